@@ -0,0 +1,616 @@
+"""Per-feature benchmarks: variants of one task timed side by side.
+
+Run from the repository root, through the suite:
+
+    python -m benchmarks.suite --compare index linear [--quick]
+    python -m benchmarks.suite --compare all --output features.json
+
+Each comparison is a generator of (label, params, variants), where
+variants maps a name to a zero-argument callable and the number of rows
+(or items) one call processes; the first variant is the baseline the
+others improve on. The suite times every variant with `measure`, so the
+results have the same fields as the synthetic cases and can be compared
+against a baseline file the same way. Resources such as worker pools or
+servers live inside the generator and are released once the suite has
+timed the variants and asks for the next case.
+"""
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from contextlib import closing
+from functools import partial
+from itertools import combinations, product
+
+import numpy as np
+
+from nebulo.expressions import Is
+from nebulo.features import Delta, Ema, Max, Mean, Min, RollingFeatures, Slope, Std
+from nebulo.learning import fit_anfis, grid_partition, wang_mendel
+from nebulo.membership import (
+    TriangularMF, TrapezoidalMF, GaussianMF, GeneralizedBellMF, SigmoidMF,
+    SShapedMF, PiShapedMF, PiecewiseLinearMF,
+)
+from nebulo.parallel import ParallelEvaluator
+from nebulo.pipeline import FuzzyPipeline
+from nebulo.rules import FuzzyRule, LinearOutput
+from nebulo.sensitivity import monte_carlo, sobol_indices
+from nebulo.server import Client, FuzzyServer
+from nebulo.system import FuzzySystem
+from nebulo.utils import compute_surface
+from nebulo.variables import FuzzyVariable
+from benchmarks.suite import measure, synthetic_system
+
+EXAMPLE_INPUTS = ("Buget_Lunar", "Cost_Actual")
+
+
+def example_system(mode):
+    """The 3x3 budget/cost risk example of the README"""
+    buget = FuzzyVariable("Buget_Lunar")
+    buget.add_term("scazut", TriangularMF(0, 1000, 2000))
+    buget.add_term("mediu", TriangularMF(1000, 3000, 5000))
+    buget.add_term("ridicat", TriangularMF(3000, 5000, 5000))
+
+    cost = FuzzyVariable("Cost_Actual")
+    cost.add_term("mic", TriangularMF(0, 500, 1500))
+    cost.add_term("moderat", TriangularMF(500, 2500, 4500))
+    cost.add_term("mare", TriangularMF(3500, 5000, 5000))
+
+    risc = FuzzyVariable("Risc")
+    risc.add_term("scazut", TriangularMF(0, 0, 45))
+    risc.add_term("mediu", TriangularMF(30, 50, 70))
+    risc.add_term("ridicat", TriangularMF(60, 100, 100))
+
+    system = FuzzySystem(mode=mode)
+    for var in (buget, cost, risc):
+        system.add_variable(var)
+
+    matrix = [["scazut", "mediu", "ridicat"],
+              ["scazut", "mediu", "ridicat"],
+              ["scazut", "scazut", "mediu"]]
+    values = {"scazut": 0, "mediu": 50, "ridicat": 100}
+    for i, b in enumerate(buget.terms):
+        for j, c in enumerate(cost.terms):
+            label = matrix[i][j]
+            output = ("Risc", label) if mode == "mamdani" else values[label]
+            system.add_rule(FuzzyRule([("Buget_Lunar", b), ("Cost_Actual", c)], output))
+    return system
+
+
+def grid_system(n_vars, n_terms, rules=True):
+    """Sugeno system with every combination of terms as a rule: n_terms ** n_vars rules"""
+    system = FuzzySystem(mode="sugeno")
+    names = [f"x{i}" for i in range(n_vars)]
+    step = 100 / (n_terms - 1)
+    for name in names:
+        var = FuzzyVariable(name)
+        for t in range(n_terms):
+            var.add_term(f"t{t}", TriangularMF((t - 1) * step, t * step, (t + 1) * step))
+        system.add_variable(var)
+    for k, terms in enumerate(product(range(n_terms), repeat=n_vars) if rules else ()):
+        system.add_rule(FuzzyRule([(n, f"t{t}") for n, t in zip(names, terms)], k % 10))
+    return system
+
+
+def uniform_inputs(names, n, high=100, seed=0):
+    rng = np.random.default_rng(seed)
+    return {name: rng.uniform(0, high, n) for name in names}
+
+
+def as_rows(inputs, n=None):
+    """The first n rows of column inputs as dicts, for per-row calls"""
+    columns = [values[:n].tolist() for values in inputs.values()]
+    return [dict(zip(inputs, row)) for row in zip(*columns)]
+
+
+def per_row(function, rows):
+    return lambda: [function(row) for row in rows], len(rows)
+
+
+def batch(quick):
+    """FuzzySystem.evaluate one dict per call versus evaluate_batch"""
+    n = 2_000 if quick else 100_000
+    inputs = uniform_inputs(EXAMPLE_INPUTS, n, 5000)
+    for mode in ("sugeno", "mamdani"):
+        system = example_system(mode)
+        yield mode, {"n": n}, {"evaluate": per_row(system.evaluate, as_rows(inputs)),
+                               "evaluate_batch": (lambda: system.evaluate_batch(inputs), n)}
+
+
+def _feedback_loop(system, starts, iterations=15):
+    """The budget/cost feedback loop of the examples, from every start"""
+    for buget, cost in starts:
+        for _ in range(iterations):
+            risc = system.evaluate({"Buget_Lunar": buget, "Cost_Actual": cost})
+            cost = min(cost + 300, 5000)
+            if risc > 40:
+                buget = min(buget + 500, 5000)
+
+
+def cache(quick):
+    """evaluate with and without the quantized cache on revisited inputs
+
+    Starts are drawn on a 100-unit grid, so the loops revisit inputs as
+    in a continuous deployment. The cache is cleared before every timed
+    call, so hits only come from within one pass.
+    """
+    n = 200 if quick else 5000
+    starts = (np.random.default_rng(0).integers(0, 30, (n, 2)) * 100).tolist()
+    for mode in ("sugeno", "mamdani"):
+        plain, cached = example_system(mode), example_system(mode)
+        memo = cached.enable_cache(steps={"Buget_Lunar": 1, "Cost_Actual": 1})
+
+        def cold():
+            memo.clear()
+            _feedback_loop(cached, starts)
+
+        yield mode, {"entities": n}, {"plain": (lambda: _feedback_loop(plain, starts), 15 * n),
+                                      "cached": (cold, 15 * n)}
+
+
+def codegen(quick):
+    """Single evaluations through evaluate, a support index and the generated code"""
+    n = 500 if quick else 20_000
+    systems = [("sugeno-3x3", lambda: example_system("sugeno"), 5000),
+               ("mamdani-3x3", lambda: example_system("mamdani"), 5000),
+               ("sugeno-5^3", lambda: grid_system(3, 5), 100)]
+    for label, build, high in systems:
+        system, indexed = build(), build()
+        indexed.build_index()
+        columns = uniform_inputs(system.compile().used_variables, n, high)
+        rows = as_rows(columns)
+        generated = system.codegen()
+        positional = [tuple(row[var] for var in generated.inputs) for row in rows]
+        yield label, {"n": n}, {"evaluate": per_row(system.evaluate, rows),
+                                "indexed": per_row(indexed.evaluate, rows),
+                                "generated": per_row(generated.evaluate, rows),
+                                "evaluate_values": per_row(lambda values: generated.evaluate_values(*values),
+                                                           positional)}
+        for size in (16, 1024):
+            small = {var: values[:size] for var, values in columns.items()}
+            yield f"{label}-b{size}", {"batch": size}, {
+                "evaluate_batch": (lambda: system.evaluate_batch(small), size),
+                "generated": (lambda: generated.evaluate_batch(small), size)}
+
+
+def dtype(quick):
+    """evaluate_batch in float64, float32 and float16 on 4 inputs with 5 terms each"""
+    n, n_rules = (2_000, 50) if quick else (100_000, 200)
+    inputs = uniform_inputs([f"x{i}" for i in range(4)], n)
+    for mode in ("sugeno", "mamdani"):
+        variants = {}
+        for name in ("float64", "float32", "float16"):
+            system = synthetic_system(4, 5, n_rules, mode=mode)
+            system.dtype = name
+            system.compile()
+            variants[name] = (partial(system.evaluate_batch, inputs), n)
+        yield mode, {"n": n, "n_rules": n_rules}, variants
+
+
+def expression_system(n_rules, seed=0):
+    """synthetic_system over 4 inputs with 9 terms, plain and with every rule rewritten as
+
+        (x0 IS a OR x0 IS very b) AND NOT x1 IS c AND x2 IS d AND x3 IS e
+
+    with a weight, over the same terms, so terms and subexpressions repeat
+    across rules as they do in hand-written rule bases.
+    """
+    plain = synthetic_system(4, 9, n_rules, seed=seed)
+    system = synthetic_system(4, 9, 0, seed=seed)
+    rng = np.random.default_rng(seed)
+    rules = []
+    for rule, other, weight in zip(plain.rules, rng.integers(0, 9, n_rules).tolist(),
+                                   rng.uniform(0.5, 1, n_rules).tolist()):
+        (v0, t0), (v1, t1), (v2, t2), (v3, t3) = rule.conditions
+        expression = (Is(v0, t0) | Is(v0, f"t{other}", "very")) & ~Is(v1, t1) & Is(v2, t2) & Is(v3, t3)
+        rules.append(FuzzyRule(expression, rule.output, weight))
+    system.rules = rules
+    return plain, system
+
+
+def expressions(quick):
+    """Expression rules (OR, NOT, hedges, weights) versus plain min-conjunctions"""
+    n_rules, n = (200, 1_000) if quick else (10_000, 1_000)
+    plain, expression = expression_system(n_rules)
+    inputs = uniform_inputs(plain.variables, n, seed=1)
+    yield "batch", {"n": n, "n_rules": n_rules}, {"plain": (lambda: plain.evaluate_batch(inputs), n),
+                                                  "expressions": (lambda: expression.evaluate_batch(inputs), n)}
+
+
+def _window_specs(window):
+    return {"slope": Slope("x", window), "mean": Mean("x", window), "std": Std("x", window),
+            "min": Min("x", window), "max": Max("x", window), "delta": Delta("x", window),
+            "ema": Ema("x", span=window)}
+
+
+def features(quick):
+    """RollingFeatures per tick versus recomputing the statistics over the window
+
+    The time per tick of RollingFeatures should not grow with the window.
+    The last case is update_one for a single entity, the online path
+    feeding FuzzySystem.evaluate.
+    """
+    n, ticks, windows = (100, 200, (16, 256)) if quick else (1000, 2000, (16, 256, 4096))
+    stream = np.random.default_rng(0).normal(0, 1, (ticks, n)).cumsum(axis=0)
+    for window in windows:
+        rolling = RollingFeatures(_window_specs(window), n_entities=n)
+        warm = np.zeros((window, n))
+        for row in warm:  # fill the windows so every tick slides
+            rolling.update({"x": row})
+        history = np.concatenate([warm, stream])
+        positions = np.arange(window)
+
+        def update():
+            for row in stream:
+                rolling.update({"x": row})
+
+        def recompute():
+            for t in range(window, window + ticks):
+                last = history[t - window + 1:t + 1]
+                last.mean(axis=0), last.std(axis=0), last.min(axis=0), last.max(axis=0)
+                np.polyfit(positions, last, 1)
+
+        yield f"w{window}", {"entities": n, "window": window}, {"recompute": (recompute, ticks),
+                                                                 "rolling": (update, ticks)}
+
+    single = RollingFeatures(_window_specs(256))
+    values = stream[:, 0].tolist()
+    yield "update_one", {"window": 256}, {"update_one": per_row(lambda value: single.update_one({"x": value}),
+                                                                values)}
+
+
+def index(quick):
+    """Scalar evaluate with and without the support-interval index
+
+    On grid systems the rule count grows as terms ** variables while only
+    about 2 ** variables rules fire for any input.
+    """
+    n_terms, sizes = (5, (2, 3)) if quick else (10, (2, 3, 4))
+    for n_vars in sizes:
+        plain, indexed = grid_system(n_vars, n_terms), grid_system(n_vars, n_terms)
+        indexed.build_index()
+        rows = as_rows(uniform_inputs(plain.variables, 200))
+        yield f"v{n_vars}", {"n_rules": len(plain.rules)}, {"plain": per_row(plain.evaluate, rows),
+                                                            "indexed": per_row(indexed.evaluate, rows)}
+
+
+def instrumentation(quick):
+    """evaluate and evaluate_batch without hooks and with the built-in Collector"""
+    n = 500 if quick else 100_000
+    inputs = uniform_inputs(EXAMPLE_INPUTS, n, 5000)
+    rows = as_rows(inputs, 2000)
+    for mode in ("sugeno", "mamdani"):
+        off, on = example_system(mode), example_system(mode)
+        on.instrument()
+        yield f"{mode}-evaluate", {}, {"off": per_row(off.evaluate, rows), "collector": per_row(on.evaluate, rows)}
+        yield f"{mode}-batch", {"n": n}, {"off": (lambda: off.evaluate_batch(inputs), n),
+                                          "collector": (lambda: on.evaluate_batch(inputs), n)}
+
+
+def learning(quick):
+    """Wang-Mendel rule generation and one ANFIS epoch on a smooth function of 4 inputs"""
+    n, n_terms = (2_000, 3) if quick else (200_000, 4)
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 100, (4, n))
+    y = 20 * np.sin(x[0] / 15) + 0.3 * x[1] + x[2] * x[3] / 200 + rng.normal(0, 1, n)
+    inputs = {f"x{i}": x[i] for i in range(4)}
+
+    def partitioned():
+        system = FuzzySystem(tnorm="product")
+        for name in inputs:
+            system.add_variable(grid_partition(name, (0, 100), n_terms))
+        return system
+
+    trained = partitioned()
+    wang_mendel(trained, inputs, y)
+    yield "train", {"n": n, "n_terms": n_terms}, {
+        "wang_mendel": (lambda: wang_mendel(partitioned(), inputs, y), n),
+        "fit_anfis": (lambda: fit_anfis(trained, inputs, y, epochs=1, batch_size=1024, seed=0), n)}
+
+
+def tsk_systems(n_vars=3, n_terms=5):
+    """A grid system with random first-order consequents, as LinearOutput and as lambdas"""
+    linear, lambdas = grid_system(n_vars, n_terms), grid_system(n_vars, n_terms)
+    names = list(linear.variables)
+    rng = np.random.default_rng(0)
+    rules_linear, rules_lambda = [], []
+    for rule in linear.rules:
+        *coefficients, bias = rng.normal(size=len(names) + 1).tolist()
+        rules_linear.append(FuzzyRule(rule.conditions, LinearOutput(dict(zip(names, coefficients)), bias)))
+        rules_lambda.append(FuzzyRule(rule.conditions, (lambda c, b: lambda x: b + sum(
+            ci * x[n] for ci, n in zip(c, names)))(coefficients, bias)))
+    linear.rules, lambdas.rules = rules_linear, rules_lambda
+    return linear, lambdas
+
+
+def linear(quick):
+    """First-order Sugeno consequents: Python callables versus LinearOutput"""
+    n = 1_000 if quick else 10_000
+    fast, slow = tsk_systems()
+    inputs = uniform_inputs(fast.variables, n, seed=1)
+    yield "batch", {"n": n, "n_rules": len(fast.rules)}, {"callables": (lambda: slow.evaluate_batch(inputs), n),
+                                                          "linear": (lambda: fast.evaluate_batch(inputs), n)}
+
+
+MEMBERSHIP_FUNCTIONS = [
+    TriangularMF(1000, 3000, 5000),
+    TrapezoidalMF(1000, 2500, 3500, 5000),
+    GaussianMF(2500, 800),
+    GeneralizedBellMF(1000, 2, 2500),
+    SigmoidMF(0.005, 2500),
+    SShapedMF(1000, 4000),
+    PiShapedMF(0, 1500, 3500, 5000),
+    PiecewiseLinearMF([(0, 0), (1000, 1), (3000, 0.4), (5000, 0)]),
+]
+
+
+def membership(quick):
+    """A Python loop over evaluate versus evaluate_array into a preallocated buffer"""
+    n = 20_000 if quick else 1_000_000
+    x = np.random.default_rng(0).uniform(0, 5000, n)
+    out = np.empty_like(x)
+    sample = x[:min(n, 20_000)].tolist()
+    for mf in MEMBERSHIP_FUNCTIONS:
+        yield type(mf).__name__, {"n": n}, {"evaluate": per_row(mf.evaluate, sample),
+                                            "evaluate_array": (lambda: mf.evaluate_array(x, out=out), n)}
+
+
+def optimizer(quick):
+    """evaluate_batch before and after optimize(), without and with a tolerance
+
+    Random rule bases over 4 inputs with 5 terms, so most antecedents
+    repeat. The tolerance is 1.0 on the output range 0..100.
+    """
+    n_rules, n = (500, 2_000) if quick else (5000, 20_000)
+    inputs = uniform_inputs([f"x{i}" for i in range(4)], n)
+    for mode in ("sugeno", "mamdani"):
+        systems = {"original": synthetic_system(4, 5, n_rules, mode=mode)}
+        params = {"n": n, "n_rules": n_rules}
+        for name, tolerance in (("optimized", None), ("tolerance", 1.0)):
+            systems[name] = synthetic_system(4, 5, n_rules, mode=mode)
+            params[f"{name}_rules"] = systems[name].optimize(tolerance=tolerance, seed=0).rules_after
+        yield mode, params, {name: (partial(system.evaluate_batch, inputs), n) for name, system in systems.items()}
+
+
+def _worker_counts(limit):
+    counts = [1]
+    while counts[-1] * 2 <= limit:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != limit:
+        counts.append(limit)
+    return counts
+
+
+def parallel(quick):
+    """ParallelEvaluator over the number of workers; pools are started before timing"""
+    n = 20_000 if quick else 2_000_000
+    inputs = uniform_inputs(EXAMPLE_INPUTS, n, 5000)
+    for mode in ("sugeno", "mamdani"):
+        system = example_system(mode)
+        for backend in ("process", "thread"):
+            for workers in _worker_counts(os.cpu_count() or 1):
+                with ParallelEvaluator(system, workers, backend) as evaluator:
+                    yield f"{mode}-{backend}-w{workers}", {"n": n, "workers": workers}, {
+                        "evaluate_batch": (lambda: evaluator.evaluate_batch(inputs), n)}
+
+
+def level_system(n_rules, seed=0):
+    """synthetic_system over the stage outputs y0..y3 instead of x0..x3"""
+    system = synthetic_system(4, 5, n_rules, "triangular", seed=seed)
+    for k in range(4):
+        var = system.variables.pop(f"x{k}")
+        var.name = f"y{k}"
+        system.variables[var.name] = var
+    system.rules = [type(rule)([(f"y{var[1:]}", term) for var, term in rule.conditions], rule.output)
+                    for rule in system.rules]
+    return system
+
+
+def pipeline(quick):
+    """A hierarchical model as a FuzzyPipeline versus separate evaluate_batch calls
+
+    Four Sugeno systems with different rule bases over the same four
+    inputs (nine Gaussian terms each) feed a fifth system combining their
+    outputs. Separately every system fuzzifies the inputs again; the
+    pipeline computes each distinct term once.
+    """
+    n, n_rules = (2_000, 20) if quick else (100_000, 20)
+    stages = [synthetic_system(4, 9, n_rules, "gaussian", seed=k) for k in range(4)]
+    level = level_system(n_rules)
+    chained = FuzzyPipeline()
+    for k, system in enumerate(stages):
+        chained.add(system, f"y{k}")
+    chained.add(level, "level")
+    inputs = uniform_inputs([f"x{i}" for i in range(4)], n, seed=1)
+    rows = as_rows(inputs, 200)
+
+    def separate(evaluate, inputs):
+        outputs = {f"y{k}": evaluate(system, inputs) for k, system in enumerate(stages)}
+        outputs["level"] = evaluate(level, outputs)
+        return outputs
+
+    yield "batch", {"n": n, "n_rules": n_rules}, {
+        "separate": (lambda: separate(FuzzySystem.evaluate_batch, inputs), n),
+        "pipeline": (lambda: chained.evaluate_batch(inputs), n)}
+    yield "evaluate", {"n_rules": n_rules}, {
+        "separate": per_row(lambda row: separate(FuzzySystem.evaluate, row), rows),
+        "pipeline": per_row(chained.evaluate, rows)}
+
+
+def rulebase(quick):
+    """Building a grid rule base as a list of FuzzyRule, with add_rule and with add_rules
+
+    Peak memory shows the size of each representation; "list" is what
+    FuzzySystem.rules used to be.
+    """
+    n_terms, n_vars = (10 if quick else 37), 3
+    names = [f"x{i}" for i in range(n_vars)]
+    grid = list(product(range(n_terms), repeat=n_vars))
+    n = len(grid)
+
+    def as_list():
+        return [FuzzyRule([(v, f"t{t}") for v, t in zip(names, terms)], k % 10) for k, terms in enumerate(grid)]
+
+    def one_by_one():
+        system = grid_system(n_vars, n_terms, rules=False)
+        for rule in as_list():
+            system.add_rule(rule)
+        return system.rules
+
+    def from_arrays():
+        system = grid_system(n_vars, n_terms, rules=False)
+        system.add_rules(names, np.array(grid), np.arange(n) % 10)
+        return system.rules
+
+    yield f"v{n_vars}", {"n_rules": n}, {"list": (as_list, n), "add_rule": (one_by_one, n),
+                                         "add_rules": (from_arrays, n)}
+
+
+def sensitivity(quick):
+    """Surfaces with nested evaluate calls versus compute_surface; Monte Carlo and Sobol"""
+    n, resolutions = (10_000, (30,)) if quick else (1_000_000, (30, 100))
+    for mode in ("sugeno", "mamdani"):
+        system = example_system(mode)
+        for resolution in resolutions:
+            grid = np.linspace(0, 5000, resolution)
+            yield f"{mode}-surface{resolution}", {"resolution": resolution}, {
+                "nested": (lambda: [[system.evaluate({"Buget_Lunar": x, "Cost_Actual": y}) for x in grid]
+                                    for y in grid], resolution ** 2),
+                "compute_surface": (lambda: compute_surface(system, *EXAMPLE_INPUTS, resolution,
+                                                            x_range=(0, 5000), y_range=(0, 5000)), resolution ** 2)}
+    system = example_system("sugeno")
+    yield "sugeno-sampling", {"n": n}, {
+        "monte_carlo": (lambda: monte_carlo(system, n_samples=n, seed=0, keep_outputs=False), n),
+        "sobol_indices": (lambda: sobol_indices(system, n_samples=n, seed=0), n)}
+
+
+def _serve(path, max_batch_size, ready):
+    async def run():
+        server = await FuzzyServer(example_system("sugeno"), max_batch_size, 0.001).start(path=path)
+        ready.set()
+        await server.serve_forever()
+    asyncio.run(run())
+
+
+async def _load(path, rows, connections):
+    clients = [await Client.connect(path=path) for _ in range(connections)]
+
+    async def send(client, part):
+        for row in part:
+            await client.evaluate(row)
+
+    try:
+        await asyncio.gather(*(send(client, rows[i::connections]) for i, client in enumerate(clients)))
+    finally:
+        for client in clients:
+            await client.close()
+
+
+def server(quick):
+    """FuzzyServer requests/s from max_batch_size=1 (no micro-batching) upward
+
+    Each server runs in a child process on a Unix socket; one call sends
+    every request over `connections` concurrent clients.
+    """
+    requests, connections, sizes = (500, 16, (1, 64)) if quick else (20_000, 64, (1, 16, 64, 256))
+    rows = as_rows(uniform_inputs(EXAMPLE_INPUTS, requests, 5000))
+    with tempfile.TemporaryDirectory() as directory:
+        for max_batch_size in sizes:
+            path = os.path.join(directory, f"server{max_batch_size}.sock")
+            ready = multiprocessing.Event()
+            process = multiprocessing.Process(target=_serve, args=(path, max_batch_size, ready), daemon=True)
+            process.start()
+            ready.wait()
+            try:
+                yield f"b{max_batch_size}", {"requests": requests, "connections": connections}, {
+                    "requests": (lambda: asyncio.run(_load(path, rows, connections)), requests)}
+            finally:
+                process.terminate()
+                process.join()
+
+
+def pairwise_system(mode, n_vars, n_terms=5):
+    """Every rule tests a pair of variables (a full grid per pair), so an input feeds part of the rules"""
+    system = FuzzySystem(mode=mode)
+    names = [f"x{i}" for i in range(n_vars)]
+    step = 100 / (n_terms - 1)
+    for name in names + (["y"] if mode == "mamdani" else []):
+        var = FuzzyVariable(name, (0, 100))
+        for t in range(n_terms):
+            var.add_term(f"t{t}", TriangularMF((t - 1) * step, t * step, (t + 1) * step))
+        (system.add_output if name == "y" else system.add_variable)(var)
+    rng = np.random.default_rng(0)
+    grid = np.array([(a, b) for a in range(n_terms) for b in range(n_terms)])
+    for a, b in combinations(names, 2):
+        if mode == "sugeno":
+            outputs = rng.uniform(0, 100, len(grid))
+        else:
+            outputs = [("y", f"t{t}") for t in rng.integers(0, n_terms, len(grid)).tolist()]
+        system.add_rules([a, b], grid, outputs)
+    return system
+
+
+def session(quick):
+    """Feedback-loop steps changing one input: evaluate versus an EvaluationSession
+
+    The "open" case creates one session per tracked entity; its peak
+    memory divided by the rows is the memory held per session.
+    """
+    n_vars, n_sessions, steps = (4, 100, 200) if quick else (8, 1000, 2000)
+    rng = np.random.default_rng(1)
+    for mode in ("sugeno", "mamdani"):
+        system = pairwise_system(mode, n_vars)
+        names = list(system.variables)
+        changes = [(names[i], v) for i, v in zip(rng.integers(0, n_vars, steps).tolist(),
+                                                  rng.uniform(0, 100, steps).tolist())]
+        start = {name: 50.0 for name in names}
+        inputs = dict(start)
+        live = system.session(start)
+
+        def step(change):
+            inputs[change[0]] = change[1]
+            return system.evaluate(inputs)
+
+        def open_sessions():
+            sessions = [system.session(start) for _ in range(n_sessions)]
+            return [s.output for s in sessions]
+
+        yield f"{mode}-steps", {"n_rules": len(system.rules)}, {
+            "evaluate": per_row(step, changes),
+            "session": per_row(lambda change: live.update({change[0]: change[1]}), changes)}
+        yield f"{mode}-open", {"n_rules": len(system.rules)}, {"session": (open_sessions, n_sessions)}
+
+
+def storage(quick):
+    """Start-up: building a grid system in code versus FuzzySystem.load
+
+    "build" and "load_first_batch" include the first evaluate_batch of
+    1000 rows, i.e. compiling the rule base for built systems.
+    """
+    n_terms, sizes = (5, (2, 3)) if quick else (10, (2, 3, 4))
+    with tempfile.TemporaryDirectory() as directory:
+        for n_vars in sizes:
+            inputs = uniform_inputs([f"x{i}" for i in range(n_vars)], 1000)
+            path = os.path.join(directory, f"grid{n_vars}.nebulo")
+            grid_system(n_vars, n_terms).save(path)
+            yield f"v{n_vars}", {"n_rules": n_terms ** n_vars, "bytes": os.path.getsize(path)}, {
+                "build": (lambda: grid_system(n_vars, n_terms).evaluate_batch(inputs), 1),
+                "load_mmap": (lambda: FuzzySystem.load(path), 1),
+                "load_read": (lambda: FuzzySystem.load(path, mmap=False), 1),
+                "load_first_batch": (lambda: FuzzySystem.load(path).evaluate_batch(inputs), 1)}
+
+
+COMPARISONS = {function.__name__: function for function in (
+    batch, cache, codegen, dtype, expressions, features, index, instrumentation, learning, linear,
+    membership, optimizer, parallel, pipeline, rulebase, sensitivity, server, session, storage)}
+
+
+def run_comparison(name, quick=False, min_time=0.2):
+    """One result dict per variant of every case of comparison `name`"""
+    results = []
+    with closing(COMPARISONS[name](quick)) as comparison:
+        for label, params, variants in comparison:
+            for variant, (call, rows) in variants.items():
+                results.append(dict({"case": f"{name}-{label}", "params": dict(params), "stage": variant},
+                                    **measure(call, rows, min_time)))
+    return results
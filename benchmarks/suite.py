@@ -0,0 +1,302 @@
+"""Benchmark suite over synthetic systems, with JSON results and regression checks.
+
+Run from the repository root:
+
+    python -m benchmarks.suite [--quick | --full] [--output results.json]
+                               [--baseline baseline.json] [--threshold 0.2]
+    python -m benchmarks.suite --compare index linear ...   # or --compare all
+
+Each case is a generated system described by the number of input
+variables, terms per variable, rules, membership function type and mode,
+evaluated on batches of a given size. For every case the stages
+
+    fuzzify           CompiledSystem.fuzzify of the batch
+    inference         CompiledSystem.activations and aggregate of the fuzzified batch
+    defuzzification   CompiledSystem.defuzzify_batch of the aggregated outputs
+    evaluate_batch    the three stages end to end
+    evaluate          FuzzySystem.evaluate of a single row
+
+report throughput (rows/s), latency percentiles of one call and the peak
+memory allocated during one call. By default each axis is varied on its
+own around a base case; --full runs the whole cartesian product.
+
+With --baseline, results are matched to the baseline by case and stage;
+a throughput drop or a peak memory growth beyond --threshold is reported
+as a regression and the exit status is 1. Save a baseline with --output
+before a change, then compare after it.
+
+--compare runs the per-feature benchmarks of benchmarks.comparisons
+instead of the synthetic cases (the support index, code generation,
+dtypes, the server, ...): variants of one task, such as evaluate with
+and without an index, reported as the stages of a case.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from itertools import cycle, product
+
+import numpy as np
+
+from nebulo.membership import TriangularMF, TrapezoidalMF, GaussianMF
+from nebulo.variables import FuzzyVariable
+from nebulo.system import FuzzySystem
+
+MF_TYPES = ("triangular", "trapezoidal", "gaussian")
+MODES = ("sugeno", "mamdani")
+STAGES = ("fuzzify", "inference", "defuzzification", "evaluate_batch", "evaluate")
+
+BASE = {"n_vars": 3, "n_terms": 5, "n_rules": 100, "mf": "triangular", "mode": "sugeno", "batch": 10_000}
+
+AXES = {
+    "n_vars": (2, 3, 5, 8),
+    "n_terms": (3, 5, 9),
+    "n_rules": (10, 100, 1_000, 10_000),
+    "mf": MF_TYPES,
+    "mode": MODES,
+    "batch": (1, 100, 10_000, 100_000),
+}
+
+QUICK_BASE = dict(BASE, n_rules=30, batch=1_000)
+
+QUICK_AXES = {
+    "n_vars": (2, 3),
+    "n_terms": (3, 5),
+    "n_rules": (10, 30),
+    "mf": MF_TYPES,
+    "mode": MODES,
+    "batch": (1, 1_000),
+}
+
+# Distinct inputs cycled through by the scalar `evaluate` stage
+SCALAR_ROWS = 200
+
+
+def make_term(mf, t, step):
+    """Term t of an evenly partitioned universe [0, 100]"""
+    center = t * step
+    if mf == "triangular":
+        return TriangularMF(center - step, center, center + step)
+    if mf == "trapezoidal":
+        return TrapezoidalMF(center - step, center - step / 4, center + step / 4, center + step)
+    if mf == "gaussian":
+        return GaussianMF(center, step / 2)
+    raise ValueError(f"unknown membership function type {mf!r}, expected one of {MF_TYPES}")
+
+
+def synthetic_system(n_vars, n_terms, n_rules, mf="triangular", mode="sugeno", seed=0):
+    """System over inputs x0..x{n_vars-1} in [0, 100] with n_rules random rules
+
+    Every rule tests all inputs; terms are drawn uniformly. Sugeno rules
+    get constant consequents in [0, 100], Mamdani rules a term of the
+    output "y", partitioned like the inputs.
+    """
+    rng = np.random.default_rng(seed)
+    system = FuzzySystem(mode=mode)
+    step = 100 / (n_terms - 1)
+    names = [f"x{i}" for i in range(n_vars)]
+    for name in names:
+        var = FuzzyVariable(name, (0, 100))
+        for t in range(n_terms):
+            var.add_term(f"t{t}", make_term(mf, t, step))
+        system.add_variable(var)
+
+    terms = rng.integers(0, n_terms, (n_rules, n_vars))
+    if mode == "sugeno":
+        outputs = rng.uniform(0, 100, n_rules)
+    else:
+        y = FuzzyVariable("y", (0, 100))
+        for t in range(n_terms):
+            y.add_term(f"t{t}", make_term(mf, t, step))
+        system.add_output(y)
+        outputs = [("y", f"t{t}") for t in rng.integers(0, n_terms, n_rules).tolist()]
+    system.add_rules(names, terms, outputs)
+    return system
+
+
+def case_name(case):
+    return "v{n_vars}-t{n_terms}-r{n_rules}-{mf}-{mode}-b{batch}".format(**case)
+
+
+def cases(axes=AXES, full=False, base=BASE):
+    """Case dicts: the cartesian product of `axes`, or each axis varied alone around `base`"""
+    if full:
+        return [dict(zip(axes, values)) for values in product(*axes.values())]
+    result = []
+    for axis, values in axes.items():
+        for value in values:
+            case = dict(base, **{axis: value})
+            if case not in result:
+                result.append(case)
+    return result
+
+
+def stage_call(system, stage, inputs):
+    """Zero-argument callable running `stage` once, and the rows it processes"""
+    compiled = system.compile()
+    n = len(next(iter(inputs.values())))
+    if stage == "evaluate_batch":
+        return lambda: compiled.evaluate_batch(inputs), n
+    if stage == "evaluate":
+        rows = cycle([dict(zip(inputs, values))
+                      for values in zip(*(v[:SCALAR_ROWS].tolist() for v in inputs.values()))])
+        return lambda: system.evaluate(next(rows)), 1
+
+    fuzzified = compiled.fuzzify(inputs, n)
+    if stage == "fuzzify":
+        return lambda: compiled.fuzzify(inputs, n), n
+    if stage == "inference":
+        return lambda: compiled.aggregate(compiled.activations(fuzzified), inputs), n
+    if stage != "defuzzification":
+        raise ValueError(f"unknown stage {stage!r}, expected one of {STAGES}")
+    aggregated = compiled.aggregate(compiled.activations(fuzzified), inputs)
+    return lambda: compiled.defuzzify_batch(aggregated, n), n
+
+
+def measure(call, rows, min_time=0.2, min_repeats=5, max_repeats=1000):
+    """Time `call` until min_time has passed (within the repeat bounds), then trace one more call"""
+    call()  # warm-up
+    times = []
+    deadline = time.perf_counter() + min_time
+    while len(times) < max_repeats and (len(times) < min_repeats or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    times = np.array(times)
+    p50, p90, p99 = np.percentile(times, [50, 90, 99]).tolist()
+    return {
+        "rows": rows,
+        "repeats": len(times),
+        "throughput": rows / float(np.median(times)),
+        "latency": {"min": float(times.min()), "mean": float(times.mean()), "p50": p50, "p90": p90, "p99": p99},
+        "peak_memory": peak,
+    }
+
+
+def run_case(case, stages=STAGES, min_time=0.2, seed=0):
+    """One result dict per stage of `case`"""
+    system = synthetic_system(case["n_vars"], case["n_terms"], case["n_rules"], case["mf"], case["mode"], seed)
+    rng = np.random.default_rng(seed + 1)
+    inputs = {name: rng.uniform(0, 100, case["batch"]) for name in system.variables}
+    results = []
+    for stage in stages:
+        call, rows = stage_call(system, stage, inputs)
+        results.append(dict({"case": case_name(case), "params": dict(case), "stage": stage},
+                            **measure(call, rows, min_time)))
+    return results
+
+
+def environment():
+    """Where the results come from, recorded next to them"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(results, baseline, threshold=0.2):
+    """Regressions of `results` against `baseline` result lists, as readable lines
+
+    A (case, stage) pair regresses when its throughput fell below
+    (1 - threshold) times the baseline or its peak memory grew above
+    (1 + threshold) times the baseline. Pairs missing from either side
+    are ignored.
+    """
+    previous = {(r["case"], r["stage"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["case"], result["stage"]))
+        if old is None:
+            continue
+        name = f"{result['case']} {result['stage']}"
+        ratio = result["throughput"] / old["throughput"]
+        if ratio < 1 - threshold:
+            regressions.append(f"{name}: throughput {old['throughput']:.4g} -> {result['throughput']:.4g} rows/s "
+                               f"({ratio - 1:+.0%})")
+        if old["peak_memory"] and result["peak_memory"] > (1 + threshold) * old["peak_memory"]:
+            regressions.append(f"{name}: peak memory {old['peak_memory']} -> {result['peak_memory']} bytes "
+                               f"({result['peak_memory'] / old['peak_memory'] - 1:+.0%})")
+    return regressions
+
+
+def write_results(path, results):
+    with open(path, "w") as handle:
+        json.dump({"environment": environment(), "results": results}, handle, indent=1)
+
+
+def read_results(path):
+    with open(path) as handle:
+        try:
+            results = json.load(handle)["results"]
+        except (ValueError, KeyError, TypeError):
+            results = None
+    if not results:
+        raise ValueError(f"{path}: no benchmark results, expected a file written by --output")
+    return results
+
+
+def main(argv=None):
+    # benchmarks.comparisons builds on this module's helpers
+    from benchmarks.comparisons import COMPARISONS, run_comparison
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="small axes, for a fast smoke run")
+    parser.add_argument("--full", action="store_true", help="every combination of the axes")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--compare", nargs="+", choices=[*COMPARISONS, "all"], metavar="NAME",
+                        help="per-feature benchmarks to run instead: all or any of " + ", ".join(COMPARISONS))
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent timing each stage")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="tolerated relative slowdown")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        names = list(COMPARISONS) if "all" in args.compare else args.compare
+        runs = (run_comparison(name, args.quick, args.min_time) for name in names)
+    else:
+        axes, base = (QUICK_AXES, QUICK_BASE) if args.quick else (AXES, BASE)
+        runs = (run_case(case, args.stages, args.min_time) for case in cases(axes, args.full, base))
+    results = []
+    for run in runs:
+        for result in run:
+            results.append(result)
+            latency = result["latency"]
+            print(f"{result['case']:42s} {result['stage']:16s} {result['throughput']:14.0f} rows/s   "
+                  f"p50 {latency['p50'] * 1e3:9.3f} ms   p99 {latency['p99'] * 1e3:9.3f} ms   "
+                  f"peak {result['peak_memory'] / 2 ** 20:8.2f} MiB", flush=True)
+    if args.output:
+        write_results(args.output, results)
+
+    if args.baseline:
+        regressions = compare(results, read_results(args.baseline), args.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""The suite's quick cases as pytest-benchmark tests.
+
+    python -m pytest benchmarks/test_suite.py --benchmark-json=results.json
+
+Skipped when pytest-benchmark is not installed.
+"""
+import pytest
+
+from benchmarks.suite import QUICK_AXES, QUICK_BASE, STAGES, case_name, cases, stage_call, synthetic_system
+
+pytest.importorskip("pytest_benchmark")
+
+import numpy as np  # noqa: E402
+
+
+@pytest.mark.parametrize("stage", STAGES)
+@pytest.mark.parametrize("case", cases(QUICK_AXES, base=QUICK_BASE), ids=case_name)
+def test_stage(benchmark, case, stage):
+    system = synthetic_system(case["n_vars"], case["n_terms"], case["n_rules"], case["mf"], case["mode"])
+    rng = np.random.default_rng(1)
+    inputs = {name: rng.uniform(0, 100, case["batch"]) for name in system.variables}
+    call, rows = stage_call(system, stage, inputs)
+    benchmark.extra_info.update(case, rows=rows)
+    benchmark(call)
@@ -5,6 +5,7 @@ from nebulo.membership import TriangularMF  # Folosim TriangularMF
 from nebulo.variables import FuzzyVariable
 from nebulo.rules import FuzzyRule
 from nebulo.system import FuzzySystem
+from nebulo.utils import compute_surface
 
 # --- 1. Definirea Variabilelor (Triunghiulare) ---
 buget_lunar = FuzzyVariable("Buget_Lunar")
@@ -25,7 +26,7 @@ risc_var.add_term("ridicat", TriangularMF(60, 100, 100))
 system_mamdani = FuzzySystem(mode="mamdani")
 system_mamdani.add_variable(buget_lunar)
 system_mamdani.add_variable(cost_actual)
-system_mamdani.add_variable(risc_var)
+system_mamdani.add_output(risc_var)
 
 rules = [
     FuzzyRule([("Buget_Lunar", "scazut"), ("Cost_Actual", "mic")], ("Risc", "scazut")),
@@ -54,10 +55,7 @@ for t in range(iteratii):
     if r_eval > 45: buget = min(buget + 500, 5000)
     elif r_eval < 15: buget = max(buget - 200, 500)
 
-x1_range = np.linspace(0, 5000, 20)
-x2_range = np.linspace(0, 5000, 20)
-X1, X2 = np.meshgrid(x1_range, x2_range)
-Z = np.array([[system_mamdani.evaluate({"Buget_Lunar": x, "Cost_Actual": y}) for x in x1_range] for y in x2_range])
+X1, X2, Z = compute_surface(system_mamdani, "Buget_Lunar", "Cost_Actual", resolution=20, x_range=(0, 5000), y_range=(0, 5000))
 
 # --- 3. Crearea Plotului Unificat (Identic cu Template-ul) ---
 fig = plt.figure(figsize=(16, 10))
@@ -5,6 +5,7 @@ from nebulo.membership import TrapezoidalMF
 from nebulo.variables import FuzzyVariable
 from nebulo.rules import FuzzyRule
 from nebulo.system import FuzzySystem
+from nebulo.utils import compute_surface
 
 # --- 1. Definirea Variabilelor ---
 buget_lunar = FuzzyVariable("Buget_Lunar")
@@ -48,10 +49,7 @@ for t in range(iteratii):
     cost = min(cost + 300, 5000)
     if r_eval > 40: buget = min(buget + 500, 5000)
 
-x1_range = np.linspace(0, 5000, 30)
-x2_range = np.linspace(0, 5000, 30)
-X1, X2 = np.meshgrid(x1_range, x2_range)
-Z = np.array([[system_sugeno.evaluate({"Buget_Lunar": x, "Cost_Actual": y}) for x in x1_range] for y in x2_range])
+X1, X2, Z = compute_surface(system_sugeno, "Buget_Lunar", "Cost_Actual", resolution=30, x_range=(0, 5000), y_range=(0, 5000))
 
 # --- 3. Vizualizare ---
 fig = plt.figure(figsize=(18, 10))
@@ -1,15 +1,39 @@
-from .membership import TriangularMF, TrapezoidalMF, GaussianMF
+from .membership import (
+    TriangularMF,
+    TrapezoidalMF,
+    GaussianMF,
+    GeneralizedBellMF,
+    SigmoidMF,
+    SShapedMF,
+    ZShapedMF,
+    PiShapedMF,
+    PiecewiseLinearMF,
+)
 from .variables import FuzzyVariable
-from .rules import FuzzyRule
+from .rules import FuzzyRule, LinearOutput
+from .expressions import Is, parse_expression, parse_rule
 from .system import FuzzySystem
-from .utils import compute_weekly_trend
+from .pipeline import FuzzyPipeline
+from .utils import compute_weekly_trend, compute_surface
 
 __all__ = [
     "TriangularMF",
     "TrapezoidalMF",
     "GaussianMF",
+    "GeneralizedBellMF",
+    "SigmoidMF",
+    "SShapedMF",
+    "ZShapedMF",
+    "PiShapedMF",
+    "PiecewiseLinearMF",
     "FuzzyVariable",
     "FuzzyRule",
+    "LinearOutput",
+    "Is",
+    "parse_expression",
+    "parse_rule",
     "FuzzySystem",
+    "FuzzyPipeline",
     "compute_weekly_trend",
+    "compute_surface",
 ]
\ No newline at end of file
@@ -0,0 +1,97 @@
+from collections import OrderedDict, namedtuple
+
+from .compiled import _signature
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class _LRU:
+    """Bounded mapping that drops the least recently used entry"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+class EvaluationCache:
+    """Memoizes FuzzySystem.evaluate on quantized inputs, see `FuzzySystem.enable_cache`
+
+    steps: {var_name: step}. A value x of such a variable is replaced by
+           the nearest multiple of its step, round(x / step) * step, both
+           as the cache key and as the input actually evaluated, so a
+           result never depends on which nearby input came first.
+           Variables without a step are keyed on their exact value.
+    maxsize: bound on the number of cached outputs; per-variable
+             fuzzifications get the same bound
+
+    Everything is dropped when a variable, term or rule is added.
+    """
+
+    def __init__(self, system, steps=None, maxsize=4096):
+        self.system = system
+        self.steps = dict(steps or {})
+        self.outputs = _LRU(maxsize)
+        self.fuzzified = _LRU(maxsize)
+        self._signature = _signature(system)
+
+    def clear(self):
+        self.outputs.clear()
+        self.fuzzified.clear()
+        self._signature = _signature(self.system)
+
+    def cache_info(self):
+        """{"outputs": CacheInfo, "fuzzify": CacheInfo} hit/miss statistics"""
+        return {"outputs": self.outputs.info(), "fuzzify": self.fuzzified.info()}
+
+    def quantize(self, name, value):
+        step = self.steps.get(name)
+        if step is None:
+            return value
+        return round(value / step) * step
+
+    def fuzzify(self, name, value):
+        """Cached FuzzyVariable.fuzzify of an already quantized value; do not mutate the result"""
+        key = (name, value)
+        degrees = self.fuzzified.get(key)
+        if degrees is None:
+            degrees = self.system.variables[name].fuzzify(value)
+            self.fuzzified.put(key, degrees)
+        return degrees
+
+    def evaluate(self, inputs):
+        if _signature(self.system) != self._signature:
+            self.clear()
+        steps = self.steps
+        quantized = {}
+        for name, value in inputs.items():
+            step = steps.get(name)
+            quantized[name] = value if step is None else round(value / step) * step
+        key = tuple(sorted(quantized.items()))
+        output = self.outputs.get(key)
+        if output is None:
+            fuzzified = {name: self.fuzzify(name, value) for name, value in quantized.items()}
+            output = self.system._infer(quantized, fuzzified, range(len(self.system.rules)))
+            self.outputs.put(key, output)
+        return output
@@ -0,0 +1,289 @@
+import linecache
+from itertools import count
+
+from .compiled import _as_columns
+from .expressions import And, Is, Not
+from .membership import (
+    TriangularMF,
+    TrapezoidalMF,
+    GaussianMF,
+    GeneralizedBellMF,
+    SigmoidMF,
+    SShapedMF,
+    ZShapedMF,
+    PiShapedMF,
+    PiecewiseLinearMF,
+)
+from .rules import LinearOutput
+
+# Constructor parameters of the membership functions code can be generated for
+_MF_PARAMETERS = {
+    TriangularMF: ("a", "b", "c"),
+    TrapezoidalMF: ("a", "b", "c", "d"),
+    GaussianMF: ("mean", "sigma"),
+    GeneralizedBellMF: ("a", "b", "c"),
+    SigmoidMF: ("a", "c"),
+    SShapedMF: ("a", "b"),
+    ZShapedMF: ("a", "b"),
+    PiShapedMF: ("a", "b", "c", "d"),
+    PiecewiseLinearMF: None,  # built from its points
+}
+
+# Terms per line of the generated sums; long single expressions nest too deeply for the compiler
+_SUM_TERMS = 32
+
+_filenames = count()
+
+
+class GeneratedSystem:
+    """Functions exec-compiled from the source written by generate_source
+
+    evaluate(inputs) -- FuzzySystem.evaluate, from a {name: float} dict
+    evaluate_values(*values) -- the same with the values of `inputs` (the
+                                input names, in order) as arguments
+    evaluate_batch(inputs, columns=None) -- FuzzySystem.evaluate_batch
+
+    `source` is a plain Python module depending only on NumPy and nebulo;
+    save it with `save` and get the functions back with `load` without
+    generating again, or import it directly. It is a snapshot: changes
+    to the system after codegen are not seen. Indexes, caches and hooks
+    of the system are not used.
+    """
+
+    def __init__(self, source, filename=None):
+        self.source = source
+        self.filename = filename or f"<nebulo-codegen-{next(_filenames)}>"
+        # Lets tracebacks and inspect show the generated lines
+        linecache.cache[self.filename] = (len(source), None, source.splitlines(True), self.filename)
+        namespace = {}
+        exec(compile(source, self.filename, "exec"), namespace)
+        self.inputs = namespace["INPUTS"]
+        self.evaluate = namespace["evaluate"]
+        self.evaluate_values = namespace["evaluate_values"]
+        self._evaluate_batch = namespace["evaluate_batch"]
+
+    def evaluate_batch(self, inputs, columns=None):
+        """inputs: {var_name: 1-D array}, or a 2-D array with `columns` naming its columns"""
+        return self._evaluate_batch(_as_columns(inputs, columns))
+
+    def save(self, path):
+        with open(path, "w") as handle:
+            handle.write(self.source)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as handle:
+            return cls(handle.read(), path)
+
+
+def generate_source(system):
+    """
+    Python source of a module with straight-line evaluate, evaluate_values
+    and evaluate_batch functions for `system`
+
+    Term parameters, rule structure, weights and consequents become
+    literals; each rule is one line and no loop over rules runs at call
+    time. Mamdani outputs are defuzzified by a Defuzzifier the module
+    builds once from the output terms. Rules with callable consequents
+    other than LinearOutput and custom membership functions are refused
+    with ValueError.
+    """
+    compiled = system.compile()  # validates the rule base like evaluate would
+    rules = system.rules
+    mamdani = system.mode == "mamdani"
+    n_rules = len(rules)
+
+    # Every input a rule reads, with the terms it tests
+    slots, inputs = {}, {}
+    expressions = [rules.expression(i) for i in range(n_rules)]
+    consequents = [rules.output(i) for i in range(n_rules)]
+    for i in range(n_rules):
+        for var, term in rules.conditions(i):
+            slots.setdefault((var, term), len(slots))
+            inputs.setdefault(var, len(inputs))
+        if isinstance(consequents[i], LinearOutput):
+            for var in consequents[i].coefficients:
+                inputs.setdefault(var, len(inputs))
+        elif not mamdani and callable(consequents[i]):
+            raise ValueError("rules with callable consequents cannot be generated")
+    names = list(inputs)
+
+    kinds = {type(system.variables[var].terms[term]) for var, term in slots}
+    constants = [f"INPUTS = {tuple(names)!r}"]
+    scalar_terms, batch_terms = [], []
+    for (var, term), k in slots.items():
+        mf = system.variables[var].terms[term]
+        x = f"x{inputs[var]}"
+        constants.append(f"_MF{k} = {_constructor(mf)}  # {var} IS {term}")
+        scalar_terms.extend(_scalar_membership(mf, k, x))
+        batch_terms.append(f"m{k} = _MF{k}.evaluate_array({x})")
+
+    strengths, batch_strengths = [], []
+    for i in range(n_rules):
+        for target, scalar in ((strengths, True), (batch_strengths, False)):
+            if expressions[i] is None:
+                strength = _conjunction(system.tnorm, [f"m{slots[pair]}" for pair in rules.conditions(i)], scalar)
+            else:
+                strength = _expression(expressions[i], slots, system.tnorm, scalar)
+            target.append(strength if rules.weight(i) == 1 else f"({strength}) * {rules.weight(i)!r}")
+
+    scalar = [f"w{i} = {strength}" for i, strength in enumerate(strengths)]
+    batch = ["n = len(next(iter(inputs.values()))) if inputs else 0"]
+    imports = []
+    if mamdani:
+        imports = ["from nebulo.defuzzification import Defuzzifier", "from nebulo.variables import FuzzyVariable"]
+        output = compiled.defuzzifier.variable
+        labels = compiled.labels
+        constants.append(f"_OUTPUT = FuzzyVariable({output.name!r}, {tuple(output.universe)!r})")
+        for label in labels:
+            constants.append(f"_OUTPUT.add_term({label!r}, {_constructor(output.terms[label])})")
+            kinds.add(type(output.terms[label]))
+        constants.append(f"_DEFUZZIFIER = Defuzzifier(_OUTPUT, {labels!r}, {system.defuzzification!r}, "
+                         f"{system.resolution!r})")
+        constants.append("_DEFUZZIFY_ONE = _DEFUZZIFIER.defuzzify_one")
+        by_label = [[] for _ in labels]
+        for i, label in enumerate(compiled.consequents.tolist()):
+            by_label[label].append(i)
+        for label, members in enumerate(by_label):
+            scalar.append(f"d{label} = " + (f"w{members[0]}" if len(members) == 1 else
+                                             "max(" + ", ".join(f"w{i}" for i in members) + ")"))
+        degrees = "".join(f"d{label}, " for label in range(len(labels)))
+        scalar.append(f"return _DEFUZZIFY_ONE(({degrees}))" if labels else "return 0.0")
+
+        for label, members in enumerate(by_label):
+            for position, i in enumerate(members):
+                batch.append(f"d{label} = {batch_strengths[i]}" if not position else
+                             f"d{label} = np.maximum(d{label}, {batch_strengths[i]})")
+        batch.append(f"return _DEFUZZIFIER.defuzzify(np.array([{degrees}]).reshape({len(labels)}, n))"
+                     if labels else "return np.zeros(n)")
+    else:
+        products = []
+        for i, z in enumerate(consequents):
+            if isinstance(z, LinearOutput):
+                products.append(f"w{i} * ({_linear(z, inputs)})")
+            elif float(z) != 0:
+                products.append(f"w{i} * {float(z)!r}")
+        scalar.extend(_sum("num", products, "0.0"))
+        scalar.extend(_sum("den", [f"w{i}" for i in range(n_rules)], "0.0"))
+        scalar.append("return num / den if den != 0 else 0.0")
+
+        batch.extend(["num = np.zeros(n)", "den = np.zeros(n)"])
+        for i, z in enumerate(consequents):
+            batch.append(f"w = {batch_strengths[i]}")
+            batch.append("den += w")
+            if isinstance(z, LinearOutput):
+                batch.append(f"num += w * ({_linear(z, inputs)})")
+            elif float(z) != 0:
+                batch.append(f"num += w * {float(z)!r}")
+        batch.append("return np.divide(num, den, out=np.zeros(n), where=den != 0)")
+
+    if kinds:
+        imports.append("from nebulo.membership import " + ", ".join(sorted(cls.__name__ for cls in kinds)))
+    arguments = ", ".join(f"x{j}" for j in range(len(names)))
+    lines = [f'"""Generated by nebulo.codegen from a {system.mode} system with {n_rules} rules; do not edit"""',
+             "from math import exp", "", "import numpy as np", ""] + sorted(imports) + ["", ""] + constants + ["", ""]
+    lines.append(f"def evaluate_values({arguments}):")
+    lines.extend("    " + line for line in scalar_terms + scalar)
+    lines.extend(["", "", "def evaluate(inputs):"])
+    lines.extend(f"    x{j} = inputs[{name!r}]" for j, name in enumerate(names))
+    lines.extend("    " + line for line in scalar_terms + scalar)
+    lines.extend(["", "", "def evaluate_batch(inputs):"])
+    lines.extend(f"    x{j} = np.asarray(inputs[{name!r}], dtype=float)" for j, name in enumerate(names))
+    lines.extend("    " + line for line in batch_terms + batch)
+    return "\n".join(lines) + "\n"
+
+
+def _constructor(mf):
+    parameters = _MF_PARAMETERS.get(type(mf), ())
+    if parameters == ():
+        raise ValueError(f"cannot generate code for membership function {type(mf).__name__}")
+    if parameters is None:
+        return f"{type(mf).__name__}({list(zip(mf.xs, mf.ys))!r})"
+    return f"{type(mf).__name__}({', '.join(repr(getattr(mf, p)) for p in parameters)})"
+
+
+def _scalar_membership(mf, k, x):
+    """Lines computing m{k}, the degree of `mf` at x, as its evaluate method does"""
+    kind = type(mf)
+    if kind is TriangularMF or kind is TrapezoidalMF:
+        a, b = mf.a, mf.b
+        c, d = (mf.b, mf.c) if kind is TriangularMF else (mf.c, mf.d)
+        # Inside (a, d); a vertical side (a == b or c == d) leaves its slope unreachable
+        rising = f"({x} - {a!r}) / {b - a!r}" if b > a else "0.0"
+        falling = f"({d!r} - {x}) / {d - c!r}" if d > c else "0.0"
+        if kind is TrapezoidalMF:
+            falling = f"(1.0 if {x} <= {c!r} else {falling})"
+        return [f"m{k} = 0.0 if {x} <= {a!r} or {x} >= {d!r} else ({rising} if {x} < {b!r} else {falling})"]
+    if kind is GaussianMF:
+        return [f"m{k} = exp(-0.5 * (({x} - {mf.mean!r}) / {mf.sigma!r}) ** 2)"]
+    if kind is GeneralizedBellMF:
+        return [f"m{k} = 1 / (1 + abs(({x} - {mf.c!r}) / {mf.a!r}) ** {2 * mf.b!r})"]
+    if kind is SigmoidMF:
+        return [f"m{k} = {-mf.a!r} * ({x} - {mf.c!r})",
+                f"m{k} = 0.0 if m{k} > 700 else 1 / (1 + exp(m{k}))"]
+    return [f"m{k} = _MF{k}.evaluate({x})"]
+
+
+def _conjunction(tnorm, operands, scalar):
+    if not operands:
+        return "1.0" if scalar else "np.ones(n)"
+    if len(operands) == 1:
+        return operands[0]
+    if tnorm == "product":
+        return " * ".join(operands)
+    if tnorm == "lukasiewicz":
+        total = " + ".join(operands)
+        excess = float(len(operands) - 1)
+        return f"max(0.0, {total} - {excess!r})" if scalar else f"np.maximum({total} - {excess!r}, 0.0)"
+    if not scalar:
+        return _fold("np.minimum", operands)
+    if len(operands) == 2:
+        a, b = operands
+        if a.isidentifier() and b.isidentifier():
+            return f"{a} if {a} < {b} else {b}"  # cheaper than calling min
+    return f"min({', '.join(operands)})"
+
+
+def _disjunction(tnorm, operands, scalar):
+    if tnorm == "product":
+        return "1.0 - " + " * ".join(f"(1.0 - {operand})" for operand in operands)
+    if tnorm == "lukasiewicz":
+        total = " + ".join(operands)
+        return f"min(1.0, {total})" if scalar else f"np.minimum({total}, 1.0)"
+    if scalar:
+        return f"max({', '.join(operands)})"
+    return _fold("np.maximum", operands)
+
+
+def _fold(function, operands):
+    result = operands[0]
+    for operand in operands[1:]:
+        result = f"{function}({result}, {operand})"
+    return result
+
+
+def _expression(expression, slots, tnorm, scalar):
+    """Source of an Expression's degree, as Expression.degree computes it"""
+    if type(expression) is Is:
+        degree = f"m{slots[(expression.var, expression.term)]}"
+        return f"{degree} ** {expression.power!r}" if expression.hedges else degree
+    if type(expression) is Not:
+        return f"(1.0 - {_expression(expression.operand, slots, tnorm, scalar)})"
+    operands = [f"({_expression(operand, slots, tnorm, scalar)})" for operand in expression.operands]
+    combine = _conjunction if type(expression) is And else _disjunction
+    return f"({combine(tnorm, operands, scalar)})"
+
+
+def _linear(output, inputs):
+    """Source of a LinearOutput, summed in the order LinearOutput.__call__ uses"""
+    return " + ".join([repr(output.bias)] + [f"{c!r} * x{inputs[var]}" for var, c in output.coefficients.items()])
+
+
+def _sum(name, terms, zero):
+    """Lines summing `terms` left to right into `name`"""
+    if not terms:
+        return [f"{name} = {zero}"]
+    lines = [f"{name} = " + " + ".join(terms[:_SUM_TERMS])]
+    for start in range(_SUM_TERMS, len(terms), _SUM_TERMS):
+        lines.append(f"{name} = {name} + " + " + ".join(terms[start:start + _SUM_TERMS]))
+    return lines
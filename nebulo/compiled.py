@@ -0,0 +1,365 @@
+import numpy as np
+
+from .defuzzification import Defuzzifier
+from .expressions import BINARY_TNORMS, GATHER_MAX_SAMPLES, RuleProgram
+from .rules import LinearOutput
+
+# Evaluation dtypes of the fuzzification tensor and activation matrix
+DTYPES = ("float64", "float32", "float16")
+
+# Largest number of float16 values widened to float32 at once
+_WIDEN_CELLS = 1 << 20
+
+
+class CompiledSystem:
+    """Array form of a FuzzySystem rule base, built by `FuzzySystem.compile`
+
+    Every (variable, term) pair gets a row ("slot") in a stacked
+    fuzzification tensor of shape (n_slots + 1, n_samples). The last row
+    is constant 1 and pads rules with fewer antecedents, so it never
+    lowers a minimum.
+
+    antecedents: int array (n_rules, max_antecedents) of slot indices
+    consequents: Sugeno -> float array (n_rules,) of constant outputs,
+                           the bias of LinearOutput consequents
+                 Mamdani -> int array (n_rules,) of output label indices
+    linear: Sugeno only; float array (n_rules, len(linear_variables)) of
+            LinearOutput coefficients, or None when all rules are constant
+    weights: float array (n_rules,) of rule weights, None when all are 1
+    dtype: dtype of the fuzzification tensor and activation matrix (see
+           FuzzySystem); float16 only stores them, sums and products of
+           strengths are computed in float32
+    program: RuleProgram of the rules with Expression antecedents (their
+             rows are `expression_rows`), None when there are none; the
+             antecedents row of such a rule holds its leaves
+    """
+
+    def __init__(self, system, arrays=None):
+        """
+        arrays: the array attributes below as stored by FuzzySystem.save,
+                used instead of lowering system.rules (see nebulo.storage)
+        """
+        self.mode = system.mode
+        self.dtype = system.dtype
+        self.slots = {}
+        self.slot_terms = []
+        for var in system.variables.values():
+            for term, mf in var.terms.items():
+                self.slots[(var.name, term)] = len(self.slot_terms)
+                self.slot_terms.append((var.name, mf))
+        self.padding = len(self.slot_terms)
+
+        if arrays is not None:
+            self._restore(system, arrays)
+            return
+
+        rules = system.rules
+        # Rule base slots -> rows of the fuzzification tensor (-1: unknown term)
+        lookup = [self.slots.get(name, -1) for name in rules.slot_names]
+        self.antecedents = rules.padded(lookup, self.padding)
+        if (self.antecedents < 0).any():
+            raise KeyError(rules.slot_names[lookup.index(-1)])
+        # Only variables referenced by a rule need fuzzifying
+        self.used_slots = np.unique(self.antecedents[self.antecedents != self.padding])
+        self.used_variables = list(dict.fromkeys(self.slot_terms[s][0] for s in self.used_slots))
+        self.tnorm = system.tnorm
+        forms, weights = rules.forms_and_weights()
+        self.weights = None if (weights == 1).all() else weights
+        self.expression_rows = np.flatnonzero(forms >= 0)
+        self.program = None
+        self._plain_antecedents = None
+        if len(self.expression_rows):
+            expressions = [rules.objects[form] for form in forms[self.expression_rows].tolist()]
+            self.program = RuleProgram(expressions, self.slots, self.padding, self.tnorm)
+            self.plain_rows = np.flatnonzero(forms < 0)
+            self._plain_antecedents = self.antecedents[self.plain_rows]
+
+        _, _, values, codes = rules.arrays()
+        if self.mode == "sugeno":
+            self.consequents = values
+            self.callables = []
+            linear = {}
+            for i in np.nonzero(codes >= 0)[0].tolist():
+                output = rules.objects[codes[i]]
+                if isinstance(output, LinearOutput):
+                    linear[i] = output
+                    self.consequents[i] = output.bias
+                elif callable(output):
+                    self.callables.append((i, rules[i]))
+                elif isinstance(output, tuple):
+                    raise ValueError("Sugeno rules naming their output are evaluated with evaluate_outputs")
+                else:
+                    self.consequents[i] = float(output)
+            self._lower_linear(linear, len(rules))
+        else:
+            if (codes < 0).any():
+                raise ValueError("Mamdani rules need a term label as consequent")
+            # Label of every distinct consequent, in order of first use
+            first = np.unique(codes, return_index=True)[1]
+            consequents = {code: _split_consequent(rules.objects[code]) for code in codes[np.sort(first)].tolist()}
+            self.labels = list(dict.fromkeys(label for _, label in consequents.values()))
+            index = {label: i for i, label in enumerate(self.labels)}
+            by_code = np.zeros(len(rules.objects), dtype=np.intp)
+            for code, (_, label) in consequents.items():
+                by_code[code] = index[label]
+            self.consequents = by_code[codes]
+            # Rules grouped by label so the max-aggregation is a single reduceat
+            order = np.argsort(self.consequents, kind="stable")
+            self.group_starts = np.searchsorted(self.consequents[order], np.arange(len(self.labels)))
+            self.order = None if np.array_equal(order, np.arange(len(rules))) else order
+            output = system._output_variable(name for name, _ in consequents.values())
+            self.defuzzifier = Defuzzifier(output, self.labels, system.defuzzification, system.resolution)
+
+        self._rule_count = len(rules)
+        self._signature = _signature(system)
+
+    def _lower_linear(self, linear, n_rules):
+        """Coefficient matrix of the {rule index: LinearOutput} consequents"""
+        self.linear_variables = list(dict.fromkeys(var for output in linear.values() for var in output.coefficients))
+        if not linear:
+            self.linear = None
+            return
+        columns = {var: j for j, var in enumerate(self.linear_variables)}
+        self.linear = np.zeros((n_rules, len(columns)))
+        for i, output in linear.items():
+            for var, c in output.coefficients.items():
+                self.linear[i, columns[var]] = c
+
+    def _restore(self, system, arrays):
+        self.antecedents = arrays["antecedents"]
+        self.used_slots = arrays["used_slots"]
+        self.used_variables = list(dict.fromkeys(self.slot_terms[s][0] for s in self.used_slots.tolist()))
+        self.consequents = arrays["consequents"]
+        self.tnorm = system.tnorm
+        self.weights = arrays.get("weights")
+        self.expression_rows = np.zeros(0, dtype=np.intp)
+        self.program = None
+        self._plain_antecedents = None
+        if self.mode == "sugeno":
+            self.callables = []
+            self.linear = arrays.get("linear")
+            self.linear_variables = list(arrays.get("linear_variables", []))
+        else:
+            self.labels = list(arrays["labels"])
+            self.group_starts = arrays["group_starts"]
+            self.order = arrays.get("order")
+            output = system._output_variable(arrays["output_names"])
+            self.defuzzifier = Defuzzifier(output, self.labels, system.defuzzification, system.resolution)
+        self._rule_count = len(self.antecedents)
+        self._signature = _signature(system)
+
+    def is_stale(self, system):
+        """True when `system` changed after this form was compiled"""
+        return _signature(system) != self._signature
+
+    def input_names(self, inputs):
+        """
+        Names of the `inputs` columns evaluate_batch reads: the antecedent
+        variables and those of LinearOutput consequents, plus every other
+        input when a callable consequent may read it
+        """
+        names = list(self.used_variables)
+        if self.mode == "sugeno":
+            names += [name for name in self.linear_variables if name not in names]
+            if self.callables:
+                names += [name for name in inputs if name not in names]
+        return names
+
+    def fuzzify(self, inputs, n, dtype=None):
+        """
+        Stacked membership degrees, shape (n_slots + 1, n), in `dtype`
+        (default: the system's)
+        """
+        fuzzified = np.empty((self.padding + 1, n), dtype=dtype or self.dtype)
+        fuzzified[self.padding] = 1
+        for var in self.used_variables:
+            if var not in inputs:
+                raise KeyError(var)
+        _fuzzify_rows(fuzzified, self.used_slots.tolist(), self.slot_terms, inputs)
+        return fuzzified
+
+    def activations(self, fuzzified):
+        """Firing strength of every rule, shape (n_rules, n)"""
+        if fuzzified.dtype == np.float16:
+            return _widened(self.activations, fuzzified, self._rule_count)
+        if self.program is None:
+            strengths = self._conjunctions(fuzzified, self.antecedents)
+        else:
+            strengths = np.empty((self._rule_count, fuzzified.shape[1]), dtype=fuzzified.dtype)
+            if len(self.plain_rows):
+                strengths[self.plain_rows] = self._conjunctions(fuzzified, self._plain_antecedents)
+            self.program.run(fuzzified, strengths, self.expression_rows)
+        if self.weights is not None:
+            strengths *= self.weights[:, None]
+        return strengths
+
+    def _conjunctions(self, fuzzified, antecedents):
+        """Strengths of rules as t-norms of their `antecedents` rows"""
+        n = fuzzified.shape[1]
+        if not antecedents.size:
+            return np.zeros((len(antecedents), n), dtype=fuzzified.dtype)
+        tnorm = BINARY_TNORMS[self.tnorm]  # all of them leave the padding row of 1 neutral
+        if n < GATHER_MAX_SAMPLES:
+            # Small batches: one gather per antecedent column, then a reduction
+            # over all rules at once; Python overhead is independent of the rule count
+            strengths = fuzzified[antecedents[:, 0]]
+            for j in range(1, antecedents.shape[1]):
+                tnorm(strengths, fuzzified[antecedents[:, j]], out=strengths)
+            return strengths
+        # Large batches are memory bound: fancy-index gathers copy every row
+        # before the reduction, so reduce row by row straight into the result
+        strengths = np.empty((len(antecedents), n), dtype=fuzzified.dtype)
+        for row, slots in zip(strengths, antecedents.tolist()):
+            if len(slots) == 1:
+                row[...] = fuzzified[slots[0]]
+                continue
+            tnorm(fuzzified[slots[0]], fuzzified[slots[1]], out=row)
+            for slot in slots[2:]:
+                tnorm(row, fuzzified[slot], out=row)
+        return strengths
+
+    def evaluate_batch(self, inputs):
+        """inputs: {var_name: 1-D float array}, all of the same length"""
+        n = len(next(iter(inputs.values()))) if inputs else 0
+        strengths = self.activations(self.fuzzify(inputs, n))
+        return self.defuzzify_batch(self.aggregate(strengths, inputs), n)
+
+    def aggregate(self, strengths, inputs):
+        """
+        Combine rule strengths into what defuzzify_batch needs:
+        Sugeno -> (weighted output sums, weight totals), each of shape (n,)
+        Mamdani -> (n_labels, n) max-aggregated label degrees, None without rules
+        """
+        n = strengths.shape[1]
+        if self.mode == "sugeno":
+            weighted_sum = _weighted_sums(self.consequents, strengths)
+            if self.linear is not None:
+                # sum_r w_r * (c_r . x) == sum_j x_j * (sum_r w_r * c_rj): one product for all rules
+                moments = _weighted_sums(self.linear.T, strengths)
+                for j, var in enumerate(self.linear_variables):
+                    if var not in inputs:
+                        raise KeyError(var)
+                    weighted_sum += inputs[var] * moments[j]
+            for i, rule in self.callables:
+                z = np.array([rule.eval_output(row) for row in _iter_rows(inputs, n)], dtype=float)
+                weighted_sum += strengths[i] * z
+            return weighted_sum, strengths.sum(axis=0, dtype=weighted_sum.dtype)
+
+        if not self._rule_count:
+            return None
+        if strengths.dtype == np.float16:
+            return _widened(lambda block: self.aggregate(block, None), strengths, len(self.labels))
+        if self.order is not None:
+            strengths = strengths[self.order]
+        degrees = np.maximum.reduceat(strengths, self.group_starts, axis=0)
+        np.maximum(degrees, 0, out=degrees)
+        return degrees
+
+    def defuzzify_batch(self, aggregated, n):
+        """Crisp outputs, shape (n,), from the result of `aggregate`"""
+        if self.mode == "sugeno":
+            weighted_sum, weight_total = aggregated
+            return np.divide(weighted_sum, weight_total,
+                             out=np.zeros(n), where=weight_total != 0)
+        if aggregated is None:
+            return np.zeros(n)
+        return self.defuzzifier.defuzzify(aggregated)
+
+    def defuzzify(self, output_degrees):
+        """Crisp Mamdani output from a {label: activation} dict"""
+        return self.defuzzifier.defuzzify_one([output_degrees.get(label, 0) for label in self.labels])
+
+
+def _fuzzify_rows(fuzzified, rows, terms, inputs):
+    """
+    Degrees of the (variable, membership function) terms[row] of `inputs`
+    into those rows of `fuzzified`. float16 rows are only stored: they are
+    evaluated in float32, then narrowed
+    """
+    scratch = np.empty(fuzzified.shape[1], dtype=np.float32) if fuzzified.dtype == np.float16 else None
+    for row in rows:
+        var, mf = terms[row]
+        if scratch is None:
+            mf.evaluate_array(inputs[var], out=fuzzified[row])
+        else:
+            fuzzified[row] = mf.evaluate_array(inputs[var], out=scratch)
+
+
+def _weighted_sums(matrix, strengths):
+    """
+    matrix @ strengths in the dtype of the strengths, or float32 for
+    float16 ones, which are widened a block of samples at a time
+    """
+    if strengths.dtype != np.float16:
+        return matrix.astype(strengths.dtype, copy=False) @ strengths
+    matrix = matrix.astype(np.float32)
+    n = strengths.shape[1]
+    result = np.empty(matrix.shape[:-1] + (n,), dtype=np.float32)
+    block = max(1, _WIDEN_CELLS // max(1, len(strengths)))
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        np.matmul(matrix, strengths[:, start:stop].astype(np.float32), out=result[..., start:stop])
+    return result
+
+
+def _widened(function, array, rows):
+    """
+    function of a float16 (_, n) array, computed in float32 a block of
+    samples at a time and stored as float16 (rows, n)
+    """
+    n = array.shape[1]
+    result = np.empty((rows, n), dtype=np.float16)
+    block = max(1, _WIDEN_CELLS // max(1, len(array), rows))
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        result[:, start:stop] = function(array[:, start:stop].astype(np.float32))
+    return result
+
+
+def _check_dtype(dtype):
+    """np.dtype of an evaluation dtype name or type, one of DTYPES"""
+    dtype = np.dtype(dtype)
+    if dtype.name not in DTYPES:
+        raise ValueError(f"unsupported evaluation dtype {dtype.name!r}, expected one of {DTYPES}")
+    return dtype
+
+
+def _signature(system):
+    """Everything a compiled form depends on, cheap to recompute"""
+    variables = [(name, id(var), var._version)
+                 for group in (system.variables, system.outputs) for name, var in group.items()]
+    rules = system.rules
+    return (system.mode, system.defuzzification, system.resolution, system.tnorm, system.dtype,
+            id(rules), rules._version, len(rules), variables)
+
+
+def _split_consequent(output):
+    """Mamdani consequent -> (output variable name or None, label)"""
+    if isinstance(output, tuple):
+        return output
+    return None, output
+
+
+def _as_columns(inputs, columns=None):
+    """Normalize batch inputs to {var_name: 1-D float array} of equal length"""
+    if columns is not None:
+        data = np.asarray(inputs, dtype=float)
+        if data.ndim != 2 or data.shape[1] != len(columns):
+            raise ValueError("expected a 2-D array with one column per name in `columns`")
+        inputs = {name: data[:, i] for i, name in enumerate(columns)}
+    result = {name: np.asarray(values, dtype=float).ravel() for name, values in inputs.items()}
+    lengths = {len(v) for v in result.values()}
+    if len(lengths) > 1:
+        raise ValueError("all input arrays must have the same length")
+    return result
+
+
+def _iter_rows(columns, n):
+    """Yield one {var_name: float} dict per sample"""
+    names = list(columns)
+    if not names:
+        for _ in range(n):
+            yield {}
+        return
+    for values in zip(*(columns[name].tolist() for name in names)):
+        yield dict(zip(names, values))
@@ -0,0 +1,278 @@
+from bisect import bisect_right
+
+import numpy as np
+
+METHODS = ("centroid", "bisector", "mom", "som", "lom")
+
+# Largest number of grid cells (resolution x samples), or of exact centroid
+# points (per sample x samples), aggregated at once
+BLOCK_CELLS = 1 << 20
+
+# Offset of the two Gauss-Legendre nodes from the interval midpoint, in
+# units of the interval length; two nodes integrate x * mu(x) exactly when
+# mu is linear on the interval
+_GAUSS_OFFSET = 0.5 / 3 ** 0.5
+
+
+class Defuzzifier:
+    """Crisp outputs of one Mamdani output variable
+
+    Rule activations clip the output terms (min implication), the clipped
+    terms are combined with max and the result is reduced to a number by
+    `method`:
+
+    centroid -- center of gravity of the aggregated set
+    bisector -- point splitting the aggregated area in two equal halves
+    mom, som, lom -- mean, smallest and largest point of maximum membership
+
+    The terms are sampled once on `resolution` points of the variable's
+    universe. When every term is piecewise linear the centroid is computed
+    in closed form instead: between the knots of the terms and the points
+    where the clipped pieces cross, the aggregated set is linear, so each
+    such interval is integrated exactly.
+
+    Batches of float32 or float16 degrees are defuzzified in float32,
+    anything else in float64; the crisp outputs are float64.
+    """
+
+    def __init__(self, variable, labels, method="centroid", resolution=1001):
+        if method not in METHODS:
+            raise ValueError(f"unknown defuzzification method {method!r}, expected one of {METHODS}")
+        self.variable = variable
+        self.labels = list(labels)
+        self.method = method
+        self.low, self.high = variable.universe
+        self.grid = np.linspace(self.low, self.high, resolution)
+        terms = [variable.terms[label] for label in self.labels]
+        self.samples = np.array([mf.evaluate_array(self.grid) for mf in terms]).reshape(len(terms), resolution)
+        self._cast = {}
+        knots = [mf.breakpoints() for mf in terms]
+        self.exact = method == "centroid" and all(k is not None for k in knots)
+        if self.exact:
+            self._prepare_exact(knots)
+
+    def defuzzify(self, degrees):
+        """degrees: (n_labels, n) activation of every label -> (n,) crisp outputs"""
+        degrees = np.asarray(degrees)
+        single = degrees.dtype in (np.float32, np.float16)
+        degrees = degrees.astype(np.float32 if single else float, copy=False)
+        n = degrees.shape[1]
+        if not self.labels:
+            return np.zeros(n)
+        if self.exact:
+            reduce, cells = self._exact_centroid, len(self.fixed_points) + len(self.cut_slopes) * len(self.labels)
+        else:
+            reduce, cells = self._from_grid, len(self.grid)
+        result = np.empty(n)
+        block = max(1, BLOCK_CELLS // cells)
+        for start in range(0, n, block):
+            stop = min(start + block, n)
+            result[start:stop] = reduce(degrees[:, start:stop])
+        return result
+
+    def defuzzify_one(self, levels):
+        """Crisp output for a single sample; levels: activation of every label"""
+        if self.exact:
+            return self._exact_centroid_one(levels)
+        degrees = np.array(levels, dtype=float).reshape(len(self.labels), 1)
+        return float(self.defuzzify(degrees)[0])
+
+    def aggregate(self, degrees):
+        """Aggregated membership on the grid, shape (resolution, n)"""
+        mu = np.zeros((len(self.grid), degrees.shape[1]), dtype=degrees.dtype)
+        clipped = np.empty_like(mu)
+        terms, = self._as(degrees.dtype, "samples")
+        for samples, level in zip(terms, degrees):
+            np.minimum(samples[:, None], level[None, :], out=clipped)
+            np.maximum(mu, clipped, out=mu)
+        return mu
+
+    def _from_grid(self, degrees):
+        mu = self.aggregate(degrees)
+        n = mu.shape[1]
+        total = mu.sum(axis=0)
+        fired = total > 0
+        result = np.zeros(n)
+
+        if self.method == "centroid":
+            grid, = self._as(mu.dtype, "grid")
+            np.divide(grid @ mu, total, out=result, where=fired)
+        elif self.method == "bisector":
+            area = np.cumsum(mu, axis=0)
+            index = np.argmax(area >= area[-1] / 2, axis=0)
+            result = np.where(fired, self.grid[index], 0.0)
+        else:
+            peak = mu.max(axis=0)
+            at_peak = mu >= peak * (1 - 1e-12)
+            if self.method == "som":
+                index = np.argmax(at_peak, axis=0)
+            elif self.method == "lom":
+                index = len(self.grid) - 1 - np.argmax(at_peak[::-1], axis=0)
+            if self.method == "mom":
+                np.divide(self.grid @ at_peak, at_peak.sum(axis=0), out=result, where=fired)
+            else:
+                result = np.where(fired, self.grid[index], 0.0)
+        return result
+
+    def _as(self, dtype, *names):
+        """The arrays `names` cast to `dtype`, cached per dtype"""
+        if dtype == np.float64:
+            return [getattr(self, name) for name in names]
+        cast = self._cast.setdefault(np.dtype(dtype).name, {})
+        for name in names:
+            if name not in cast:
+                cast[name] = getattr(self, name).astype(dtype)
+        return [cast[name] for name in names]
+
+    def _prepare_exact(self, knots):
+        self.knot_x, self.knot_y, self.knot_lists = [], [], []
+        slopes, intercepts, starts, stops, owners = [], [], [], [], []
+        for owner, points in enumerate(knots):
+            xs = [float(x) for x, _ in points]
+            ys = [float(y) for _, y in points]
+            # Outside its knots a term keeps its end values, as np.interp does
+            if xs[0] > self.low:
+                xs.insert(0, self.low)
+                ys.insert(0, ys[0])
+            if xs[-1] < self.high:
+                xs.append(self.high)
+                ys.append(ys[-1])
+            if xs[0] < self.low or xs[-1] > self.high:
+                # Universe narrower than the term: cut the knots at its edges
+                edges = np.interp([self.low, self.high], xs, ys).tolist()
+                inner = [(x, y) for x, y in zip(xs, ys) if self.low < x < self.high]
+                xs = [self.low] + [x for x, _ in inner] + [self.high]
+                ys = [edges[0]] + [y for _, y in inner] + [edges[1]]
+            self.knot_x.append(np.array(xs))
+            self.knot_y.append(np.array(ys))
+            self.knot_lists.append((xs, ys))
+            for x0, x1, y0, y1 in zip(xs, xs[1:], ys, ys[1:]):
+                if x1 > x0:
+                    slope = (y1 - y0) / (x1 - x0)
+                    slopes.append(slope)
+                    intercepts.append(y0 - slope * x0)
+                    starts.append(x0)
+                    stops.append(x1)
+                    owners.append(owner)
+
+        slopes, intercepts = np.array(slopes), np.array(intercepts)
+        starts, stops, owners = np.array(starts), np.array(stops), np.array(owners)
+
+        # Crossings between segments of different terms do not depend on the inputs
+        fixed = [self.low, self.high]
+        for x in self.knot_x:
+            fixed.extend(x.tolist())
+        for i in range(len(slopes)):
+            other = (owners > owners[i]) & (slopes != slopes[i])
+            x = (intercepts[other] - intercepts[i]) / (slopes[i] - slopes[other])
+            inside = (x > max(starts[i], self.low)) & (x < min(stops[i], self.high)) & \
+                     (x > starts[other]) & (x < stops[other])
+            fixed.extend(x[inside].tolist())
+        self.fixed_points = np.unique(np.clip(fixed, self.low, self.high))
+
+        # Sloped segments cross every clipping level at an input dependent point
+        sloped = slopes != 0
+        self.cut_slopes = slopes[sloped]
+        self.cut_intercepts = intercepts[sloped]
+        self.cut_starts = np.maximum(starts[sloped], self.low)
+        self.cut_stops = np.minimum(stops[sloped], self.high)
+
+    def _exact_centroid(self, degrees):
+        n = degrees.shape[1]
+        intercepts, slopes, starts, stops, fixed = self._as(degrees.dtype, "cut_intercepts", "cut_slopes",
+                                                            "cut_starts", "cut_stops", "fixed_points")
+        # (segments, labels, n) crossings of each sloped segment with each level
+        cuts = (degrees[None, :, :] - intercepts[:, None, None]) / slopes[:, None, None]
+        np.clip(cuts, starts[:, None, None], stops[:, None, None], out=cuts)
+        points = np.concatenate([np.broadcast_to(fixed[:, None], (len(fixed), n)), cuts.reshape(-1, n)])
+        points.sort(axis=0)
+
+        width = np.diff(points, axis=0)
+        middle = (points[:-1] + points[1:]) / 2
+        left = middle - _GAUSS_OFFSET * width
+        right = middle + _GAUSS_OFFSET * width
+        mu_left = self._aggregate_at(left, degrees)
+        mu_right = self._aggregate_at(right, degrees)
+
+        area = (width * (mu_left + mu_right)).sum(axis=0)
+        moment = (width * (left * mu_left + right * mu_right)).sum(axis=0)
+        return np.divide(moment, area, out=np.zeros(n), where=area > 0)
+
+    def _aggregate_at(self, x, degrees):
+        mu = np.zeros_like(x)
+        for xs, ys, level in zip(self.knot_x, self.knot_y, degrees):
+            np.maximum(mu, np.minimum(np.interp(x, xs, ys), level), out=mu)
+        return mu
+
+    def _exact_centroid_one(self, levels):
+        # Scalar version of _exact_centroid in plain Python, which beats NumPy
+        # dispatch for a handful of points: only fired terms take part, each
+        # is clipped at its level and the upper envelope is integrated exactly
+        pieces = [_clip(xs, ys, level) for (xs, ys), level in zip(self.knot_lists, levels) if level > 0]
+        if not pieces:
+            return 0.0
+        points = pieces[0] if len(pieces) == 1 else _upper_envelope(pieces)
+        area = moment = 0.0
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            h = x1 - x0
+            if h > 0 and (y0 or y1):
+                area += h * (y0 + y1)
+                moment += h * (x0 * (2 * y0 + y1) + x1 * (y0 + 2 * y1))
+        # area and moment above are 2x and 6x the true integrals
+        return moment / (3 * area) if area > 0 else 0.0
+
+
+def _clip(xs, ys, level):
+    """Knots of min(level, f) for the piecewise linear f given by xs, ys"""
+    points = []
+    for x0, x1, y0, y1 in zip(xs, xs[1:], ys, ys[1:]):
+        points.append((x0, min(y0, level)))
+        if (y0 - level) * (y1 - level) < 0:
+            points.append((x0 + (level - y0) * (x1 - x0) / (y1 - y0), level))
+    points.append((xs[-1], min(ys[-1], level)))
+    # Zero stretches at the edges add intervals but no area
+    while len(points) > 2 and points[0][1] == 0 and points[1][1] == 0:
+        points.pop(0)
+    while len(points) > 2 and points[-1][1] == 0 and points[-2][1] == 0:
+        points.pop()
+    return points
+
+
+def _upper_envelope(pieces):
+    """Knots of the pointwise maximum of non-negative piecewise linear functions
+
+    A piece is 0 outside its own knots. Vertical jumps show up as two knots
+    with the same x.
+    """
+    breaks = sorted({x for piece in pieces for x, _ in piece})
+    cursors = [0] * len(pieces)
+    points = []
+    for x0, x1 in zip(breaks, breaks[1:]):
+        # Value of every piece at both ends of (x0, x1), where all are linear
+        lines = []
+        for i, piece in enumerate(pieces):
+            if x1 <= piece[0][0] or x0 >= piece[-1][0]:
+                lines.append((0.0, 0.0))
+                continue
+            k = cursors[i]
+            while k + 2 < len(piece) and piece[k + 1][0] <= x0:
+                k += 1
+            cursors[i] = k
+            (u0, v0), (u1, v1) = piece[k], piece[k + 1]
+            slope = (v1 - v0) / (u1 - u0)
+            lines.append((v0 + slope * (x0 - u0), v0 + slope * (x1 - u0)))
+        # The maximum of the lines bends only where two of them cross
+        cuts = None
+        for i, (a0, a1) in enumerate(lines):
+            for b0, b1 in lines[i + 1:]:
+                d0, d1 = a0 - b0, a1 - b1
+                if d0 * d1 < 0:
+                    cuts = (cuts or []) + [d0 / (d0 - d1)]
+        starts, ends = zip(*lines)
+        points.append((x0, max(starts)))
+        if cuts:
+            width = x1 - x0
+            for t in sorted(cuts):
+                points.append((x0 + t * width, max(y0 + t * (y1 - y0) for y0, y1 in lines)))
+        points.append((x1, max(ends)))
+    return points
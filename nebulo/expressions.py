@@ -0,0 +1,490 @@
+import re
+from functools import reduce
+from operator import mul
+
+import numpy as np
+
+TNORMS = ("min", "product", "lukasiewicz")
+
+# Hedges as exponents applied to a membership degree
+HEDGES = {"very": 2.0, "extremely": 3.0, "somewhat": 0.5, "more_or_less": 0.5, "slightly": 0.5}
+
+
+def conjunction(tnorm, values):
+    """AND of a list of degrees under `tnorm`"""
+    if tnorm == "min":
+        return min(values)
+    if tnorm == "product":
+        return reduce(mul, values, 1.0)
+    if tnorm == "lukasiewicz":
+        return max(0.0, sum(values) - (len(values) - 1))
+    raise ValueError(f"unknown t-norm {tnorm!r}, expected one of {TNORMS}")
+
+
+def disjunction(tnorm, values):
+    """OR of a list of degrees under the s-norm dual to `tnorm`"""
+    if tnorm == "min":
+        return max(values)
+    if tnorm == "product":
+        return 1.0 - reduce(mul, (1.0 - v for v in values), 1.0)
+    if tnorm == "lukasiewicz":
+        return min(1.0, sum(values))
+    raise ValueError(f"unknown t-norm {tnorm!r}, expected one of {TNORMS}")
+
+
+class Expression:
+    """Antecedent of a FuzzyRule beyond a plain conjunction
+
+    Built from Is(var, term) leaves with & (AND), | (OR) and ~ (NOT), or
+    parsed from text with parse_expression. Expressions are immutable,
+    compare by structure and can be shared between rules.
+    """
+    __slots__ = ()
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash((type(self).__name__, self._key()))
+
+    def leaves(self):
+        """(var_name, term_name) of every Is leaf, in order, without repeats"""
+        return list(dict.fromkeys(self._leaves()))
+
+    def degree(self, lookup, tnorm="min"):
+        """Truth degree given lookup(var, term) -> membership degree"""
+        raise NotImplementedError
+
+
+class Is(Expression):
+    """`var IS [hedges] term`; hedges such as "very" raise the degree to a power (see HEDGES)"""
+    __slots__ = ("var", "term", "hedges")
+
+    def __init__(self, var, term, hedges=()):
+        self.var = var
+        self.term = term
+        self.hedges = (hedges,) if isinstance(hedges, str) else tuple(hedges)
+        for hedge in self.hedges:
+            if hedge not in HEDGES:
+                raise ValueError(f"unknown hedge {hedge!r}, expected one of {sorted(HEDGES)}")
+
+    @property
+    def power(self):
+        return reduce(mul, (HEDGES[hedge] for hedge in self.hedges), 1.0)
+
+    def _key(self):
+        return self.var, self.term, self.hedges
+
+    def _leaves(self):
+        yield self.var, self.term
+
+    def degree(self, lookup, tnorm="min"):
+        value = lookup(self.var, self.term)
+        return value ** self.power if self.hedges else value
+
+    def __repr__(self):
+        hedges = "".join(f"{hedge} " for hedge in self.hedges)
+        return f"{self.var} IS {hedges}{self.term}"
+
+
+class Not(Expression):
+    __slots__ = ("operand",)
+
+    def __init__(self, operand):
+        self.operand = operand
+
+    def _key(self):
+        return self.operand
+
+    def _leaves(self):
+        return self.operand._leaves()
+
+    def degree(self, lookup, tnorm="min"):
+        return 1.0 - self.operand.degree(lookup, tnorm)
+
+    def __repr__(self):
+        return f"NOT ({self.operand!r})"
+
+
+class _Connective(Expression):
+    __slots__ = ("operands",)
+
+    def __init__(self, *operands):
+        if not operands:
+            raise ValueError(f"{type(self).__name__} needs at least one operand")
+        flat = []
+        for operand in operands:
+            # Both connectives are associative: And(a, And(b, c)) is And(a, b, c)
+            flat.extend(operand.operands if type(operand) is type(self) else (operand,))
+        self.operands = tuple(flat)
+
+    def _key(self):
+        return self.operands
+
+    def _leaves(self):
+        for operand in self.operands:
+            yield from operand._leaves()
+
+    def __repr__(self):
+        return f" {self._word} ".join(f"({operand!r})" for operand in self.operands)
+
+
+class And(_Connective):
+    __slots__ = ()
+    _word = "AND"
+
+    def degree(self, lookup, tnorm="min"):
+        return conjunction(tnorm, [operand.degree(lookup, tnorm) for operand in self.operands])
+
+
+class Or(_Connective):
+    __slots__ = ()
+    _word = "OR"
+
+    def degree(self, lookup, tnorm="min"):
+        return disjunction(tnorm, [operand.degree(lookup, tnorm) for operand in self.operands])
+
+
+def as_conditions(expression):
+    """[(var, term), ...] when `expression` is a plain conjunction of unhedged terms, else None"""
+    operands = expression.operands if isinstance(expression, And) else (expression,)
+    if all(type(operand) is Is and not operand.hedges for operand in operands):
+        pairs = [(operand.var, operand.term) for operand in operands]
+        if len(set(pairs)) == len(pairs):
+            return pairs
+    return None
+
+
+# -- parsing ----------------------------------------------------------------
+
+_TOKEN = re.compile(r"\s*(?:(\()|(\))|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|(\w+))", re.UNICODE)
+_KEYWORDS = {"if", "then", "is", "and", "or", "not", "with"}
+
+
+class _Tokens:
+
+    def __init__(self, text):
+        self.text = text
+        self.items = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if match is None:
+                raise ValueError(f"cannot parse {self.text!r} at {text[position:]!r}")
+            open_, close, number, word = match.groups()
+            if number is not None:
+                self.items.append(("number", float(number)))
+            elif word is not None:
+                lower = word.lower()
+                self.items.append(("keyword", lower) if lower in _KEYWORDS else ("name", word))
+            else:
+                self.items.append(("paren", open_ or close))
+            position = match.end()
+        self.position = 0
+
+    def peek(self, kind=None, value=None):
+        if self.position >= len(self.items):
+            return None
+        token = self.items[self.position]
+        if (kind is None or token[0] == kind) and (value is None or token[1] == value):
+            return token
+        return None
+
+    def take(self, kind=None, value=None):
+        token = self.peek(kind, value)
+        if token is None:
+            found = self.items[self.position][1] if self.position < len(self.items) else "end of text"
+            raise ValueError(f"cannot parse {self.text!r}: expected {value or kind}, found {found!r}")
+        self.position += 1
+        return token[1]
+
+    def accept(self, kind, value=None):
+        if self.peek(kind, value):
+            self.position += 1
+            return True
+        return False
+
+
+def _parse_or(tokens):
+    operands = [_parse_and(tokens)]
+    while tokens.accept("keyword", "or"):
+        operands.append(_parse_and(tokens))
+    return operands[0] if len(operands) == 1 else Or(*operands)
+
+
+def _parse_and(tokens):
+    operands = [_parse_unary(tokens)]
+    while tokens.accept("keyword", "and"):
+        operands.append(_parse_unary(tokens))
+    return operands[0] if len(operands) == 1 else And(*operands)
+
+
+def _parse_unary(tokens):
+    if tokens.accept("keyword", "not"):
+        return Not(_parse_unary(tokens))
+    if tokens.accept("paren", "("):
+        expression = _parse_or(tokens)
+        tokens.take("paren", ")")
+        return expression
+    var = tokens.take("name")
+    tokens.take("keyword", "is")
+    negated = tokens.accept("keyword", "not")
+    words = [tokens.take("name")]
+    while tokens.peek("name") and words[-1].lower() in HEDGES:
+        words.append(tokens.take("name"))
+    leaf = Is(var, words[-1], [hedge.lower() for hedge in words[:-1]])
+    return Not(leaf) if negated else leaf
+
+
+def parse_expression(text):
+    """Expression from text such as "a IS very high AND NOT (b IS low OR c IS low)" """
+    tokens = _Tokens(text)
+    expression = _parse_or(tokens)
+    if tokens.peek() is not None:
+        raise ValueError(f"cannot parse {text!r}: unexpected {tokens.take()!r}")
+    return expression
+
+
+def parse_rule(text):
+    """
+    FuzzyRule from "IF <expression> THEN <consequent> [WITH <weight>]"
+
+    consequent: a number (Sugeno), `output IS label` or `label` (Mamdani).
+    Plain conjunctions of unhedged terms become ordinary condition lists.
+    """
+    from .rules import FuzzyRule
+
+    tokens = _Tokens(text)
+    tokens.take("keyword", "if")
+    expression = _parse_or(tokens)
+    tokens.take("keyword", "then")
+    if tokens.peek("number"):
+        output = tokens.take("number")
+    else:
+        output = tokens.take("name")
+        if tokens.accept("keyword", "is"):
+            output = (output, tokens.take("name"))
+    weight = tokens.take("number") if tokens.accept("keyword", "with") else 1.0
+    if tokens.peek() is not None:
+        raise ValueError(f"cannot parse {text!r}: unexpected {tokens.take()!r}")
+    conditions = as_conditions(expression)
+    return FuzzyRule(expression if conditions is None else conditions, output, weight)
+
+
+# -- vectorized programs --------------------------------------------------------
+
+def _lukasiewicz_and(a, b, out):
+    np.add(a, b, out=out)
+    out -= 1
+    return np.maximum(out, 0, out=out)
+
+
+def _lukasiewicz_or(a, b, out):
+    np.add(a, b, out=out)
+    return np.minimum(out, 1, out=out)
+
+
+def _probabilistic_or(a, b, out):
+    # a + b - a * b, written so `out` may alias `a`
+    product = a * b
+    np.add(a, b, out=out)
+    return np.subtract(out, product, out=out)
+
+
+# Binary (a, b, out) forms of each t-norm and its s-norm; all associative,
+# with 1 neutral for the t-norm and 0 for the s-norm
+BINARY_TNORMS = {"min": np.minimum, "product": np.multiply, "lukasiewicz": _lukasiewicz_and}
+BINARY_SNORMS = {"min": np.maximum, "product": _probabilistic_or, "lukasiewicz": _lukasiewicz_or}
+
+# Register rows of a batch chunk kept below this many floats
+_CHUNK_FLOATS = 1 << 22
+# Batches at least this large reduce rule by rule instead of gathering
+# (CompiledSystem.activations, and RuleProgram chunks)
+GATHER_MAX_SAMPLES = 512
+
+
+class RuleProgram:
+    """Rule expressions flattened into register instructions run over whole batches
+
+    Registers are rows of one (n_registers, n_samples) array: first the
+    fuzzification tensor of CompiledSystem (slot rows, then its constant
+    1 row), a constant 0 row, then one row per distinct subexpression
+    used by another one. Subexpressions are hash-consed, so a term,
+    hedge, negation or sub-conjunction used by many rules is computed
+    once. Instructions are grouped by depth and kind; each group is one
+    gather and one ufunc call per operand position, however many rules
+    it serves. The top instruction of each rule writes straight into
+    the output rows, so registers stay few even for large rule bases.
+
+    steps: (first register, last register, op, parameter, operands) of
+           the inner instruction groups, in execution order
+    roots: (output positions, op, parameter, operands) of the top
+           instruction groups
+    copies: (output positions, source registers) of outputs that are a
+            leaf or an inner subexpression
+    """
+
+    def __init__(self, expressions, slots, padding, tnorm="min"):
+        if tnorm not in TNORMS:
+            raise ValueError(f"unknown t-norm {tnorm!r}, expected one of {TNORMS}")
+        self.tnorm = tnorm
+        self.one = padding
+        self.zero = padding + 1
+        self.n_outputs = len(expressions)
+        self._slots = slots
+        self._nodes = {}   # key -> (node index, level)
+        self._entries = []  # (level, op, parameter, operand registers or node indices)
+        outputs = [self._intern(expression) for expression in expressions]
+        self._layout(outputs)
+
+    def _intern(self, expression):
+        """('reg', register) of a leaf or ('node', index) of an instruction"""
+        if type(expression) is Is:
+            ref = ("reg", self._slots[(expression.var, expression.term)])
+            return self._node("pow", expression.power, (ref,)) if expression.hedges else ref
+        if type(expression) is Not:
+            return self._node("not", None, (self._intern(expression.operand),))
+        op = "and" if type(expression) is And else "or"
+        refs = [self._intern(operand) for operand in expression.operands]
+        if self.tnorm == "min":
+            refs = list(dict.fromkeys(refs))  # min and max are idempotent
+        if len(refs) == 1:
+            return refs[0]
+        return self._node(op, None, tuple(sorted(refs)))
+
+    def _node(self, op, parameter, refs):
+        key = (op, parameter, refs)
+        found = self._nodes.get(key)
+        if found is None:
+            level = 1 + max((self._entries[ref[1]][0] for ref in refs if ref[0] == "node"), default=0)
+            found = self._nodes[key] = ("node", len(self._entries))
+            self._entries.append((level, op, parameter, refs))
+        return found
+
+    def _layout(self, outputs):
+        """Assign registers so every inner instruction group writes one contiguous block"""
+        entries = self._entries
+        inner = {ref[1] for entry in entries for ref in entry[3] if ref[0] == "node"}
+        base = self.zero + 1
+        order = sorted(inner, key=lambda i: entries[i][:3])
+        register = {i: base + position for position, i in enumerate(order)}
+
+        def resolve(ref):
+            return ref[1] if ref[0] == "reg" else register[ref[1]]
+
+        def operand_matrix(op, group):
+            refs = [[resolve(ref) for ref in entries[i][3]] for i in group]
+            width = max(len(r) for r in refs)
+            fill = self.one if op == "and" else self.zero
+            return np.array([r + [fill] * (width - len(r)) for r in refs], dtype=np.intp)
+
+        self.steps = []
+        for (level, op, parameter), group in _groups(order, lambda i: entries[i][:3]):
+            first = register[group[0]]
+            self.steps.append((first, first + len(group), op, parameter, operand_matrix(op, group)))
+        self.n_registers = base + len(order)
+
+        # Top instructions, one per output even when two rules repeat a whole
+        # expression, so that groups usually cover a contiguous run of outputs
+        roots, copies = [], []
+        for position, ref in enumerate(outputs):
+            if ref[0] == "node" and ref[1] not in inner:
+                roots.append((position, ref[1]))
+            else:
+                copies.append((position, resolve(ref)))
+        roots.sort(key=lambda root: (entries[root[1]][1:3], root[0]))
+        self.roots = []
+        for (op, parameter), group in _groups(roots, lambda root: entries[root[1]][1:3]):
+            positions = np.array([position for position, _ in group], dtype=np.intp)
+            self.roots.append((positions, op, parameter, operand_matrix(op, [i for _, i in group])))
+        self.copies = tuple(np.array(column, dtype=np.intp).reshape(-1) for column in zip(*copies or [((), ())]))
+        self._length = len(order) + len({i for _, i in roots})
+
+    def __len__(self):
+        """Number of instructions"""
+        return self._length
+
+    def run(self, fuzzified, out=None, rows=None):
+        """
+        Degrees of every output expression from the fuzzification tensor
+
+        Returns an array of shape (n_outputs, n), or writes them into rows
+        `rows` (one per output, in order) of `out` when given. Registers
+        have the dtype of `fuzzified`.
+        """
+        n = fuzzified.shape[1]
+        if out is None:
+            out = np.empty((self.n_outputs, n), dtype=fuzzified.dtype)
+        targets = np.arange(self.n_outputs) if rows is None else np.asarray(rows, dtype=np.intp)
+        roots = []
+        for positions, op, parameter, operands in self.roots:
+            rows_of = targets[positions]
+            contiguous = bool(len(rows_of)) and rows_of[-1] - rows_of[0] + 1 == len(rows_of) and \
+                bool((np.diff(rows_of) == 1).all())
+            roots.append((rows_of, slice(rows_of[0], rows_of[-1] + 1) if contiguous else None, op, parameter,
+                          operands))
+        chunk = max(1, min(n, _CHUNK_FLOATS // self.n_registers))
+        for start in range(0, n, chunk):
+            stop = min(start + chunk, n)
+            registers = np.empty((self.n_registers, stop - start), dtype=fuzzified.dtype)
+            registers[:self.zero] = fuzzified[:, start:stop]
+            registers[self.zero] = 0
+            by_row = stop - start >= GATHER_MAX_SAMPLES
+            for first, last, op, parameter, operands in self.steps:
+                self._apply(registers, op, parameter, operands, registers[first:last], by_row)
+            for rows_of, block, op, parameter, operands in roots:
+                if block is not None:
+                    self._apply(registers, op, parameter, operands, out[block, start:stop], by_row)
+                elif by_row and op in ("and", "or"):
+                    self._apply(registers, op, parameter, operands, [out[r, start:stop] for r in rows_of], by_row)
+                else:
+                    result = np.empty((len(rows_of), stop - start), dtype=fuzzified.dtype)
+                    self._apply(registers, op, parameter, operands, result, by_row)
+                    out[rows_of, start:stop] = result
+            positions, sources = self.copies
+            if len(positions):
+                out[targets[positions], start:stop] = registers[sources]
+        return out
+
+    def _apply(self, registers, op, parameter, operands, out, by_row):
+        """One instruction group: row i of `out` from the registers operands[i]"""
+        if op == "pow":
+            np.power(registers[operands[:, 0]], parameter, out=out)
+            return
+        if op == "not":
+            np.subtract(1.0, registers[operands[:, 0]], out=out)
+            return
+        combine = BINARY_TNORMS[self.tnorm] if op == "and" else BINARY_SNORMS[self.tnorm]
+        if by_row:
+            # Wide chunks are memory bound, as in CompiledSystem.activations:
+            # combine row by row instead of gathering whole operand columns
+            for row, refs in zip(out, operands.tolist()):
+                combine(registers[refs[0]], registers[refs[1]], out=row)
+                for ref in refs[2:]:
+                    combine(row, registers[ref], out=row)
+            return
+        np.take(registers, operands[:, 0], axis=0, out=out, mode="clip")  # "raise" buffers a copy of out
+        for j in range(1, operands.shape[1]):
+            combine(out, registers[operands[:, j]], out=out)
+
+
+def _groups(items, key):
+    """Runs of consecutive `items` with equal key(item), as (key, [items])"""
+    result = []
+    for item in items:
+        k = key(item)
+        if result and result[-1][0] == k:
+            result[-1][1].append(item)
+        else:
+            result.append((k, [item]))
+    return result
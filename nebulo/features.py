@@ -0,0 +1,332 @@
+"""Rolling time-series features of input streams, updated tick by tick
+
+RollingFeatures keeps, for n_entities streams at once, one ring buffer
+per source of the last values and the running state of each feature:
+
+  Delta(source, lag)       value now minus `lag` ticks ago (the weekly
+                           trend of compute_weekly_trend with lag=7 on
+                           daily values)
+  Ema(source, span|alpha)  exponential moving average
+  Mean(source, window)     moving average
+  Std(source, window)      moving standard deviation (volatility)
+  Slope(source, window)    least-squares slope per tick over the window
+  Min / Max(source, window)
+
+Every feature costs O(1) per tick and entity whatever its window: sums
+and moments are moved by the value entering and the one leaving the
+window, and Min / Max use the van Herk / Gil-Werman block scheme, whose
+block suffixes (O(window) once per window ticks) make them O(1) amortized.
+Until a window is full, features cover the values seen so far.
+
+update() takes the new value of every source for all entities, or for
+some of them, and returns {feature name: array}: the inputs of
+FuzzySystem.evaluate_batch. update_one() serves a single entity online
+and returns {feature name: float} for FuzzySystem.evaluate.
+"""
+from copy import copy
+
+import numpy as np
+
+
+class Feature:
+    """A statistic of the last values of one source
+
+    window: values the feature looks at; history: ring buffer length it
+    needs (the window plus the value leaving it)
+    """
+
+    def __init__(self, source, window):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.source = source
+        self.window = int(window)
+
+    @property
+    def history(self):
+        return self.window + 1
+
+    def _bind(self, n):
+        """Allocate the state of n entities"""
+
+    def _reset(self, rows):
+        """Clear the state of the entities `rows`"""
+
+    def _update(self, ring, rows, x, count):
+        """
+        New value x of the entities `rows`, already pushed to `ring`;
+        count: values seen so far, including x. While all entities tick
+        together, rows is slice(None) and count an int. Returns the
+        feature values.
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.source!r}, {self.window})"
+
+
+class Delta(Feature):
+    """x[t] - x[t - lag]; against the oldest value while fewer than lag + 1 were seen"""
+
+    def _update(self, ring, rows, x, count):
+        return x - ring.ago(rows, np.minimum(self.window, count - 1), count)
+
+
+class Ema(Feature):
+    """Exponential moving average, alpha = 2 / (span + 1) unless given; starts at the first value"""
+
+    def __init__(self, source, span=None, alpha=None):
+        if (span is None) == (alpha is None):
+            raise ValueError("give either span or alpha")
+        self.alpha = float(alpha) if alpha is not None else 2 / (span + 1)
+        if not 0 < self.alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        super().__init__(source, 1)
+
+    @property
+    def history(self):
+        return 1
+
+    def _bind(self, n):
+        self.value = np.zeros(n)
+
+    def _update(self, ring, rows, x, count):
+        value = self.value[rows]
+        value = _where(count == 1, x, value + self.alpha * (x - value))
+        self.value[rows] = value
+        return value
+
+    def __repr__(self):
+        return f"Ema({self.source!r}, alpha={self.alpha!r})"
+
+
+class Mean(Feature):
+    """Moving average of the last `window` values"""
+
+    def _bind(self, n):
+        self.total = np.zeros(n)
+
+    def _reset(self, rows):
+        self.total[rows] = 0
+
+    def _update(self, ring, rows, x, count):
+        full = count > self.window
+        total = self.total[rows] + x - _where(full, ring.ago(rows, np.minimum(self.window, count - 1), count), 0)
+        self.total[rows] = total
+        return total / np.minimum(count, self.window)
+
+
+class Std(Feature):
+    """Moving (population) standard deviation, by sliding Welford updates"""
+
+    def _bind(self, n):
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+
+    def _reset(self, rows):
+        self.mean[rows] = 0
+        self.m2[rows] = 0
+
+    def _update(self, ring, rows, x, count):
+        mean, m2 = self.mean[rows], self.m2[rows]
+        full = count > self.window
+        # Growing window: add x; full window: replace the leaving value by x
+        old = _where(full, ring.ago(rows, np.minimum(self.window, count - 1), count), mean)
+        size = np.minimum(count, self.window)
+        new_mean = mean + (x - old) / size
+        m2 = m2 + _where(full, (x - old) * (x - new_mean + old - mean), (x - mean) * (x - new_mean))
+        np.maximum(m2, 0, out=m2)
+        self.mean[rows], self.m2[rows] = new_mean, m2
+        return np.sqrt(m2 / size)
+
+
+class Slope(Feature):
+    """
+    Least-squares slope per tick of the last `window` values. With S the
+    sum and T the sum of position * value (oldest at position 0), a slide
+    is T -= S - oldest, T += (window - 1) * x; 0 for a single value.
+    """
+
+    def _bind(self, n):
+        self.total = np.zeros(n)
+        self.moment = np.zeros(n)
+
+    def _reset(self, rows):
+        self.total[rows] = 0
+        self.moment[rows] = 0
+
+    def _update(self, ring, rows, x, count):
+        total, moment = self.total[rows], self.moment[rows]
+        full = count > self.window
+        old = _where(full, ring.ago(rows, np.minimum(self.window, count - 1), count), 0)
+        size = np.minimum(count, self.window)
+        moment = moment - _where(full, total - old, 0) + (size - 1) * x
+        total = total - old + x
+        self.total[rows], self.moment[rows] = total, moment
+        spread = size * (size * size - 1) / 12
+        return np.divide(moment - (size - 1) / 2 * total, spread, out=np.zeros(len(x)), where=size > 1)
+
+
+class Max(Feature):
+    """
+    Maximum of the last `window` values (van Herk / Gil-Werman): the
+    window is the running maximum of the current block of `window` ticks
+    and a suffix maximum of the previous block, computed once per block.
+    """
+    _reduce = staticmethod(np.maximum)
+    _empty = -np.inf
+
+    def _bind(self, n):
+        self.prefix = np.full(n, self._empty)
+        # suffix[j]: extreme of positions j.. of the previous block; row `window` is empty
+        self.suffix = np.full((self.window + 1, n), self._empty)
+
+    def _reset(self, rows):
+        self.prefix[rows] = self._empty
+        self.suffix[:, rows] = self._empty
+
+    def _update(self, ring, rows, x, count):
+        position = (count - 1) % self.window
+        starts = position == 0
+        back = np.arange(self.window, 0, -1)[:, None]
+        if np.ndim(count) == 0:
+            if starts and count > 1:  # the first block has no previous one
+                previous = ring.ago(rows, back[:, 0], count)  # (window, n), oldest first
+                self.suffix[:-1] = self._reduce.accumulate(previous[::-1], axis=0)[::-1]
+            prefix = x.copy() if starts else self._reduce(self.prefix, x)
+            self.prefix[:] = prefix
+            return self._reduce(prefix, self.suffix[position + 1])
+        block = starts & (count > 1)
+        if block.any():
+            previous = ring.ago(rows[block], back, count[block])
+            self.suffix[:-1, rows[block]] = self._reduce.accumulate(previous[::-1], axis=0)[::-1]
+        prefix = _where(starts, x, self._reduce(self.prefix[rows], x))
+        self.prefix[rows] = prefix
+        return self._reduce(prefix, self.suffix[position + 1, rows])
+
+
+class Min(Max):
+    """Minimum of the last `window` values (see Max)"""
+    _reduce = staticmethod(np.minimum)
+    _empty = np.inf
+
+
+def _where(condition, a, b):
+    """np.where, short-circuited when all entities share one condition"""
+    if type(condition) is bool:
+        return a if condition else b
+    return np.where(condition, a, b)
+
+
+class _Ring:
+    """Last `size` values of one source for n entities, one row per tick; count per entity"""
+
+    def __init__(self, n, size):
+        self.size = size
+        self.values = np.zeros((size, n))
+        self.count = np.zeros(n, dtype=np.int64)
+
+    def push(self, rows, x, count):
+        """count: values seen by `rows` before x"""
+        self.values[count % self.size, rows] = x
+        self.count[rows] += 1
+
+    def ago(self, rows, k, count):
+        """Value k ticks before the newest (k=0: newest) of `rows`, which have seen count values; k < count"""
+        return self.values[(count - 1 - k) % self.size, rows]
+
+
+class RollingFeatures:
+    """Features of input streams for n_entities at once
+
+    features: {output name: Feature}, the names being the FuzzySystem
+              input variables they feed; each RollingFeatures keeps its
+              own copies, so the same specs can be reused
+    values: {output name: array (n_entities,)}, the latest value of every
+            feature for every entity (0 before its first update)
+    """
+
+    def __init__(self, features, n_entities=1):
+        self.features = {name: copy(feature) for name, feature in features.items()}
+        self.n_entities = n_entities
+        self.sources = list(dict.fromkeys(f.source for f in self.features.values()))
+        self._rings = {}
+        for source in self.sources:
+            size = max(f.history for f in self.features.values() if f.source == source)
+            self._rings[source] = _Ring(n_entities, size)
+        for feature in self.features.values():
+            feature._bind(n_entities)
+        self._all = np.arange(n_entities)
+        self._aligned = True  # every entity has seen the same number of ticks
+        self.values = {name: np.zeros(n_entities) for name in self.features}
+
+    @property
+    def count(self):
+        """Ticks seen per entity, shape (n_entities,)"""
+        return self._rings[self.sources[0]].count.copy() if self.sources else np.zeros(self.n_entities, dtype=np.int64)
+
+    @property
+    def ready(self):
+        """Per entity: every window is full"""
+        windows = [f.window for f in self.features.values()]
+        return self.count >= max(windows, default=0)
+
+    def update(self, values, entities=None):
+        """
+        Push one tick. values: {source: array of one value per updated
+        entity, or a scalar}; entities: indices of the entities updated,
+        by default all of them. Returns {feature name: array} for those
+        entities, ready for FuzzySystem.evaluate_batch.
+        """
+        if entities is not None:
+            rows = np.atleast_1d(np.asarray(entities, dtype=np.intp))
+            self._aligned = False
+        else:
+            # All entities in step: whole rows of the rings, scalar positions
+            rows = slice(None) if self._aligned else self._all
+        shape = (self.n_entities,) if entities is None else rows.shape
+        new = {}
+        counts = {}
+        for source in self.sources:
+            if source not in values:
+                raise KeyError(source)
+            x = np.broadcast_to(np.asarray(values[source], dtype=float), shape)
+            ring = self._rings[source]
+            count = int(ring.count[0]) if self._aligned else ring.count[rows]
+            ring.push(rows, x, count)
+            new[source] = x
+            counts[source] = count + 1
+        result = {}
+        for name, feature in self.features.items():
+            value = feature._update(self._rings[feature.source], rows, new[feature.source], counts[feature.source])
+            self.values[name][rows] = value
+            result[name] = value
+        return result
+
+    def update_one(self, values, entity=0):
+        """update() for a single entity: {source: float} -> {feature name: float}, for FuzzySystem.evaluate"""
+        result = self.update(values, None if self.n_entities == 1 else [entity])
+        return {name: float(value[0]) for name, value in result.items()}
+
+    def run(self, series):
+        """
+        Features at every tick of whole series. series: {source: array of
+        shape (n_ticks,) or (n_ticks, n_entities)}, fed to update() tick
+        by tick. Returns {feature name: array (n_ticks, n_entities)}.
+        """
+        arrays = {source: np.asarray(series[source], dtype=float) for source in self.sources}
+        n_ticks = len(next(iter(arrays.values()))) if arrays else 0
+        result = {name: np.empty((n_ticks, self.n_entities)) for name in self.features}
+        for t in range(n_ticks):
+            for name, value in self.update({source: a[t] for source, a in arrays.items()}).items():
+                result[name][t] = value
+        return result
+
+    def reset(self, entities=None):
+        """Forget the history of `entities` (all by default), e.g. when a slot is reused"""
+        rows = self._all if entities is None else np.atleast_1d(np.asarray(entities, dtype=np.intp))
+        self._aligned = entities is None
+        for ring in self._rings.values():
+            ring.count[rows] = 0
+        for name, feature in self.features.items():
+            feature._reset(rows)
+            self.values[name][rows] = 0
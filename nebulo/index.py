@@ -0,0 +1,105 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from itertools import product
+from math import inf
+
+from .compiled import _signature
+
+
+class SupportIndex:
+    """Finds the terms and rules of a FuzzySystem that can fire for an input
+
+    Each term is reduced to its open support interval (lo, hi): (a, c) for
+    TriangularMF, (a, d) for TrapezoidalMF and the `eps` cut-off for
+    functions that never reach 0, such as GaussianMF. Per variable the
+    intervals are sorted by lower edge; a lookup bisects to the terms whose
+    interval starts before x and could still reach it, so it costs
+    O(log n + k) for n terms and k overlapping ones.
+
+    Rules are grouped by the variables they test. For an input, only the
+    combinations of active terms are looked up, so the work scales with
+    the number of rules that can fire rather than with the rule count.
+    `rules_by_term` maps each (variable, term) pair to the rules testing it.
+
+    With terms cut off at `eps`, the rules left out still fire below eps,
+    so an indexed evaluation is an approximation: rules fire at most as
+    strongly as their weakest term, so each left-out rule weighs at most
+    eps (times its weight) against the indexed ones. When no indexed rule
+    reaches eps, the left-out ones could decide the output alone and
+    FuzzySystem.evaluate falls back to all rules (see `decides`).
+    """
+
+    def __init__(self, system, eps=1e-6):
+        self.eps = eps
+        self._signature = _signature(system)
+
+        self.supports = {}
+        # Whether some support depends on eps, i.e. is cut off rather than exact
+        self.truncated = any(mf.support(eps) != mf.support(eps / 2)
+                             for var in system.variables.values() for mf in var.terms.values())
+        for var in system.variables.values():
+            entries = sorted((mf.support(eps), term) for term, mf in var.terms.items())
+            lows = [lo for (lo, _), _ in entries]
+            highs = [hi for (_, hi), _ in entries]
+            names = [term for _, term in entries]
+            width = max((hi - lo for lo, hi in zip(lows, highs)), default=0)
+            self.supports[var.name] = (lows, highs, names, width)
+
+        # (var, term) -> indices of the rules testing it
+        self.rules_by_term = defaultdict(list)
+        # (var, var, ...) -> {(term, term, ...): [rule indices]}
+        self.groups = defaultdict(lambda: defaultdict(list))
+        # Rules with an Expression antecedent (OR, NOT) may fire with inactive terms
+        self.always = []
+        for i in range(len(system.rules)):
+            if system.rules.expression(i) is not None:
+                self.always.append(i)
+                continue
+            conditions = system.rules.conditions(i)
+            for condition in conditions:
+                self.rules_by_term[condition].append(i)
+            names = tuple(var for var, _ in conditions)
+            self.groups[names][tuple(term for _, term in conditions)].append(i)
+        self.rules_by_term = dict(self.rules_by_term)
+        self.groups = {names: dict(terms) for names, terms in self.groups.items()}
+
+    def is_stale(self, system):
+        """True when `system` changed after the index was built"""
+        return _signature(system) != self._signature
+
+    def active_terms(self, var, x):
+        """Names of the terms of `var` whose support contains x"""
+        lows, highs, names, width = self.supports[var]
+        stop = bisect_left(lows, x)
+        start = 0 if width == inf else bisect_right(lows, x - width)
+        return [names[i] for i in range(start, stop) if highs[i] > x]
+
+    def degrees(self, variable, terms, x):
+        """
+        {term: degree} of FuzzyVariable `variable` at x for the active
+        `terms`; with expression rules every other term is 0
+        """
+        degrees = {term: variable.terms[term].evaluate(x) for term in terms}
+        if self.always and len(degrees) < len(variable.terms):
+            degrees = {**dict.fromkeys(variable.terms, 0.0), **degrees}
+        return degrees
+
+    def decides(self, strengths):
+        """
+        False when terms are cut off at eps and none of the `strengths` of
+        the indexed rules reaches it: the rules left out may then weigh as
+        much, so all rules must be evaluated
+        """
+        return not self.truncated or max(strengths, default=0) >= self.eps
+
+    def active_rules(self, active):
+        """Indices of the rules whose terms are all active, and the expression rules
+
+        active: {var_name: [term names]} as returned by active_terms
+        """
+        fired = []
+        for names, by_terms in self.groups.items():
+            choices = [active[var] for var in names]
+            for terms in product(*choices):
+                fired.extend(by_terms.get(terms, ()))
+        return sorted(fired + self.always)
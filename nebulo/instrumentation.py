@@ -0,0 +1,244 @@
+from time import perf_counter
+
+import numpy as np
+
+from .compiled import _fuzzify_rows
+
+STAGES = ("fuzzify", "activation", "aggregation", "defuzzification", "evaluate")
+
+
+class Hook:
+    """Receives stage timings from FuzzySystem.evaluate and evaluate_batch
+
+    Attach with `FuzzySystem.add_hook`; subclass and override the methods
+    of interest, the defaults do nothing. Times are in seconds and `rows`
+    is the number of samples the call covered (1 for `evaluate`).
+    """
+
+    def fuzzify(self, variable, seconds, rows):
+        """One input variable fuzzified"""
+
+    def activation(self, rules, strengths, seconds, rows):
+        """
+        Firing strengths of the rules with indices `rules` (into
+        system.rules): shape (len(rules),) for evaluate, (len(rules), rows)
+        for evaluate_batch. `seconds` is an array with the time of every
+        rule on the scalar path and the total time of the stage on the
+        batch path.
+        """
+
+    def aggregation(self, seconds, rows):
+        """Rule outputs combined (Sugeno weighted sums, Mamdani max per label)"""
+
+    def defuzzification(self, seconds, rows):
+        """Crisp output computed from the aggregate"""
+
+    def evaluate(self, seconds, rows):
+        """A whole evaluate or evaluate_batch call, hooks included"""
+
+
+class Collector(Hook):
+    """Built-in Hook accumulating stage times and rule firing counts
+
+    threshold: a rule counts as fired for a sample when its strength
+               is above this
+
+    Rules are identified by their index in system.rules; counts of a
+    rule base edited in between refer to whatever was at that index.
+    With a cache enabled, evaluate calls answered from it only record
+    their total time.
+    """
+
+    def __init__(self, threshold=0.0):
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.stage_calls = dict.fromkeys(STAGES, 0)
+        self.rows = 0
+        self.variable_seconds = {}
+        self.variable_rows = {}
+        self.rule_seconds = np.zeros(0)
+        self.rule_evaluated = np.zeros(0, dtype=np.int64)
+        self.rule_fired = np.zeros(0, dtype=np.int64)
+
+    def _stage(self, stage, seconds):
+        self.stage_seconds[stage] += seconds
+        self.stage_calls[stage] += 1
+
+    def _grow(self, size):
+        if size > len(self.rule_fired):
+            extra = size - len(self.rule_fired)
+            self.rule_seconds = np.concatenate([self.rule_seconds, np.zeros(extra)])
+            self.rule_evaluated = np.concatenate([self.rule_evaluated, np.zeros(extra, dtype=np.int64)])
+            self.rule_fired = np.concatenate([self.rule_fired, np.zeros(extra, dtype=np.int64)])
+
+    def fuzzify(self, variable, seconds, rows):
+        self._stage("fuzzify", seconds)
+        self.variable_seconds[variable] = self.variable_seconds.get(variable, 0.0) + seconds
+        self.variable_rows[variable] = self.variable_rows.get(variable, 0) + rows
+
+    def activation(self, rules, strengths, seconds, rows):
+        rules = np.asarray(rules, dtype=np.intp)
+        seconds = np.asarray(seconds, dtype=float)
+        self._stage("activation", float(seconds.sum()))
+        if not len(rules):
+            return
+        self._grow(int(rules.max()) + 1)
+        fired = (np.asarray(strengths) > self.threshold).reshape(len(rules), -1).sum(axis=1)
+        self.rule_fired[rules] += fired
+        self.rule_evaluated[rules] += rows
+        if seconds.ndim:
+            self.rule_seconds[rules] += seconds
+
+    def aggregation(self, seconds, rows):
+        self._stage("aggregation", seconds)
+
+    def defuzzification(self, seconds, rows):
+        self._stage("defuzzification", seconds)
+
+    def evaluate(self, seconds, rows):
+        self._stage("evaluate", seconds)
+        self.rows += rows
+
+    def dead_rules(self, n_rules=None):
+        """Indices of rules that never fired; pass len(system.rules) to include rules never evaluated"""
+        fired = self.rule_fired
+        if n_rules is not None:
+            fired = np.concatenate([fired[:n_rules], np.zeros(max(0, n_rules - len(fired)), dtype=np.int64)])
+        return np.flatnonzero(fired == 0).tolist()
+
+    def hot_variables(self):
+        """[(variable, seconds)] sorted by fuzzification time, slowest first"""
+        return sorted(self.variable_seconds.items(), key=lambda item: item[1], reverse=True)
+
+    def as_dict(self):
+        """Everything collected, as plain Python values"""
+        return {
+            "rows": self.rows,
+            "threshold": self.threshold,
+            "stages": {stage: {"seconds": self.stage_seconds[stage], "calls": self.stage_calls[stage]}
+                       for stage in STAGES},
+            "variables": {name: {"seconds": seconds, "rows": self.variable_rows[name]}
+                          for name, seconds in self.variable_seconds.items()},
+            "rules": {"seconds": self.rule_seconds.tolist(),
+                      "evaluated": self.rule_evaluated.tolist(),
+                      "fired": self.rule_fired.tolist()},
+        }
+
+    def to_prometheus(self, prefix="nebulo"):
+        """Counters in the Prometheus text exposition format"""
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value!r}" if labels else f"{prefix}_{name} {value!r}")
+
+        metric("rows_total", "Samples evaluated.", [({}, self.rows)])
+        metric("stage_seconds_total", "Time spent in each evaluation stage.",
+               [({"stage": stage}, self.stage_seconds[stage]) for stage in STAGES])
+        metric("stage_calls_total", "Number of times each evaluation stage ran.",
+               [({"stage": stage}, self.stage_calls[stage]) for stage in STAGES])
+        metric("variable_fuzzify_seconds_total", "Time spent fuzzifying each input variable.",
+               [({"variable": name}, seconds) for name, seconds in self.variable_seconds.items()])
+        metric("rule_activation_seconds_total", "Time spent computing each rule's firing strength (scalar path).",
+               [({"rule": i}, seconds) for i, seconds in enumerate(self.rule_seconds.tolist())])
+        metric("rule_evaluated_total", "Samples each rule was evaluated on.",
+               [({"rule": i}, count) for i, count in enumerate(self.rule_evaluated.tolist())])
+        metric("rule_fired_total", "Samples on which each rule fired above the threshold.",
+               [({"rule": i}, count) for i, count in enumerate(self.rule_fired.tolist())])
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _emit(hooks, stage, *args):
+    for hook in hooks:
+        getattr(hook, stage)(*args)
+
+
+def evaluate_instrumented(system, inputs, hooks):
+    """FuzzySystem.evaluate reporting every stage to `hooks`"""
+    start = perf_counter()
+    if system._cache is not None:
+        output = system._cache.evaluate(inputs)
+        _emit(hooks, "evaluate", perf_counter() - start, 1)
+        return output
+
+    index = system._index
+    if index is not None and index.is_stale(system):
+        index = system.build_index(index.eps)
+    rules, strengths = _fire(system, inputs, hooks, index)
+    if index is not None and not index.decides(strengths):
+        rules, strengths = _fire(system, inputs, hooks, None)
+
+    t = perf_counter()
+    aggregated = system._aggregate(inputs, rules, strengths)
+    _emit(hooks, "aggregation", perf_counter() - t, 1)
+    t = perf_counter()
+    output = system._conclude(aggregated)
+    end = perf_counter()
+    _emit(hooks, "defuzzification", end - t, 1)
+    _emit(hooks, "evaluate", end - start, 1)
+    return output
+
+
+def _fire(system, inputs, hooks, index):
+    """(rules, strengths) of the rules `index` finds (all without one), reporting fuzzification and activation"""
+    fuzzified, active = {}, {}
+    for var, value in inputs.items():
+        t = perf_counter()
+        if index is not None:
+            active[var] = index.active_terms(var, value)
+            fuzzified[var] = index.degrees(system.variables[var], active[var], value)
+        else:
+            fuzzified[var] = system.variables[var].fuzzify(value)
+        _emit(hooks, "fuzzify", var, perf_counter() - t, 1)
+    rules = list(index.active_rules(active) if index is not None else range(len(system.rules)))
+
+    # Activation, one rule at a time so each rule's cost is known
+    strength = system._rule_strength(fuzzified)
+    strengths, seconds = [], []
+    for i in rules:
+        t = perf_counter()
+        strengths.append(strength(i))
+        seconds.append(perf_counter() - t)
+    _emit(hooks, "activation", rules, np.array(strengths), np.array(seconds), 1)
+    return rules, strengths
+
+
+def evaluate_batch_instrumented(system, inputs, hooks):
+    """CompiledSystem.evaluate_batch of normalized `inputs`, reporting every stage to `hooks`"""
+    start = perf_counter()
+    compiled = system.compile()
+    n = len(next(iter(inputs.values()))) if inputs else 0
+    fuzzified = np.empty((compiled.padding + 1, n), dtype=compiled.dtype)
+    fuzzified[compiled.padding] = 1
+    by_variable = {}
+    for slot in compiled.used_slots.tolist():
+        by_variable.setdefault(compiled.slot_terms[slot][0], []).append(slot)
+    for var, slots in by_variable.items():
+        if var not in inputs:
+            raise KeyError(var)
+        t = perf_counter()
+        _fuzzify_rows(fuzzified, slots, compiled.slot_terms, inputs)
+        _emit(hooks, "fuzzify", var, perf_counter() - t, n)
+
+    t = perf_counter()
+    strengths = compiled.activations(fuzzified)
+    _emit(hooks, "activation", np.arange(len(strengths)), strengths, perf_counter() - t, n)
+    t = perf_counter()
+    aggregated = compiled.aggregate(strengths, inputs)
+    _emit(hooks, "aggregation", perf_counter() - t, n)
+    t = perf_counter()
+    output = compiled.defuzzify_batch(aggregated, n)
+    end = perf_counter()
+    _emit(hooks, "defuzzification", end - t, n)
+    _emit(hooks, "evaluate", end - start, n)
+    return output
@@ -0,0 +1,424 @@
+"""Rule bases learned from labeled data
+
+wang_mendel generates rules over existing FuzzyVariable partitions, one
+per populated cell of the term grid. fit_anfis tunes TriangularMF,
+TrapezoidalMF and GaussianMF parameters by gradient descent and Sugeno
+consequents by least squares (the ANFIS hybrid rule) or by gradient.
+Both read the data in chunks / mini-batches, so memory is bounded by
+the chunk size, not by the number of rows.
+"""
+import time
+
+import numpy as np
+
+from .compiled import _as_columns
+from .membership import GaussianMF, TrapezoidalMF, TriangularMF
+from .rules import FuzzyRule, LinearOutput
+from .variables import FuzzyVariable
+
+DEFAULT_CHUNK_SIZE = 65536
+# Parameters fit_anfis tunes, per membership function type
+TUNABLE = {TriangularMF: ("a", "b", "c"), TrapezoidalMF: ("a", "b", "c", "d"), GaussianMF: ("mean", "sigma")}
+MF_TYPES = ("triangular", "trapezoidal", "gaussian")
+LSE_BLOCK = 256  # samples per update of the least-squares normal equations
+
+
+def grid_partition(name, universe, n_terms, mf="triangular", names=None):
+    """
+    FuzzyVariable with n_terms evenly spaced terms over `universe`, each
+    peaking at its grid point and reaching 0 at its neighbours'.
+    names: term names, by default t0..t{n_terms-1}
+    """
+    if n_terms < 2:
+        raise ValueError("a partition needs at least 2 terms")
+    if mf not in MF_TYPES:
+        raise ValueError(f"unknown membership function type {mf!r}, expected one of {MF_TYPES}")
+    low, high = universe
+    step = (high - low) / (n_terms - 1)
+    var = FuzzyVariable(name, universe)
+    for t in range(n_terms):
+        center = low + t * step
+        if mf == "triangular":
+            term = TriangularMF(center - step, center, center + step)
+        elif mf == "trapezoidal":
+            term = TrapezoidalMF(center - step, center - step / 4, center + step / 4, center + step)
+        else:
+            term = GaussianMF(center, step / 2)
+        var.add_term(names[t] if names else f"t{t}", term)
+    return var
+
+
+def wang_mendel(system, inputs, targets, columns=None, variables=None, output=None,
+                chunk_size=DEFAULT_CHUNK_SIZE, min_degree=0.0):
+    """
+    Add rules generated from data by the Wang-Mendel method.
+
+    Every sample is assigned to the cell of the terms where each input has
+    its highest membership, with degree the product of those memberships.
+    One rule is added per cell reached with degree above min_degree:
+    Mamdani -> the output term where the target of the cell's
+               highest-degree sample has its highest membership
+    Sugeno  -> the degree-weighted mean target of the cell's samples
+
+    inputs: as for FuzzySystem.evaluate_batch; targets: 1-D array
+    variables: inputs to build rules over, by default every system
+               variable present in `inputs`
+    output: Mamdani output variable name, by default the declared one
+    Returns the number of rules added.
+    """
+    data = _as_columns(inputs, columns)
+    y = np.asarray(targets, dtype=float).ravel()
+    if variables is None:
+        variables = [name for name in system.variables if name in data and name != output]
+    terms = [list(system.variables[var].terms.values()) for var in variables]
+    shape = tuple(len(t) for t in terms)
+    out_terms = out_labels = None
+    if system.mode == "mamdani":
+        out_var = system._output_variable([output])
+        out_labels = list(out_var.terms)
+        out_terms = list(out_var.terms.values())
+    # Per populated cell: Sugeno (sum of degree, sum of degree * y),
+    # Mamdani (best degree, output term of the best sample)
+    cells = np.zeros(0, dtype=np.int64)
+    first, second = np.zeros(0), np.zeros(0)
+    for start in range(0, len(y), chunk_size):
+        stop = min(start + chunk_size, len(y))
+        degree = np.ones(stop - start)
+        positions = []
+        for var, var_terms in zip(variables, terms):
+            memberships = _memberships(var_terms, data[var][start:stop])
+            best = memberships.argmax(axis=0)
+            positions.append(best)
+            degree *= np.take_along_axis(memberships, best[None], axis=0)[0]
+        chunk_y = y[start:stop]
+        if out_terms is not None:
+            memberships = _memberships(out_terms, chunk_y)
+            label = memberships.argmax(axis=0)
+            degree *= np.take_along_axis(memberships, label[None], axis=0)[0]
+        keep = degree > min_degree
+        cell = np.ravel_multi_index([p[keep] for p in positions], shape) if variables else np.zeros(keep.sum(), np.int64)
+        degree = degree[keep]
+        if out_terms is None:
+            cells, (first, second) = _sum_cells(np.concatenate([cells, cell]),
+                                                np.concatenate([first, degree]),
+                                                np.concatenate([second, degree * chunk_y[keep]]))
+        else:
+            cells, first, second = _best_cells(np.concatenate([cells, cell]),
+                                               np.concatenate([first, degree]),
+                                               np.concatenate([second, label[keep].astype(float)]))
+    rule_terms = np.stack(np.unravel_index(cells, shape), axis=1) if variables else np.zeros((len(cells), 0), int)
+    if out_terms is None:
+        outputs = second / first
+    else:
+        outputs = [(out_var.name, out_labels[k]) for k in second.astype(int).tolist()]
+    system.add_rules(variables, rule_terms, outputs)
+    return len(cells)
+
+
+def _memberships(mfs, values):
+    memberships = np.empty((len(mfs), len(values)))
+    for row, mf in zip(memberships, mfs):
+        mf.evaluate_array(values, out=row)
+    return memberships
+
+
+def _sum_cells(cells, *columns):
+    """Distinct cells and the sums of every column over each"""
+    unique, inverse = np.unique(cells, return_inverse=True)
+    return unique, [np.bincount(inverse, column, len(unique)) for column in columns]
+
+
+def _best_cells(cells, degree, label):
+    """Distinct cells with the degree and label of their highest-degree entry"""
+    order = np.lexsort((degree, cells))
+    cells, degree, label = cells[order], degree[order], label[order]
+    last = np.flatnonzero(np.append(cells[1:] != cells[:-1], True))
+    return cells[last], degree[last], label[last]
+
+
+class FitResult:
+    """Training report of fit_anfis
+
+    history: one dict per epoch with the training RMSE (measured during
+             the epoch's gradient pass), seconds and rows_per_second
+    """
+
+    def __init__(self, history, n_rows):
+        self.history = history
+        self.n_rows = n_rows
+        self.rmse = history[-1]["rmse"] if history else None
+        seconds = sum(entry["seconds"] for entry in history)
+        self.rows_per_second = n_rows * len(history) / seconds if seconds else None
+
+    def as_dict(self):
+        return {"rmse": self.rmse, "rows_per_second": self.rows_per_second, "history": self.history}
+
+
+def fit_anfis(system, inputs, targets, columns=None, epochs=10, batch_size=1024, learning_rate=0.01,
+              order=1, consequents="lse", tune=True, l2=1e-6, seed=None, callback=None):
+    """
+    Train a Sugeno system on (inputs, targets) with the ANFIS hybrid rule.
+
+    Every epoch first solves the consequents by least squares over all
+    rows (consequents="lse"; the normal equations are accumulated batch
+    by batch), then takes one Adam step per mini-batch on the membership
+    function parameters (tune=True), and with consequents="gradient" on
+    the consequents too. Rules keep their antecedents and weights; their
+    consequents become LinearOutput over the rules' input variables
+    (order=1) or constants (order=0).
+
+    learning_rate: Adam step as a fraction of each variable's universe
+                   width (of the targets' spread for consequents)
+    l2: ridge term of the least squares, relative to the mean diagonal;
+        it keeps rules that never fire at their previous consequent
+    callback: called with each epoch's history entry
+    Memory is about 4 * n_rules * batch_size floats, and the normal
+    equations need (n_rules * (n_inputs + 1))^2 with consequents="lse".
+    Only TriangularMF, TrapezoidalMF and GaussianMF terms are tuned; the
+    min t-norm passes gradient to the smallest antecedent only, so
+    tnorm="product" usually trains faster. Returns a FitResult.
+    """
+    if system.mode != "sugeno":
+        raise ValueError("fit_anfis trains Sugeno systems")
+    if consequents not in ("lse", "gradient"):
+        raise ValueError(f"unknown consequent fitting {consequents!r}, expected 'lse' or 'gradient'")
+    data = _as_columns(inputs, columns)
+    y = np.asarray(targets, dtype=float).ravel()
+    trainer = _Anfis(system, data, y[:batch_size], order, tune, consequents == "gradient", learning_rate)
+    rng = np.random.default_rng(seed)
+    starts = np.arange(0, len(y), batch_size)
+    history = []
+    for epoch in range(epochs):
+        start_time = time.perf_counter()
+        if consequents == "lse":
+            trainer.solve_consequents(data, y, batch_size, l2)
+        squared = 0.0
+        for start in rng.permutation(starts).tolist():
+            batch = {var: values[start:start + batch_size] for var, values in data.items()}
+            squared += trainer.step(batch, y[start:start + batch_size])
+        seconds = time.perf_counter() - start_time
+        history.append({"epoch": epoch + 1, "rmse": float(np.sqrt(squared / len(y))), "seconds": seconds,
+                        "rows_per_second": len(y) / seconds})
+        if callback is not None:
+            callback(history[-1])
+    trainer.write_back()
+    return FitResult(history, len(y))
+
+
+class _Anfis:
+    """Parameters and gradients of one fit_anfis run"""
+
+    def __init__(self, system, data, sample, order, tune, fit_consequents, learning_rate):
+        compiled = system.compile()
+        if compiled.program is not None:
+            raise ValueError("fit_anfis needs rules whose conditions are plain conjunctions")
+        if compiled.callables:
+            raise ValueError("callable consequents cannot be fitted; use LinearOutput")
+        self.system = system
+        self.compiled = compiled
+        self.n_rules = len(compiled.antecedents)
+        self.inputs = list(dict.fromkeys(compiled.used_variables + compiled.linear_variables)) if order == 1 else []
+        for var in compiled.used_variables + self.inputs:
+            if var not in data:
+                raise KeyError(var)
+        # Consequents: one row per rule, coefficients of self.inputs then the bias
+        self.theta = np.zeros((self.n_rules, len(self.inputs) + 1))
+        self.theta[:, -1] = compiled.consequents
+        if compiled.linear is not None:
+            for j, var in enumerate(compiled.linear_variables):
+                if var in self.inputs:  # order 0 drops the coefficients
+                    self.theta[:, self.inputs.index(var)] = compiled.linear[:, j]
+        # Tuned membership functions, each with the slots that use it
+        self.groups = []
+        names = {slot: key for key, slot in compiled.slots.items()}
+        by_mf = {}
+        for slot in compiled.used_slots.tolist():
+            var, mf = compiled.slot_terms[slot]
+            if tune and type(mf) in TUNABLE:
+                by_mf.setdefault(id(mf), (mf, var, []))[2].append(slot)
+        for mf, var, slots_of in by_mf.values():
+            scale = _width(system.variables[var], mf)
+            self.groups.append((mf, var, slots_of, [names[s] for s in slots_of], scale))
+        sizes = [len(TUNABLE[type(mf)]) for mf, *_ in self.groups]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(int)
+        step = np.repeat([group[4] for group in self.groups], sizes) if sizes else np.zeros(0)
+        self.mf_adam = _Adam(learning_rate * step)
+        self.fit_consequents = fit_consequents
+        self.pattern_keys = np.random.default_rng(0).integers(1, 1 << 62, len(compiled.used_slots))
+        if fit_consequents:
+            spread = float(np.std(sample)) or 1.0
+            self.theta_adam = _Adam(np.full(self.theta.size, learning_rate * spread))
+
+    def _design(self, batch, n):
+        columns = [batch[var] for var in self.inputs]
+        return np.vstack(columns + [np.ones(n)])
+
+    def _forward(self, batch, n):
+        # Training runs in float64 whatever the system's dtype
+        fuzzified = self.compiled.fuzzify(batch, n, dtype=np.float64)
+        return fuzzified, self.compiled.activations(fuzzified)
+
+    def solve_consequents(self, data, y, batch_size, l2):
+        """Least-squares consequents given the current membership functions"""
+        width = len(self.inputs) + 1
+        size = self.theta.size
+        gram = np.zeros((size, size))
+        moment = np.zeros(size)
+        # Chunks of whole batches, bounded to about 2**22 strengths
+        chunk = batch_size * max(1, (1 << 22) // (batch_size * max(self.n_rules, 1)))
+        for start in range(0, len(y), chunk):
+            batch = {var: values[start:start + chunk] for var, values in data.items()}
+            targets = y[start:start + chunk]
+            n = len(targets)
+            fuzzified, strengths = self._forward(batch, n)
+            total = strengths.sum(axis=0)
+            normalized = strengths / np.where(total > 0, total, 1)
+            design = self._design(batch, n)
+            # Samples sorted by the set of terms they reach (hashed), so each
+            # block of them fires few rules and only those rows of the normal
+            # equations change
+            reached = (fuzzified[self.compiled.used_slots] > 0).astype(np.int64)
+            order = np.argsort(self.pattern_keys @ reached, kind="stable")
+            for block in range(0, n, LSE_BLOCK):
+                samples = order[block:block + LSE_BLOCK]
+                weights = normalized[:, samples]
+                rules = np.flatnonzero(weights.any(axis=1))
+                # Row (rule r, column k) of the design matrix: normalized_r * [inputs, 1]_k
+                rows = (weights[rules][:, None, :] * design[None][:, :, samples]).reshape(len(rules) * width, -1)
+                columns = (rules[:, None] * width + np.arange(width)).ravel()
+                gram[np.ix_(columns, columns)] += rows @ rows.T
+                moment[columns] += rows @ targets[samples]
+        reg = l2 * max(np.trace(gram) / size, np.finfo(float).tiny)
+        solution = np.linalg.solve(gram + reg * np.eye(size), moment + reg * self.theta.ravel())
+        self.theta = solution.reshape(self.theta.shape)
+
+    def step(self, batch, y):
+        """One update on a mini-batch; returns its sum of squared errors before the update"""
+        n = len(y)
+        fuzzified, strengths = self._forward(batch, n)
+        total = strengths.sum(axis=0)
+        active = total > 0
+        safe_total = np.where(active, total, 1)
+        design = self._design(batch, n)
+        outputs = self.theta @ design
+        predicted = (strengths * outputs).sum(axis=0) / safe_total
+        error = predicted - y
+        squared = float(np.dot(error, error))
+        error = np.where(active, error, 0) / n  # gradient of the mean of error^2 / 2
+        if self.fit_consequents:
+            gradient = ((strengths / safe_total) * error) @ design.T
+            self.theta -= self.theta_adam.step(gradient.ravel()).reshape(self.theta.shape)
+        if self.groups:
+            gradient = self.mf_gradient(batch, fuzzified, strengths, outputs, predicted, safe_total, error)
+            self._apply(self.mf_adam.step(gradient))
+        return squared
+
+    def mf_gradient(self, batch, fuzzified, strengths, outputs, predicted, safe_total, error):
+        """Gradient of the loss with respect to every tuned parameter, in self.groups order"""
+        compiled = self.compiled
+        n = fuzzified.shape[1]
+        # Only fired (rule, sample) pairs: an antecedent at 0 is outside the
+        # support of its term (or the smallest under min), where it has no gradient
+        rules, samples = np.nonzero(strengths)
+        slots = compiled.antecedents[rules]
+        partials = _tnorm_partials(fuzzified[slots, samples[:, None]], compiled.tnorm)
+        by_strength = (error * (outputs - predicted) / safe_total)[rules, samples]
+        if compiled.weights is not None:
+            by_strength *= compiled.weights[rules]
+        partials *= by_strength[:, None]
+        by_slot = np.bincount((slots * n + samples[:, None]).ravel(), partials.ravel(), fuzzified.size)
+        by_slot = by_slot.reshape(fuzzified.shape)
+        gradient = np.empty(self.offsets[-1])
+        for k, (mf, var, slots_of, _, _) in enumerate(self.groups):
+            by_degree = by_slot[slots_of].sum(axis=0)
+            gradient[self.offsets[k]:self.offsets[k + 1]] = _mf_partials(mf, batch[var]) @ by_degree
+        return gradient
+
+    def _apply(self, steps):
+        for k, (mf, *_rest) in enumerate(self.groups):
+            names = TUNABLE[type(mf)]
+            values = [getattr(mf, name) for name in names] - steps[self.offsets[k]:self.offsets[k + 1]]
+            if type(mf) is GaussianMF:
+                values[1] = max(abs(values[1]), 1e-3 * self.groups[k][4])
+            else:
+                values = np.sort(values)  # keep a <= b <= c (<= d)
+            for name, value in zip(names, values.tolist()):
+                setattr(mf, name, value)
+
+    def write_back(self):
+        """Store the consequents in the rules and mark the tuned variables changed"""
+        system = self.system
+        if self.inputs:
+            outputs = [LinearOutput(dict(zip(self.inputs, row[:-1])), row[-1]) for row in self.theta.tolist()]
+        else:
+            outputs = self.theta[:, -1].tolist()
+        system.rules = [FuzzyRule(rule.conditions, output, rule.weight) for rule, output in zip(system.rules, outputs)]
+        for mf, var, _, terms, _ in self.groups:
+            for _, term in terms:
+                system.variables[var].add_term(term, mf)
+
+
+class _Adam:
+    def __init__(self, rates, beta1=0.9, beta2=0.999, eps=1e-8):
+        self.rates = rates
+        self.beta1, self.beta2, self.eps = beta1, beta2, eps
+        self.m = np.zeros(len(rates))
+        self.v = np.zeros(len(rates))
+        self.t = 0
+
+    def step(self, gradient):
+        """Parameter change to subtract"""
+        self.t += 1
+        self.m = self.beta1 * self.m + (1 - self.beta1) * gradient
+        self.v = self.beta2 * self.v + (1 - self.beta2) * gradient ** 2
+        m = self.m / (1 - self.beta1 ** self.t)
+        v = self.v / (1 - self.beta2 ** self.t)
+        return self.rates * m / (np.sqrt(v) + self.eps)
+
+
+def _tnorm_partials(degrees, tnorm):
+    """Partial derivatives of the t-norm of every row of `degrees`
+    (n_pairs, n_antecedents) with respect to each of its entries"""
+    if tnorm == "product":
+        prefix = np.ones_like(degrees)
+        suffix = np.ones_like(degrees)
+        for j in range(1, degrees.shape[1]):
+            prefix[:, j] = prefix[:, j - 1] * degrees[:, j - 1]
+        for j in range(degrees.shape[1] - 2, -1, -1):
+            suffix[:, j] = suffix[:, j + 1] * degrees[:, j + 1]
+        return prefix * suffix
+    if tnorm == "min":
+        partials = np.zeros_like(degrees)
+        np.put_along_axis(partials, degrees.argmin(axis=1)[:, None], 1.0, axis=1)
+        return partials
+    # lukasiewicz: max(0, sum - (k - 1)), the padding degrees of 1 cancel out;
+    # only fired pairs are passed, so every entry has derivative 1
+    return np.ones_like(degrees)
+
+
+def _mf_partials(mf, x):
+    """Derivatives of mf(x) with respect to its TUNABLE parameters, shape (n_parameters, n)"""
+    if type(mf) is GaussianMF:
+        offset = x - mf.mean
+        degree = np.exp(-0.5 * (offset / mf.sigma) ** 2)
+        return np.stack([degree * offset / mf.sigma ** 2, degree * offset ** 2 / mf.sigma ** 3])
+    a, b, c, d = (mf.a, mf.b, mf.b, mf.c) if type(mf) is TriangularMF else (mf.a, mf.b, mf.c, mf.d)
+    rising = (x > a) & (x < b)
+    falling = (x > c) & (x < d)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        da = np.where(rising, (x - b) / (b - a) ** 2, 0.0)
+        db = np.where(rising, (a - x) / (b - a) ** 2, 0.0)
+        dc = np.where(falling, (d - x) / (d - c) ** 2, 0.0)
+        dd = np.where(falling, (x - c) / (d - c) ** 2, 0.0)
+    if type(mf) is TriangularMF:
+        return np.stack([da, db + dc, dd])
+    return np.stack([da, db, dc, dd])
+
+
+def _width(var, mf):
+    """Scale of a term's parameters: its variable's universe width"""
+    try:
+        low, high = var.universe
+    except ValueError:
+        low, high = mf.support()
+    return float(high - low) if np.isfinite(high - low) and high > low else 1.0
@@ -1,11 +1,129 @@
+from bisect import bisect_right
+from math import exp, inf, log, sqrt
+
+import numpy as np
+
 # Clasa de bază (interfață) pentru toate funcțiile de apartenență
 class MembershipFunction:
+    # Fără __dict__ per instanță; subclasele își declară parametrii în __slots__
+    __slots__ = ()
+
     def evaluate(self, x):
         # Forțează subclasele să implementeze propria metodă de calcul
         raise NotImplementedError
 
+    def evaluate_array(self, x, out=None):
+        # Varianta vectorizată: gradul de apartenență pentru fiecare element din x.
+        # Dacă `out` este dat, rezultatul se scrie direct în el (fără alocări noi).
+        # Implicit aplică evaluate element cu element; subclasele o suprascriu.
+        x = np.asarray(x, dtype=float)
+        out = _prepare_out(x, out)
+        out[...] = np.vectorize(self.evaluate, otypes=[float])(x)
+        return out
+
+    def support(self, eps=1e-6):
+        # Intervalul (lo, hi) în afara căruia gradul de apartenență este <= eps.
+        # Funcțiile cu suport compact îl ignoră pe eps; implicit: toată axa reală
+        return (-inf, inf)
+
+    def breakpoints(self):
+        # Punctele (x, grad) pentru funcțiile liniare pe porțiuni, altfel None
+        return None
+
+
+# Elemente interpolate odată de PiecewiseLinearMF
+_INTERP_BLOCK = 1 << 13
+
+
+def _prepare_out(x, out):
+    # Alocă vectorul rezultat doar când apelantul nu a furnizat unul
+    if out is None:
+        return np.empty(x.shape, dtype=float)
+    if out.shape != x.shape:
+        raise ValueError("`out` must have the same shape as `x`")
+    if np.may_share_memory(out, x):
+        # Nucleele citesc x după ce au început să scrie în out
+        raise ValueError("`out` must not overlap `x`")
+    return out
+
+
+def _trapezoid_kernel(x, a, b, c, d, out):
+    # min((x - a)/(b - a), (d - x)/(d - c)) limitat la [0, 1], calculat pe loc în `out`.
+    # Minimul a două pante se rescrie ca min(x, ...) pentru a evita un vector temporar:
+    # min(ku*(x - a), kv*(d - x)) = ku * (min(x, a + kv/ku*(d - x)) - a)
+    with np.errstate(invalid="ignore", over="ignore"):
+        if b > a and d > c:
+            np.subtract(d, x, out=out)
+            out *= (b - a) / (d - c)
+            out += a
+            np.minimum(out, x, out=out)
+            out -= a
+            out *= 1 / (b - a)
+        elif d > c:
+            # Latura stângă verticală (a == b): panta ascendentă devine +/-inf
+            np.subtract(x, a, out=out)
+            out *= -np.inf
+            out += d
+            np.maximum(out, x, out=out)
+            np.subtract(d, out, out=out)
+            out *= 1 / (d - c)
+        elif b > a:
+            # Latura dreaptă verticală (c == d)
+            np.subtract(d, x, out=out)
+            out *= np.inf
+            out += a
+            np.minimum(out, x, out=out)
+            out -= a
+            out *= 1 / (b - a)
+        else:
+            # Dreptunghi: 1 strict în interiorul (a, d)
+            np.subtract(x, (a + d) / 2, out=out)
+            np.abs(out, out=out)
+            np.less(out, (d - a) / 2, out=out, casting="unsafe")
+        np.minimum(out, 1, out=out)
+        # fmax transformă și NaN-urile (0 * inf pe muchii) în 0, ca în evaluate
+        np.fmax(out, 0, out=out)
+    return out
+
+
+def _smooth_step(x, a, b, out):
+    # Curba S pătratică standard între a și b (0 până la a, 1 după b), pe loc în `out`.
+    if b <= a:
+        np.greater_equal(x, a, out=out, casting="unsafe")
+        return out
+    np.subtract(x, a, out=out)
+    out *= 1 / (b - a)
+    np.clip(out, 0, 1, out=out)
+    return _smooth_curve(out)
+
+
+def _smooth_curve(out):
+    # 2t² până la 0.5, 1 - 2(1 - t)² după, pentru t din [0, 1] aflat în `out`, pe loc.
+    # Ca 0.5 + 2s(1 - |s|) cu s = t - 0.5: partea impară cere semnul lui s după ce
+    # out a devenit |s|, deci singurul auxiliar e o mască booleană (1 octet pe element)
+    out -= 0.5
+    negative = np.signbit(out)
+    np.abs(out, out=out)
+    # 2|s|(1 - |s|) = 0.5 - 2(|s| - 0.5)²
+    out -= 0.5
+    np.square(out, out=out)
+    out *= -2
+    out += 0.5
+    np.negative(out, out=out, where=negative)
+    out += 0.5
+    return out
+
+
+def _smooth_step_scalar(x, a, b):
+    if x <= a: return 0.0 if b > a else float(x >= a)
+    if x >= b: return 1.0
+    t = (x - a) / (b - a)
+    return 2 * t * t if t <= 0.5 else 1 - 2 * (1 - t) ** 2
+
 # Funcția de apartenență Triunghiulară (definită de punctele a, b, c)
 class TriangularMF(MembershipFunction):
+    __slots__ = ("a", "b", "c")
+
     def __init__(self, a, b, c):
         self.a, self.b, self.c = a, b, c
 
@@ -18,8 +136,20 @@ class TriangularMF(MembershipFunction):
         elif self.b <= x < self.c: return (self.c - x)/(self.c - self.b)
         return 0
 
+    def evaluate_array(self, x, out=None):
+        x = np.asarray(x, dtype=float)
+        return _trapezoid_kernel(x, self.a, self.b, self.b, self.c, _prepare_out(x, out))
+
+    def support(self, eps=1e-6):
+        return (self.a, self.c)
+
+    def breakpoints(self):
+        return [(self.a, 0.0), (self.b, 1.0), (self.c, 0.0)]
+
 # Funcția de apartenență Trapezoidală (definită de a, b, c, d)
 class TrapezoidalMF(MembershipFunction):
+    __slots__ = ("a", "b", "c", "d")
+
     def __init__(self, a, b, c, d):
         self.a, self.b, self.c, self.d = a, b, c, d
 
@@ -34,12 +164,193 @@ class TrapezoidalMF(MembershipFunction):
         elif self.c < x < self.d: return (self.d - x)/(self.d - self.c)
         return 0
 
+    def evaluate_array(self, x, out=None):
+        x = np.asarray(x, dtype=float)
+        return _trapezoid_kernel(x, self.a, self.b, self.c, self.d, _prepare_out(x, out))
+
+    def support(self, eps=1e-6):
+        return (self.a, self.d)
+
+    def breakpoints(self):
+        return [(self.a, 0.0), (self.b, 1.0), (self.c, 1.0), (self.d, 0.0)]
+
 # Funcția de apartenență Gaussiană (Clopotul lui Gauss)
 class GaussianMF(MembershipFunction):
+    __slots__ = ("mean", "sigma")
+
     def __init__(self, mean, sigma):
         self.mean, self.sigma = mean, sigma # media (centrul) și deviația standard
 
     def evaluate(self, x):
-        e = 2.718281828459045 # Constanta Euler
         # Formula matematică: e ^ (-0.5 * ((x - medie) / sigma)^2)
-        return e ** (-0.5 * ((x - self.mean) / self.sigma) ** 2)
\ No newline at end of file
+        return exp(-0.5 * ((x - self.mean) / self.sigma) ** 2)
+
+    def evaluate_array(self, x, out=None):
+        x = np.asarray(x, dtype=float)
+        out = _prepare_out(x, out)
+        np.subtract(x, self.mean, out=out)
+        out *= 1 / self.sigma
+        np.square(out, out=out)
+        out *= -0.5
+        return np.exp(out, out=out)
+
+    def support(self, eps=1e-6):
+        # Clopotul nu atinge niciodată 0: tăiem unde scade sub eps
+        half = abs(self.sigma) * sqrt(-2 * log(eps))
+        return (self.mean - half, self.mean + half)
+
+# Funcția clopot generalizată: 1 / (1 + |(x - c) / a| ^ (2b))
+class GeneralizedBellMF(MembershipFunction):
+    __slots__ = ("a", "b", "c")
+
+    def __init__(self, a, b, c):
+        self.a, self.b, self.c = a, b, c # lățimea, panta și centrul
+
+    def evaluate(self, x):
+        return 1 / (1 + abs((x - self.c) / self.a) ** (2 * self.b))
+
+    def evaluate_array(self, x, out=None):
+        x = np.asarray(x, dtype=float)
+        out = _prepare_out(x, out)
+        np.subtract(x, self.c, out=out)
+        out *= 1 / self.a
+        np.abs(out, out=out)
+        with np.errstate(over="ignore"):
+            np.power(out, 2 * self.b, out=out)
+        out += 1
+        return np.reciprocal(out, out=out)
+
+    def support(self, eps=1e-6):
+        half = abs(self.a) * (1 / eps - 1) ** (1 / (2 * self.b))
+        return (self.c - half, self.c + half)
+
+# Funcția sigmoidă: 1 / (1 + e ^ (-a * (x - c)))
+class SigmoidMF(MembershipFunction):
+    __slots__ = ("a", "c")
+
+    def __init__(self, a, c):
+        self.a, self.c = a, c # panta (semnul dă direcția) și punctul de inflexiune
+
+    def evaluate(self, x):
+        z = -self.a * (x - self.c)
+        # Evităm depășirea lui exp pentru argumente foarte mari
+        return 0.0 if z > 700 else 1 / (1 + exp(z))
+
+    def evaluate_array(self, x, out=None):
+        x = np.asarray(x, dtype=float)
+        out = _prepare_out(x, out)
+        np.subtract(x, self.c, out=out)
+        out *= -self.a
+        with np.errstate(over="ignore"):
+            np.exp(out, out=out)
+        out += 1
+        return np.reciprocal(out, out=out)
+
+    def support(self, eps=1e-6):
+        if self.a == 0: return (-inf, inf)
+        edge = self.c - log(1 / eps - 1) / self.a
+        return (edge, inf) if self.a > 0 else (-inf, edge)
+
+# Funcția în formă de S: crește pătratic de la 0 (în a) la 1 (în b)
+class SShapedMF(MembershipFunction):
+    __slots__ = ("a", "b")
+
+    def __init__(self, a, b):
+        self.a, self.b = a, b
+
+    def evaluate(self, x):
+        return _smooth_step_scalar(x, self.a, self.b)
+
+    def evaluate_array(self, x, out=None):
+        x = np.asarray(x, dtype=float)
+        return _smooth_step(x, self.a, self.b, _prepare_out(x, out))
+
+    def support(self, eps=1e-6):
+        return (self.a, inf)
+
+# Funcția în formă de Z: oglinda lui S, scade de la 1 (în a) la 0 (în b)
+class ZShapedMF(MembershipFunction):
+    __slots__ = ("a", "b")
+
+    def __init__(self, a, b):
+        self.a, self.b = a, b
+
+    def evaluate(self, x):
+        return 1 - _smooth_step_scalar(x, self.a, self.b)
+
+    def evaluate_array(self, x, out=None):
+        x = np.asarray(x, dtype=float)
+        out = _smooth_step(x, self.a, self.b, _prepare_out(x, out))
+        return np.subtract(1, out, out=out)
+
+    def support(self, eps=1e-6):
+        return (-inf, self.b)
+
+# Funcția în formă de Pi: S între a și b, platou 1 între b și c, Z între c și d
+class PiShapedMF(MembershipFunction):
+    __slots__ = ("a", "b", "c", "d")
+
+    def __init__(self, a, b, c, d):
+        self.a, self.b, self.c, self.d = a, b, c, d
+
+    def evaluate(self, x):
+        return _smooth_step_scalar(x, self.a, self.b) * (1 - _smooth_step_scalar(x, self.c, self.d))
+
+    def evaluate_array(self, x, out=None):
+        x = np.asarray(x, dtype=float)
+        out = _prepare_out(x, out)
+        if self.b <= self.c and self.a < self.b and self.c < self.d:
+            # Cu platoul între b și c, S(x) * (1 - S'(x)) = min(S(x), Z(x)), iar curba
+            # fiind crescătoare, min(curba(t1), curba(t2)) = curba(min(t1, t2)): curba
+            # aplicată trapezului (a, b, c, d), fără al doilea vector
+            _trapezoid_kernel(x, self.a, self.b, self.c, self.d, out)
+            return _smooth_curve(out)
+        _smooth_step(x, self.a, self.b, out)
+        falling = _smooth_step(x, self.c, self.d, np.empty_like(out))
+        np.subtract(1, falling, out=falling)
+        return np.multiply(out, falling, out=out)
+
+    def support(self, eps=1e-6):
+        return (self.a, self.d)
+
+# Funcția liniară pe porțiuni, definită printr-o listă de puncte (x, grad)
+class PiecewiseLinearMF(MembershipFunction):
+    __slots__ = ("xs", "ys")
+
+    def __init__(self, points):
+        points = sorted(points)
+        if len(points) < 2:
+            raise ValueError("PiecewiseLinearMF needs at least two points")
+        self.xs = [float(p[0]) for p in points]
+        self.ys = [float(p[1]) for p in points]
+
+    def evaluate(self, x):
+        # În afara punctelor se păstrează valoarea de la capăt (ca np.interp)
+        if x <= self.xs[0]: return self.ys[0]
+        if x >= self.xs[-1]: return self.ys[-1]
+        i = bisect_right(self.xs, x)
+        x0, x1, y0, y1 = self.xs[i - 1], self.xs[i], self.ys[i - 1], self.ys[i]
+        return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+    def evaluate_array(self, x, out=None):
+        x = np.asarray(x, dtype=float)
+        out = _prepare_out(x, out)
+        if not out.flags.c_contiguous:
+            out[...] = np.interp(x, self.xs, self.ys)
+            return out
+        # np.interp nu are parametru `out`: pe blocuri, temporarul rămâne mic (în cache)
+        flat_x, flat_out = x.reshape(-1), out.reshape(-1)
+        for start in range(0, len(flat_x), _INTERP_BLOCK):
+            stop = start + _INTERP_BLOCK
+            flat_out[start:stop] = np.interp(flat_x[start:stop], self.xs, self.ys)
+        return out
+
+    def support(self, eps=1e-6):
+        positive = [i for i, y in enumerate(self.ys) if y > 0]
+        if not positive: return (self.xs[0], self.xs[0])
+        lo = -inf if positive[0] == 0 else self.xs[positive[0] - 1]
+        hi = inf if positive[-1] == len(self.ys) - 1 else self.xs[positive[-1] + 1]
+        return (lo, hi)
+
+    def breakpoints(self):
+        return list(zip(self.xs, self.ys))
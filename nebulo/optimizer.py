@@ -0,0 +1,339 @@
+"""Smaller rule bases computing the same outputs
+
+FuzzySystem.optimize runs these passes over system.rules, in order:
+  unreachable -- rules that can never fire: weight 0, or conditions on
+                 one variable whose terms are never positive together
+  merged      -- rules with identical antecedents. Mamdani keeps the
+                 highest weight per consequent (max-aggregation); Sugeno
+                 ones become a single rule with the summed weight and the
+                 weight-averaged consequent, so the weighted mean is unchanged
+  dominated   -- Mamdani rules whose consequent is also concluded by a rule
+                 with a subset of their conditions and at least their
+                 weight; under any t-norm that rule fires at least as strongly
+  pruned      -- with a tolerance only: rules whose removal keeps every
+                 output on validation samples within tolerance of the
+                 original, tried weakest first
+The first three passes leave outputs mathematically unchanged, which the
+identities above prove. They are not bit for bit identical in general:
+a merged Sugeno rule regroups the weighted sums, and product-like
+t-norms round differently once conditions or weights change, so outputs
+may move by float rounding (relative 1e-12 in the tests). Under min,
+Mamdani outputs are identical.
+"""
+from itertools import combinations
+from math import inf
+
+import numpy as np
+
+from .compiled import _as_columns, _iter_rows
+from .expressions import Expression
+from .rules import FuzzyRule, LinearOutput
+
+DEFAULT_VALIDATION_SAMPLES = 4096
+
+
+class OptimizationReport:
+    """What FuzzySystem.optimize removed
+
+    rules_before, rules_after: rule counts
+    unreachable, merged, dominated, pruned: rules removed by each pass
+    max_error: largest output change on the validation samples, None
+               without a tolerance
+    estimated_speedup: cost of a batch evaluation before / after, counting
+                       the fuzzified terms, the conditions and the rules
+    """
+
+    def __init__(self, rules_before, removed, cost_before, cost_after, max_error):
+        self.rules_before = rules_before
+        self.unreachable = removed["unreachable"]
+        self.merged = removed["merged"]
+        self.dominated = removed["dominated"]
+        self.pruned = removed["pruned"]
+        self.rules_after = rules_before - sum(removed.values())
+        self.max_error = max_error
+        self.estimated_speedup = cost_before / cost_after if cost_after else inf
+
+    @property
+    def removed(self):
+        return self.rules_before - self.rules_after
+
+    def as_dict(self):
+        return {"rules_before": self.rules_before, "rules_after": self.rules_after,
+                "unreachable": self.unreachable, "merged": self.merged, "dominated": self.dominated,
+                "pruned": self.pruned, "max_error": self.max_error,
+                "estimated_speedup": self.estimated_speedup}
+
+    def __repr__(self):
+        return (f"OptimizationReport({self.rules_before} -> {self.rules_after} rules, "
+                f"estimated speedup {self.estimated_speedup:.2f}x)")
+
+
+def optimize_rules(system, tolerance=None, validation=None, columns=None,
+                   n_samples=DEFAULT_VALIDATION_SAMPLES, seed=None):
+    """
+    Replace system.rules by an equivalent, smaller rule base (see the
+    module docstring for the passes) and return an OptimizationReport.
+
+    tolerance: also prune rules while every output on the validation
+               samples stays within this absolute distance of the original
+    validation: inputs as for evaluate_batch; by default n_samples points
+                drawn uniformly from the universes of the used variables
+    """
+    rules = list(system.rules)
+    before = len(rules)
+    cost_before = _cost(system.rules)
+    if tolerance is not None:
+        samples = _validation_samples(system, validation, columns, n_samples, seed)
+        reference = system.evaluate_batch(samples)
+
+    removed = dict.fromkeys(["unreachable", "merged", "dominated", "pruned"], 0)
+    supports = {}
+    kept = [rule for rule in rules if _reachable(rule, system.variables, supports)]
+    removed["unreachable"] = len(rules) - len(kept)
+    merged = _merge_mamdani(kept) if system.mode == "mamdani" else _merge_sugeno(kept)
+    removed["merged"] = len(kept) - len(merged)
+    kept = merged
+    if system.mode == "mamdani":
+        kept = _drop_dominated(merged)
+        removed["dominated"] = len(merged) - len(kept)
+    system.rules = kept
+
+    max_error = None
+    if tolerance is not None:
+        drop = _prunable(system, samples, reference, tolerance)
+        if drop:
+            system.rules = [rule for i, rule in enumerate(kept) if i not in drop]
+        removed["pruned"] = len(drop)
+        max_error = float(np.max(np.abs(system.evaluate_batch(samples) - reference), initial=0.0))
+    return OptimizationReport(before, removed, cost_before, _cost(system.rules), max_error)
+
+
+def _cost(rules):
+    """Work per sample of evaluate_batch: distinct terms fuzzified, t-norm operands and rules"""
+    ids = rules.columns()[0]
+    return len(set(ids)) + len(ids) + len(rules)
+
+
+def _validation_samples(system, validation, columns, n_samples, seed):
+    if validation is not None:
+        return _as_columns(validation, columns)
+    compiled = system.compile()
+    names = dict.fromkeys(compiled.used_variables + getattr(compiled, "linear_variables", []))
+    rng = np.random.default_rng(seed)
+    return {name: rng.uniform(*system.variables[name].universe, n_samples) for name in names}
+
+
+def _exact_support(mf):
+    """(lo, hi) outside of which mf is 0; the whole axis when it only gets close to 0"""
+    support = mf.support(1e-12)
+    return support if mf.support(1e-3) == support else (-inf, inf)
+
+
+def _reachable(rule, variables, supports):
+    """False when `rule` has weight 0 or two of its terms on one variable are never positive together"""
+    if rule.weight == 0:
+        return False
+    if isinstance(rule.conditions, Expression):
+        return True
+    by_variable = {}
+    for var, term in rule.conditions:
+        by_variable.setdefault(var, set()).add(term)
+    for var, terms in by_variable.items():
+        mfs = [variables[var].terms[term] for term in terms]
+        bounds = [supports.setdefault((var, term), _exact_support(mf)) for term, mf in zip(terms, mfs)]
+        lo = max(lo for lo, _ in bounds)
+        hi = min(hi for _, hi in bounds)
+        # Supports are open or closed intervals: a single common point needs checking
+        if hi < lo or (hi == lo and not all(mf.evaluate(lo) > 0 for mf in mfs)):
+            return False
+    return True
+
+
+def _antecedent_key(rule):
+    if isinstance(rule.conditions, Expression):
+        return rule.conditions
+    return tuple(sorted(rule.conditions))
+
+
+def _merge_mamdani(rules):
+    """Max-aggregation: of rules with the same antecedent and consequent only the heaviest counts"""
+    position = {}
+    merged = []
+    for rule in rules:
+        key = (_antecedent_key(rule), rule.output)
+        i = position.setdefault(key, len(merged))
+        if i == len(merged):
+            merged.append(rule)
+        elif rule.weight > merged[i].weight:
+            merged[i] = rule
+    return merged
+
+
+def _merge_sugeno(rules):
+    """
+    Rules with the same antecedent A and weights w_i add w_i * A * z_i to
+    the numerator and w_i * A to the denominator: one rule of weight
+    sum(w_i) and consequent sum(w_i * z_i) / sum(w_i) adds the same
+    """
+    groups = {}
+    for rule in rules:
+        name, value = rule.output if isinstance(rule.output, tuple) else (None, rule.output)
+        # Constants and LinearOutput combine; other callables only with themselves
+        kind = id(value) if callable(value) and not isinstance(value, LinearOutput) else None
+        groups.setdefault((_antecedent_key(rule), name, kind, rule.weight > 0), []).append(rule)
+    merged = []
+    for (_, name, kind, _), members in groups.items():
+        if len(members) == 1:
+            merged.append(members[0])
+            continue
+        weight = sum(rule.weight for rule in members)
+        if kind is not None:
+            value = members[0].output[1] if name is not None else members[0].output
+        else:
+            value = _weighted_consequent(members, weight, name is not None)
+        merged.append(FuzzyRule(members[0].conditions, value if name is None else (name, value), weight))
+    return merged
+
+
+def _weighted_consequent(rules, weight, named):
+    bias = 0.0
+    coefficients = {}
+    for rule in rules:
+        value = rule.output[1] if named else rule.output
+        if isinstance(value, LinearOutput):
+            bias += rule.weight * value.bias
+            for var, c in value.coefficients.items():
+                coefficients[var] = coefficients.get(var, 0.0) + rule.weight * c
+        else:
+            bias += rule.weight * float(value)
+    if not coefficients:
+        return bias / weight
+    return LinearOutput({var: c / weight for var, c in coefficients.items()}, bias / weight)
+
+
+def _drop_dominated(rules):
+    """Mamdani rules fired no more strongly than a rule with a subset of their conditions and the same consequent"""
+    heaviest = {}
+    lengths = {}
+    for rule in rules:
+        if not isinstance(rule.conditions, Expression):
+            key = (rule.output, tuple(sorted(rule.conditions)))
+            heaviest[key] = max(heaviest.get(key, -inf), rule.weight)
+            lengths.setdefault(rule.output, set()).add(len(rule.conditions))
+    kept = []
+    for rule in rules:
+        if not isinstance(rule.conditions, Expression):
+            conditions = tuple(sorted(rule.conditions))
+            shorter = [m for m in lengths[rule.output] if m < len(conditions)]
+            # A t-norm of more degrees in [0, 1] is never larger: T(x, y) <= x
+            if any(heaviest.get((rule.output, subset), -inf) >= rule.weight
+                   for m in shorter for subset in set(combinations(conditions, m))):
+                continue
+        kept.append(rule)
+    return kept
+
+
+def _prunable(system, samples, reference, tolerance):
+    """
+    Indices of rules that can be removed together while outputs on
+    `samples` stay within `tolerance` of `reference`; greedy, weakest
+    rule first. Only the samples a rule fires on are re-checked. Rules
+    firing on none of them are kept: the samples say nothing about them.
+    """
+    compiled = system.compile()
+    n_rules = len(system.rules)
+    pairs, aggregated = _firing_pairs(compiled, samples, len(reference), n_rules)
+    rules, cols, values = pairs
+    # The (sample, strength) pairs of every rule, weakest rule first
+    by_rule = np.argsort(rules, kind="stable")
+    bounds = np.searchsorted(rules[by_rule], np.arange(n_rules + 1))
+    strongest = np.zeros(n_rules)
+    np.maximum.at(strongest, rules, np.abs(values))
+    candidates = [r for r in np.argsort(strongest, kind="stable").tolist() if strongest[r] > 0]
+    drop = set()
+    if system.mode == "sugeno":
+        numerator, denominator = aggregated
+        firing = np.bincount(cols, minlength=len(reference))
+        callables = dict(compiled.callables)
+        for r in candidates:
+            pairs_of = by_rule[bounds[r]:bounds[r + 1]]
+            at, s = cols[pairs_of], values[pairs_of]
+            num = numerator[at] - s * _rule_output(compiled, r, callables, samples, at)
+            den = denominator[at] - s
+            out = np.divide(num, den, out=np.zeros(len(at)), where=(firing[at] > 1) & (den != 0))
+            if np.all(np.abs(out - reference[at]) <= tolerance):
+                numerator[at], denominator[at] = num, den
+                firing[at] -= 1
+                drop.add(r)
+        return drop
+
+    degrees = aggregated
+    if degrees is None:
+        return drop
+    # The same pairs grouped by sample, to find the next strongest rule
+    by_col = np.argsort(cols, kind="stable")
+    col_bounds = np.searchsorted(cols[by_col], np.arange(len(reference) + 1))
+    labels = compiled.consequents
+    alive = np.ones(n_rules, dtype=bool)
+    for r in candidates:
+        label = labels[r]
+        pairs_of = by_rule[bounds[r]:bounds[r + 1]]
+        top = values[pairs_of] >= degrees[label, cols[pairs_of]]
+        at = cols[pairs_of][top]
+        if len(at):
+            lengths = col_bounds[at + 1] - col_bounds[at]
+            starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+            index = by_col[np.repeat(col_bounds[at] - starts, lengths) + np.arange(lengths.sum())]
+            others = rules[index]
+            rivals = np.where((labels[others] == label) & alive[others] & (others != r), values[index], 0.0)
+            lowered = np.maximum.reduceat(rivals, starts)
+            changed = lowered < degrees[label, at]
+            at, lowered = at[changed], lowered[changed]
+        if len(at):
+            trial = degrees[:, at]
+            trial[label] = lowered
+            if not np.all(np.abs(compiled.defuzzifier.defuzzify(trial) - reference[at]) <= tolerance):
+                continue
+            degrees[label, at] = lowered
+        alive[r] = False
+        drop.add(r)
+    return drop
+
+
+def _firing_pairs(compiled, samples, n, n_rules):
+    """
+    (rules, samples, strengths) of every pair with a nonzero strength, and
+    the result of compiled.aggregate over all samples; strengths are
+    computed in chunks of about 2**22, so memory follows the firing pairs
+    """
+    chunk = max(1, (1 << 22) // max(n_rules, 1))
+    rules, cols, values, aggregated = [], [], [], []
+    for start in range(0, n, chunk):
+        part = {var: values_[start:start + chunk] for var, values_ in samples.items()}
+        size = min(chunk, n - start)
+        strengths = compiled.activations(compiled.fuzzify(part, size))
+        r, c = np.nonzero(strengths)
+        rules.append(r)
+        cols.append(c + start)
+        values.append(strengths[r, c])
+        aggregated.append(compiled.aggregate(strengths, part))
+    pairs = tuple(np.concatenate(a) if a else np.zeros(0, dtype=dtype)
+                  for a, dtype in ((rules, np.intp), (cols, np.intp), (values, float)))
+    if compiled.mode == "sugeno":
+        aggregated = tuple(np.concatenate(parts) for parts in zip(*aggregated)) if aggregated else (np.zeros(0),) * 2
+    else:
+        aggregated = None if not aggregated or aggregated[0] is None else np.concatenate(aggregated, axis=1)
+    return pairs, aggregated
+
+
+def _rule_output(compiled, r, callables, samples, at):
+    """Sugeno consequent of rule r at the samples `at`"""
+    if r in callables:
+        rows = _iter_rows({var: values[at] for var, values in samples.items()}, len(at))
+        return np.array([callables[r].eval_output(row) for row in rows], dtype=float)
+    output = np.full(len(at), compiled.consequents[r])
+    if compiled.linear is not None:
+        for var, c in zip(compiled.linear_variables, compiled.linear[r].tolist()):
+            if c:
+                output += c * samples[var][at]
+    return output
@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from .compiled import _as_columns, _signature
+
+BACKENDS = ("process", "thread")
+
+# Smallest number of rows handed to a worker at once
+MIN_CHUNK_SIZE = 4096
+
+
+class ParallelEvaluator:
+    """Evaluates batches of a FuzzySystem on several cores
+
+    backend="process": a pool of worker processes, each receiving the
+    compiled system once when it starts. Inputs and outputs live in
+    `multiprocessing.shared_memory` blocks; a task only names a row range,
+    so no array is pickled per chunk. Callable Sugeno consequents run in
+    parallel too, but must be picklable unless the start method is "fork".
+
+    backend="thread": a thread pool sharing the compiled system. NumPy
+    releases the GIL inside its kernels, so this avoids process start-up
+    and copies, but callable consequents are serialized by the GIL.
+
+    Results are written at their row offsets, so they keep input order.
+    The workers are restarted when the system changes; call `close` (or
+    use the evaluator as a context manager) to stop them.
+    """
+
+    def __init__(self, system, workers=None, backend="process", start_method=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+        self.system = system
+        self.workers = workers or os.cpu_count() or 1
+        self.backend = backend
+        self.start_method = start_method
+        self._pool = None
+        self._signature = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            if self.backend == "process":
+                self._pool.close()
+                self._pool.join()
+            else:
+                self._pool.shutdown()
+            self._pool = None
+
+    def _start(self):
+        compiled = self.system.compile()
+        if self._pool is not None and self._signature == _signature(self.system):
+            return compiled
+        self.close()
+        if self.backend == "process":
+            context = multiprocessing.get_context(self.start_method)
+            # Workers must share the parent's resource tracker: one of their
+            # own would report the parent's (already unlinked) blocks as leaked
+            resource_tracker.ensure_running()
+            self._pool = context.Pool(self.workers, initializer=_init_worker, initargs=(compiled,))
+        else:
+            self._pool = ThreadPoolExecutor(self.workers)
+        self._signature = _signature(self.system)
+        return compiled
+
+    def evaluate_batch(self, inputs, columns=None, chunk_size=None):
+        """Same inputs and result as FuzzySystem.evaluate_batch"""
+        inputs = _as_columns(inputs, columns)
+        compiled = self._start()
+        names = compiled.input_names(inputs)
+        n = len(next(iter(inputs.values()))) if inputs else 0
+        if chunk_size is None:
+            chunk_size = max(MIN_CHUNK_SIZE, -(-n // (4 * self.workers)))
+        ranges = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+        if self.backend == "thread":
+            result = np.empty(n)
+
+            def run(start, stop):
+                chunk = {name: inputs[name][start:stop] for name in names if name in inputs}
+                result[start:stop] = compiled.evaluate_batch(chunk)
+
+            for future in [self._pool.submit(run, start, stop) for start, stop in ranges]:
+                future.result()
+            return result
+
+        if n == 0:
+            return np.zeros(0)
+        source = shared_memory.SharedMemory(create=True, size=len(names) * n * 8 or 8)
+        target = shared_memory.SharedMemory(create=True, size=n * 8)
+        try:
+            matrix = np.ndarray((len(names), n), buffer=source.buf)
+            for row, name in zip(matrix, names):
+                if name not in inputs:
+                    raise KeyError(name)
+                row[...] = inputs[name]
+            del matrix
+            tasks = [(source.name, target.name, names, n, start, stop) for start, stop in ranges]
+            self._pool.starmap(_evaluate_chunk, tasks, chunksize=1)
+            return np.ndarray(n, buffer=target.buf).copy()
+        finally:
+            for block in (source, target):
+                block.close()
+                block.unlink()
+
+
+def evaluate_parallel(system, inputs, workers=None, backend="process", columns=None, chunk_size=None):
+    """One-off parallel evaluation; keep a ParallelEvaluator to reuse the workers"""
+    with ParallelEvaluator(system, workers, backend) as evaluator:
+        return evaluator.evaluate_batch(inputs, columns, chunk_size)
+
+
+# Per-process state of the pool workers
+_worker = {}
+
+
+def _init_worker(compiled):
+    _worker["compiled"] = compiled
+    _worker["blocks"] = (None, None)
+
+
+def _attach(source_name, target_name):
+    """Shared blocks of the current batch, reopened only when the batch changes"""
+    names, blocks = _worker.get("names"), _worker["blocks"]
+    if names != (source_name, target_name):
+        for block in blocks:
+            if block is not None:
+                block.close()
+        blocks = (shared_memory.SharedMemory(name=source_name),
+                  shared_memory.SharedMemory(name=target_name))
+        _worker["names"], _worker["blocks"] = (source_name, target_name), blocks
+    return blocks
+
+
+def _evaluate_chunk(source_name, target_name, names, n, start, stop):
+    source, target = _attach(source_name, target_name)
+    matrix = np.ndarray((len(names), n), buffer=source.buf)
+    chunk = {name: matrix[i, start:stop] for i, name in enumerate(names)}
+    np.ndarray(n, buffer=target.buf)[start:stop] = _worker["compiled"].evaluate_batch(chunk)
@@ -0,0 +1,197 @@
+import numpy as np
+
+from .compiled import _as_columns, _fuzzify_rows, _signature
+from .membership import MembershipFunction
+
+
+class FuzzyPipeline:
+    """Systems chained into a graph: outputs of one feed inputs of the next
+
+    Every stage publishes its outputs under a name; a stage whose input
+    variable has a published name reads that output instead of an input
+    of the pipeline. Stages run in dependency order, whatever the order
+    they were added in, and multi-output systems run one stage per output
+    (see FuzzySystem.split_outputs).
+
+    Membership degrees are shared across stages: a term with the same
+    variable name and the same membership function parameters is computed
+    once per evaluation, however many stages test it. Stage hooks, caches
+    and support indexes are not used.
+    """
+
+    def __init__(self):
+        self._stages = []
+        self._plan = None
+
+    def add(self, system, name=None):
+        """
+        Add a stage. name: published name of a single-output system's
+        output, or a {output: published name} dict; by default outputs are
+        published under their own names (unnamed Sugeno outputs need one).
+        """
+        self._stages.append((system, name))
+        self._plan = None
+
+    @property
+    def outputs(self):
+        """Published names in evaluation order"""
+        return [stage.name for stage in self.plan().stages]
+
+    @property
+    def inputs(self):
+        """Variables no stage publishes, which evaluation needs as inputs"""
+        return list(self.plan().inputs)
+
+    def plan(self):
+        """The _PipelinePlan, rebuilt when a stage's system changed"""
+        signatures = [_signature(system) for system, _ in self._stages]
+        if self._plan is None or self._plan.signatures != signatures:
+            self._plan = _PipelinePlan(self._stages, signatures)
+        return self._plan
+
+    def evaluate(self, inputs: dict):
+        """{published name: crisp output} of every stage"""
+        plan = self.plan()
+        values = dict(inputs)
+        degrees = [None] * len(plan.entries)
+        for stage in plan.stages:
+            fuzzified = {}
+            for var, term, row in stage.terms:
+                degree = degrees[row]
+                if degree is None:
+                    degree = degrees[row] = plan.entries[row][1].evaluate(values[var])
+                fuzzified.setdefault(var, {})[term] = degree
+            values[stage.name] = stage.system._infer(values, fuzzified, range(stage.n_rules))
+        return {stage.name: values[stage.name] for stage in plan.stages}
+
+    def evaluate_batch(self, inputs, columns=None):
+        """
+        Vectorized counterpart of `evaluate`; inputs as for
+        FuzzySystem.evaluate_batch. Returns {published name: 1-D array}.
+        """
+        plan = self.plan()
+        values = _as_columns(inputs, columns)
+        n = len(next(iter(values.values()))) if values else 0
+        # One row per distinct term of the whole graph, plus the padding row of 1,
+        # in the widest dtype of the stages
+        dtype = np.result_type(np.float16, *[stage.compiled.dtype for stage in plan.stages])
+        shared = np.empty((len(plan.entries), n), dtype=dtype)
+        shared[plan.ones] = 1
+        done = np.zeros(len(plan.entries), dtype=bool)
+        done[plan.ones] = True
+        for stage in plan.stages:
+            rows = [row for row in stage.rows_to_fuzzify if not done[row]]
+            for row in rows:
+                if plan.entries[row][0] not in values:
+                    raise KeyError(plan.entries[row][0])
+            _fuzzify_rows(shared, rows, plan.entries, values)
+            done[rows] = True
+            compiled = stage.compiled
+            # Stages laid out like the first one read the shared rows in place
+            fuzzified = shared[:len(stage.rows)] if stage.in_place else shared[stage.rows]
+            strengths = compiled.activations(fuzzified)
+            values[stage.name] = compiled.defuzzify_batch(compiled.aggregate(strengths, values), n)
+        return {stage.name: values[stage.name] for stage in plan.stages}
+
+
+class _PipelineStage:
+    __slots__ = ("system", "name", "compiled", "n_rules", "needs", "rows", "in_place", "rows_to_fuzzify", "terms")
+
+    def __init__(self, system, name):
+        self.system = system
+        self.name = name
+        self.compiled = system.compile()
+        self.n_rules = len(system.rules)
+        linear = self.compiled.linear_variables if system.mode == "sugeno" else []
+        self.needs = set(self.compiled.used_variables) | set(linear)
+
+
+class _PipelinePlan:
+    """Evaluation order and shared fuzzification rows of a FuzzyPipeline
+
+    entries: (variable name, membership function) of every row of the
+             shared degree tensor, None for the padding row `ones`
+    stages: _PipelineStage list in dependency order; stage.rows maps the
+            rows of the stage's own fuzzification tensor to shared rows
+    """
+
+    def __init__(self, stages, signatures):
+        self.signatures = signatures
+        units = []
+        for system, name in stages:
+            outputs = system.split_outputs()
+            names = name if isinstance(name, dict) else {}
+            if name is not None and not isinstance(name, dict):
+                if len(outputs) > 1:
+                    raise ValueError(f"system has several outputs {list(outputs)}; name them with a dict")
+                names = {next(iter(outputs)): name}
+            for output, sub in outputs.items():
+                if output is None and output not in names:
+                    raise ValueError("name the output of a Sugeno system with add(system, name)")
+                units.append(_PipelineStage(sub, names.get(output, output)))
+
+        producers = {}
+        for k, unit in enumerate(units):
+            if unit.name in producers:
+                raise ValueError(f"several stages publish {unit.name!r}")
+            producers[unit.name] = k
+        self.stages = _dependency_order(units, producers)
+        self.inputs = dict.fromkeys(var for unit in self.stages for var in sorted(unit.needs) if var not in producers)
+        self._lay_out()
+
+    def _lay_out(self):
+        self.entries = []
+        index = {}
+
+        def row(var, mf):
+            key = (var, _mf_key(mf))
+            if key not in index:
+                index[key] = len(self.entries)
+                self.entries.append((var, mf))
+            return index[key]
+
+        # The first stage gets every slot in its own order, followed by the
+        # padding row, so it and stages over the same variables need no gather
+        first = self.stages[0].compiled if self.stages else None
+        for var, mf in first.slot_terms if first else ():
+            row(var, mf)
+        self.ones = len(self.entries)
+        self.entries.append(None)
+        for stage in self.stages:
+            compiled = stage.compiled
+            used = set(compiled.used_slots.tolist())
+            rows = [row(var, mf) if slot in used else self.ones for slot, (var, mf) in enumerate(compiled.slot_terms)]
+            rows.append(self.ones)
+            stage.rows = np.array(rows, dtype=np.intp)
+            stage.in_place = len(rows) == self.ones + 1 and all(r in (s, self.ones) for s, r in enumerate(rows))
+            stage.rows_to_fuzzify = list(dict.fromkeys(rows[s] for s in sorted(used)))
+            slot_names = {slot: key for key, slot in compiled.slots.items()}
+            stage.terms = [(var, term, rows[s]) for s in sorted(used) for var, term in [slot_names[s]]]
+
+
+def _dependency_order(units, producers):
+    """Stages sorted so every stage runs after those publishing its inputs"""
+    waiting = {k: {producers[var] for var in unit.needs if var in producers} for k, unit in enumerate(units)}
+    order = []
+    while waiting:
+        ready = [k for k, deps in waiting.items() if not deps]
+        if not ready:
+            raise ValueError(f"pipeline stages form a cycle through {[units[k].name for k in waiting]}")
+        for k in ready:
+            order.append(units[k])
+            del waiting[k]
+        for deps in waiting.values():
+            deps.difference_update(ready)
+    return order
+
+
+def _mf_key(mf):
+    """Equal for membership functions of the same type and parameters"""
+    if not isinstance(mf, MembershipFunction) or hasattr(mf, "__dict__"):
+        return id(mf)
+    parameters = []
+    for cls in type(mf).__mro__:
+        for attribute in getattr(cls, "__slots__", ()):
+            value = getattr(mf, attribute)
+            parameters.append(tuple(value) if isinstance(value, list) else value)
+    return type(mf), tuple(parameters)
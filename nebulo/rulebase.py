@@ -0,0 +1,367 @@
+from array import array
+from collections.abc import MutableSequence
+from numbers import Real
+
+import numpy as np
+
+from .expressions import Expression, conjunction
+from .rules import FuzzyRule
+
+
+class RuleBase(MutableSequence):
+    """Rules of a FuzzySystem stored in typed arrays
+
+    Every (variable, term) pair used in a condition is interned once as a
+    small integer "slot" (`slot_names[slot]` gives the pair back), and
+    every distinct non-numeric consequent -- a Mamdani label, an
+    (output, label) pair or a callable -- once in `objects`. A rule then
+    costs a few machine integers and one float:
+
+    _ids     -- int32 slots of all conditions, rule after rule
+    _offsets -- int64 start of each rule in _ids, plus the end
+    _values  -- float64 numeric consequent (Sugeno constants)
+    _codes   -- int32 index into objects, or -1 for a numeric consequent
+    _forms   -- int32 index into objects of the rule's Expression, or -1
+                for a plain conjunction; _ids then holds its leaves
+    _weights -- float64 rule weight
+
+    It behaves as a list of FuzzyRule: indexing builds a FuzzyRule from
+    the arrays, so changing a rule means assigning `rules[i] = rule`.
+    """
+
+    def __init__(self, rules=()):
+        self.slot_names = []
+        self.objects = []
+        self._slots = {}
+        self._object_codes = {}
+        self._ids = array("i")
+        self._offsets = array("q", [0])
+        self._values = array("d")
+        self._codes = array("i")
+        self._forms = array("i")
+        self._weights = array("d")
+        self._version = 0
+        self._plain = (-1, True)
+        self._loader = None
+        self._count = 0
+        self.extend(rules)
+
+    @classmethod
+    def deferred(cls, count, loader):
+        """Rule base of `count` rules whose arrays are filled by loader(rule_base) on first use"""
+        rules = cls()
+        rules._loader = loader
+        rules._count = count
+        return rules
+
+    def _load(self):
+        loader, self._loader = self._loader, None
+        if loader is not None:
+            # Filling in stored rules is not a change to the rule base
+            version = self._version
+            loader(self)
+            self._version = version
+
+    def __getstate__(self):
+        self._load()
+        return self.__dict__
+
+    # -- encoding -------------------------------------------------------
+
+    def slot(self, var, term):
+        """Interned id of a (variable, term) pair"""
+        key = (var, term)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = len(self.slot_names)
+            self.slot_names.append(key)
+        return slot
+
+    def _encode_output(self, output):
+        if isinstance(output, Real) and not callable(output):
+            return float(output), -1
+        return 0.0, self._encode_object(output)
+
+    def _encode_object(self, output):
+        try:
+            code = self._object_codes.get(output)
+        except TypeError:  # unhashable consequents are stored as they are
+            self.objects.append(output)
+            return len(self.objects) - 1
+        if code is None:
+            code = self._object_codes[output] = len(self.objects)
+            self.objects.append(output)
+        return code
+
+    # -- access ---------------------------------------------------------
+
+    def conditions(self, i):
+        """[(var_name, term_name), ...] of rule i"""
+        self._load()
+        names = self.slot_names
+        return [names[s] for s in self._ids[self._offsets[i]:self._offsets[i + 1]]]
+
+    def output(self, i):
+        """Consequent of rule i, as given to FuzzyRule"""
+        self._load()
+        code = self._codes[i]
+        return self._values[i] if code < 0 else self.objects[code]
+
+    def expression(self, i):
+        """Expression antecedent of rule i, None for a plain conjunction"""
+        self._load()
+        form = self._forms[i]
+        return None if form < 0 else self.objects[form]
+
+    def weight(self, i):
+        self._load()
+        return self._weights[i]
+
+    def plain(self):
+        """True when every rule is an unweighted conjunction of (var, term) conditions"""
+        self._load()
+        version, plain = self._plain
+        if version != self._version:
+            plain = all(form < 0 for form in self._forms) and all(w == 1.0 for w in self._weights)
+            self._plain = (self._version, plain)
+        return plain
+
+    def forms_and_weights(self):
+        """NumPy copies of (expression codes, -1 for plain rules; weights)"""
+        self._load()
+        return np.array(self._forms, dtype=np.intp), np.array(self._weights, dtype=float)
+
+    def strength_function(self, degrees, tnorm="min"):
+        """
+        Function of a rule index giving its firing strength
+
+        degrees: membership degree per slot (sequence indexed like
+                 slot_names); None where the variable was not fuzzified,
+                 which raises KeyError for rules that need it
+        """
+        self._load()
+        ids, offsets = self._ids, self._offsets
+        names = self.slot_names
+
+        def conjunction_of(i):
+            slots = [degrees[s] for s in ids[offsets[i]:offsets[i + 1]]]
+            if None in slots:
+                raise KeyError(names[ids[offsets[i] + slots.index(None)]][0])
+            return slots
+
+        if tnorm == "min" and self.plain():
+            def strength(i):
+                slots = [degrees[s] for s in ids[offsets[i]:offsets[i + 1]]]
+                if None in slots:
+                    raise KeyError(names[ids[offsets[i] + slots.index(None)]][0])
+                return min(slots)
+
+            return strength
+
+        forms, weights, objects, slot_of = self._forms, self._weights, self.objects, self._slots
+
+        def lookup(var, term):
+            degree = degrees[slot_of[(var, term)]]
+            if degree is None:
+                raise KeyError(var)
+            return degree
+
+        def strength(i):
+            form = forms[i]
+            if form < 0:
+                value = conjunction(tnorm, conjunction_of(i))
+            else:
+                value = objects[form].degree(lookup, tnorm)
+            return value * weights[i]
+
+        return strength
+
+    def columns(self):
+        """The typed arrays themselves: (_ids, _offsets, _values, _codes); read only"""
+        self._load()
+        return self._ids, self._offsets, self._values, self._codes
+
+    def arrays(self):
+        """NumPy copies of (condition slots, offsets, numeric consequents, object codes)"""
+        self._load()
+        return (np.array(self._ids, dtype=np.intp), np.array(self._offsets, dtype=np.intp),
+                np.array(self._values, dtype=float), np.array(self._codes, dtype=np.intp))
+
+    def padded(self, lookup, padding):
+        """(n_rules, max_conditions) array of lookup[slot] per condition, padded with `padding`"""
+        ids, offsets, _, _ = self.arrays()
+        lengths = np.diff(offsets)
+        width = int(lengths.max()) if len(lengths) else 0
+        result = np.full((len(lengths), width), padding, dtype=np.intp)
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        columns = np.arange(len(ids)) - np.repeat(offsets[:-1], lengths)
+        result[rows, columns] = np.asarray(lookup, dtype=np.intp)[ids] if len(ids) else ()
+        return result
+
+    def __len__(self):
+        return self._count if self._loader is not None else len(self._codes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("rule index out of range")
+        self._load()
+        form = self._forms[i]
+        conditions = self.conditions(i) if form < 0 else self.objects[form]
+        return FuzzyRule(conditions, self.output(i), self._weights[i])
+
+    # -- changes --------------------------------------------------------
+
+    def append(self, rule):
+        if self._loader is not None:
+            self._load()
+        output = rule.output
+        if type(output) is float or type(output) is int:
+            value, code = float(output), -1
+        else:
+            value, code = self._encode_output(output)
+        slots = self._slots
+        ids = self._ids
+        conditions = rule.conditions
+        if isinstance(conditions, Expression):
+            self._forms.append(self._encode_object(conditions))
+            conditions = conditions.leaves()
+        else:
+            self._forms.append(-1)
+        for condition in conditions:
+            slot = slots.get(condition) if type(condition) is tuple else None
+            ids.append(self.slot(*condition) if slot is None else slot)
+        self._offsets.append(len(ids))
+        self._values.append(value)
+        self._codes.append(code)
+        self._weights.append(rule.weight)
+        self._version += 1
+
+    def extend(self, rules):
+        for rule in rules:
+            self.append(rule)
+
+    def add_arrays(self, variables, terms, outputs, term_names=None):
+        """Append len(outputs) rules at once
+
+        variables: names of the k variables the conditions test
+        terms: (n, k) array-like of term names, None or "" skipping the
+               variable in that rule; or of integer positions into
+               term_names[j] (one list of names per variable), -1 skipping
+        outputs: n consequents, numeric or not
+        """
+        self._load()
+        terms = np.asarray(terms)
+        terms = terms.reshape(len(outputs), len(variables))
+        slots = np.empty(terms.shape, dtype=np.int32)
+        for j, var in enumerate(variables):
+            if terms.dtype.kind in "iu":
+                table = np.array([self.slot(var, name) for name in term_names[j]] + [-1], dtype=np.int32)
+                column = terms[:, j]
+                slots[:, j] = table[np.where(column < 0, len(table) - 1, column)]
+                continue
+            column = terms[:, j]
+            if column.dtype == object:
+                column = np.where(np.equal(column, None), "", column).astype(str)
+            names, inverse = np.unique(column, return_inverse=True)
+            codes = np.array([-1 if name == "" else self.slot(var, name) for name in names.tolist()],
+                             dtype=np.int32)
+            slots[:, j] = codes[inverse.ravel()]
+
+        numeric = np.asarray(outputs)
+        if numeric.dtype.kind in "iuf" and numeric.ndim == 1:
+            values = numeric.astype(float)
+            codes = np.full(len(values), -1, dtype=np.int32)
+        else:
+            outputs = outputs.tolist() if isinstance(outputs, np.ndarray) else outputs
+            encoded = [self._encode_output(tuple(o) if isinstance(o, list) else o) for o in outputs]
+            values = np.array([value for value, _ in encoded], dtype=float)
+            codes = np.array([code for _, code in encoded], dtype=np.int32)
+        self._extend_encoded(slots, slots >= 0, values, codes)
+
+    def _extend_encoded(self, slots, used, values, codes, weights=None):
+        """Append plain rules given as a slot matrix, its mask of real conditions and encoded consequents"""
+        self._ids.frombytes(slots[used].astype(np.int32).tobytes())
+        ends = self._offsets[-1] + np.cumsum(used.sum(axis=1), dtype=np.int64)
+        self._offsets.frombytes(ends.astype(np.int64).tobytes())
+        self._values.frombytes(np.asarray(values, dtype=float).tobytes())
+        self._codes.frombytes(np.asarray(codes, dtype=np.int32).tobytes())
+        self._forms.frombytes(np.full(len(codes), -1, dtype=np.int32).tobytes())
+        weights = np.ones(len(codes)) if weights is None else np.asarray(weights, dtype=float)
+        self._weights.frombytes(weights.tobytes())
+        self._version += 1
+
+    def insert(self, i, rule):
+        # Like list.insert: negative indices count from the end, and out of
+        # range ones clamp to either end
+        if i < 0:
+            i = max(i + len(self), 0)
+        if i >= len(self):
+            self.append(rule)
+            return
+        self._splice(i, i, [rule])
+
+    def __setitem__(self, i, rule):
+        if isinstance(i, slice):
+            rules = list(self)
+            rules[i] = rule
+            self.clear()
+            self.extend(rules)
+            return
+        if i < 0:
+            i += len(self)
+        self._splice(i, i + 1, [rule])
+
+    def __delitem__(self, i):
+        if isinstance(i, slice):
+            rules = list(self)
+            del rules[i]
+            self.clear()
+            self.extend(rules)
+            return
+        if i < 0:
+            i += len(self)
+        self._splice(i, i + 1, [])
+
+    def clear(self):
+        self._loader = None
+        self._ids = array("i")
+        self._offsets = array("q", [0])
+        self._values = array("d")
+        self._codes = array("i")
+        self._forms = array("i")
+        self._weights = array("d")
+        self._version += 1
+
+    def _splice(self, start, stop, rules):
+        """Replace rules start:stop by `rules`"""
+        self._load()
+        if not 0 <= start <= stop <= len(self):
+            raise IndexError("rule index out of range")
+        ids, offsets, values, codes = array("i"), array("q", [self._offsets[start]]), array("d"), array("i")
+        forms, weights = array("i"), array("d")
+        for rule in rules:
+            value, code = self._encode_output(rule.output)
+            conditions = rule.conditions
+            if isinstance(conditions, Expression):
+                forms.append(self._encode_object(conditions))
+                conditions = conditions.leaves()
+            else:
+                forms.append(-1)
+            ids.extend(self.slot(var, term) for var, term in conditions)
+            offsets.append(offsets[0] + len(ids))
+            values.append(value)
+            codes.append(code)
+            weights.append(rule.weight)
+        shift = len(ids) - (self._offsets[stop] - self._offsets[start])
+        self._ids[self._offsets[start]:self._offsets[stop]] = ids
+        tail = array("q", (o + shift for o in self._offsets[stop + 1:]))
+        self._offsets[start:] = offsets + tail
+        self._values[start:stop] = values
+        self._codes[start:stop] = codes
+        self._forms[start:stop] = forms
+        self._weights[start:stop] = weights
+        self._version += 1
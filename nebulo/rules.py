@@ -1,18 +1,61 @@
+from .expressions import Expression, conjunction
+
+
 class FuzzyRule:
     """Generic rule, can be Sugeno or Mamdani"""
-    def __init__(self, conditions, output):
+    __slots__ = ("conditions", "output", "weight")
+
+    def __init__(self, conditions, output, weight=1.0):
         """
-        conditions: list of (var_name, term_name)
-        output: numeric (Sugeno) or fuzzy term name (Mamdani)
+        conditions: list of (var_name, term_name), all of which must hold,
+                    or an Expression (OR, NOT, hedges; see nebulo.expressions)
+        output: numeric or LinearOutput (Sugeno), or fuzzy term name (Mamdani)
+        weight: factor applied to the firing strength
         """
         self.conditions = conditions
         self.output = output
+        self.weight = float(weight)
 
-    def activation(self, fuzzified_inputs):
-        degrees = [fuzzified_inputs[var][term] for var, term in self.conditions]
-        return min(degrees)
+    def activation(self, fuzzified_inputs, tnorm="min"):
+        if isinstance(self.conditions, Expression):
+            degree = self.conditions.degree(lambda var, term: fuzzified_inputs[var][term], tnorm)
+        else:
+            degree = conjunction(tnorm, [fuzzified_inputs[var][term] for var, term in self.conditions])
+        return degree * self.weight
 
     def eval_output(self, inputs=None):
         if callable(self.output):
             return self.output(inputs)
-        return self.output
\ No newline at end of file
+        return self.output
+
+
+class LinearOutput:
+    """First-order Sugeno (TSK) consequent: bias + sum of coefficient * input
+
+    coefficients: {var_name: coefficient}; zero coefficients are dropped
+    Compiled systems evaluate these for a whole batch with one matrix
+    product instead of calling a function per rule and sample.
+    """
+    __slots__ = ("coefficients", "bias")
+
+    def __init__(self, coefficients, bias=0.0):
+        self.coefficients = {var: float(c) for var, c in dict(coefficients).items() if c != 0}
+        self.bias = float(bias)
+
+    def __call__(self, inputs):
+        z = self.bias
+        for var, c in self.coefficients.items():
+            z += c * inputs[var]
+        return z
+
+    def _key(self):
+        return tuple(sorted(self.coefficients.items())), self.bias
+
+    def __eq__(self, other):
+        return isinstance(other, LinearOutput) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"LinearOutput({self.coefficients!r}, bias={self.bias!r})"
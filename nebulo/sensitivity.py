@@ -0,0 +1,302 @@
+"""Uncertainty propagation and sensitivity analysis through evaluate_batch
+
+Input distributions are given per variable as
+  (low, high)          uniform on the interval
+  callable(rng, n)     n draws from a numpy Generator, e.g.
+                       lambda rng, n: rng.normal(2500, 400, n)
+  a number             held fixed
+  None                 uniform on the variable's universe
+Variables the rules use but `distributions` omits are sampled as None.
+
+Samples are drawn and evaluated in chunks, so millions of them run in
+bounded memory; the estimates after every chunk are kept in `history`
+and their spread across chunks gives the standard errors (batch means).
+"""
+import numpy as np
+
+from .compiled import _as_columns
+
+DEFAULT_MAX_CHUNK = 65536
+MIN_CHUNKS = 4  # before a tolerance may stop sampling
+
+
+class MonteCarloResult:
+    """Distribution of the output under random inputs
+
+    mean, std, minimum, maximum: of all outputs
+    standard_error: of the mean, std / sqrt(n_samples)
+    history: [(samples so far, mean, standard error)] after every chunk
+    converged: standard_error <= tolerance, None without a tolerance
+    outputs: every output, None with keep_outputs=False
+    """
+
+    def __init__(self, moments, minimum, maximum, history, tolerance, outputs):
+        n, self.mean, squares = moments
+        self.n_samples = n
+        self.std = float(np.sqrt(squares / n))
+        self.standard_error = self.std / np.sqrt(n)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.history = history
+        self.converged = None if tolerance is None else bool(self.standard_error <= tolerance)
+        self.outputs = outputs
+
+    def quantile(self, q):
+        """Output quantile(s) q in [0, 1]; needs keep_outputs=True"""
+        if self.outputs is None:
+            raise ValueError("quantiles need the outputs; run with keep_outputs=True")
+        return np.quantile(self.outputs, q)
+
+    def as_dict(self):
+        return {"n_samples": self.n_samples, "mean": self.mean, "std": self.std,
+                "standard_error": self.standard_error, "min": self.minimum, "max": self.maximum,
+                "converged": self.converged, "history": [list(entry) for entry in self.history]}
+
+
+class SobolResult:
+    """Variance-based sensitivity indices
+
+    first_order: {var: S_i}, the share of the output variance due to the
+                 variable alone (Saltelli 2010 estimator)
+    total: {var: ST_i}, including all its interactions (Jansen estimator)
+    first_order_error, total_error: standard errors from the chunks
+    history: [(base samples so far, first_order, total)] after every chunk
+    n_evaluations: system evaluations, n_samples * (n_variables + 2)
+    """
+
+    def __init__(self, names, first_order, total, first_order_error, total_error,
+                 variance, n, history, tolerance):
+        self.names = names
+        self.first_order = dict(zip(names, first_order.tolist()))
+        self.total = dict(zip(names, total.tolist()))
+        self.first_order_error = dict(zip(names, first_order_error.tolist()))
+        self.total_error = dict(zip(names, total_error.tolist()))
+        self.variance = variance
+        self.n_samples = n
+        self.n_evaluations = n * (len(names) + 2)
+        self.history = history
+        largest = max(np.max(first_order_error), np.max(total_error)) if names else 0.0
+        self.converged = None if tolerance is None else bool(largest <= tolerance)
+
+    def ranking(self):
+        """Variables sorted by total index, most influential first"""
+        return sorted(self.names, key=self.total.get, reverse=True)
+
+    def as_dict(self):
+        return {"first_order": self.first_order, "total": self.total,
+                "first_order_error": self.first_order_error, "total_error": self.total_error,
+                "variance": self.variance, "n_samples": self.n_samples,
+                "n_evaluations": self.n_evaluations, "converged": self.converged}
+
+
+class OneAtATimeResult:
+    """Each input swept over its range with the others at `base`
+
+    values, outputs: {var: sweep grid}, {var: output along it}
+    ranges: {var: max - min of the output along the sweep}
+    slopes: {var: central difference of the output at the base point}
+    """
+
+    def __init__(self, base, base_output, values, outputs, slopes):
+        self.base = base
+        self.base_output = base_output
+        self.values = values
+        self.outputs = outputs
+        self.ranges = {var: float(np.ptp(out)) for var, out in outputs.items()}
+        self.slopes = slopes
+
+    def ranking(self):
+        """Variables sorted by output range, most influential first"""
+        return sorted(self.ranges, key=self.ranges.get, reverse=True)
+
+
+def monte_carlo(system, distributions=None, n_samples=100_000, chunk_size=None, seed=None,
+                tolerance=None, keep_outputs=True):
+    """
+    Propagate input distributions through `system` (anything with
+    evaluate_batch). tolerance: stop early once the standard error of the
+    mean is at most this (after at least MIN_CHUNKS chunks).
+    Returns a MonteCarloResult.
+    """
+    rng = np.random.default_rng(seed)
+    distributions = _distributions(system, distributions)
+    chunk_size = _chunk_size(n_samples, chunk_size)
+    moments = (0, 0.0, 0.0)
+    minimum, maximum = np.inf, -np.inf
+    history, kept = [], []
+    while moments[0] < n_samples:
+        size = min(chunk_size, n_samples - moments[0])
+        outputs = system.evaluate_batch(_draw(distributions, rng, size))
+        moments = _merge(moments, outputs)
+        minimum, maximum = min(minimum, float(outputs.min())), max(maximum, float(outputs.max()))
+        if keep_outputs:
+            kept.append(outputs)
+        n, mean, squares = moments
+        error = np.sqrt(squares / n / n)
+        history.append((n, mean, error))
+        if tolerance is not None and len(history) >= MIN_CHUNKS and error <= tolerance:
+            break
+    outputs = np.concatenate(kept) if keep_outputs else None
+    return MonteCarloResult(moments, minimum, maximum, history, tolerance, outputs)
+
+
+def sobol_indices(system, distributions=None, n_samples=100_000, chunk_size=None, seed=None, tolerance=None):
+    """
+    First-order and total Sobol indices of every randomly distributed
+    input, from n_samples base samples and n_samples * (k + 2)
+    evaluations (k inputs). Each chunk is evaluated in one evaluate_batch
+    call over the stacked A, B and A_B^i sample matrices. tolerance: stop
+    early once every index's standard error is at most this.
+    Returns a SobolResult.
+    """
+    rng = np.random.default_rng(seed)
+    distributions = _distributions(system, distributions)
+    names = [var for var, spec in distributions.items() if not _is_fixed(spec)]
+    k = len(names)
+    chunk_size = _chunk_size(n_samples, chunk_size)
+    n = 0
+    moments = (0, 0.0, 0.0)  # of f(A) and f(B) together
+    first_sums, total_sums = np.zeros(k), np.zeros(k)
+    chunk_first, chunk_total, history = [], [], []
+    while n < n_samples:
+        size = min(chunk_size, n_samples - n)
+        a = _draw(distributions, rng, size)
+        b = _draw(distributions, rng, size)
+        # Rows: A, B, then A with column i taken from B, for every factor i
+        stacked = {var: np.concatenate([a[var], b[var]] + [b[var] if var == other else a[var] for other in names])
+                   for var in distributions}
+        outputs = system.evaluate_batch(stacked).reshape(k + 2, size)
+        f_a, f_b, f_ab = outputs[0], outputs[1], outputs[2:]
+        chunk = _merge((0, 0.0, 0.0), outputs[:2].ravel())
+        first = (f_b * (f_ab - f_a)).sum(axis=1)
+        total = 0.5 * ((f_a - f_ab) ** 2).sum(axis=1)
+        n += size
+        moments = _merge(moments, chunk)
+        first_sums += first
+        total_sums += total
+        variance = _variance(chunk)
+        chunk_first.append(first / size / variance if variance > 0 else np.zeros(k))
+        chunk_total.append(total / size / variance if variance > 0 else np.zeros(k))
+        estimates = _indices(moments, first_sums, total_sums, n)
+        history.append((n, dict(zip(names, estimates[0].tolist())), dict(zip(names, estimates[1].tolist()))))
+        errors = _batch_errors(chunk_first), _batch_errors(chunk_total)
+        if (tolerance is not None and len(history) >= MIN_CHUNKS
+                and max(errors[0].max(initial=0), errors[1].max(initial=0)) <= tolerance):
+            break
+    first, total = _indices(moments, first_sums, total_sums, n)
+    return SobolResult(names, first, total, errors[0], errors[1], _variance(moments), n, history, tolerance)
+
+
+def one_at_a_time(system, base, n_points=101, ranges=None, step=None):
+    """
+    Sweep every input of `base` ({var: value}) over its range, the others
+    held at their base values, in one evaluate_batch call.
+
+    ranges: {var: (low, high)}, by default the variables' universes
+    step: {var: h} or one h for all, for the slopes (f(x+h) - f(x-h)) / 2h;
+          by default 1e-3 of the range
+    Returns a OneAtATimeResult.
+    """
+    names = list(base)
+    ranges = dict(ranges or {})
+    grids, steps = {}, {}
+    for var in names:
+        low, high = ranges[var] if var in ranges else system.variables[var].universe
+        grids[var] = np.linspace(low, high, n_points)
+        h = step.get(var) if isinstance(step, dict) else step
+        steps[var] = h if h is not None else 1e-3 * (high - low)
+    # Base row, then per variable its sweep and the two points around the base
+    blocks = [1] + [n_points + 2] * len(names)
+    columns = {var: [np.array([float(base[var])])] for var in names}
+    for var in names:
+        sweep = np.concatenate([grids[var], [base[var] - steps[var], base[var] + steps[var]]])
+        for other in names:
+            columns[other].append(sweep if other == var else np.full(len(sweep), float(base[other])))
+    outputs = system.evaluate_batch(_as_columns({var: np.concatenate(c) for var, c in columns.items()}))
+    parts = np.split(outputs, np.cumsum(blocks)[:-1])
+    swept, slopes = {}, {}
+    for var, part in zip(names, parts[1:]):
+        swept[var] = part[:n_points]
+        slopes[var] = float((part[-1] - part[-2]) / (2 * steps[var]))
+    return OneAtATimeResult(dict(base), float(parts[0][0]), grids, swept, slopes)
+
+
+def _distributions(system, distributions):
+    """Sampling specs for every input, the rules' variables included"""
+    result = dict(distributions or {})
+    used = system.compile().used_variables if hasattr(system, "compile") else []
+    for var in used:
+        result.setdefault(var, None)
+    for var, spec in result.items():
+        if spec is None:
+            result[var] = tuple(system.variables[var].universe)
+    return result
+
+
+def _is_fixed(spec):
+    return not callable(spec) and not isinstance(spec, tuple)
+
+
+def _draw(distributions, rng, n):
+    columns = {}
+    for var, spec in distributions.items():
+        if callable(spec):
+            values = np.asarray(spec(rng, n), dtype=float)
+            if values.shape != (n,):
+                raise ValueError(f"distribution of {var!r} returned shape {values.shape}, expected ({n},)")
+        elif isinstance(spec, tuple):
+            values = rng.uniform(spec[0], spec[1], n)
+        else:
+            values = np.full(n, float(spec))
+        columns[var] = values
+    return columns
+
+
+def _chunk_size(n_samples, chunk_size):
+    if n_samples < 1:
+        raise ValueError("n_samples must be at least 1")
+    if chunk_size is None:
+        # About ten chunks, enough for batch-means standard errors
+        chunk_size = min(DEFAULT_MAX_CHUNK, -(-n_samples // 10))
+    return max(1, int(chunk_size))
+
+
+def _merge(moments, values):
+    """
+    (count, mean, sum of squared deviations) of the samples behind
+    `moments` and of `values` (a 1-D array, or such moments) together.
+    Chan et al.'s pairwise update: no large sums cancel, so the variance
+    of outputs with a large mean and a small spread stays accurate.
+    """
+    n, mean, squares = moments
+    if isinstance(values, tuple):
+        size, chunk_mean, chunk_squares = values
+    else:
+        size = len(values)
+        chunk_mean = float(values.mean())
+        deviations = values - chunk_mean
+        chunk_squares = float(np.dot(deviations, deviations))
+    count = n + size
+    delta = chunk_mean - mean
+    return count, mean + delta * size / count, squares + chunk_squares + delta * delta * n * size / count
+
+
+def _variance(moments):
+    """Output variance from (count, mean, sum of squared deviations)"""
+    n, _, squares = moments
+    return squares / n
+
+
+def _indices(moments, first_sums, total_sums, n):
+    variance = _variance(moments)
+    if variance == 0:
+        return np.zeros(len(first_sums)), np.zeros(len(total_sums))
+    return first_sums / n / variance, total_sums / n / variance
+
+
+def _batch_errors(chunk_estimates):
+    """Standard errors of the mean of per-chunk estimates; NaN from a single chunk"""
+    estimates = np.array(chunk_estimates)
+    if len(estimates) < 2:
+        return np.full(estimates.shape[1], np.nan)
+    return estimates.std(axis=0, ddof=1) / np.sqrt(len(estimates))
@@ -0,0 +1,240 @@
+import asyncio
+import json
+
+import numpy as np
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            500: "Internal Server Error"}
+
+
+class MicroBatcher:
+    """Coalesces single evaluations into calls to `evaluate_batch`
+
+    Requests queue until `max_batch_size` of them are waiting or
+    `max_wait` seconds have passed since the first one, then the whole
+    batch is evaluated at once and every caller gets its own result.
+    The batch runs inside the event loop callback, so `swap` can never
+    interleave with it: requests already queued are served by the new
+    system, none are dropped.
+    """
+
+    def __init__(self, system, max_batch_size=256, max_wait=0.001):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be positive")
+        system.compile()
+        self.system = system
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = 0
+        self.batches = 0
+        self._pending = []
+        self._timer = None
+
+    def swap(self, system):
+        """Serve later batches from `system`; compiled first, so errors surface here"""
+        system.compile()
+        self.system = system
+
+    def evaluate(self, inputs):
+        """Future resolving to the output for one {var_name: value} dict"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((inputs, future))
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self.flush)
+        return future
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        batch = [(inputs, future) for inputs, future in batch if not future.done()]
+        if not batch:
+            return
+        self.requests += len(batch)
+        self.batches += 1
+
+        compiled = self.system.compile()
+        # Callable consequents may read any input, so requests are only
+        # batched with those giving the same ones
+        callables = compiled.mode == "sugeno" and compiled.callables
+        groups = {}
+        for inputs, future in batch:
+            names = compiled.input_names(inputs if callables else {})
+            groups.setdefault(frozenset(names), (names, []))[1].append((inputs, future))
+        for names, requests in groups.values():
+            self._evaluate(names, requests)
+
+    def _evaluate(self, names, batch):
+        """Evaluate queued (inputs, future) pairs on the `names` columns"""
+        rows, futures = [], []
+        for inputs, future in batch:
+            try:
+                rows.append([float(inputs[name]) for name in names])
+                futures.append(future)
+            except KeyError as e:
+                future.set_exception(KeyError(f"missing input {e.args[0]!r}"))
+            except (TypeError, ValueError) as e:
+                future.set_exception(ValueError(f"invalid input: {e}"))
+        if not futures:
+            return
+        try:
+            if len(rows) == 1 and self.system.variables.keys() >= set(names):
+                # A lone request is cheaper on the scalar path, which only fuzzifies variables
+                outputs = [float(self.system.evaluate(dict(zip(names, rows[0]))))]
+            else:
+                outputs = self.system.evaluate_batch(np.array(rows).reshape(len(rows), -1),
+                                                     columns=names).tolist()
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future, output in zip(futures, outputs):
+            future.set_result(output)
+
+
+class FuzzyServer:
+    """HTTP/1.1 endpoint over TCP or a Unix socket serving one FuzzySystem
+
+    POST /evaluate with a JSON object {var_name: value} answers
+    {"output": value}; GET /health answers request and batch counts.
+    Connections are kept alive. Concurrent requests, from any number of
+    connections, are evaluated together by a MicroBatcher.
+    """
+
+    def __init__(self, system, max_batch_size=256, max_wait=0.001):
+        self.batcher = MicroBatcher(system, max_batch_size, max_wait)
+        self._server = None
+
+    @property
+    def system(self):
+        return self.batcher.system
+
+    def swap(self, system):
+        """Replace the served system without dropping queued requests"""
+        self.batcher.swap(system)
+
+    async def start(self, host="127.0.0.1", port=8080, path=None):
+        """Listen on host:port, or on the Unix socket `path` when given"""
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        return self
+
+    @property
+    def address(self):
+        """(host, port) or the Unix socket path the server listens on"""
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request = await _read_message(reader)
+                if request is None:
+                    break
+                start_line, headers, body = request
+                method, target = (start_line.split() + ["", ""])[:2]
+                status, payload = await self._respond(method, target, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                _write_message(writer, f"HTTP/1.1 {status} {_REASONS[status]}", payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method, target, body):
+        if target == "/health":
+            return 200, {"requests": self.batcher.requests, "batches": self.batcher.batches}
+        if target != "/evaluate":
+            return 404, {"error": f"unknown path {target}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            inputs = json.loads(body)
+            if not isinstance(inputs, dict):
+                raise ValueError("expected a JSON object of inputs")
+            return 200, {"output": await self.batcher.evaluate(inputs)}
+        except (KeyError, ValueError) as e:
+            return 400, {"error": str(e.args[0]) if e.args else str(e)}
+        except Exception as e:
+            # Anything else raised by the system (e.g. a consequent callable):
+            # report it and keep the connection, as MicroBatcher.flush does
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+
+class Client:
+    """Minimal keep-alive client for FuzzyServer, e.g. for load tests"""
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8080, path=None):
+        if path is not None:
+            return cls(*await asyncio.open_unix_connection(path))
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, method, target, payload=None):
+        """(status, decoded JSON body)"""
+        _write_message(self._writer, f"{method} {target} HTTP/1.1", payload, True)
+        await self._writer.drain()
+        response = await _read_message(self._reader)
+        if response is None:
+            raise ConnectionError("server closed the connection")
+        status_line, _, body = response
+        return int(status_line.split()[1]), json.loads(body)
+
+    async def evaluate(self, inputs):
+        status, payload = await self.request("POST", "/evaluate", inputs)
+        if status != 200:
+            raise ValueError(payload.get("error", f"HTTP {status}"))
+        return payload["output"]
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def _read_message(reader):
+    """(start line, {lowercase header: value}, body bytes), None at end of stream"""
+    start_line = await reader.readline()
+    if not start_line:
+        return None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+    return start_line.decode("latin-1").strip(), headers, body
+
+
+def _write_message(writer, start_line, payload, keep_alive):
+    body = b"" if payload is None else json.dumps(payload).encode()
+    head = (f"{start_line}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
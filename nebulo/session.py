@@ -0,0 +1,246 @@
+from array import array
+
+from .compiled import _signature
+from .rules import LinearOutput
+
+
+class SessionPlan:
+    """Per-system tables shared by every EvaluationSession of that system
+
+    Which slots ((variable, term) pairs interned by the RuleBase) and
+    which rules each variable feeds, the slots of every rule and the
+    consequents in a form the sessions can update from.
+    """
+
+    def __init__(self, system):
+        compiled = system.compile()  # validates the rule base like evaluate would
+        rules = system.rules
+        ids, offsets, values, codes = rules.columns()
+        self.mode = system.mode
+        self.signature = _signature(system)
+        self.n_slots = len(rules.slot_names)
+        self.n_rules = len(rules)
+        # Plain min rules are computed inline, others by RuleBase.strength_function
+        self.rules = rules
+        self.tnorm = system.tnorm
+        self.inline = self.tnorm == "min" and rules.plain()
+
+        self.var_slots = {name: [] for name in system.variables}
+        for slot, (var, term) in enumerate(rules.slot_names):
+            if var in system.variables and term in system.variables[var].terms:
+                self.var_slots[var].append((slot, system.variables[var].terms[term]))
+        self.rule_slots = [tuple(ids[offsets[i]:offsets[i + 1]]) for i in range(self.n_rules)]
+
+        linear = {}
+        if self.mode == "sugeno":
+            self.values = [values[i] if codes[i] < 0 else rules.objects[codes[i]] for i in range(self.n_rules)]
+            linear = {i: z for i, z in enumerate(self.values) if isinstance(z, LinearOutput)}
+            self.callables = [i for i, z in enumerate(self.values) if callable(z) and i not in linear]
+        else:
+            self.callables = []
+            self.labels = compiled.labels
+            self.rule_labels = compiled.consequents.tolist()
+            self.label_rules = [[] for _ in self.labels]
+            for i, label in enumerate(self.rule_labels):
+                self.label_rules[label].append(i)
+            self.defuzzify = compiled.defuzzifier.defuzzify_one
+
+        # Rules to recompute when a variable changes: constant consequents in
+        # var_rules, linear ones (which also depend on their coefficients'
+        # variables) in var_linear; other callables are always recomputed
+        self.var_rules = {}
+        self.var_linear = {}
+        callables = set(self.callables)
+        for i, slots in enumerate(self.rule_slots):
+            used = dict.fromkeys(rules.slot_names[s][0] for s in slots)
+            if i in linear:
+                used.update(dict.fromkeys(linear[i].coefficients))
+            for var in used:
+                self.var_rules.setdefault(var, [])
+                self.var_linear.setdefault(var, [])
+                if i in linear:
+                    self.var_linear[var].append(i)
+                elif i not in callables:
+                    self.var_rules[var].append(i)
+        self.used_variables = list(self.var_rules)
+
+
+class EvaluationSession:
+    """Incremental FuzzySystem.evaluate for inputs that change a few at a time
+
+    Keeps the membership degrees, rule strengths and aggregate of the
+    last evaluation. `update` re-fuzzifies only the variables whose value
+    changed and recomputes only the rules that test them:
+
+    - Sugeno: the weighted sums move by the changed rules' contributions;
+      a LinearOutput rule also changes with its coefficients' inputs.
+      This is subject to rounding, so they are recomputed from scratch
+      every `refresh` updates and whenever no rule fires any more.
+    - Mamdani: a label's maximum is raised in place, and rescanned over
+      the label's rules only when its maximal rule weakened; the
+      defuzzification is skipped when no label degree changed. Exact.
+
+    When more than half of the rules are affected, or after the system
+    changed, everything is recomputed. Rules with callable consequents
+    depend on every input and are recomputed on each update.
+
+    Sessions of one system share its lookup tables, so each one holds
+    only its inputs, one degree per slot and one strength per rule.
+    Caches, indexes and hooks of the system are not used.
+    """
+
+    __slots__ = ("system", "inputs", "refresh", "_plan", "_degrees", "_strengths", "_zs",
+                 "_sums", "_firing", "_aggregate", "_output", "_stale", "_deltas", "_strength")
+
+    def __init__(self, system, inputs=None, refresh=1024):
+        self.system = system
+        self.inputs = {}
+        self.refresh = refresh
+        self._plan = None
+        self._reset()
+        if inputs:
+            self._apply(inputs)
+
+    def _reset(self):
+        plan = self._plan = _shared_plan(self.system)
+        self._degrees = array("d", bytes(8 * plan.n_slots))
+        self._strengths = array("d", bytes(8 * plan.n_rules))
+        self._strength = None if plan.inline else plan.rules.strength_function(self._degrees, plan.tnorm)
+        self._zs = {}
+        self._sums = [0.0, 0.0]
+        self._firing = 0
+        self._aggregate = None
+        self._output = None
+        self._stale = True
+        self._deltas = 0
+        for var, value in self.inputs.items():
+            for slot, mf in plan.var_slots[var]:
+                self._degrees[slot] = mf.evaluate(value)
+
+    def _apply(self, values):
+        """Store new input values and their degrees; the variables that changed"""
+        if self._plan.signature != _signature(self.system):
+            self._reset()
+        var_slots, inputs, degrees = self._plan.var_slots, self.inputs, self._degrees
+        changed = []
+        for var, value in values.items():
+            if var not in var_slots:
+                raise KeyError(var)
+            if var in inputs and inputs[var] == value:
+                continue
+            inputs[var] = value
+            for slot, mf in var_slots[var]:
+                degrees[slot] = mf.evaluate(value)
+            changed.append(var)
+        return changed
+
+    def update(self, inputs=None, **values):
+        """Set new values, e.g. update(Cost_Actual=1200) or update({...}); returns the output"""
+        if inputs:
+            values = dict(inputs, **values)
+        changed = self._apply(values)
+        plan = self._plan
+        if self._stale:
+            return self.output
+        if len(changed) == 1:
+            dirty = plan.var_rules.get(changed[0], [])
+            linear = plan.var_linear.get(changed[0], [])
+        else:
+            dirty = sorted({i for var in changed for i in plan.var_rules.get(var, ())})
+            linear = sorted({i for var in changed for i in plan.var_linear.get(var, ())})
+        callables = plan.callables if changed else []
+        if not (dirty or linear or callables):
+            return self._output
+        if 2 * (len(dirty) + len(linear) + len(callables)) > plan.n_rules or self._deltas >= self.refresh:
+            self._stale = True
+            return self.output
+        self._deltas += 1
+        if plan.mode == "sugeno":
+            self._update_sugeno(dirty, linear + callables)
+        else:
+            self._update_mamdani(dirty)
+        return self._output
+
+    @property
+    def output(self):
+        """Crisp output for the current inputs; KeyError names an input still missing"""
+        if self._stale:
+            missing = [var for var in self._plan.used_variables if var not in self.inputs]
+            if missing:
+                raise KeyError(missing[0])
+            self._recompute()
+        return self._output
+
+    def _recompute(self):
+        plan, degrees, strengths, strength = self._plan, self._degrees, self._strengths, self._strength
+        for i, slots in enumerate(plan.rule_slots):
+            strengths[i] = min([degrees[s] for s in slots]) if strength is None else strength(i)
+        if plan.mode == "sugeno":
+            weighted_sum = weight_total = 0.0
+            self._zs = {}
+            for i, z in enumerate(plan.values):
+                w = strengths[i]
+                if callable(z):
+                    z = self._zs[i] = z(self.inputs)
+                weighted_sum += w * z
+                weight_total += w
+            self._sums = [weighted_sum, weight_total]
+            self._firing = sum(1 for w in strengths if w > 0)
+            self._output = weighted_sum / weight_total if weight_total != 0 else 0
+        else:
+            self._aggregate = [max([0.0] + [strengths[i] for i in rules]) for rules in plan.label_rules]
+            self._output = plan.defuzzify(self._aggregate)
+        self._stale = False
+        self._deltas = 0
+
+    def _update_sugeno(self, dirty, dependent):
+        """dirty: rules with constant consequents; dependent: rules whose consequent depends on the inputs"""
+        plan, degrees, strengths, strength = self._plan, self._degrees, self._strengths, self._strength
+        rule_slots, values = plan.rule_slots, plan.values
+        weighted_sum, weight_total = self._sums
+        firing = self._firing
+        for i in dirty:
+            old = strengths[i]
+            new = strengths[i] = min([degrees[s] for s in rule_slots[i]]) if strength is None else strength(i)
+            weighted_sum += (new - old) * values[i]
+            weight_total += new - old
+            firing += (new > 0) - (old > 0)
+        zs = self._zs
+        for i in dependent:
+            old, z_old = strengths[i], zs[i]
+            new = strengths[i] = min([degrees[s] for s in rule_slots[i]]) if strength is None else strength(i)
+            z = zs[i] = values[i](self.inputs)
+            weighted_sum += new * z - old * z_old
+            weight_total += new - old
+            firing += (new > 0) - (old > 0)
+        if not firing:
+            # Nothing fires: the sums are exactly zero, whatever rounding left in them
+            weighted_sum = weight_total = 0.0
+        self._sums = [weighted_sum, weight_total]
+        self._firing = firing
+        self._output = weighted_sum / weight_total if weight_total != 0 else 0
+
+    def _update_mamdani(self, dirty):
+        plan, degrees, strengths, aggregate = self._plan, self._degrees, self._strengths, self._aggregate
+        rule_slots, rule_labels, strength = plan.rule_slots, plan.rule_labels, self._strength
+        before = list(aggregate)
+        rescan = set()
+        for i in dirty:
+            old = strengths[i]
+            new = strengths[i] = min([degrees[s] for s in rule_slots[i]]) if strength is None else strength(i)
+            label = rule_labels[i]
+            if new >= aggregate[label]:
+                aggregate[label] = new
+            elif old == aggregate[label]:
+                rescan.add(label)
+        for label in rescan:
+            aggregate[label] = max([0.0] + [strengths[i] for i in plan.label_rules[label]])
+        if aggregate != before:
+            self._output = plan.defuzzify(aggregate)
+
+
+def _shared_plan(system):
+    plan = system._session_plan
+    if plan is None or plan.signature != _signature(system):
+        plan = system._session_plan = SessionPlan(system)
+    return plan
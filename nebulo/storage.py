@@ -0,0 +1,241 @@
+import json
+import mmap as _mmap
+import struct
+
+import numpy as np
+
+from .compiled import CompiledSystem, _split_consequent
+from .membership import (
+    TriangularMF,
+    TrapezoidalMF,
+    GaussianMF,
+    GeneralizedBellMF,
+    SigmoidMF,
+    SShapedMF,
+    ZShapedMF,
+    PiShapedMF,
+    PiecewiseLinearMF,
+)
+from .rulebase import RuleBase
+from .rules import LinearOutput
+from .variables import FuzzyVariable
+
+MAGIC = b"NEBULOFS"
+# 2 added the "linear" array of first-order Sugeno coefficients; files
+# without linear consequents are still written as version 1
+# 3 added rule "weights" and the header "tnorm"; written only when the
+# weights are not all 1 or the t-norm is not min
+# 4 added the header "dtype" of batch evaluation; written only when it is
+# not float64
+FORMAT_VERSION = 4
+
+# Arrays start on multiples of this many bytes, so mapped views are aligned
+_ALIGN = 64
+_PREAMBLE = struct.Struct("<8sII")  # magic, format version, header length
+
+# Membership function kinds by stored code; only ever append to this list
+_MF_KINDS = [
+    (TriangularMF, ("a", "b", "c")),
+    (TrapezoidalMF, ("a", "b", "c", "d")),
+    (GaussianMF, ("mean", "sigma")),
+    (GeneralizedBellMF, ("a", "b", "c")),
+    (SigmoidMF, ("a", "c")),
+    (SShapedMF, ("a", "b")),
+    (ZShapedMF, ("a", "b")),
+    (PiShapedMF, ("a", "b", "c", "d")),
+    (PiecewiseLinearMF, None),  # parameters: x0, y0, x1, y1, ...
+]
+_MF_CODES = {cls: code for code, (cls, _) in enumerate(_MF_KINDS)}
+
+
+def save_system(system, path):
+    """Write `system` to `path` in the binary layout read by load_system
+
+    Layout (little endian): magic b"NEBULOFS", uint32 format version,
+    uint32 header length, a JSON header with names, settings and the
+    offset, dtype and shape of every array, then the arrays themselves:
+    term kinds and parameters and the compiled rule arrays (antecedent
+    slots, consequents, Mamdani grouping), each aligned to 64 bytes.
+    """
+    compiled = system.compile()
+    if system.mode == "sugeno" and compiled.callables:
+        raise ValueError("rules with callable consequents cannot be saved")
+    if compiled.program is not None:
+        raise ValueError("rules with expression antecedents cannot be saved")
+
+    header = {"mode": system.mode, "defuzzification": system.defuzzification,
+              "resolution": system.resolution, "variables": [], "outputs": []}
+    kinds, offsets, params = [], [0], []
+    for group, variables in (("variables", system.variables), ("outputs", system.outputs)):
+        for name, var in variables.items():
+            if group == "outputs" and system.variables.get(name) is var:
+                header["outputs"].append({"name": name, "shared": True})
+                continue
+            header[group].append({"name": name, "universe": var._universe, "terms": list(var.terms)})
+            for mf in var.terms.values():
+                code = _MF_CODES.get(type(mf))
+                if code is None:
+                    raise ValueError(f"cannot save membership function {type(mf).__name__}")
+                names = _MF_KINDS[code][1]
+                if names is None:
+                    params.extend(v for point in zip(mf.xs, mf.ys) for v in point)
+                else:
+                    params.extend(float(getattr(mf, attr)) for attr in names)
+                kinds.append(code)
+                offsets.append(len(params))
+
+    arrays = {
+        "term_kinds": np.array(kinds, dtype=np.int32),
+        "term_offsets": np.array(offsets, dtype=np.int64),
+        "params": np.array(params, dtype=float),
+        "antecedents": compiled.antecedents.astype(np.int64),
+        "used_slots": compiled.used_slots.astype(np.int64),
+    }
+    version = 1
+    if system.mode == "sugeno":
+        arrays["consequents"] = compiled.consequents.astype(float)
+        if compiled.linear is not None:
+            arrays["linear"] = compiled.linear.astype(float)
+            header["linear_variables"] = compiled.linear_variables
+            version = 2
+    else:
+        arrays["consequents"] = compiled.consequents.astype(np.int64)
+        arrays["group_starts"] = compiled.group_starts.astype(np.int64)
+        if compiled.order is not None:
+            arrays["order"] = compiled.order.astype(np.int64)
+        # Which output variable each rule names, as written in its consequent
+        rule_codes = system.rules.arrays()[3]
+        objects = system.rules.objects
+        outputs = {code: _split_consequent(objects[code])[0] for code in np.unique(rule_codes).tolist()}
+        header["labels"] = compiled.labels
+        header["output_names"] = list(dict.fromkeys(outputs.values()))
+        by_code = np.zeros(len(objects), dtype=np.int32)
+        for code, name in outputs.items():
+            by_code[code] = header["output_names"].index(name)
+        arrays["rule_outputs"] = by_code[rule_codes]
+    if compiled.weights is not None or system.tnorm != "min":
+        header["tnorm"] = system.tnorm
+        if compiled.weights is not None:
+            arrays["weights"] = compiled.weights.astype(float)
+        version = 3
+    if system.dtype != np.float64:
+        header["dtype"] = system.dtype.name
+        version = 4
+
+    position = 0
+    header["arrays"] = {}
+    for name, array in arrays.items():
+        header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": position}
+        position = _aligned(position + array.nbytes)
+    encoded = json.dumps(header).encode()
+
+    with open(path, "wb") as handle:
+        handle.write(_PREAMBLE.pack(MAGIC, version, len(encoded)))
+        handle.write(encoded)
+        start = _aligned(_PREAMBLE.size + len(encoded))
+        for name, array in arrays.items():
+            handle.write(b"\0" * (start + header["arrays"][name]["offset"] - handle.tell()))
+            handle.write(np.ascontiguousarray(array).tobytes())
+
+
+def load_system(path, mmap=True):
+    """Read a system written by save_system
+
+    mmap: map the file read-only instead of reading it. The rule arrays
+          are then views of the page cache, shared by every process that
+          loads the same file. Rule objects are only built when
+          `system.rules` is accessed; evaluate_batch works without them.
+    """
+    from .system import FuzzySystem
+
+    with open(path, "rb") as handle:
+        if mmap:
+            buffer = _mmap.mmap(handle.fileno(), 0, access=_mmap.ACCESS_READ)
+        else:
+            buffer = handle.read()
+    if len(buffer) < _PREAMBLE.size:
+        raise ValueError(f"{path}: not a Nebulo model file")
+    magic, version, length = _PREAMBLE.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a Nebulo model file")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"{path}: format version {version} is newer than supported ({FORMAT_VERSION})")
+    header = json.loads(bytes(buffer[_PREAMBLE.size:_PREAMBLE.size + length]))
+    start = _aligned(_PREAMBLE.size + length)
+    arrays = {name: _view(buffer, start, spec) for name, spec in header["arrays"].items()}
+
+    kinds = arrays["term_kinds"].tolist()
+    offsets = arrays["term_offsets"].tolist()
+    params = arrays["params"].tolist()
+    system = FuzzySystem(header["mode"], header["defuzzification"], header["resolution"],
+                         tnorm=header.get("tnorm", "min"), dtype=header.get("dtype", "float64"))
+    term = 0
+    slot_names = []
+    for group in ("variables", "outputs"):
+        for entry in header[group]:
+            if entry.get("shared"):
+                system.add_output(system.variables[entry["name"]])
+                continue
+            var = FuzzyVariable(entry["name"], entry["universe"])
+            for term_name in entry["terms"]:
+                cls, names = _MF_KINDS[kinds[term]]
+                values = params[offsets[term]:offsets[term + 1]]
+                var.add_term(term_name, cls(list(zip(values[::2], values[1::2]))) if names is None else cls(*values))
+                term += 1
+                if group == "variables":
+                    slot_names.append((var.name, term_name))
+            (system.add_variable if group == "variables" else system.add_output)(var)
+
+    arrays["antecedents"] = arrays["antecedents"].astype(np.intp, copy=False)
+    arrays["used_slots"] = arrays["used_slots"].astype(np.intp, copy=False)
+    if system.mode == "sugeno" and "linear" in arrays:
+        arrays["linear_variables"] = header["linear_variables"]
+    if system.mode == "mamdani":
+        arrays["consequents"] = arrays["consequents"].astype(np.intp, copy=False)
+        arrays["labels"] = header["labels"]
+        arrays["output_names"] = header["output_names"]
+    system.rules = RuleBase.deferred(len(arrays["antecedents"]), lambda rules: _fill(rules, slot_names, arrays))
+    system._compiled = CompiledSystem(system, arrays)
+    return system
+
+
+def _fill(rules, slot_names, arrays):
+    """Decode the stored compiled arrays into an empty RuleBase"""
+    for var, term in slot_names:
+        rules.slot(var, term)  # interned in slot order, so slot ids match the stored ones
+    antecedents = arrays["antecedents"]
+    consequents = arrays["consequents"]
+    weights = arrays.get("weights")
+    if "labels" not in arrays:
+        codes = np.full(len(consequents), -1)
+        values = consequents
+        if "linear" in arrays:
+            linear, names = arrays["linear"], arrays["linear_variables"]
+            values = consequents.copy()
+            for i in np.flatnonzero((linear != 0).any(axis=1)).tolist():
+                coefficients = {var: c for var, c in zip(names, linear[i].tolist()) if c != 0}
+                codes[i] = rules._encode_output(LinearOutput(coefficients, consequents[i]))[1]
+                values[i] = 0.0
+        rules._extend_encoded(antecedents, antecedents < len(slot_names), values, codes, weights)
+        return
+    # One object per distinct (label, output variable) pair
+    pairs, inverse = np.unique(np.stack([consequents, arrays["rule_outputs"]], axis=1), axis=0, return_inverse=True)
+    codes = []
+    for label, output in pairs.tolist():
+        label, output = arrays["labels"][label], arrays["output_names"][output]
+        codes.append(rules._encode_output(label if output is None else (output, label))[1])
+    codes = np.array(codes, dtype=np.int32)[inverse.ravel()]
+    rules._extend_encoded(antecedents, antecedents < len(slot_names), np.zeros(len(codes)), codes, weights)
+
+
+def _aligned(position):
+    return -(-position // _ALIGN) * _ALIGN
+
+
+def _view(buffer, start, spec):
+    shape = tuple(spec["shape"])
+    dtype = np.dtype(spec["dtype"])
+    count = int(np.prod(shape, dtype=np.int64))
+    if not count:
+        return np.empty(shape, dtype=dtype)
+    return np.frombuffer(buffer, dtype=dtype, count=count, offset=start + spec["offset"]).reshape(shape)
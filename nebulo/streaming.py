@@ -0,0 +1,124 @@
+import csv
+import os
+from collections.abc import Mapping
+from itertools import islice
+
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def evaluate_stream(system, source, chunk_size=DEFAULT_CHUNK_SIZE, columns=None, out=None):
+    """
+    Evaluate `source` in fixed-size chunks through `system.evaluate_batch`,
+    yielding one 1-D output array per chunk. Only one chunk of inputs and
+    outputs is held in memory at a time.
+
+    source: one of
+        - a path to a CSV file with a header row naming the variables
+        - a path to a .npy file (memory-mapped) or a 2-D array / np.memmap,
+          with `columns` naming its columns (structured arrays use their
+          field names)
+        - a mapping {var_name: 1-D array}, e.g. of memory-mapped arrays
+        - an iterable of {var_name: value} records, or of sequences when
+          `columns` is given
+    out: optional 1-D array or np.memmap receiving every output in order;
+         a path creates a .npy file (the length of `source` must be known).
+         The yielded chunks are then views into it.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    chunks = _input_chunks(source, chunk_size, columns)
+    if isinstance(out, (str, os.PathLike)):
+        out = np.lib.format.open_memmap(out, mode="w+", dtype=float, shape=(_length(source, columns),))
+
+    position = 0
+    for chunk in chunks:
+        result = system.evaluate_batch(chunk)
+        if out is not None:
+            stop = position + len(result)
+            if stop > len(out):
+                raise ValueError(f"`out` holds {len(out)} outputs but the source has more")
+            out[position:stop] = result
+            result = out[position:stop]
+            position = stop
+        yield result
+    if isinstance(out, np.memmap):
+        out.flush()
+
+
+def _input_chunks(source, chunk_size, columns):
+    """Yield {var_name: 1-D float array} chunks of at most chunk_size rows"""
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if path.endswith(".npy"):
+            source = np.load(path, mmap_mode="r")
+        else:
+            yield from _csv_chunks(path, chunk_size, columns)
+            return
+
+    if isinstance(source, np.ndarray):
+        if source.dtype.names:
+            source = {name: source[name] for name in (columns or source.dtype.names)}
+        else:
+            if columns is None or source.ndim != 2 or source.shape[1] != len(columns):
+                raise ValueError("2-D array sources need one name in `columns` per column")
+            for start in range(0, len(source), chunk_size):
+                block = np.asarray(source[start:start + chunk_size], dtype=float)
+                yield {name: block[:, i] for i, name in enumerate(columns)}
+            return
+
+    if isinstance(source, Mapping):
+        names = list(columns or source)
+        n = len(source[names[0]]) if names else 0
+        for start in range(0, n, chunk_size):
+            yield {name: np.asarray(source[name][start:start + chunk_size], dtype=float) for name in names}
+        return
+
+    records = iter(source)
+    while True:
+        block = list(islice(records, chunk_size))
+        if not block:
+            return
+        yield _records_to_columns(block, columns)
+
+
+def _records_to_columns(block, columns):
+    if isinstance(block[0], Mapping):
+        names = list(columns or block[0])
+        return {name: np.array([record[name] for record in block], dtype=float) for name in names}
+    if columns is None:
+        raise ValueError("sequence records need `columns`")
+    data = np.array(block, dtype=float).reshape(len(block), len(columns))
+    return {name: data[:, i] for i, name in enumerate(columns)}
+
+
+def _csv_chunks(path, chunk_size, columns):
+    with open(path, newline="") as handle:
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"{path}: empty CSV file, expected a header row naming the variables")
+        header = [name.strip() for name in header]
+        names = list(columns or header)
+        positions = [header.index(name) for name in names]
+        while True:
+            block = list(islice(reader, chunk_size))
+            if not block:
+                return
+            data = np.array([[row[p] for p in positions] for row in block], dtype=float)
+            yield {name: data[:, i] for i, name in enumerate(names)}
+
+
+def _length(source, columns):
+    if isinstance(source, (str, os.PathLike)):
+        if os.fspath(source).endswith(".npy"):
+            return len(np.load(os.fspath(source), mmap_mode="r"))
+        source = None
+    if isinstance(source, Mapping):
+        names = list(columns or source)
+        return len(source[names[0]]) if names else 0
+    try:
+        return len(source)
+    except TypeError:
+        raise ValueError("an output path needs a source of known length; pass an array as `out`") from None
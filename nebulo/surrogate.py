@@ -0,0 +1,184 @@
+from bisect import bisect_right
+from itertools import product
+
+import numpy as np
+
+from .compiled import _as_columns
+
+
+class LookupTable:
+    """Multilinear-interpolation surrogate of a FuzzySystem, built by `FuzzySystem.to_lut`
+
+    axes: {var_name: sorted 1-D array of grid points}
+    values: system outputs on the grid, shape (len(axis) for axis in axes)
+    Inputs outside an axis are clamped to its ends.
+
+    max_error / mean_error: absolute difference to the exact engine
+    observed on the validation samples drawn when the table was built.
+    """
+
+    def __init__(self, axes, values, max_error=None, mean_error=None):
+        self.names = list(axes)
+        self.axes = [np.asarray(axes[name], dtype=float) for name in self.names]
+        self.values = np.ascontiguousarray(values, dtype=float)
+        if self.values.shape != tuple(len(a) for a in self.axes):
+            raise ValueError("values must have one dimension per axis")
+        if any(len(a) < 2 for a in self.axes):
+            raise ValueError("every axis needs at least two points")
+        self.max_error = max_error
+        self.mean_error = mean_error
+
+        self._strides = np.array([s // self.values.itemsize for s in self.values.strides])
+        self._flat = self.values.ravel()
+        # Plain-Python copies keep single evaluations free of NumPy dispatch
+        self._axis_lists = [a.tolist() for a in self.axes]
+        self._flat_list = self._flat.tolist()
+        self._stride_list = self._strides.tolist()
+        self._corners = list(product((0, 1), repeat=len(self.axes)))
+
+    def __len__(self):
+        return self.values.size
+
+    def evaluate(self, inputs: dict):
+        offset = 0
+        fractions = []
+        for name, axis, stride in zip(self.names, self._axis_lists, self._stride_list):
+            x = inputs[name]
+            i = min(max(bisect_right(axis, x) - 1, 0), len(axis) - 2)
+            t = (x - axis[i]) / (axis[i + 1] - axis[i])
+            fractions.append(min(max(t, 0.0), 1.0))
+            offset += i * stride
+        result = 0.0
+        for corner in self._corners:
+            weight = 1.0
+            index = offset
+            for bit, t, stride in zip(corner, fractions, self._stride_list):
+                if bit:
+                    weight *= t
+                    index += stride
+                else:
+                    weight *= 1 - t
+            result += weight * self._flat_list[index]
+        return result
+
+    def evaluate_batch(self, inputs, columns=None):
+        inputs = _as_columns(inputs, columns)
+        n = len(inputs[self.names[0]])
+        offset = np.zeros(n, dtype=np.intp)
+        fractions = []
+        for name, axis, stride in zip(self.names, self.axes, self._strides):
+            x = inputs[name]
+            i = np.clip(np.searchsorted(axis, x, side="right") - 1, 0, len(axis) - 2)
+            t = (x - axis[i]) / (axis[i + 1] - axis[i])
+            fractions.append(np.clip(t, 0.0, 1.0))
+            offset += i * stride
+        result = np.zeros(n)
+        for corner in self._corners:
+            weight = np.ones(n)
+            index = offset.copy()
+            for bit, t, stride in zip(corner, fractions, self._strides):
+                if bit:
+                    weight *= t
+                    index += stride
+                else:
+                    weight *= 1 - t
+            result += weight * self._flat[index]
+        return result
+
+
+def build_lookup_table(system, resolution=33, tolerance=None, refine=True, universes=None,
+                       max_points=1_000_000, max_rounds=8, validation=10_000, seed=0):
+    """Tabulate `system` over the universes of its input variables
+
+    resolution: grid points per variable (int or {var_name: int})
+    refine: add the breakpoints of every term to the grid, so piecewise
+            linear systems are exact along each axis at the term edges
+    tolerance: when given, repeatedly halve the grid cells whose midpoint
+               interpolation error exceeds it, within `max_points` and
+               `max_rounds`
+    universes: {var_name: (low, high)} overriding FuzzyVariable.universe
+    validation: number of random samples used to measure the final error
+
+    Callable Sugeno consequents may read any input, so systems using them
+    raise ValueError.
+    """
+    compiled = system.compile()
+    if system.mode == "sugeno" and compiled.callables:
+        # A callable may read any input, so the table could not know its axes
+        raise ValueError("systems with callable consequents cannot be tabulated")
+    # LinearOutput consequents may read inputs no antecedent tests: axes too
+    names = compiled.input_names({})
+    universes = dict(universes or {})
+    axes = {}
+    for name in names:
+        var = system.variables.get(name)
+        if var is None and name not in universes:
+            raise ValueError(f"input {name!r} of a LinearOutput has no variable; give its range in `universes`")
+        low, high = universes.get(name) or var.universe
+        points = resolution.get(name, 33) if isinstance(resolution, dict) else resolution
+        axis = set(np.linspace(low, high, points).tolist())
+        if refine and var is not None:
+            for mf in var.terms.values():
+                for x, _ in mf.breakpoints() or ():
+                    if low <= x <= high:
+                        axis.add(float(x))
+        axes[name] = np.array(sorted(axis))
+
+    values = _tabulate(system, axes, max_points)
+    if tolerance is not None:
+        for _ in range(max_rounds):
+            splits = _cells_above_tolerance(system, axes, values, tolerance)
+            if not any(len(s) for s in splits.values()):
+                break
+            refined = {name: np.union1d(axes[name], splits[name]) for name in names}
+            if np.prod([len(a) for a in refined.values()]) > max_points:
+                break
+            axes = refined
+            values = _tabulate(system, axes, max_points)
+
+    table = LookupTable(axes, values)
+    if validation:
+        rng = np.random.default_rng(seed)
+        samples = {name: rng.uniform(axes[name][0], axes[name][-1], validation) for name in names}
+        error = np.abs(table.evaluate_batch(samples) - system.evaluate_batch(samples))
+        table.max_error = float(error.max())
+        table.mean_error = float(error.mean())
+    return table
+
+
+def _tabulate(system, axes, max_points):
+    shape = tuple(len(a) for a in axes.values())
+    if np.prod(shape) > max_points:
+        raise ValueError(f"lookup table of shape {shape} exceeds max_points={max_points}")
+    mesh = np.meshgrid(*axes.values(), indexing="ij")
+    inputs = {name: m.ravel() for name, m in zip(axes, mesh)}
+    return system.evaluate_batch(inputs).reshape(shape)
+
+
+def _cells_above_tolerance(system, axes, values, tolerance):
+    """Midpoints of the intervals, per axis, where interpolation misses by more than tolerance"""
+    names = list(axes)
+    splits = {}
+    for d, name in enumerate(names):
+        axis = axes[name]
+        middles = (axis[:-1] + axis[1:]) / 2
+        grids = [middles if other == name else axes[other] for other in names]
+        mesh = np.meshgrid(*grids, indexing="ij")
+        exact = system.evaluate_batch({n: m.ravel() for n, m in zip(names, mesh)}).reshape(mesh[0].shape)
+        lower = np.take(values, np.arange(len(axis) - 1), axis=d)
+        upper = np.take(values, np.arange(1, len(axis)), axis=d)
+        error = np.abs(exact - (lower + upper) / 2)
+        worst = error.max(axis=tuple(i for i in range(len(names)) if i != d)) if len(names) > 1 else error
+        splits[name] = set(middles[worst > tolerance].tolist())
+
+    # Cell centers catch the cross terms that single-axis midpoints miss
+    centers = [(axes[name][:-1] + axes[name][1:]) / 2 for name in names]
+    mesh = np.meshgrid(*centers, indexing="ij")
+    exact = system.evaluate_batch({n: m.ravel() for n, m in zip(names, mesh)}).reshape(mesh[0].shape)
+    corners = [values[tuple(slice(b, len(axes[n]) - 1 + b) for b, n in zip(bits, names))]
+               for bits in product((0, 1), repeat=len(names))]
+    error = np.abs(exact - np.mean(corners, axis=0))
+    for d, name in enumerate(names):
+        bad = np.nonzero(error > tolerance)[d]
+        splits[name].update(centers[d][bad].tolist())
+    return {name: np.array(sorted(points)) for name, points in splits.items()}
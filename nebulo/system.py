@@ -1,48 +1,383 @@
+import numpy as np
+
 from .variables import FuzzyVariable
-from .rules import FuzzyRule
+from .rules import FuzzyRule, LinearOutput
+from .expressions import TNORMS, parse_rule
+from .rulebase import RuleBase
+from .compiled import CompiledSystem, _as_columns, _check_dtype, _signature, _split_consequent
+from .index import SupportIndex
+from .cache import EvaluationCache
+from .surrogate import build_lookup_table
+from .streaming import evaluate_stream, DEFAULT_CHUNK_SIZE
+from .parallel import evaluate_parallel
+from .storage import save_system, load_system
+from .session import EvaluationSession
+from .instrumentation import Collector, evaluate_instrumented, evaluate_batch_instrumented
+from .codegen import GeneratedSystem, generate_source
+from .pipeline import FuzzyPipeline
+from .optimizer import optimize_rules, DEFAULT_VALIDATION_SAMPLES
 
 class FuzzySystem:
-    def __init__(self, mode="sugeno"):
+    def __init__(self, mode="sugeno", defuzzification="centroid", resolution=1001, tnorm="min", dtype="float64"):
         """
         mode: 'sugeno' or 'mamdani'
+        defuzzification: Mamdani method, one of 'centroid', 'bisector',
+                         'mom', 'som', 'lom' (see Defuzzifier)
+        resolution: number of points sampled on the output universe
+        tnorm: AND of rule conditions, 'min', 'product' or 'lukasiewicz';
+               OR uses the dual s-norm (max, probabilistic or bounded sum)
+        dtype: 'float64', 'float32' or 'float16', the precision of the
+               membership degrees and rule strengths of batch evaluation
+               (evaluate_batch and everything built on it); float32
+               halves their memory traffic, float16 quarters their
+               storage but computes slower. evaluate stays in float64.
         """
+        if tnorm not in TNORMS:
+            raise ValueError(f"unknown t-norm {tnorm!r}, expected one of {TNORMS}")
         self.variables = {}
+        self.outputs = {}
         self.rules = []
         self.mode = mode
+        self.defuzzification = defuzzification
+        self.resolution = resolution
+        self.tnorm = tnorm
+        self.dtype = dtype
+        self._compiled = None
+        self._index = None
+        self._cache = None
+        self._hooks = []
+        self._session_plan = None
+        self._split = None
+        self._pipeline = None
 
     def add_variable(self, variable: FuzzyVariable):
         self.variables[variable.name] = variable
+        self._compiled = None
+
+    def add_output(self, variable: FuzzyVariable):
+        """Declare a variable Mamdani consequents refer to; with several, consequents are (output, label) pairs"""
+        self.outputs[variable.name] = variable
+        self._compiled = None
+
+    @property
+    def rules(self):
+        """The RuleBase; behaves as a list of FuzzyRule"""
+        return self._rules
+
+    @rules.setter
+    def rules(self, rules):
+        self._rules = rules if isinstance(rules, RuleBase) else RuleBase(rules)
+        self._compiled = None
+
+    @property
+    def dtype(self):
+        """np.dtype of batch evaluation; may be changed at any time, e.g. system.dtype = "float32" """
+        return self._dtype
+
+    @dtype.setter
+    def dtype(self, dtype):
+        self._dtype = _check_dtype(dtype)
 
     def add_rule(self, rule: FuzzyRule):
+        """rule: a FuzzyRule or text such as "IF a IS high AND NOT b IS low THEN 5" (see parse_rule)"""
+        if isinstance(rule, str):
+            rule = parse_rule(rule)
         self.rules.append(rule)
+        self._compiled = None
+
+    def add_rules(self, variables, terms, outputs, linear=None):
+        """
+        Add many rules at once, e.g. a generated grid.
+
+        variables: names of the k variables the conditions test
+        terms: (n_rules, k) array of term names, or of integer positions
+               in each variable's terms; None, "" or -1 skips the variable
+        outputs: n_rules consequents (constants, labels, (output, label) pairs)
+        linear: names of m input variables; outputs is then an
+                (n_rules, m + 1) array of first-order Sugeno coefficients
+                for them, followed by the bias (see LinearOutput)
+        """
+        if linear is not None:
+            outputs = [LinearOutput(dict(zip(linear, row[:-1])), row[-1]) for row in np.asarray(outputs, dtype=float).tolist()]
+        term_names = [list(self.variables[var].terms) for var in variables]
+        self.rules.add_arrays(variables, terms, outputs, term_names)
+        self._compiled = None
+
+    def optimize(self, tolerance=None, validation=None, columns=None, n_samples=DEFAULT_VALIDATION_SAMPLES, seed=None):
+        """
+        Shrink the rule base in place: drop rules that can never fire, merge
+        rules with identical antecedents and, for Mamdani, drop rules another
+        rule always outfires (see nebulo.optimizer). Outputs are unchanged up
+        to float rounding. With a tolerance, also prune rules while outputs
+        on `validation` (by default n_samples uniform draws over the
+        universes) stay within it. Returns an OptimizationReport.
+        """
+        return optimize_rules(self, tolerance, validation, columns, n_samples, seed)
+
+    def build_index(self, eps=1e-6):
+        """
+        Build a SupportIndex so `evaluate` only computes the terms and rules
+        that can fire. Terms that never reach 0 (e.g. GaussianMF) are treated
+        as 0 where their membership is below `eps`. The index is rebuilt
+        automatically when the system changes.
+        """
+        self._index = SupportIndex(self, eps)
+        return self._index
+
+    def enable_cache(self, steps=None, maxsize=4096):
+        """
+        Memoize `evaluate` (see EvaluationCache). Inputs are rounded to the
+        nearest multiple of steps[var_name] before lookup and evaluation;
+        variables without a step are matched exactly. Returns the cache,
+        whose cache_info() reports hits and misses.
+        """
+        self._cache = EvaluationCache(self, steps, maxsize)
+        return self._cache
+
+    def disable_cache(self):
+        self._cache = None
+
+    def add_hook(self, hook):
+        """
+        Report the stages of every evaluate and evaluate_batch call to
+        `hook`, a nebulo.instrumentation.Hook. Returns the hook.
+        Without hooks, evaluation runs uninstrumented at no extra cost.
+        """
+        self._hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def instrument(self, threshold=0.0):
+        """
+        Attach and return a Collector of stage times (per variable and,
+        for evaluate, per rule) and of how often each rule fires above
+        `threshold`; see Collector.as_dict and Collector.to_prometheus.
+        """
+        return self.add_hook(Collector(threshold))
+
+    def session(self, inputs=None, refresh=1024):
+        """
+        New EvaluationSession: keeps the state of the last evaluation so
+        session.update(var=value) only recomputes what the changed inputs
+        affect. Sessions of one system share its lookup tables; create one
+        per tracked entity.
+        """
+        return EvaluationSession(self, inputs, refresh)
 
     def evaluate(self, inputs: dict):
+            if self._hooks:
+                return evaluate_instrumented(self, inputs, self._hooks)
+            if self._cache is not None:
+                return self._cache.evaluate(inputs)
+            if self._index is not None:
+                if self._index.is_stale(self):
+                    self.build_index(self._index.eps)
+                active = {var: self._index.active_terms(var, inputs[var]) for var in inputs}
+                fuzzified = {var: self._index.degrees(self.variables[var], terms, inputs[var])
+                             for var, terms in active.items()}
+                rules = self._index.active_rules(active)
+                strength = self._rule_strength(fuzzified)
+                strengths = [strength(i) for i in rules]
+                if self._index.decides(strengths):
+                    return self._conclude(self._aggregate(inputs, rules, strengths))
+
             fuzzified = {var: self.variables[var].fuzzify(inputs[var]) for var in inputs}
+            return self._infer(inputs, fuzzified, range(len(self.rules)))
+
+    def _infer(self, inputs, fuzzified, rules):
+        """Combine the fired rules (indices into self.rules) given fuzzified inputs into the crisp output"""
+        strength = self._rule_strength(fuzzified)
+        return self._conclude(self._aggregate(inputs, rules, [strength(i) for i in rules]))
+
+    def _aggregate(self, inputs, rules, strengths):
+        """
+        Aggregate of `rules` firing with `strengths`: the Sugeno (weighted
+        sum, weight total) or the Mamdani {label: activation}
+        """
+        _, _, values, codes = self.rules.columns()
+        objects = self.rules.objects
+        if self.mode == "sugeno":
+            weighted_sum = 0
+            weight_total = 0
+            for i, w in zip(rules, strengths):
+                if codes[i] < 0:
+                    z = values[i]
+                else:
+                    z = objects[codes[i]]
+                    if callable(z):
+                        z = z(inputs)
+                    elif isinstance(z, tuple):
+                        raise ValueError("Sugeno rules naming their output are evaluated with evaluate_outputs")
+                weighted_sum += w * z
+                weight_total += w
+            return weighted_sum, weight_total
+        output_degrees = {}
+        for i, w in zip(rules, strengths):
+            _, label = _split_consequent(objects[codes[i]])
+            output_degrees[label] = max(output_degrees.get(label, 0), w)
+        return output_degrees
+
+    def _conclude(self, aggregated):
+        """Crisp output of an aggregate from _aggregate"""
+        if self.mode == "sugeno":
+            weighted_sum, weight_total = aggregated
+            return weighted_sum / weight_total if weight_total != 0 else 0
+        return self.compile().defuzzify(aggregated)
 
+    def _rule_strength(self, fuzzified):
+        """Function of a rule index giving its firing strength (see RuleBase.strength_function)"""
+        self.rules.columns()  # memory-mapped rules intern their slots when first read
+        # Degree of every interned (variable, term) slot; None where not fuzzified
+        degrees = [fuzzified[var].get(term) if var in fuzzified else None for var, term in self.rules.slot_names]
+        return self.rules.strength_function(degrees, self.tnorm)
+
+    def _output_variable(self, names):
+        """Output variable of Mamdani consequents naming `names` (None: unnamed)"""
+        named = {name for name in names if name is not None}
+        if len(named) > 1:
+            raise ValueError(f"rules refer to several output variables: {sorted(named)}")
+        if named:
+            name = named.pop()
+            if name in self.outputs:
+                return self.outputs[name]
+            return self.variables[name]
+        if len(self.outputs) == 1:
+            return next(iter(self.outputs.values()))
+        raise ValueError("declare the Mamdani output variable with add_output")
+
+    def split_outputs(self):
+        """
+        {output name: FuzzySystem} with the rules concluding on each output.
+        Mamdani rules name it with (output, label) consequents, Sugeno rules
+        with (output, value) ones; unnamed Sugeno consequents belong to the
+        output None. A system with one output maps it to itself; the parts
+        share this system's variables and are rebuilt after it changes.
+        """
+        signature = _signature(self)
+        if self._split is not None and self._split[0] == signature:
+            return self._split[1]
+        _, _, _, codes = self.rules.columns()
+        names = {}
+        for code in set(codes.tolist()):
+            output = self.rules.objects[code] if code >= 0 else None
             if self.mode == "sugeno":
-                weighted_sum = 0
-                weight_total = 0
-                for r in self.rules:
-                    w = r.activation(fuzzified)
-                    z = r.eval_output(inputs)
-                    weighted_sum += w * z
-                    weight_total += w
-                return weighted_sum / weight_total if weight_total != 0 else 0
+                names[code] = output[0] if isinstance(output, tuple) else None
             else:
-                output_degrees = {}
-                for r in self.rules:
-                    w = r.activation(fuzzified)
-                    _, label = r.eval_output() 
-                    output_degrees[label] = max(output_degrees.get(label, 0), w)
-                
-                numerator = 0
-                denominator = 0
-                out_var = [v for v in self.variables.values() if v.name.startswith("Risc")][0]
-                
-                for label, activation in output_degrees.items():
-                    if activation > 0:
-                        center = out_var.terms[label].b 
-                        numerator += activation * center
-                        denominator += activation
-                
-                return numerator / denominator if denominator != 0 else 0
\ No newline at end of file
+                names[code] = _split_consequent(output)[0]
+        if None in names.values() and self.mode == "mamdani":
+            default = self._output_variable([None]).name
+            names = {code: default if name is None else name for code, name in names.items()}
+        groups = {}
+        for i, code in enumerate(codes.tolist()):
+            groups.setdefault(names[code], []).append(i)
+
+        named = any(isinstance(self.rules.objects[code], tuple) for code in names if code >= 0)
+        if len(groups) <= 1 and (self.mode == "mamdani" or not named):
+            split = {next(iter(groups), None): self}
+        else:
+            split = {}
+            for name, rows in groups.items():
+                part = FuzzySystem(self.mode, self.defuzzification, self.resolution, self.tnorm, self.dtype)
+                part.variables = dict(self.variables)
+                if name in self.outputs:
+                    part.outputs[name] = self.outputs[name]
+                rules = [self.rules[i] for i in rows]
+                if self.mode == "sugeno":
+                    rules = [FuzzyRule(rule.conditions, rule.output[1], rule.weight) if isinstance(rule.output, tuple)
+                             else rule for rule in rules]
+                part.rules = rules
+                split[name] = part
+        self._split = (signature, split)
+        return split
+
+    def evaluate_outputs(self, inputs: dict):
+        """
+        {output name: crisp value} of every output in one pass; each
+        membership degree is computed once for all outputs (see split_outputs)
+        """
+        return self._outputs_pipeline().evaluate(inputs)
+
+    def evaluate_batch_outputs(self, inputs, columns=None):
+        """Vectorized counterpart of `evaluate_outputs`: {output name: 1-D array}"""
+        return self._outputs_pipeline().evaluate_batch(inputs, columns)
+
+    def _outputs_pipeline(self):
+        if self._pipeline is None:
+            self._pipeline = FuzzyPipeline()
+            self._pipeline.add(self, {None: None})
+        return self._pipeline
+
+    def compile(self):
+        """
+        Lower the rule base into index arrays (see CompiledSystem).
+        The result is cached and rebuilt automatically after add_rule,
+        add_variable or FuzzyVariable.add_term.
+        """
+        if self._compiled is None or self._compiled.is_stale(self):
+            self._compiled = CompiledSystem(self)
+        return self._compiled
+
+    def evaluate_batch(self, inputs, columns=None):
+        """
+        Vectorized counterpart of `evaluate`.
+
+        inputs: mapping {var_name: 1-D array} or a 2-D array of shape
+                (n_samples, n_columns) whose columns are named by `columns`
+        Returns a 1-D float array with one output per sample.
+        """
+        if self._hooks:
+            return evaluate_batch_instrumented(self, _as_columns(inputs, columns), self._hooks)
+        return self.compile().evaluate_batch(_as_columns(inputs, columns))
+
+    def evaluate_parallel(self, inputs, workers=None, backend="process", columns=None, chunk_size=None):
+        """
+        evaluate_batch split over `workers` processes or threads
+        (backend "process" or "thread"); see nebulo.parallel.ParallelEvaluator,
+        which also keeps the workers alive across calls.
+        """
+        return evaluate_parallel(self, inputs, workers, backend, columns, chunk_size)
+
+    def evaluate_stream(self, source, chunk_size=DEFAULT_CHUNK_SIZE, columns=None, out=None):
+        """
+        Generator evaluating `source` (records, CSV path, .npy path,
+        memory-mapped or in-memory arrays) in chunks of `chunk_size` rows
+        through evaluate_batch; see nebulo.streaming.evaluate_stream.
+        """
+        return evaluate_stream(self, source, chunk_size, columns, out)
+
+    def save(self, path):
+        """
+        Write the system to `path` in Nebulo's versioned binary format
+        (see nebulo.storage.save_system). Membership functions must be
+        built-in ones and Sugeno consequents constants.
+        """
+        save_system(self, path)
+
+    @staticmethod
+    def load(path, mmap=True):
+        """
+        Read a system written by `save`. With mmap=True the rule arrays
+        are memory-mapped read-only, so processes loading the same file
+        share them; rule objects are only created if `rules` is used.
+        """
+        return load_system(path, mmap)
+
+    def codegen(self):
+        """
+        Emit and compile straight-line evaluate / evaluate_batch functions
+        specialized to this system (see nebulo.codegen.generate_source).
+        Returns a GeneratedSystem; its `source` can be saved and loaded
+        back without generating again. Regenerate after changing the system.
+        """
+        return GeneratedSystem(generate_source(self))
+
+    def to_lut(self, resolution=33, tolerance=None, refine=True, universes=None, **options):
+        """
+        Tabulate the system into a LookupTable evaluated by multilinear
+        interpolation (see build_lookup_table for all options). The table's
+        max_error reports the largest deviation from this system observed
+        on random validation samples.
+        """
+        return build_lookup_table(self, resolution, tolerance, refine, universes, **options)
@@ -1,3 +1,30 @@
+import numpy as np
+
+
 def compute_weekly_trend(current, previous):
-    """Compute the slope from one week to the next"""
-    return current - previous
\ No newline at end of file
+    """Compute the slope from one week to the next
+
+    For streams, nebulo.features.Delta(source, 7) computes it on every
+    tick, alongside moving averages, slopes and volatility.
+    """
+    return current - previous
+
+
+def compute_surface(system, x_var, y_var, resolution=30, fixed=None, x_range=None, y_range=None):
+    """
+    Decision surface of `system` over two inputs, in one evaluate_batch call.
+
+    resolution: points per axis, or an (nx, ny) pair
+    fixed: {var_name: value} for the other inputs the rules use
+    x_range, y_range: (low, high), by default the variables' universes
+    Returns X, Y, Z arrays of shape (ny, nx) as from np.meshgrid, with
+    Z[i, j] the output at (X[i, j], Y[i, j]); ready for plot_surface.
+    """
+    nx, ny = (resolution, resolution) if np.ndim(resolution) == 0 else resolution
+    x_range = x_range if x_range is not None else system.variables[x_var].universe
+    y_range = y_range if y_range is not None else system.variables[y_var].universe
+    X, Y = np.meshgrid(np.linspace(*x_range, nx), np.linspace(*y_range, ny))
+    inputs = {name: np.full(X.size, float(value)) for name, value in (fixed or {}).items()}
+    inputs[x_var] = X.ravel()
+    inputs[y_var] = Y.ravel()
+    return X, Y, system.evaluate_batch(inputs).reshape(X.shape)
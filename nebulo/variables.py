@@ -1,12 +1,40 @@
+from math import isfinite
+
 from .membership import MembershipFunction
 
 class FuzzyVariable:
-    def __init__(self, name):
+    __slots__ = ("name", "terms", "_universe", "_version")
+
+    def __init__(self, name, universe=None):
+        """
+        universe: optional (low, high) range of the variable; when omitted it
+                  is derived from the supports of the terms
+        """
         self.name = name
         self.terms = {}  # {"low": MF, "medium": MF, ...}
+        self._universe = tuple(universe) if universe is not None else None
+        self._version = 0  # bumped on every change so compiled systems can detect it
         
     def add_term(self, term_name, mf: MembershipFunction):
         self.terms[term_name] = mf
+        self._version += 1
         
+    @property
+    def universe(self):
+        if self._universe is not None:
+            return self._universe
+        supports = [mf.support() for mf in self.terms.values()]
+        if not supports:
+            raise ValueError(f"variable {self.name!r} has no terms")
+        low = min(lo for lo, _ in supports)
+        high = max(hi for _, hi in supports)
+        if not (isfinite(low) and isfinite(high)):
+            raise ValueError(f"variable {self.name!r} needs an explicit universe")
+        return (low, high)
+
     def fuzzify(self, value):
-        return {term: mf.evaluate(value) for term, mf in self.terms.items()}
\ No newline at end of file
+        return {term: mf.evaluate(value) for term, mf in self.terms.items()}
+
+    def fuzzify_batch(self, values):
+        """Membership degrees of every term for an array of values"""
+        return {term: mf.evaluate_array(values) for term, mf in self.terms.items()}
@@ -16,5 +16,6 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
+    install_requires=['numpy>=1.17'],
     python_requires='>=3.6',
 )
\ No newline at end of file
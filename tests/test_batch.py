@@ -0,0 +1,92 @@
+import unittest
+
+import numpy as np
+
+from nebulo.membership import TriangularMF, TrapezoidalMF, GaussianMF
+from nebulo.variables import FuzzyVariable
+from nebulo.rules import FuzzyRule
+from nebulo.system import FuzzySystem
+
+
+def build_system(mode, mf="triangular"):
+    shapes = {
+        "triangular": lambda lo, mid, hi: TriangularMF(lo, mid, hi),
+        "trapezoidal": lambda lo, mid, hi: TrapezoidalMF(lo, (lo + mid) / 2, (mid + hi) / 2, hi),
+        "gaussian": lambda lo, mid, hi: GaussianMF(mid, (hi - lo) / 4),
+    }[mf]
+    buget = FuzzyVariable("Buget_Lunar")
+    buget.add_term("scazut", shapes(0, 1000, 2000))
+    buget.add_term("mediu", shapes(1000, 3000, 5000))
+    buget.add_term("ridicat", shapes(3000, 5000, 5000))
+
+    cost = FuzzyVariable("Cost_Actual")
+    cost.add_term("mic", shapes(0, 500, 1500))
+    cost.add_term("moderat", shapes(500, 2500, 4500))
+    cost.add_term("mare", shapes(3500, 5000, 5000))
+
+    risc = FuzzyVariable("Risc")
+    risc.add_term("scazut", TriangularMF(0, 0, 45))
+    risc.add_term("mediu", TriangularMF(30, 50, 70))
+    risc.add_term("ridicat", TriangularMF(60, 100, 100))
+
+    system = FuzzySystem(mode=mode)
+    system.add_variable(buget)
+    system.add_variable(cost)
+    system.add_variable(risc)
+
+    labels = [["scazut", "mediu", "ridicat"],
+              ["scazut", "mediu", "ridicat"],
+              ["scazut", "scazut", "mediu"]]
+    values = {"scazut": 0, "mediu": 50, "ridicat": 100}
+    for i, b in enumerate(["scazut", "mediu", "ridicat"]):
+        for j, c in enumerate(["mic", "moderat", "mare"]):
+            label = labels[i][j]
+            output = ("Risc", label) if mode == "mamdani" else values[label]
+            system.add_rule(FuzzyRule([("Buget_Lunar", b), ("Cost_Actual", c)], output))
+    return system
+
+
+class TestEvaluateBatch(unittest.TestCase):
+
+    def setUp(self):
+        grid = np.linspace(0, 5000, 23)
+        x1, x2 = np.meshgrid(grid, grid)
+        self.inputs = {"Buget_Lunar": x1.ravel(), "Cost_Actual": x2.ravel()}
+
+    def assertMatchesScalar(self, system, inputs):
+        batch = system.evaluate_batch(inputs)
+        names = list(inputs)
+        expected = [system.evaluate(dict(zip(names, row)))
+                    for row in zip(*(inputs[n].tolist() for n in names))]
+        np.testing.assert_allclose(batch, expected, rtol=0, atol=1e-12)
+
+    def test_sugeno_matches_evaluate(self):
+        for mf in ("triangular", "trapezoidal", "gaussian"):
+            with self.subTest(mf=mf):
+                self.assertMatchesScalar(build_system("sugeno", mf), self.inputs)
+
+    def test_mamdani_matches_evaluate(self):
+        for mf in ("triangular", "trapezoidal", "gaussian"):
+            with self.subTest(mf=mf):
+                self.assertMatchesScalar(build_system("mamdani", mf), self.inputs)
+
+    def test_callable_consequent(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")],
+                                  lambda inputs: inputs["Cost_Actual"] / 100))
+        self.assertMatchesScalar(system, self.inputs)
+
+    def test_2d_array_with_columns(self):
+        system = build_system("sugeno")
+        data = np.column_stack([self.inputs["Buget_Lunar"], self.inputs["Cost_Actual"]])
+        np.testing.assert_array_equal(
+            system.evaluate_batch(data, columns=["Buget_Lunar", "Cost_Actual"]),
+            system.evaluate_batch(self.inputs))
+
+    def test_mismatched_lengths(self):
+        system = build_system("sugeno")
+        with self.assertRaises(ValueError):
+            system.evaluate_batch({"Buget_Lunar": [1, 2], "Cost_Actual": [1]})
+
+if __name__ == '__main__':
+    unittest.main()
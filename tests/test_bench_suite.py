@@ -0,0 +1,139 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmarks.comparisons import COMPARISONS, tsk_systems
+from benchmarks.suite import (
+    MF_TYPES,
+    QUICK_AXES,
+    QUICK_BASE,
+    STAGES,
+    cases,
+    compare,
+    main,
+    read_results,
+    run_case,
+    stage_call,
+    synthetic_system,
+)
+
+
+class TestSyntheticSystems(unittest.TestCase):
+
+    def test_shape_and_consistency(self):
+        rng = np.random.default_rng(3)
+        for mode in ("sugeno", "mamdani"):
+            for mf in MF_TYPES:
+                with self.subTest(mode=mode, mf=mf):
+                    system = synthetic_system(3, 4, 25, mf, mode)
+                    self.assertEqual(list(system.variables), ["x0", "x1", "x2"])
+                    self.assertEqual(len(system.rules), 25)
+                    inputs = {name: rng.uniform(0, 100, 20) for name in system.variables}
+                    scalar = [system.evaluate({name: float(v[i]) for name, v in inputs.items()})
+                              for i in range(20)]
+                    np.testing.assert_allclose(system.evaluate_batch(inputs), scalar, atol=1e-9)
+
+    def test_cases_vary_one_axis_at_a_time(self):
+        one_at_a_time = cases(QUICK_AXES, base=QUICK_BASE)
+        self.assertIn(QUICK_BASE, one_at_a_time)
+        self.assertEqual(len(one_at_a_time), len({json.dumps(c, sort_keys=True) for c in one_at_a_time}))
+        for case in one_at_a_time:
+            self.assertLessEqual(sum(case[k] != QUICK_BASE[k] for k in QUICK_BASE), 1)
+        product_size = np.prod([len(v) for v in QUICK_AXES.values()])
+        self.assertEqual(len(cases(QUICK_AXES, full=True)), product_size)
+
+
+class TestStages(unittest.TestCase):
+
+    def test_stages_chain_to_evaluate_batch(self):
+        systems = [synthetic_system(3, 4, 25, mode=mode) for mode in ("sugeno", "mamdani")] + [tsk_systems()[0]]
+        rng = np.random.default_rng(4)
+        for system in systems:
+            with self.subTest(mode=system.mode, rules=len(system.rules)):
+                inputs = {name: rng.uniform(0, 100, 30) for name in system.variables}
+                compiled = system.compile()
+                aggregated = stage_call(system, "inference", inputs)[0]()
+                expected = compiled.evaluate_batch(inputs)
+                np.testing.assert_array_equal(compiled.defuzzify_batch(aggregated, 30), expected)
+                np.testing.assert_array_equal(stage_call(system, "defuzzification", inputs)[0](), expected)
+
+
+class TestComparisons(unittest.TestCase):
+
+    def test_every_variant_runs(self):
+        for name, comparison in COMPARISONS.items():
+            with self.subTest(comparison=name):
+                labels = []
+                for label, params, variants in comparison(quick=True):
+                    labels.append(label)
+                    self.assertIsInstance(params, dict)
+                    for call, rows in variants.values():
+                        self.assertGreater(rows, 0)
+                        call()
+                self.assertTrue(labels)
+                self.assertEqual(len(labels), len(set(labels)))
+
+    def test_results_like_the_cases(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            argv = ["--compare", "rulebase", "storage", "--quick", "--min-time", "0"]
+            self.assertEqual(main(argv + ["--output", path]), 0)
+            results = read_results(path)
+            self.assertEqual({r["case"].split("-")[0] for r in results}, {"rulebase", "storage"})
+            self.assertEqual([r["stage"] for r in results if r["case"] == "rulebase-v3"],
+                             ["list", "add_rule", "add_rules"])
+            for result in results:
+                self.assertGreater(result["throughput"], 0)
+            self.assertEqual(main(argv + ["--baseline", path, "--threshold", "100"]), 0)
+
+
+class TestResults(unittest.TestCase):
+
+    def test_every_stage_is_measured(self):
+        for mode in ("sugeno", "mamdani"):
+            case = dict(QUICK_BASE, n_rules=10, batch=50, mode=mode)
+            results = run_case(case, min_time=0)
+            self.assertEqual([r["stage"] for r in results], list(STAGES))
+            for result in results:
+                self.assertGreater(result["throughput"], 0)
+                self.assertLessEqual(result["latency"]["p50"], result["latency"]["p99"])
+                self.assertGreaterEqual(result["peak_memory"], 0)
+
+    def test_compare_flags_regressions(self):
+        old = [{"case": "a", "stage": "evaluate", "throughput": 1000.0, "peak_memory": 100},
+               {"case": "b", "stage": "evaluate", "throughput": 1000.0, "peak_memory": 100}]
+        new = [{"case": "a", "stage": "evaluate", "throughput": 950.0, "peak_memory": 110},
+               {"case": "b", "stage": "evaluate", "throughput": 500.0, "peak_memory": 200},
+               {"case": "c", "stage": "evaluate", "throughput": 1.0, "peak_memory": 1}]
+        regressions = compare(new, old, threshold=0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(line.startswith("b evaluate") for line in regressions))
+
+    def test_json_round_trip_and_exit_status(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            argv = ["--quick", "--stages", "evaluate_batch", "--min-time", "0"]
+            self.assertEqual(main(argv + ["--output", path]), 0)
+            results = read_results(path)
+            with open(path) as handle:
+                self.assertIn("numpy", json.load(handle)["environment"])
+            self.assertEqual({r["stage"] for r in results}, {"evaluate_batch"})
+
+            for result in results:
+                result["throughput"] *= 1000
+            with open(path, "w") as handle:
+                json.dump({"results": results}, handle)
+            self.assertEqual(main(argv + ["--baseline", path]), 1)
+
+            for content in ["", '{"results": []}']:
+                with open(path, "w") as handle:
+                    handle.write(content)
+                with self.assertRaisesRegex(ValueError, "results.json"):
+                    read_results(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from nebulo.membership import TriangularMF
+from nebulo.rules import FuzzyRule
+from tests.test_batch import build_system
+
+
+class TestEvaluationCache(unittest.TestCase):
+
+    def test_exact_inputs(self):
+        for mode in ("sugeno", "mamdani"):
+            with self.subTest(mode=mode):
+                system = build_system(mode)
+                inputs = {"Buget_Lunar": 1234.5, "Cost_Actual": 987.6}
+                expected = system.evaluate(inputs)
+                cache = system.enable_cache()
+                self.assertEqual(system.evaluate(inputs), expected)
+                self.assertEqual(system.evaluate(dict(reversed(list(inputs.items())))), expected)
+                info = cache.cache_info()
+                self.assertEqual((info["outputs"].hits, info["outputs"].misses), (1, 1))
+                self.assertEqual((info["fuzzify"].hits, info["fuzzify"].misses), (0, 2))
+
+    def test_quantized_inputs_share_entries(self):
+        system = build_system("sugeno")
+        expected = system.evaluate({"Buget_Lunar": 1200, "Cost_Actual": 1000})
+        cache = system.enable_cache(steps={"Buget_Lunar": 50, "Cost_Actual": 50})
+        self.assertEqual(system.evaluate({"Buget_Lunar": 1210.3, "Cost_Actual": 990.2}), expected)
+        self.assertEqual(system.evaluate({"Buget_Lunar": 1189.9, "Cost_Actual": 1012.5}), expected)
+        system.evaluate({"Buget_Lunar": 1200, "Cost_Actual": 2000})
+        info = cache.cache_info()
+        self.assertEqual((info["outputs"].hits, info["outputs"].currsize), (1, 2))
+        self.assertEqual(info["fuzzify"].hits, 1)
+
+    def test_lru_eviction(self):
+        system = build_system("sugeno")
+        cache = system.enable_cache(maxsize=2)
+        for budget in (100, 200, 100, 300, 200):
+            system.evaluate({"Buget_Lunar": budget, "Cost_Actual": 1000})
+        info = cache.cache_info()["outputs"]
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 4, 2))
+
+    def test_invalidated_by_changes(self):
+        system = build_system("sugeno")
+        system.enable_cache()
+        inputs = {"Buget_Lunar": 4000, "Cost_Actual": 4000}
+        before = system.evaluate(inputs)
+        system.add_rule(FuzzyRule([("Cost_Actual", "mare")], 0))
+        after_rule = system.evaluate(inputs)
+        self.assertLess(after_rule, before)
+        system.variables["Cost_Actual"].add_term("mare", TriangularMF(4500, 5000, 5000))
+        after_term = system.evaluate(inputs)
+        system.disable_cache()
+        self.assertEqual(after_term, system.evaluate(inputs))
+        self.assertNotEqual(after_term, after_rule)
+
+if __name__ == '__main__':
+    unittest.main()
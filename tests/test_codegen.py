@@ -0,0 +1,134 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from nebulo.codegen import GeneratedSystem
+from nebulo.membership import TriangularMF
+from nebulo.rules import FuzzyRule, LinearOutput
+from nebulo.system import FuzzySystem
+from nebulo.variables import FuzzyVariable
+from tests.test_batch import build_system
+from tests.test_expressions import expression_system
+from tests.test_storage import every_kind_system
+
+
+def samples(system, n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return {name: rng.uniform(*var.universe, n) for name, var in system.variables.items()
+            if name in system.compile().used_variables}
+
+
+def rows(inputs):
+    names = list(inputs)
+    return [dict(zip(names, values)) for values in zip(*(inputs[n].tolist() for n in names))]
+
+
+class TestCodegen(unittest.TestCase):
+
+    def assertMatches(self, system, generated=None, inputs=None):
+        generated = generated or system.codegen()
+        inputs = inputs if inputs is not None else samples(system)
+        expected = np.array([system.evaluate(row) for row in rows(inputs)])
+        np.testing.assert_allclose([generated.evaluate(row) for row in rows(inputs)], expected, rtol=1e-12, atol=1e-12)
+        values = [generated.evaluate_values(*(row[name] for name in generated.inputs)) for row in rows(inputs)]
+        np.testing.assert_allclose(values, expected, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(generated.evaluate_batch(inputs), system.evaluate_batch(inputs),
+                                   rtol=1e-12, atol=1e-12)
+
+    def test_examples(self):
+        for mode in ["sugeno", "mamdani"]:
+            for mf in ["triangular", "trapezoidal", "gaussian"]:
+                with self.subTest(mode=mode, mf=mf):
+                    system = build_system(mode, mf)
+                    grid = np.linspace(0, 5000, 41)
+                    x1, x2 = np.meshgrid(grid, grid)  # includes the term breakpoints
+                    self.assertMatches(system, inputs={"Buget_Lunar": x1.ravel(), "Cost_Actual": x2.ravel()})
+
+    def test_every_membership_function(self):
+        system = every_kind_system()
+        rng = np.random.default_rng(2)
+        self.assertMatches(system, inputs={"x": rng.uniform(-1, 11, 300), "y": rng.uniform(-1, 11, 300)})
+
+    def test_defuzzification_methods(self):
+        for method in ["bisector", "mom", "som", "lom"]:
+            with self.subTest(method=method):
+                system = build_system("mamdani", "gaussian")
+                system.defuzzification = method
+                self.assertMatches(system, inputs=samples(system, 50))
+
+    def test_expressions_and_tnorms(self):
+        for mode in ["sugeno", "mamdani"]:
+            for tnorm in ["min", "product", "lukasiewicz"]:
+                with self.subTest(mode=mode, tnorm=tnorm):
+                    self.assertMatches(expression_system(mode, tnorm))
+
+    def test_linear_consequents(self):
+        system = build_system("sugeno")
+        system.rules = [FuzzyRule(rule.conditions, LinearOutput({"Cost_Actual": 0.01 * k, "Buget_Lunar": -0.002}, k))
+                        for k, rule in enumerate(system.rules)]
+        self.assertMatches(system)
+
+    def test_straight_line(self):
+        source = build_system("sugeno").codegen().source
+        scalar = source[source.index("def evaluate_values"):source.index("def evaluate_batch")]
+        self.assertNotIn("for ", scalar)
+        self.assertNotIn("while ", scalar)
+        self.assertIn("TriangularMF(0, 1000, 2000)", source)
+
+    def test_many_rules(self):
+        system = FuzzySystem()
+        for name in ["a", "b", "c"]:
+            var = FuzzyVariable(name, (0, 100))
+            for t in range(10):
+                var.add_term(f"t{t}", TriangularMF(t * 11 - 11, t * 11, t * 11 + 11))
+            system.add_variable(var)
+        terms = np.stack(np.meshgrid(range(10), range(10), range(10)), axis=-1).reshape(-1, 3)
+        system.add_rules(["a", "b", "c"], terms, np.arange(1000) % 17)
+        self.assertMatches(system, inputs=samples(system, 50))
+
+    def test_save_and_load(self):
+        system = build_system("mamdani")
+        generated = system.codegen()
+        inputs = samples(system, 50)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "risk_model.py")
+            generated.save(path)
+            loaded = GeneratedSystem.load(path)
+            self.assertEqual(loaded.source, generated.source)
+            self.assertMatches(system, loaded, inputs)
+            spec = importlib.util.spec_from_file_location("risk_model", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            np.testing.assert_allclose(module.evaluate_batch(inputs), system.evaluate_batch(inputs))
+
+    def test_snapshot(self):
+        system = build_system("sugeno")
+        generated = system.codegen()
+        point = {"Buget_Lunar": 1800.0, "Cost_Actual": 1200.0}
+        before = system.evaluate(point)
+        system.rules[0] = FuzzyRule(system.rules[0].conditions, 75)
+        self.assertEqual(generated.evaluate(point), before)
+        self.assertNotEqual(system.codegen().evaluate(point), before)
+
+    def test_errors(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], lambda x: x["Cost_Actual"] / 100))
+        with self.assertRaises(ValueError):
+            system.codegen()
+
+        class Step(TriangularMF):
+            pass
+
+        system = build_system("sugeno")
+        system.variables["Buget_Lunar"].add_term("mediu", Step(1000, 3000, 5000))
+        with self.assertRaises(ValueError):
+            system.codegen()
+        with self.assertRaises(KeyError):
+            build_system("sugeno").codegen().evaluate({"Buget_Lunar": 100.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
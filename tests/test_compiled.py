@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+
+from nebulo.membership import TriangularMF
+from nebulo.variables import FuzzyVariable
+from nebulo.rules import FuzzyRule
+from nebulo.system import FuzzySystem
+from nebulo.compiled import GATHER_MAX_SAMPLES
+
+from tests.test_batch import build_system
+
+
+class TestCompile(unittest.TestCase):
+
+    def setUp(self):
+        self.system = build_system("sugeno")
+        self.inputs = {"Buget_Lunar": np.array([500.0, 2500.0, 4200.0]),
+                       "Cost_Actual": np.array([300.0, 2600.0, 4900.0])}
+
+    def test_index_arrays(self):
+        compiled = self.system.compile()
+        self.assertEqual(compiled.antecedents.shape, (9, 2))
+        self.assertEqual(compiled.consequents.shape, (9,))
+        first = [compiled.slots[c] for c in self.system.rules[0].conditions]
+        self.assertEqual(compiled.antecedents[0].tolist(), first)
+
+    def test_cached_until_changed(self):
+        compiled = self.system.compile()
+        self.assertIs(self.system.compile(), compiled)
+
+        self.system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], 25))
+        self.assertIsNot(self.system.compile(), compiled)
+
+        compiled = self.system.compile()
+        self.system.variables["Cost_Actual"].add_term("urias", TriangularMF(4500, 5000, 5000))
+        self.assertIsNot(self.system.compile(), compiled)
+
+        compiled = self.system.compile()
+        self.system.add_variable(FuzzyVariable("Extra"))
+        self.assertIsNot(self.system.compile(), compiled)
+
+    def test_results_follow_new_rules(self):
+        before = self.system.evaluate_batch(self.inputs)
+        self.system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], 1000))
+        after = self.system.evaluate_batch(self.inputs)
+        self.assertGreater(after[1], before[1])
+        self.assertEqual(after[1], self.system.evaluate({"Buget_Lunar": 2500.0, "Cost_Actual": 2600.0}))
+
+    def test_gather_and_row_paths_agree(self):
+        rng = np.random.default_rng(1)
+        n = GATHER_MAX_SAMPLES * 2
+        inputs = {"Buget_Lunar": rng.uniform(0, 5000, n), "Cost_Actual": rng.uniform(0, 5000, n)}
+        compiled = self.system.compile()
+        fuzzified = compiled.fuzzify(inputs, n)
+        large = compiled.activations(fuzzified)
+        small = compiled.activations(np.ascontiguousarray(fuzzified[:, :10]))
+        np.testing.assert_array_equal(small, large[:, :10])
+
+    def test_mixed_rule_lengths(self):
+        system = FuzzySystem(mode="sugeno")
+        x = FuzzyVariable("x")
+        x.add_term("low", TriangularMF(0, 0, 10))
+        x.add_term("high", TriangularMF(0, 10, 10))
+        y = FuzzyVariable("y")
+        y.add_term("low", TriangularMF(0, 0, 10))
+        system.add_variable(x)
+        system.add_variable(y)
+        system.add_rule(FuzzyRule([("x", "low")], 1))
+        system.add_rule(FuzzyRule([("x", "high"), ("y", "low")], 5))
+        for xv, yv in [(2, 3), (7, 1), (9, 9)]:
+            batch = system.evaluate_batch({"x": [xv], "y": [yv]})
+            self.assertAlmostEqual(batch[0], system.evaluate({"x": xv, "y": yv}))
+
+if __name__ == '__main__':
+    unittest.main()
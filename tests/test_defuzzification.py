@@ -0,0 +1,110 @@
+import unittest
+
+import numpy as np
+
+from nebulo.membership import TriangularMF, TrapezoidalMF, GaussianMF, PiecewiseLinearMF
+from nebulo.variables import FuzzyVariable
+from nebulo.rules import FuzzyRule
+from nebulo.system import FuzzySystem
+from nebulo.defuzzification import Defuzzifier
+
+from tests.test_batch import build_system
+
+
+def risk_variable(universe=None):
+    risc = FuzzyVariable("Risc", universe)
+    risc.add_term("scazut", TriangularMF(0, 0, 45))
+    risc.add_term("mediu", PiecewiseLinearMF([(30, 0), (45, 0.5), (55, 0.5), (70, 0)]))
+    risc.add_term("ridicat", TrapezoidalMF(60, 85, 100, 100))
+    risc.add_term("larg", TriangularMF(20, 50, 80))
+    return risc
+
+
+class TestDefuzzifier(unittest.TestCase):
+
+    def test_full_triangle_centroid(self):
+        var = FuzzyVariable("y")
+        var.add_term("t", TriangularMF(10, 40, 100))
+        centroid = Defuzzifier(var, ["t"]).defuzzify_one([1.0])
+        self.assertAlmostEqual(centroid, 50.0, places=9)
+
+    def test_exact_centroid_matches_fine_grid(self):
+        rng = np.random.default_rng(0)
+        for universe in (None, (10, 90)):
+            var = risk_variable(universe)
+            exact = Defuzzifier(var, list(var.terms))
+            sampled = Defuzzifier(var, list(var.terms), resolution=1_000_001)
+            sampled.exact = False
+            degrees = rng.uniform(0, 1, (4, 40))
+            degrees[degrees < 0.3] = 0
+            batch = exact.defuzzify(degrees)
+            np.testing.assert_allclose(batch, sampled.defuzzify(degrees), atol=1e-3)
+            single = [exact.defuzzify_one(column.tolist()) for column in degrees.T]
+            np.testing.assert_allclose(batch, single, rtol=0, atol=1e-10)
+
+    def test_maximum_methods(self):
+        var = FuzzyVariable("y", (0, 100))
+        var.add_term("low", TrapezoidalMF(0, 10, 30, 40))
+        var.add_term("high", TrapezoidalMF(50, 60, 80, 90))
+        degrees = [[0.4], [0.8]]
+        self.assertAlmostEqual(Defuzzifier(var, ["low", "high"], "som").defuzzify(degrees)[0], 58.0)
+        self.assertAlmostEqual(Defuzzifier(var, ["low", "high"], "lom").defuzzify(degrees)[0], 82.0)
+        self.assertAlmostEqual(Defuzzifier(var, ["low", "high"], "mom").defuzzify(degrees)[0], 70.0)
+
+    def test_bisector_of_symmetric_set(self):
+        var = FuzzyVariable("y", (0, 100))
+        var.add_term("mid", TriangularMF(20, 50, 80))
+        self.assertAlmostEqual(Defuzzifier(var, ["mid"], "bisector").defuzzify_one([0.7]), 50.0, places=1)
+
+    def test_nothing_fired(self):
+        var = risk_variable()
+        self.assertEqual(Defuzzifier(var, list(var.terms)).defuzzify_one([0, 0, 0, 0]), 0.0)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            Defuzzifier(risk_variable(), ["scazut"], "median")
+
+
+class TestMamdaniSystem(unittest.TestCase):
+
+    def test_gaussian_output_terms(self):
+        system = build_system("mamdani")
+        risc = FuzzyVariable("Risc", (0, 100))
+        risc.add_term("scazut", GaussianMF(0, 15))
+        risc.add_term("mediu", GaussianMF(50, 10))
+        risc.add_term("ridicat", GaussianMF(100, 15))
+        system.add_output(risc)
+        inputs = {"Buget_Lunar": np.linspace(0, 5000, 40), "Cost_Actual": np.linspace(5000, 0, 40)}
+        batch = system.evaluate_batch(inputs)
+        expected = [system.evaluate({"Buget_Lunar": x, "Cost_Actual": y})
+                    for x, y in zip(inputs["Buget_Lunar"], inputs["Cost_Actual"])]
+        np.testing.assert_allclose(batch, expected, atol=1e-12)
+        self.assertTrue(np.all((batch >= 0) & (batch <= 100)))
+
+    def test_all_methods_batch_matches_scalar(self):
+        inputs = {"Buget_Lunar": np.linspace(0, 5000, 25), "Cost_Actual": np.linspace(0, 5000, 25)[::-1]}
+        for method in ("centroid", "bisector", "mom", "som", "lom"):
+            with self.subTest(method=method):
+                system = build_system("mamdani")
+                system.defuzzification = method
+                expected = [system.evaluate({"Buget_Lunar": x, "Cost_Actual": y})
+                            for x, y in zip(inputs["Buget_Lunar"], inputs["Cost_Actual"])]
+                np.testing.assert_allclose(system.evaluate_batch(inputs), expected, atol=1e-9)
+
+    def test_output_must_be_declared_for_bare_labels(self):
+        system = FuzzySystem(mode="mamdani")
+        x = FuzzyVariable("x")
+        x.add_term("low", TriangularMF(0, 0, 10))
+        system.add_variable(x)
+        system.add_rule(FuzzyRule([("x", "low")], "quiet"))
+        with self.assertRaises(ValueError):
+            system.evaluate({"x": 3})
+
+        out = FuzzyVariable("volume")
+        out.add_term("quiet", TriangularMF(0, 0, 30))
+        system.add_output(out)
+        self.assertAlmostEqual(system.evaluate({"x": 0.0}), 0.0)
+        self.assertAlmostEqual(system.evaluate({"x": 5.0}), system.evaluate_batch({"x": [5.0]})[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from nebulo.learning import grid_partition
+from nebulo.pipeline import FuzzyPipeline
+from nebulo.rules import FuzzyRule, LinearOutput
+from nebulo.system import FuzzySystem
+from benchmarks.suite import synthetic_system
+from tests.test_batch import build_system
+from tests.test_expressions import expression_system, samples, scalar
+from tests.test_storage import every_kind_system
+
+# Stated accuracy of batch evaluation against float64 FuzzySystem.evaluate,
+# as a fraction of the output range (0..100 for the systems below)
+TOLERANCE = {"float32": 1e-5, "float16": 2e-3}
+
+
+def accuracy_systems():
+    """The example systems (build_system), expression rules under every t-norm and synthetic rule bases"""
+    systems = {}
+    for mode in ["sugeno", "mamdani"]:
+        for mf in ["triangular", "trapezoidal", "gaussian"]:
+            systems[f"{mode} {mf}"] = build_system(mode, mf)
+            systems[f"synthetic {mode} {mf}"] = synthetic_system(2, 5, 20, mf=mf, mode=mode, seed=1)
+        for tnorm in ["min", "product", "lukasiewicz"]:
+            systems[f"{mode} expressions {tnorm}"] = expression_system(mode, tnorm)
+        systems[f"wide {mode}"] = wide_system(mode)
+    return systems
+
+
+def wide_system(mode):
+    """A synthetic rule base over inputs in [0, 1e5], beyond float16 precision"""
+    system = synthetic_system(2, 5, 20, mode=mode, seed=1)
+    for name in ["x0", "x1"]:
+        system.add_variable(grid_partition(name, (0, 1e5), 5))
+    return system
+
+
+def inputs_for(system, n=300, seed=0):
+    if "Buget_Lunar" in system.variables:
+        return samples(n, seed)
+    rng = np.random.default_rng(seed)
+    return {name: rng.uniform(*var.universe, n) for name, var in system.variables.items()}
+
+
+def reference(system, inputs):
+    names = list(inputs)
+    return np.array([system.evaluate(dict(zip(names, row))) for row in zip(*(inputs[n].tolist() for n in names))])
+
+
+class TestAccuracy(unittest.TestCase):
+
+    def test_against_float64_evaluate(self):
+        for name, system in accuracy_systems().items():
+            inputs = inputs_for(system)
+            expected = reference(system, inputs)
+            for dtype, tolerance in TOLERANCE.items():
+                with self.subTest(system=name, dtype=dtype):
+                    system.dtype = dtype
+                    outputs = system.evaluate_batch(inputs)
+                    self.assertEqual(outputs.dtype, np.float64)
+                    np.testing.assert_allclose(outputs, expected, rtol=0, atol=tolerance * 100)
+                    system.dtype = "float64"
+
+    def test_instrumented(self):
+        for name, system in accuracy_systems().items():
+            inputs = inputs_for(system, 100)
+            expected = reference(system, inputs)
+            collector = system.instrument()
+            for dtype, tolerance in TOLERANCE.items():
+                with self.subTest(system=name, dtype=dtype):
+                    system.dtype = dtype
+                    np.testing.assert_allclose(system.evaluate_batch(inputs), expected, rtol=0, atol=tolerance * 100)
+            self.assertEqual(collector.as_dict()["stages"]["evaluate"]["calls"], len(TOLERANCE))
+
+    def test_pipelines(self):
+        systems = accuracy_systems()
+        for dtype, tolerance in TOLERANCE.items():
+            for name, system in systems.items():
+                with self.subTest(system=name, dtype=dtype):
+                    inputs = inputs_for(system, 100)
+                    expected = reference(system, inputs)
+                    system.dtype = dtype
+                    pipeline = FuzzyPipeline()
+                    pipeline.add(system, "out")
+                    np.testing.assert_allclose(pipeline.evaluate_batch(inputs)["out"], expected,
+                                               rtol=0, atol=tolerance * 100)
+                    system.dtype = "float64"
+
+    def test_every_membership_function(self):
+        system = every_kind_system()
+        rng = np.random.default_rng(0)
+        inputs = {"x": rng.uniform(0, 10, 500), "y": rng.uniform(0, 10, 500)}
+        expected = reference(system, inputs)
+        span = np.ptp(expected)
+        for dtype, tolerance in TOLERANCE.items():
+            with self.subTest(dtype=dtype):
+                system.dtype = dtype
+                np.testing.assert_allclose(system.evaluate_batch(inputs), expected, rtol=0, atol=tolerance * span)
+
+    def test_linear_consequents(self):
+        system = build_system("sugeno")
+        system.rules = [FuzzyRule(rule.conditions, LinearOutput({"Buget_Lunar": 0.01 * i, "Cost_Actual": -0.005}, 20))
+                        for i, rule in enumerate(system.rules)]
+        inputs = samples(300)
+        expected = scalar(system, inputs)
+        system.dtype = "float32"
+        np.testing.assert_allclose(system.evaluate_batch(inputs), expected, rtol=1e-5, atol=1e-4)
+
+    def test_grid_methods_within_one_step(self):
+        inputs = samples(300)
+        for method in ["bisector", "mom", "som", "lom"]:
+            system = build_system("mamdani")
+            system.defuzzification = method
+            expected = scalar(system, inputs)
+            step = 100 / (system.resolution - 1)
+            for dtype in TOLERANCE:
+                with self.subTest(method=method, dtype=dtype):
+                    system.dtype = dtype
+                    np.testing.assert_allclose(system.evaluate_batch(inputs), expected, rtol=0, atol=step * 1.001)
+
+
+class TestStorage(unittest.TestCase):
+
+    def test_arrays_use_dtype(self):
+        inputs = samples(1000)
+        for mode in ["sugeno", "mamdani"]:
+            system = expression_system(mode)
+            compiled = system.compile()
+            fuzzified = compiled.fuzzify(inputs, 1000)
+            strengths = compiled.activations(fuzzified)
+            for dtype in ["float32", "float16"]:
+                with self.subTest(mode=mode, dtype=dtype):
+                    system.dtype = dtype
+                    narrow = system.compile()
+                    self.assertIsNot(narrow, compiled)
+                    reduced = narrow.fuzzify(inputs, 1000)
+                    self.assertEqual(reduced.dtype, np.dtype(dtype))
+                    self.assertEqual(reduced.nbytes * (8 // reduced.itemsize), fuzzified.nbytes)
+                    activations = narrow.activations(reduced)
+                    self.assertEqual(activations.dtype, np.dtype(dtype))
+                    np.testing.assert_allclose(activations, strengths, atol=2e-3 if dtype == "float16" else 1e-6)
+            system.dtype = np.float64
+            self.assertEqual(system.compile().fuzzify(inputs, 1000).dtype, np.float64)
+
+    def test_invalid_dtype(self):
+        with self.assertRaises(ValueError):
+            FuzzySystem(dtype="int32")
+        system = build_system("sugeno")
+        with self.assertRaises(ValueError):
+            system.dtype = np.complex128
+        self.assertEqual(system.dtype, np.float64)
+
+    def test_save_load_and_split(self):
+        system = build_system("mamdani")
+        system.dtype = "float32"
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.nebulo")
+            system.save(path)
+            loaded = FuzzySystem.load(path, mmap=False)
+        self.assertEqual(loaded.dtype, np.float32)
+        inputs = samples(200)
+        np.testing.assert_array_equal(loaded.evaluate_batch(inputs), system.evaluate_batch(inputs))
+
+        sugeno = build_system("sugeno")
+        sugeno.rules = [FuzzyRule(rule.conditions, ("a" if i % 2 else "b", rule.output))
+                        for i, rule in enumerate(sugeno.rules)]
+        sugeno.dtype = "float32"
+        self.assertTrue(all(part.dtype == np.float32 for part in sugeno.split_outputs().values()))
+
+    def test_pipeline_mixed_dtypes(self):
+        first = build_system("sugeno")
+        first.dtype = "float16"
+        second = build_system("sugeno")
+        pipeline = FuzzyPipeline()
+        pipeline.add(first, "a")
+        pipeline.add(second, "b")
+        inputs = samples(200)
+        outputs = pipeline.evaluate_batch(inputs)
+        np.testing.assert_allclose(outputs["a"], scalar(first, inputs), atol=0.1)
+        np.testing.assert_allclose(outputs["b"], scalar(second, inputs), atol=1e-9)
+
+    def test_pipeline_all_float16(self):
+        first, second = wide_system("sugeno"), wide_system("mamdani")
+        pipeline = FuzzyPipeline()
+        for system, name in ((first, "a"), (second, "b")):
+            system.dtype = "float16"
+            pipeline.add(system, name)
+        inputs = inputs_for(first)
+        outputs = pipeline.evaluate_batch(inputs)
+        for system, name in ((first, "a"), (second, "b")):
+            np.testing.assert_allclose(outputs[name], reference(system, inputs), rtol=0, atol=TOLERANCE["float16"] * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from nebulo.expressions import And, Is, Not, Or, RuleProgram, parse_expression, parse_rule
+from nebulo.rules import FuzzyRule
+from nebulo.system import FuzzySystem
+from tests.test_batch import build_system
+
+NAMES = ["Buget_Lunar", "Cost_Actual"]
+
+TEXT_RULES = {
+    "sugeno": [
+        "IF Buget_Lunar IS scazut OR Cost_Actual IS mare THEN 100",
+        "IF Buget_Lunar IS very ridicat AND NOT Cost_Actual IS mare THEN 0 WITH 0.8",
+        "IF Buget_Lunar IS mediu AND Cost_Actual IS somewhat moderat THEN 50",
+        "IF NOT (Buget_Lunar IS mediu OR Buget_Lunar IS ridicat) AND Cost_Actual IS mic THEN 30",
+    ],
+    "mamdani": [
+        "IF Buget_Lunar IS scazut OR Cost_Actual IS mare THEN Risc IS ridicat",
+        "IF Buget_Lunar IS very ridicat AND NOT Cost_Actual IS mare THEN Risc IS scazut WITH 0.8",
+        "IF Buget_Lunar IS mediu AND Cost_Actual IS somewhat moderat THEN Risc IS mediu",
+        "IF NOT (Buget_Lunar IS mediu OR Buget_Lunar IS ridicat) AND Cost_Actual IS mic THEN Risc IS mediu",
+    ],
+}
+
+
+def expression_system(mode, tnorm="min"):
+    """The 3x3 example plus rules using OR, NOT, hedges and weights"""
+    system = build_system(mode)
+    system.tnorm = tnorm
+    for text in TEXT_RULES[mode]:
+        system.add_rule(text)
+    return system
+
+
+def samples(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return {name: rng.uniform(0, 5000, n) for name in NAMES}
+
+
+def scalar(system, inputs):
+    return np.array([system.evaluate(dict(zip(NAMES, row))) for row in zip(*(inputs[n].tolist() for n in NAMES))])
+
+
+class TestParsing(unittest.TestCase):
+
+    def test_expression(self):
+        expression = parse_expression("a IS very high AND NOT (b IS low OR c is LOW)")
+        self.assertEqual(expression, And(Is("a", "high", "very"), Not(Or(Is("b", "low"), Is("c", "LOW")))))
+        self.assertEqual(expression, Is("a", "high", ["very"]) & ~(Is("b", "low") | Is("c", "LOW")))
+        self.assertEqual(expression.leaves(), [("a", "high"), ("b", "low"), ("c", "LOW")])
+        self.assertEqual(parse_expression("a IS NOT low"), Not(Is("a", "low")))
+        # AND binds tighter than OR
+        self.assertEqual(parse_expression("a IS x OR b IS y AND c IS z"),
+                         Or(Is("a", "x"), And(Is("b", "y"), Is("c", "z"))))
+        self.assertEqual(parse_expression(repr(expression)), expression)
+
+    def test_rule(self):
+        rule = parse_rule("IF a IS x AND b IS y THEN 5")
+        self.assertEqual(rule.conditions, [("a", "x"), ("b", "y")])
+        self.assertEqual((rule.output, rule.weight), (5.0, 1.0))
+        rule = parse_rule("if a is x or b is y then out is high with 0.5")
+        self.assertEqual(rule.conditions, Or(Is("a", "x"), Is("b", "y")))
+        self.assertEqual((rule.output, rule.weight), (("out", "high"), 0.5))
+        self.assertEqual(parse_rule("IF a IS x THEN high").output, "high")
+
+    def test_errors(self):
+        for text in ["a IS", "a IS x AND", "(a IS x", "a IS x b IS y", "a IS x ?"]:
+            with self.assertRaises(ValueError, msg=text):
+                parse_expression(text)
+        with self.assertRaises(ValueError):
+            parse_rule("a IS x THEN 1")
+        with self.assertRaises(ValueError):
+            Is("a", "x", "incredibly")
+        with self.assertRaises(ValueError):
+            FuzzySystem(tnorm="max")
+
+
+class TestExpressionRules(unittest.TestCase):
+
+    def test_rule_base_round_trip(self):
+        system = expression_system("sugeno")
+        rule = system.rules[10]
+        self.assertIsInstance(rule.conditions, And)
+        self.assertEqual(rule.weight, 0.8)
+        self.assertEqual(system.rules.conditions(10), [("Buget_Lunar", "ridicat"), ("Cost_Actual", "mare")])
+        self.assertFalse(system.rules.plain())
+        self.assertIsInstance(system.rules[11].conditions, And)  # hedged, so not a plain conjunction
+        system.rules[10] = FuzzyRule([("Buget_Lunar", "ridicat")], 0)
+        del system.rules[9], system.rules[10:]
+        self.assertTrue(system.rules.plain())
+
+    def test_activation(self):
+        fuzzified = {"a": {"x": 0.6, "y": 0.3}, "b": {"x": 0.5}}
+        expression = (Is("a", "x") | Is("a", "y", "very")) & ~Is("b", "x")
+        for tnorm, expected in [("min", 0.5), ("product", 0.5 * (0.6 + 0.09 - 0.6 * 0.09)),
+                                ("lukasiewicz", max(0.0, min(1.0, 0.69) + 0.5 - 1))]:
+            rule = FuzzyRule(expression, 1, weight=0.5)
+            self.assertAlmostEqual(rule.activation(fuzzified, tnorm), 0.5 * expected, msg=tnorm)
+        self.assertAlmostEqual(FuzzyRule([("a", "x"), ("b", "x")], 1).activation(fuzzified, "product"), 0.3)
+
+    def test_batch_matches_evaluate(self):
+        inputs = samples(600)  # wider than GATHER_MAX_SAMPLES: both batch strategies run
+        for mode in ["sugeno", "mamdani"]:
+            for tnorm in ["min", "product", "lukasiewicz"]:
+                with self.subTest(mode=mode, tnorm=tnorm):
+                    system = expression_system(mode, tnorm)
+                    expected = scalar(system, inputs)
+                    np.testing.assert_allclose(system.evaluate_batch(inputs), expected, rtol=1e-9, atol=1e-9)
+                    head = {name: values[:100] for name, values in inputs.items()}
+                    np.testing.assert_allclose(system.evaluate_batch(head), expected[:100], rtol=1e-9, atol=1e-9)
+
+    def test_tnorm_without_expressions(self):
+        inputs = samples(200)
+        for tnorm in ["product", "lukasiewicz"]:
+            system = build_system("sugeno")
+            system.tnorm = tnorm
+            self.assertIsNone(system.compile().program)
+            np.testing.assert_allclose(system.evaluate_batch(inputs), scalar(system, inputs), rtol=1e-9, atol=1e-9)
+
+    def test_t_norm_changes_output(self):
+        system = build_system("sugeno")
+        point = {"Buget_Lunar": 1800.0, "Cost_Actual": 1200.0}
+        outputs = []
+        for tnorm in ["min", "product"]:
+            system.tnorm = tnorm
+            outputs.append((system.evaluate(point), system.evaluate_batch({k: [v] for k, v in point.items()})[0]))
+        self.assertAlmostEqual(*outputs[1])
+        self.assertNotAlmostEqual(outputs[0][0], outputs[1][0])
+
+    def test_shared_subexpressions(self):
+        slots = {("a", t): i for i, t in enumerate("xyz")}
+        common = Is("a", "x") | Is("a", "y", "very")
+        expressions = [common & ~Is("a", "z"), ~Is("a", "z") & common, common | Is("a", "z"), common]
+        program = RuleProgram(expressions, slots, padding=3)
+        # very y, x OR very y, NOT z, (..) AND NOT z, (..) OR z: the first two rules are one node
+        self.assertEqual(len(program), 5)
+        self.assertEqual(program.n_registers, 4 + 1 + 3)  # fuzzified, zero, the three inner nodes
+        fuzzified = np.array([[0.2, 0.9], [0.5, 0.1], [0.7, 0.0], [1.0, 1.0]])
+        expected = [[0.25, 0.9], [0.25, 0.9], [0.7, 0.9], [0.25, 0.9]]
+        np.testing.assert_allclose(program.run(fuzzified), expected)
+        out = np.full((6, 2), -1.0)
+        program.run(fuzzified, out, rows=[5, 0, 2, 3])
+        np.testing.assert_allclose(out[[5, 0, 2, 3]], expected)
+        self.assertTrue((out[[1, 4]] == -1).all())
+
+    def test_index(self):
+        inputs = samples(200, seed=3)
+        system = expression_system("sugeno")
+        expected = scalar(system, inputs)
+        system.build_index()
+        np.testing.assert_allclose(scalar(system, inputs), expected, rtol=1e-12, atol=1e-12)
+
+    def test_session(self):
+        for mode in ["sugeno", "mamdani"]:
+            system = expression_system(mode, "product")
+            session = system.session({"Buget_Lunar": 2500.0, "Cost_Actual": 2500.0})
+            rng = np.random.default_rng(1)
+            for _ in range(50):
+                var = NAMES[rng.integers(2)]
+                value = float(rng.uniform(0, 5000))
+                output = session.update({var: value})
+                self.assertAlmostEqual(output, system.evaluate(dict(session.inputs)), places=9)
+
+    def test_storage(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model.nfs")
+            with self.assertRaises(ValueError):
+                expression_system("sugeno").save(path)
+            inputs = samples(100)
+            system = build_system("mamdani")
+            system.tnorm = "product"
+            system.rules[4] = FuzzyRule(system.rules[4].conditions, system.rules[4].output, weight=0.25)
+            system.save(path)
+            loaded = FuzzySystem.load(path)
+            self.assertEqual(loaded.tnorm, "product")
+            np.testing.assert_allclose(loaded.evaluate_batch(inputs), system.evaluate_batch(inputs))
+            self.assertEqual(loaded.rules[4].weight, 0.25)
+            np.testing.assert_allclose(scalar(loaded, inputs), scalar(system, inputs))
+
+
+if __name__ == "__main__":
+    unittest.main()
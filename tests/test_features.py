@@ -0,0 +1,110 @@
+import unittest
+
+import numpy as np
+
+from nebulo.features import Delta, Ema, Max, Mean, Min, RollingFeatures, Slope, Std
+from nebulo.utils import compute_weekly_trend
+from tests.test_batch import build_system
+
+
+def reference(kind, window, values):
+    """Feature over values[:t + 1] at every tick, computed from scratch"""
+    result = []
+    for t in range(len(values)):
+        last = values[max(0, t + 1 - window):t + 1]
+        if kind == "delta":
+            result.append(values[t] - values[max(0, t - window)])
+        elif kind == "mean":
+            result.append(last.mean())
+        elif kind == "std":
+            result.append(last.std())
+        elif kind == "slope":
+            result.append(np.polyfit(np.arange(len(last)), last, 1)[0] if len(last) > 1 else 0.0)
+        elif kind == "min":
+            result.append(last.min())
+        else:
+            result.append(last.max())
+    return np.array(result)
+
+
+FEATURES = {"delta": Delta, "mean": Mean, "std": Std, "slope": Slope, "min": Min, "max": Max}
+
+
+class TestRollingFeatures(unittest.TestCase):
+
+    def test_matches_reference(self):
+        rng = np.random.default_rng(0)
+        series = rng.normal(100, 10, (60, 3)).cumsum(axis=0)
+        for window in [1, 2, 5, 7, 16]:
+            specs = {kind: cls("x", window) for kind, cls in FEATURES.items()}
+            result = RollingFeatures(specs, n_entities=3).run({"x": series})
+            for kind in FEATURES:
+                with self.subTest(window=window, kind=kind):
+                    for e in range(3):
+                        np.testing.assert_allclose(result[kind][:, e], reference(kind, window, series[:, e]),
+                                                   rtol=1e-9, atol=1e-6)
+
+    def test_ema(self):
+        values = np.array([10.0, 20, 20, 5])
+        result = RollingFeatures({"e": Ema("x", span=3)}).run({"x": values})["e"][:, 0]
+        expected = [10, 15, 17.5, 11.25]
+        np.testing.assert_allclose(result, expected)
+        with self.assertRaises(ValueError):
+            Ema("x")
+        with self.assertRaises(ValueError):
+            Ema("x", alpha=0)
+        with self.assertRaises(ValueError):
+            Mean("x", 0)
+
+    def test_entities_update_independently(self):
+        rng = np.random.default_rng(1)
+        specs = {"trend": Slope("x", 4), "high": Max("y", 3), "change": Delta("x", 2), "vol": Std("y", 5)}
+        features = RollingFeatures(specs, n_entities=4)
+        alone = [RollingFeatures(specs) for _ in range(4)]
+        for _ in range(30):
+            entities = np.flatnonzero(rng.random(4) < 0.6)
+            x, y = rng.normal(size=len(entities)), rng.normal(size=len(entities))
+            result = features.update({"x": x, "y": y}, entities)
+            for k, e in enumerate(entities.tolist()):
+                expected = alone[e].update_one({"x": x[k], "y": y[k]})
+                for name in specs:
+                    self.assertAlmostEqual(result[name][k], expected[name])
+                    self.assertAlmostEqual(features.values[name][e], expected[name])
+        np.testing.assert_array_equal(features.count, [f.count[0] for f in alone])
+
+    def test_weekly_trend_and_ready(self):
+        daily = np.arange(20.0) ** 2
+        features = RollingFeatures({"trend": Delta("consum", 7), "avg": Mean("consum", 14)})
+        for t, value in enumerate(daily):
+            out = features.update_one({"consum": value})
+            self.assertEqual(bool(features.ready[0]), t >= 13)
+        self.assertEqual(out["trend"], compute_weekly_trend(daily[-1], daily[-8]))
+        features.reset()
+        self.assertEqual(features.count[0], 0)
+        self.assertEqual(features.update_one({"consum": 5.0}), {"trend": 0.0, "avg": 5.0})
+        with self.assertRaises(KeyError):
+            features.update({})
+
+    def test_feeds_system(self):
+        system = build_system("sugeno")
+        features = RollingFeatures({"Buget_Lunar": Ema("buget", alpha=0.5), "Cost_Actual": Max("cost", 3)},
+                                   n_entities=100)
+        rng = np.random.default_rng(2)
+        for _ in range(5):
+            inputs = features.update({"buget": rng.uniform(0, 5000, 100), "cost": rng.uniform(0, 5000, 100)})
+            outputs = system.evaluate_batch(inputs)
+        row = {name: float(values[7]) for name, values in features.values.items()}
+        self.assertAlmostEqual(outputs[7], system.evaluate(row))
+
+    def test_long_window_drift(self):
+        rng = np.random.default_rng(3)
+        series = rng.normal(1e4, 1, 20_000)
+        result = RollingFeatures({"m": Mean("x", 500), "s": Std("x", 500), "k": Slope("x", 500)}).run({"x": series})
+        last = series[-500:]
+        self.assertAlmostEqual(result["m"][-1, 0], last.mean(), delta=1e-7)
+        self.assertAlmostEqual(result["s"][-1, 0], last.std(), delta=1e-6)
+        self.assertAlmostEqual(result["k"][-1, 0], np.polyfit(np.arange(500), last, 1)[0], delta=1e-8)
+
+
+if __name__ == "__main__":
+    unittest.main()
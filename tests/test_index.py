@@ -0,0 +1,117 @@
+import unittest
+from itertools import product
+
+import numpy as np
+
+from nebulo.membership import TriangularMF, GaussianMF
+from nebulo.variables import FuzzyVariable
+from nebulo.rules import FuzzyRule
+from nebulo.system import FuzzySystem
+
+from tests.test_batch import build_system
+
+
+def grid_system(n_vars, n_terms, mode="sugeno"):
+    system = FuzzySystem(mode=mode)
+    names = [f"x{i}" for i in range(n_vars)]
+    step = 100 / (n_terms - 1)
+    for name in names:
+        var = FuzzyVariable(name)
+        for t in range(n_terms):
+            var.add_term(f"t{t}", TriangularMF((t - 1) * step, t * step, (t + 1) * step))
+        system.add_variable(var)
+    for k, terms in enumerate(product(range(n_terms), repeat=n_vars)):
+        system.add_rule(FuzzyRule([(n, f"t{t}") for n, t in zip(names, terms)], k % 7))
+    return system
+
+
+class TestSupportIndex(unittest.TestCase):
+
+    def test_active_terms_match_brute_force(self):
+        system = grid_system(1, 12)
+        index = system.build_index()
+        var = system.variables["x0"]
+        for x in np.linspace(-20, 120, 281).tolist():
+            expected = sorted(t for t, mf in var.terms.items() if mf.evaluate(x) > 0)
+            self.assertEqual(sorted(index.active_terms("x0", x)), expected)
+
+    def test_only_reachable_rules(self):
+        system = grid_system(3, 6)
+        index = system.build_index()
+        active = {name: index.active_terms(name, 37.0) for name in system.variables}
+        fired = index.active_rules(active)
+        self.assertEqual(len(fired), 8)
+        for i in fired:
+            self.assertGreater(system.rules[i].activation(
+                {name: system.variables[name].fuzzify(37.0) for name in system.variables}), 0)
+
+    def test_evaluate_unchanged(self):
+        points = np.random.default_rng(2).uniform(0, 5000, (50, 2)).tolist()
+        for mode in ("sugeno", "mamdani"):
+            for mf in ("triangular", "trapezoidal"):
+                with self.subTest(mode=mode, mf=mf):
+                    system = build_system(mode, mf)
+                    plain = [system.evaluate({"Buget_Lunar": x, "Cost_Actual": y}) for x, y in points]
+                    system.build_index()
+                    indexed = [system.evaluate({"Buget_Lunar": x, "Cost_Actual": y}) for x, y in points]
+                    self.assertEqual(plain, indexed)
+
+        system = grid_system(3, 5)
+        points = np.random.default_rng(2).uniform(-10, 110, (100, 3)).tolist()
+        plain = [system.evaluate(dict(zip(system.variables, p))) for p in points]
+        system.build_index()
+        indexed = [system.evaluate(dict(zip(system.variables, p))) for p in points]
+        self.assertEqual(plain, indexed)
+
+    def test_gaussian_cut_off(self):
+        system = build_system("sugeno", "gaussian")
+        points = np.random.default_rng(3).uniform(0, 5000, (100, 2)).tolist()
+        plain = [system.evaluate({"Buget_Lunar": x, "Cost_Actual": y}) for x, y in points]
+        system.build_index(eps=1e-9)
+        indexed = [system.evaluate({"Buget_Lunar": x, "Cost_Actual": y}) for x, y in points]
+        np.testing.assert_allclose(indexed, plain, atol=1e-6)
+
+    def test_falls_back_below_eps(self):
+        system = build_system("sugeno", "gaussian")
+        system.rules = [FuzzyRule(rule.conditions, 100 * (i % 2)) for i, rule in enumerate(system.rules)]
+        # Far outside the universes every degree is below eps, and so is every strength
+        points = [(-6000.0, -6000.0), (12000.0, 400.0), (-2000.0, 11000.0)]
+        plain = [system.evaluate({"Buget_Lunar": x, "Cost_Actual": y}) for x, y in points]
+        system.build_index(eps=1e-6)
+        self.assertTrue(system._index.truncated)
+        indexed = [system.evaluate({"Buget_Lunar": x, "Cost_Actual": y}) for x, y in points]
+        self.assertEqual(indexed, plain)
+        collector = system.instrument()
+        self.assertEqual([system.evaluate({"Buget_Lunar": x, "Cost_Actual": y}) for x, y in points], plain)
+        self.assertEqual(collector.rule_evaluated.tolist(), [len(points)] * len(system.rules))
+
+    def test_unbounded_error_bound(self):
+        # Left-out rules each weigh below eps: Sugeno outputs move by at most
+        # (rules left out) * eps / (indexed strength) of the output range
+        system = build_system("sugeno", "gaussian")
+        system.build_index(eps=1e-3)
+        self.assertFalse(grid_system(1, 3).build_index().truncated)
+        for x, y in np.random.default_rng(4).uniform(-3000, 8000, (300, 2)).tolist():
+            inputs = {"Buget_Lunar": x, "Cost_Actual": y}
+            index = system._index
+            active = {var: index.active_terms(var, inputs[var]) for var in inputs}
+            fuzzified = {var: system.variables[var].fuzzify(inputs[var]) for var in inputs}
+            rules = index.active_rules(active)
+            strengths = [system.rules[i].activation(fuzzified) for i in rules]
+            expected = system._infer(inputs, fuzzified, range(len(system.rules)))
+            if index.decides(strengths):
+                bound = (len(system.rules) - len(rules)) * index.eps / sum(strengths) * 100
+            else:
+                bound = 1e-12
+            self.assertLessEqual(abs(system.evaluate(inputs) - expected), bound + 1e-9)
+
+    def test_rebuilt_after_change(self):
+        system = grid_system(2, 4)
+        index = system.build_index()
+        system.add_rule(FuzzyRule([("x0", "t1")], 50))
+        system.evaluate({"x0": 30.0, "x1": 30.0})
+        self.assertIsNot(system._index, index)
+        self.assertIn(len(system.rules) - 1, system._index.rules_by_term[("x0", "t1")])
+
+if __name__ == '__main__':
+    unittest.main()
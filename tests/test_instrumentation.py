@@ -0,0 +1,143 @@
+import unittest
+
+import numpy as np
+
+from nebulo.instrumentation import STAGES, Collector, Hook
+from nebulo.membership import TriangularMF
+from nebulo.rules import FuzzyRule
+from tests.test_batch import build_system
+
+
+def samples(n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    return {"Buget_Lunar": rng.uniform(0, 5000, n), "Cost_Actual": rng.uniform(0, 5000, n)}
+
+
+def rows(inputs):
+    names = list(inputs)
+    return [dict(zip(names, row)) for row in zip(*(inputs[n].tolist() for n in names))]
+
+
+class Recorder(Hook):
+
+    def __init__(self):
+        self.calls = []
+
+    def fuzzify(self, variable, seconds, rows):
+        self.calls.append(("fuzzify", variable, rows))
+
+    def evaluate(self, seconds, rows):
+        self.calls.append(("evaluate", rows))
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_outputs_unchanged(self):
+        inputs = samples()
+        for mode in ("sugeno", "mamdani"):
+            for setup in ("plain", "index", "cache"):
+                with self.subTest(mode=mode, setup=setup):
+                    system = build_system(mode)
+                    expected = [system.evaluate(row) for row in rows(inputs)]
+                    expected_batch = system.evaluate_batch(inputs)
+                    if setup == "index":
+                        system.build_index()
+                    elif setup == "cache":
+                        system.enable_cache()
+                    system.instrument()
+                    self.assertEqual([system.evaluate(row) for row in rows(inputs)], expected)
+                    np.testing.assert_array_equal(system.evaluate_batch(inputs), expected_batch)
+
+    def test_same_errors_with_hooks(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], ("a", 10)))
+        row = rows(samples(1))[0]
+        with self.assertRaises(ValueError) as plain:
+            system.evaluate(row)
+        system.instrument()
+        with self.assertRaises(ValueError) as instrumented:
+            system.evaluate(row)
+        self.assertEqual(str(instrumented.exception), str(plain.exception))
+
+    def test_stage_counts(self):
+        system = build_system("mamdani")
+        collector = system.instrument()
+        inputs = samples(25)
+        for row in rows(inputs)[:10]:
+            system.evaluate(row)
+        system.evaluate_batch(inputs)
+        self.assertEqual(collector.rows, 35)
+        self.assertEqual(collector.stage_calls, dict(dict.fromkeys(STAGES, 11), fuzzify=22))
+        self.assertEqual(collector.variable_rows, {"Buget_Lunar": 35, "Cost_Actual": 35})
+        for stage in STAGES:
+            self.assertGreater(collector.stage_seconds[stage], 0)
+        self.assertEqual(collector.rule_evaluated.tolist(), [35] * 9)
+        self.assertGreater(collector.rule_seconds.sum(), 0)
+
+    def test_firing_counts(self):
+        system = build_system("sugeno")
+        inputs = samples(200)
+        strengths = system.compile().activations(system.compile().fuzzify(inputs, 200))
+        for threshold in (0.0, 0.5):
+            with self.subTest(threshold=threshold):
+                batch = Collector(threshold)
+                scalar = Collector(threshold)
+                system.add_hook(batch)
+                system.evaluate_batch(inputs)
+                system.remove_hook(batch)
+                system.add_hook(scalar)
+                for row in rows(inputs):
+                    system.evaluate(row)
+                system.remove_hook(scalar)
+                expected = (strengths > threshold).sum(axis=1).tolist()
+                self.assertEqual(batch.rule_fired.tolist(), expected)
+                self.assertEqual(scalar.rule_fired.tolist(), expected)
+
+    def test_dead_rules_with_index(self):
+        system = build_system("sugeno")
+        system.variables["Buget_Lunar"].add_term("imposibil", TriangularMF(9000, 9500, 10000))
+        system.add_rule(FuzzyRule([("Buget_Lunar", "imposibil")], 100))
+        system.build_index()
+        collector = system.instrument()
+        for row in rows(samples()):
+            system.evaluate(row)
+        # The index never offers rule 9 for evaluation, so it is only reported given the rule count
+        self.assertEqual(collector.dead_rules(), [])
+        self.assertEqual(collector.dead_rules(len(system.rules)), [9])
+
+    def test_custom_hook_and_removal(self):
+        system = build_system("sugeno")
+        hook = system.add_hook(Recorder())
+        system.evaluate({"Buget_Lunar": 100, "Cost_Actual": 200})
+        system.evaluate_batch(samples(5))
+        system.remove_hook(hook)
+        system.evaluate({"Buget_Lunar": 100, "Cost_Actual": 200})
+        self.assertEqual(hook.calls, [("fuzzify", "Buget_Lunar", 1), ("fuzzify", "Cost_Actual", 1), ("evaluate", 1),
+                                      ("fuzzify", "Buget_Lunar", 5), ("fuzzify", "Cost_Actual", 5), ("evaluate", 5)])
+
+    def test_exports(self):
+        system = build_system("sugeno")
+        collector = system.instrument(threshold=0.2)
+        system.evaluate_batch(samples())
+        data = collector.as_dict()
+        self.assertEqual(data["rows"], 40)
+        self.assertEqual(set(data["stages"]), set(STAGES))
+        self.assertEqual(len(data["rules"]["fired"]), 9)
+        self.assertEqual(sorted(name for name, _ in collector.hot_variables()), sorted(data["variables"]))
+
+        collector.variable_seconds['a"b\\c'] = 1.5
+        collector.variable_rows['a"b\\c'] = 1
+        text = collector.to_prometheus()
+        self.assertTrue(text.endswith("\n"))
+        self.assertIn("nebulo_rows_total 40", text)
+        self.assertIn('nebulo_variable_fuzzify_seconds_total{variable="a\\"b\\\\c"} 1.5', text)
+        self.assertIn(f'nebulo_rule_fired_total{{rule="0"}} {collector.rule_fired[0]}', text)
+        for line in text.splitlines():
+            if not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                self.assertTrue(name.startswith("nebulo_"))
+                float(value)
+
+
+if __name__ == "__main__":
+    unittest.main()
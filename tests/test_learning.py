@@ -0,0 +1,187 @@
+import unittest
+
+import numpy as np
+
+from nebulo.learning import _Anfis, fit_anfis, grid_partition, wang_mendel
+from nebulo.membership import GaussianMF, TrapezoidalMF
+from nebulo.rules import FuzzyRule, LinearOutput
+from nebulo.system import FuzzySystem
+from tests.test_batch import build_system
+
+
+def target(x1, x2):
+    return 3 * np.sin(x1) + 0.5 * x2 + x1 * x2 / 10
+
+
+def data(n=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    x1, x2 = rng.uniform(0, 10, n), rng.uniform(0, 10, n)
+    return {"x1": x1, "x2": x2}, target(x1, x2)
+
+
+def grid_system(n_terms=7, mf="triangular", mode="sugeno", tnorm="product"):
+    system = FuzzySystem(mode=mode, tnorm=tnorm)
+    system.add_variable(grid_partition("x1", (0, 10), n_terms, mf))
+    system.add_variable(grid_partition("x2", (0, 10), n_terms, mf))
+    if mode == "mamdani":
+        system.add_output(grid_partition("y", (-4, 14), 9))
+    return system
+
+
+def rmse(system, inputs, y):
+    return float(np.sqrt(np.mean((system.evaluate_batch(inputs) - y) ** 2)))
+
+
+class TestWangMendel(unittest.TestCase):
+
+    def test_sugeno(self):
+        inputs, y = data()
+        system = grid_system()
+        self.assertEqual(wang_mendel(system, inputs, y), 49)
+        self.assertLess(rmse(system, inputs, y), 1.0)
+        # chunking does not change the rules
+        other = grid_system()
+        wang_mendel(other, inputs, y, chunk_size=999)
+        np.testing.assert_allclose(other.evaluate_batch(inputs), system.evaluate_batch(inputs))
+
+    def test_mamdani_keeps_best_sample(self):
+        system = grid_system(mode="mamdani")
+        # Both samples fall in cell (t0, t0); the second is closer to its centre
+        inputs = {"x1": np.array([0.6, 0.1]), "x2": np.array([0.6, 0.1])}
+        self.assertEqual(wang_mendel(system, inputs, np.array([14.0, -4.0]), chunk_size=1), 1)
+        rule = system.rules[0]
+        self.assertEqual(rule.conditions, [("x1", "t0"), ("x2", "t0")])
+        self.assertEqual(rule.output, ("y", "t0"))
+
+    def test_mamdani_fit(self):
+        inputs, y = data()
+        system = grid_system(mode="mamdani")
+        wang_mendel(system, inputs, y, min_degree=0.01)
+        self.assertLess(rmse(system, inputs, y), 1.5)
+
+    def test_variables_and_threshold(self):
+        inputs, y = data(2000)
+        system = grid_system()
+        added = wang_mendel(system, inputs, y, variables=["x1"], min_degree=0.5)
+        self.assertEqual(added, 7)
+        self.assertTrue(all(len(rule.conditions) == 1 for rule in system.rules))
+
+
+class TestAnfis(unittest.TestCase):
+
+    def test_least_squares_recovers_linear_consequents(self):
+        inputs, _ = data(5000)
+        teacher = grid_system(3)
+        teacher.add_rules(["x1", "x2"], [[i, j] for i in range(3) for j in range(3)],
+                          np.arange(27, dtype=float).reshape(9, 3) / 10, linear=["x1", "x2"])
+        y = teacher.evaluate_batch(inputs)
+        student = grid_system(3)
+        student.add_rules(["x1", "x2"], [[i, j] for i in range(3) for j in range(3)], np.zeros(9))
+        result = fit_anfis(student, inputs, y, epochs=1, tune=False, l2=1e-12)
+        self.assertLess(result.rmse, 1e-6)
+        self.assertIsInstance(student.rules[4].output, LinearOutput)
+        np.testing.assert_allclose(student.evaluate_batch(inputs), y, atol=1e-6)
+
+    def test_training_improves(self):
+        inputs, y = data()
+        for mf, tnorm in [("triangular", "product"), ("gaussian", "product"), ("trapezoidal", "min")]:
+            with self.subTest(mf=mf, tnorm=tnorm):
+                system = grid_system(5, mf, tnorm=tnorm)
+                wang_mendel(system, inputs, y)
+                before = rmse(system, inputs, y)
+                epochs = []
+                result = fit_anfis(system, inputs, y, epochs=4, batch_size=512, seed=0, callback=epochs.append)
+                self.assertEqual(len(result.history), 4)
+                self.assertIs(epochs[-1], result.history[-1])
+                self.assertGreater(result.rows_per_second, 0)
+                self.assertLess(result.history[-1]["rmse"], result.history[0]["rmse"])
+                self.assertLess(rmse(system, inputs, y), before / 3)
+
+    def test_trains_in_float64_whatever_the_dtype(self):
+        inputs, y = data(5000)
+        results = []
+        for dtype in ["float64", "float16"]:
+            system = grid_system(5)
+            system.dtype = dtype
+            wang_mendel(system, inputs, y)
+            results.append((fit_anfis(system, inputs, y, epochs=2, batch_size=512, seed=0), system))
+        (wide, reference), (narrow, system) = results
+        self.assertEqual([h["rmse"] for h in narrow.history], [h["rmse"] for h in wide.history])
+        self.assertEqual([r.output for r in system.rules], [r.output for r in reference.rules])
+
+    def test_gradient_consequents_order_zero(self):
+        inputs, y = data(5000)
+        system = grid_system(5)
+        wang_mendel(system, inputs, y)
+        before = rmse(system, inputs, y)
+        fit_anfis(system, inputs, y, epochs=5, order=0, consequents="gradient", batch_size=256, seed=0)
+        self.assertIsInstance(system.rules[0].output, float)
+        self.assertLess(rmse(system, inputs, y), before)
+
+    def test_gradient_matches_finite_differences(self):
+        inputs, y = data(300, seed=3)
+        for mf in ["triangular", "trapezoidal", "gaussian"]:
+            for tnorm in ["product", "min", "lukasiewicz"]:
+                with self.subTest(mf=mf, tnorm=tnorm):
+                    system = grid_system(4, mf, tnorm=tnorm)
+                    wang_mendel(system, inputs, y)
+                    system.rules[3] = FuzzyRule(system.rules[3].conditions, system.rules[3].output, weight=0.5)
+                    trainer = _Anfis(system, inputs, y, 1, True, False, 0.01)
+                    trainer.theta += np.random.default_rng(1).normal(0, 1, trainer.theta.shape)
+
+                    def loss():
+                        _, strengths = trainer._forward(inputs, len(y))
+                        predicted = (strengths * (trainer.theta @ trainer._design(inputs, len(y)))).sum(0)
+                        return 0.5 * np.mean((predicted / strengths.sum(0) - y) ** 2)
+
+                    fuzzified, strengths = trainer._forward(inputs, len(y))
+                    outputs = trainer.theta @ trainer._design(inputs, len(y))
+                    total = strengths.sum(0)
+                    predicted = (strengths * outputs).sum(0) / total
+                    gradient = trainer.mf_gradient(inputs, fuzzified, strengths, outputs, predicted, total,
+                                                   (predicted - y) / len(y))
+                    k = 0
+                    for group in trainer.groups:
+                        mf_object = group[0]
+                        for name in {"triangular": "abc", "trapezoidal": "abcd"}.get(mf, ["mean", "sigma"]):
+                            value = getattr(mf_object, name)
+                            h = 1e-6
+                            setattr(mf_object, name, value + h)
+                            up = loss()
+                            setattr(mf_object, name, value - h)
+                            down = loss()
+                            setattr(mf_object, name, value)
+                            self.assertAlmostEqual(gradient[k], (up - down) / (2 * h), delta=1e-4 + 1e-3 * abs(gradient[k]))
+                            k += 1
+                    self.assertEqual(k, len(gradient))
+
+    def test_versions_bumped(self):
+        inputs, y = data(2000)
+        system = grid_system(3, "gaussian")
+        wang_mendel(system, inputs, y)
+        system.build_index()
+        version = system.variables["x1"]._version
+        fit_anfis(system, inputs, y, epochs=1)
+        self.assertGreater(system.variables["x1"]._version, version)
+        self.assertTrue(system._index.is_stale(system))
+
+    def test_errors(self):
+        inputs, y = data(100)
+        with self.assertRaises(ValueError):
+            fit_anfis(build_system("mamdani"), inputs, y)
+        system = grid_system(3)
+        system.add_rule(FuzzyRule([("x1", "t0")], lambda x: x["x1"]))
+        with self.assertRaises(ValueError):
+            fit_anfis(system, inputs, y)
+        system = grid_system(3)
+        system.add_rule("IF x1 IS t0 OR x2 IS t1 THEN 1")
+        with self.assertRaises(ValueError):
+            fit_anfis(system, inputs, y)
+        with self.assertRaises(ValueError):
+            grid_partition("x", (0, 1), 1)
+        self.assertIsInstance(grid_partition("x", (0, 1), 3, "trapezoidal").terms["t1"], TrapezoidalMF)
+        self.assertIsInstance(grid_partition("x", (0, 1), 3, "gaussian").terms["t1"], GaussianMF)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from nebulo.rulebase import RuleBase
+from nebulo.rules import FuzzyRule, LinearOutput
+from nebulo.system import FuzzySystem
+from tests.test_batch import build_system
+
+NAMES = ["Buget_Lunar", "Cost_Actual"]
+
+
+def tsk_system(callables=False):
+    """The 3x3 example with first-order consequents; as lambdas when `callables`"""
+    system = build_system("sugeno")
+    rules = []
+    for k, rule in enumerate(system.rules):
+        a, b, bias = 0.01 * (k - 4), -0.005 * k, rule.output
+        if callables:
+            output = (lambda a, b, bias: lambda x: bias + a * x["Buget_Lunar"] + b * x["Cost_Actual"])(a, b, bias)
+        else:
+            output = LinearOutput({"Buget_Lunar": a, "Cost_Actual": b}, bias)
+        rules.append(FuzzyRule(rule.conditions, output if k % 3 else rule.output))
+    system.rules = rules
+    return system
+
+
+def samples(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return {name: rng.uniform(0, 5000, n) for name in NAMES}
+
+
+def scalar(system, inputs):
+    return np.array([system.evaluate(dict(zip(NAMES, row))) for row in zip(*(inputs[n].tolist() for n in NAMES))])
+
+
+class TestLinearOutput(unittest.TestCase):
+
+    def test_value_and_identity(self):
+        output = LinearOutput({"x": 2, "y": -1}, bias=3)
+        self.assertEqual(output({"x": 1.5, "y": 4.0, "z": 100}), 2.0)
+        self.assertEqual(output, LinearOutput({"x": 2.0, "y": -1.0}, 3.0))
+        self.assertNotEqual(output, LinearOutput({"x": 2.0}, 3.0))
+        rules = RuleBase([FuzzyRule([("x", "a")], output), FuzzyRule([("x", "b")], LinearOutput({"x": 2, "y": -1}, 3))])
+        self.assertEqual(len(rules.objects), 1)
+        self.assertEqual(rules[1].output, output)
+
+    def test_batch_matches_evaluate(self):
+        inputs = samples()
+        linear, lambdas = tsk_system(), tsk_system(callables=True)
+        compiled = linear.compile()
+        self.assertEqual(compiled.linear.shape, (9, 2))
+        self.assertEqual(compiled.callables, [])
+        expected = scalar(lambdas, inputs)
+        np.testing.assert_allclose(scalar(linear, inputs), expected, rtol=1e-15)
+        np.testing.assert_allclose(linear.evaluate_batch(inputs), expected, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(lambdas.evaluate_batch(inputs), expected, rtol=1e-12, atol=1e-12)
+
+    def test_mixed_with_callables(self):
+        system = tsk_system()
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], lambda x: x["Cost_Actual"] / 100))
+        inputs = samples(50)
+        np.testing.assert_allclose(system.evaluate_batch(inputs), scalar(system, inputs), rtol=1e-12, atol=1e-12)
+
+    def test_add_rules_linear(self):
+        one_by_one = build_system("sugeno")
+        bulk = build_system("sugeno")
+        one_by_one.rules = bulk.rules = []
+        terms = [[0, 0], [1, 2], [2, -1]]
+        coefficients = [[0.5, -0.25, 10], [0.0, 1.0, -5], [2.0, 0.0, 0]]
+        bulk.add_rules(NAMES, terms, coefficients, linear=NAMES)
+        for (ti, tj), row in zip(terms, coefficients):
+            conditions = [("Buget_Lunar", ["scazut", "mediu", "ridicat"][ti])]
+            if tj >= 0:
+                conditions.append(("Cost_Actual", ["mic", "moderat", "mare"][tj]))
+            one_by_one.add_rule(FuzzyRule(conditions, LinearOutput(dict(zip(NAMES, row[:2])), row[2])))
+        self.assertEqual([(r.conditions, r.output) for r in bulk.rules],
+                         [(r.conditions, r.output) for r in one_by_one.rules])
+        inputs = samples(50)
+        np.testing.assert_array_equal(bulk.evaluate_batch(inputs), one_by_one.evaluate_batch(inputs))
+
+    def test_missing_coefficient_input(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], LinearOutput({"Risc": 1.0})))
+        with self.assertRaises(KeyError):
+            system.evaluate_batch(samples(5))
+
+    def test_session(self):
+        system = tsk_system()
+        system.add_rule(FuzzyRule([("Risc", "mediu")], LinearOutput({"Buget_Lunar": 0.1}, 1)))
+        start = {"Buget_Lunar": 1000.0, "Cost_Actual": 1000.0, "Risc": 50.0}
+        session = system.session(start)
+        rng = np.random.default_rng(2)
+        current = dict(start)
+        for _ in range(100):
+            current["Risc"] = float(rng.uniform(0, 100))
+            self.assertAlmostEqual(session.update(Risc=current["Risc"]), system.evaluate(current), places=9)
+        current["Buget_Lunar"] = 2500.0
+        self.assertAlmostEqual(session.update(Buget_Lunar=2500.0), system.evaluate(current), places=9)
+
+    def test_storage(self):
+        inputs = samples(100)
+        with tempfile.TemporaryDirectory() as directory:
+            for system, version in ((build_system("sugeno"), 1), (tsk_system(), 2)):
+                path = os.path.join(directory, f"v{version}.nebulo")
+                system.save(path)
+                with open(path, "rb") as handle:
+                    self.assertEqual(struct.unpack("<8sI", handle.read(12))[1], version)
+                loaded = FuzzySystem.load(path)
+                np.testing.assert_array_equal(loaded.evaluate_batch(inputs), system.evaluate_batch(inputs))
+                self.assertEqual([r.output for r in loaded.rules], [r.output for r in system.rules])
+                np.testing.assert_allclose(scalar(loaded, inputs), scalar(system, inputs), rtol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
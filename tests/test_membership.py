@@ -0,0 +1,75 @@
+import tracemalloc
+import unittest
+
+import numpy as np
+
+from nebulo.membership import (
+    TriangularMF, TrapezoidalMF, GaussianMF, GeneralizedBellMF, SigmoidMF,
+    SShapedMF, ZShapedMF, PiShapedMF, PiecewiseLinearMF,
+)
+
+
+class TestEvaluateArray(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.concatenate([np.linspace(-20, 120, 701), [0, 10, 25, 40, 50, 60, 100]])
+        self.mfs = [
+            TriangularMF(10, 40, 60),
+            TriangularMF(0, 0, 45),
+            TriangularMF(60, 100, 100),
+            TrapezoidalMF(10, 25, 40, 60),
+            TrapezoidalMF(0, 0, 20, 45),
+            TrapezoidalMF(60, 85, 100, 100),
+            TrapezoidalMF(10, 10, 50, 50),
+            GaussianMF(50, 12),
+            GeneralizedBellMF(20, 2, 50),
+            SigmoidMF(0.3, 50),
+            SigmoidMF(-2, 40),
+            SShapedMF(10, 60),
+            ZShapedMF(10, 60),
+            ZShapedMF(25, 25),
+            PiShapedMF(0, 25, 50, 100),
+            PiShapedMF(10, 40, 40, 90),
+            PiShapedMF(20, 20, 50, 80),
+            PiShapedMF(0, 60, 40, 100),
+            PiecewiseLinearMF([(0, 0), (20, 1), (40, 0.5), (60, 0.5), (100, 0)]),
+        ]
+
+    def test_matches_scalar_evaluate(self):
+        for mf in self.mfs:
+            with self.subTest(mf=type(mf).__name__):
+                expected = [mf.evaluate(v) for v in self.x.tolist()]
+                np.testing.assert_allclose(mf.evaluate_array(self.x), expected, rtol=0, atol=1e-12)
+
+    def test_writes_into_out(self):
+        for mf in self.mfs:
+            with self.subTest(mf=type(mf).__name__):
+                out = np.full_like(self.x, -1.0)
+                result = mf.evaluate_array(self.x, out=out)
+                self.assertIs(result, out)
+                np.testing.assert_array_equal(out, mf.evaluate_array(self.x))
+
+    def test_out_leaves_no_large_temporaries(self):
+        x = np.linspace(-20, 120, 1_000_000)
+        out = np.empty_like(x)
+        # PiShapedMF with a vertical edge or b > c still needs a second vector
+        regular = [mf for mf in self.mfs if not isinstance(mf, PiShapedMF) or mf.a < mf.b <= mf.c < mf.d]
+        for mf in regular:
+            with self.subTest(mf=type(mf).__name__):
+                mf.evaluate_array(x, out=out)
+                tracemalloc.start()
+                mf.evaluate_array(x, out=out)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                # at most a boolean mask (SShapedMF, ZShapedMF, PiShapedMF), never a float vector
+                self.assertLessEqual(peak, x.size + 4096)
+
+    def test_out_must_not_alias_input(self):
+        with self.assertRaises(ValueError):
+            TriangularMF(0, 1, 2).evaluate_array(self.x, out=self.x)
+
+    def test_scalar_input(self):
+        self.assertAlmostEqual(float(GaussianMF(0, 1).evaluate_array(0.0)), 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+
+import numpy as np
+
+from nebulo.optimizer import OptimizationReport
+from nebulo.rules import FuzzyRule, LinearOutput
+from benchmarks.suite import synthetic_system
+from tests.test_batch import build_system
+from tests.test_expressions import expression_system, samples
+
+
+def grid_samples(n=41):
+    grid = np.linspace(0, 5000, n)
+    x1, x2 = np.meshgrid(grid, grid)
+    return {"Buget_Lunar": x1.ravel(), "Cost_Actual": x2.ravel()}
+
+
+class TestExactPasses(unittest.TestCase):
+
+    def test_sugeno_merge(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Cost_Actual", "mic"), ("Buget_Lunar", "scazut")], 40, weight=0.5))
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu"), ("Cost_Actual", "mare")],
+                                  LinearOutput({"Cost_Actual": 0.01}, bias=5), weight=2))
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu"), ("Cost_Actual", "mare")],
+                                  LinearOutput({"Buget_Lunar": -0.02})))
+        inputs = grid_samples()
+        expected = system.evaluate_batch(inputs)
+        report = system.optimize()
+        self.assertEqual((report.rules_before, report.rules_after, report.merged), (12, 9, 3))
+        self.assertEqual(report.removed, 3)
+        self.assertGreater(report.estimated_speedup, 1)
+        self.assertIsNone(report.max_error)
+        np.testing.assert_allclose(system.evaluate_batch(inputs), expected, rtol=1e-12, atol=1e-9)
+        merged = system.rules[0]
+        self.assertEqual(merged.weight, 1.5)
+        self.assertAlmostEqual(merged.output, 20 / 1.5)
+        self.assertIsInstance(system.rules[5].output, LinearOutput)
+
+    def test_unreachable(self):
+        system = build_system("sugeno", "trapezoidal")
+        # scazut and ridicat of Buget_Lunar never overlap; scazut and mediu do
+        system.add_rule(FuzzyRule([("Buget_Lunar", "scazut"), ("Buget_Lunar", "ridicat")], 70))
+        system.add_rule(FuzzyRule([("Buget_Lunar", "scazut"), ("Buget_Lunar", "mediu")], 70))
+        system.add_rule(FuzzyRule([("Cost_Actual", "mic")], 10, weight=0))
+        inputs = grid_samples()
+        expected = system.evaluate_batch(inputs)
+        report = system.optimize()
+        self.assertEqual((report.unreachable, report.rules_after), (2, 10))
+        self.assertEqual(system.rules[-1].conditions, [("Buget_Lunar", "scazut"), ("Buget_Lunar", "mediu")])
+        np.testing.assert_array_equal(system.evaluate_batch(inputs), expected)
+        # Gaussian terms are never exactly 0, so nothing is unreachable
+        system = build_system("sugeno", "gaussian")
+        system.add_rule(FuzzyRule([("Buget_Lunar", "scazut"), ("Buget_Lunar", "ridicat")], 70))
+        self.assertEqual(system.optimize().unreachable, 0)
+
+    def test_mamdani_merge_and_dominated(self):
+        for tnorm in ["min", "product", "lukasiewicz"]:
+            with self.subTest(tnorm=tnorm):
+                system = build_system("mamdani")
+                system.tnorm = tnorm
+                system.add_rule(FuzzyRule([("Buget_Lunar", "mediu"), ("Cost_Actual", "mic")], ("Risc", "scazut"), 0.4))
+                system.add_rule(FuzzyRule([("Cost_Actual", "mic"), ("Buget_Lunar", "mediu")], ("Risc", "scazut"), 0.6))
+                # Fires at least as strongly as (scazut, mic) -> scazut, not as (scazut, moderat) -> mediu
+                system.add_rule(FuzzyRule([("Buget_Lunar", "scazut")], ("Risc", "scazut")))
+                inputs = grid_samples()
+                expected = system.evaluate_batch(inputs)
+                report = system.optimize()
+                self.assertEqual((report.merged, report.dominated, report.rules_after), (2, 1, 9))
+                self.assertNotIn([("Buget_Lunar", "scazut"), ("Cost_Actual", "mic")], [r.conditions for r in system.rules])
+                if tnorm == "min":
+                    np.testing.assert_array_equal(system.evaluate_batch(inputs), expected)
+                else:
+                    np.testing.assert_allclose(system.evaluate_batch(inputs), expected, rtol=1e-12, atol=1e-9)
+                weights = [r.weight for r in system.rules if r.conditions == [("Buget_Lunar", "mediu"), ("Cost_Actual", "mic")]]
+                self.assertEqual(weights, [1.0])
+
+    def test_expressions_and_callables(self):
+        for mode in ["sugeno", "mamdani"]:
+            with self.subTest(mode=mode):
+                system = expression_system(mode, "product")
+                for rule in list(system.rules)[-4:]:
+                    system.add_rule(rule)
+                inputs = samples()
+                expected = system.evaluate_batch(inputs)
+                self.assertEqual(system.optimize().merged, 4)
+                np.testing.assert_allclose(system.evaluate_batch(inputs), expected, rtol=1e-12, atol=1e-9)
+
+        system = build_system("sugeno")
+        first, second = (lambda x: x["Cost_Actual"] / 50), (lambda x: 10.0)
+        for output in (first, first, second):
+            system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], output))
+        inputs = samples(50)
+        expected = system.evaluate_batch(inputs)
+        self.assertEqual(system.optimize().merged, 1)
+        self.assertIs(system.rules[9].output, first)
+        self.assertEqual(system.rules[9].weight, 2)
+        np.testing.assert_allclose(system.evaluate_batch(inputs), expected, rtol=1e-12)
+
+    def test_named_outputs(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], ("Prioritate", 10)))
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], ("Prioritate", 30)))
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], 30))
+        inputs = samples()
+        expected = system.evaluate_batch_outputs(inputs)
+        self.assertEqual(system.optimize().merged, 1)
+        self.assertEqual(system.rules[9].output, ("Prioritate", 20))
+        result = system.evaluate_batch_outputs(inputs)
+        for name in expected:
+            np.testing.assert_allclose(result[name], expected[name], rtol=1e-12)
+
+
+class TestPruning(unittest.TestCase):
+
+    def test_tolerance(self):
+        for mode in ["sugeno", "mamdani"]:
+            with self.subTest(mode=mode):
+                system = synthetic_system(3, 5, 300, mode=mode, seed=1)
+                rng = np.random.default_rng(2)
+                validation = {f"x{i}": rng.uniform(0, 100, 2000) for i in range(3)}
+                expected = system.evaluate_batch(validation)
+                report = system.optimize(tolerance=5.0, validation=validation)
+                self.assertGreater(report.merged, 0)
+                self.assertGreater(report.pruned, 0)
+                self.assertLessEqual(report.max_error, 5.0)
+                self.assertEqual(len(system.rules), report.rules_after)
+                error = np.abs(system.evaluate_batch(validation) - expected).max()
+                self.assertAlmostEqual(error, report.max_error)
+                self.assertGreater(report.estimated_speedup, 300 / len(system.rules) / 2)
+
+    def test_default_samples(self):
+        system = synthetic_system(2, 4, 16, seed=0)
+        report = system.optimize(tolerance=0.0, n_samples=500, seed=0)
+        self.assertIsInstance(report, OptimizationReport)
+        self.assertLess(report.max_error, 1e-9)
+        self.assertEqual(report.as_dict()["rules_after"], len(system.rules))
+        # Rules that never fire on the samples are kept
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Buget_Lunar", "scazut")], 0))
+        report = system.optimize(tolerance=100.0, validation={"Buget_Lunar": [4000.0, 4500], "Cost_Actual": [0.0, 4000]})
+        self.assertEqual(report.rules_after, 6)
+        self.assertTrue(all(rule.conditions[0] == ("Buget_Lunar", "scazut") for rule in system.rules[:3]))
+        self.assertEqual(system.rules[-1].conditions, [("Buget_Lunar", "scazut")])
+
+
+if __name__ == "__main__":
+    unittest.main()
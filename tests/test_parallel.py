@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+from nebulo.parallel import ParallelEvaluator
+from nebulo.rules import FuzzyRule, LinearOutput
+from tests.test_batch import build_system
+
+
+def risk_from_budget(inputs):
+    return inputs["Buget_Lunar"] / 50
+
+
+def risk_from_margin(inputs):
+    return inputs["Marja"] * 10
+
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.inputs = {"Buget_Lunar": rng.uniform(0, 5000, 5000), "Cost_Actual": rng.uniform(0, 5000, 5000)}
+
+    def test_backends_match_evaluate_batch(self):
+        for mode in ("sugeno", "mamdani"):
+            system = build_system(mode)
+            expected = system.evaluate_batch(self.inputs)
+            for backend in ("process", "thread"):
+                with self.subTest(mode=mode, backend=backend):
+                    result = system.evaluate_parallel(self.inputs, workers=2, backend=backend, chunk_size=700)
+                    np.testing.assert_array_equal(result, expected)
+
+    def test_callable_consequents(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], risk_from_budget))
+        expected = system.evaluate_batch(self.inputs)
+        for backend in ("process", "thread"):
+            with self.subTest(backend=backend):
+                result = system.evaluate_parallel(self.inputs, workers=2, backend=backend, chunk_size=1000)
+                np.testing.assert_allclose(result, expected, rtol=1e-12)
+
+    def test_callable_reading_other_inputs(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Cost_Actual", "mare")], risk_from_margin))
+        inputs = dict(self.inputs, Marja=np.linspace(0, 5, 5000))
+        expected = system.evaluate_batch(inputs)
+        for backend in ("process", "thread"):
+            with self.subTest(backend=backend):
+                result = system.evaluate_parallel(inputs, workers=2, backend=backend, chunk_size=1000)
+                np.testing.assert_allclose(result, expected, rtol=1e-12)
+
+    def test_linear_output_reading_other_inputs(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Cost_Actual", "mare")], LinearOutput({"Marja": 10}, 5)))
+        inputs = dict(self.inputs, Marja=np.linspace(0, 5, 5000))
+        expected = system.evaluate_batch(inputs)
+        for backend in ("process", "thread"):
+            with self.subTest(backend=backend):
+                result = system.evaluate_parallel(inputs, workers=2, backend=backend, chunk_size=1000)
+                np.testing.assert_allclose(result, expected, rtol=1e-12)
+
+    def test_workers_restart_after_change(self):
+        system = build_system("sugeno")
+        with ParallelEvaluator(system, workers=2) as evaluator:
+            before = evaluator.evaluate_batch(self.inputs)
+            np.testing.assert_array_equal(before, system.evaluate_batch(self.inputs))
+            system.add_rule(FuzzyRule([("Cost_Actual", "mare")], 100))
+            after = evaluator.evaluate_batch(self.inputs)
+        np.testing.assert_array_equal(after, system.evaluate_batch(self.inputs))
+        self.assertFalse(np.array_equal(before, after))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            ParallelEvaluator(build_system("sugeno"), backend="gpu")
+
+if __name__ == '__main__':
+    unittest.main()
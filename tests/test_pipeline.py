@@ -0,0 +1,215 @@
+import unittest
+
+import numpy as np
+
+from nebulo.membership import TriangularMF
+from nebulo.pipeline import FuzzyPipeline
+from nebulo.rules import FuzzyRule, LinearOutput
+from nebulo.system import FuzzySystem
+from nebulo.variables import FuzzyVariable
+from tests.test_batch import build_system
+
+PRIORITY_RULES = [
+    ([("Buget_Lunar", "scazut")], "urgent"),
+    ([("Buget_Lunar", "mediu"), ("Cost_Actual", "moderat")], "normal"),
+    ([("Cost_Actual", "mic")], "normal"),
+    ([("Buget_Lunar", "ridicat")], "amanat"),
+]
+
+
+def priority_variable():
+    priority = FuzzyVariable("Prioritate", (0, 10))
+    priority.add_term("amanat", TriangularMF(0, 0, 4))
+    priority.add_term("normal", TriangularMF(2, 5, 8))
+    priority.add_term("urgent", TriangularMF(6, 10, 10))
+    return priority
+
+
+def multi_output_system(mode):
+    """The 3x3 example concluding on Risc and on a second output, Prioritate"""
+    system = build_system(mode)
+    if mode == "mamdani":
+        system.add_output(priority_variable())
+        system.add_output(system.variables.pop("Risc"))
+    values = {"amanat": 1, "normal": 5, "urgent": LinearOutput({"Cost_Actual": 0.002}, 8)}
+    for conditions, label in PRIORITY_RULES:
+        system.add_rule(FuzzyRule(conditions, ("Prioritate", label if mode == "mamdani" else values[label])))
+    return system
+
+
+def single_output_systems(mode):
+    """Separate systems computing the outputs of multi_output_system"""
+    risk = build_system(mode)
+    priority = build_system(mode)
+    if mode == "mamdani":
+        priority.add_output(priority_variable())
+    values = {"amanat": 1, "normal": 5, "urgent": LinearOutput({"Cost_Actual": 0.002}, 8)}
+    priority.rules = [FuzzyRule(conditions, label if mode == "mamdani" else values[label])
+                      for conditions, label in PRIORITY_RULES]
+    return risk, priority
+
+
+def samples(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return {"Buget_Lunar": rng.uniform(0, 5000, n), "Cost_Actual": rng.uniform(0, 5000, n)}
+
+
+def rows(inputs):
+    names = list(inputs)
+    return [dict(zip(names, values)) for values in zip(*(inputs[n].tolist() for n in names))]
+
+
+class CountingMF(TriangularMF):
+    __slots__ = ()
+    calls = 0
+
+    def evaluate(self, x):
+        CountingMF.calls += 1
+        return super().evaluate(x)
+
+    def evaluate_array(self, x, out=None):
+        CountingMF.calls += 1
+        return super().evaluate_array(x, out=out)
+
+
+class TestMultiOutput(unittest.TestCase):
+
+    def test_matches_separate_systems(self):
+        inputs = samples()
+        for mode in ["sugeno", "mamdani"]:
+            with self.subTest(mode=mode):
+                system = multi_output_system(mode)
+                risk, priority = single_output_systems(mode)
+                outputs = system.evaluate_batch_outputs(inputs)
+                self.assertEqual(list(outputs), ["Risc", "Prioritate"] if mode == "mamdani" else [None, "Prioritate"])
+                risk_name = "Risc" if mode == "mamdani" else None
+                np.testing.assert_allclose(outputs[risk_name], risk.evaluate_batch(inputs))
+                np.testing.assert_allclose(outputs["Prioritate"], priority.evaluate_batch(inputs))
+                for row in rows(inputs)[:40]:
+                    values = system.evaluate_outputs(row)
+                    self.assertAlmostEqual(values[risk_name], risk.evaluate(row))
+                    self.assertAlmostEqual(values["Prioritate"], priority.evaluate(row))
+                with self.assertRaises(ValueError):
+                    system.evaluate(rows(inputs)[0])
+
+    def test_split_outputs(self):
+        system = multi_output_system("mamdani")
+        parts = system.split_outputs()
+        self.assertEqual({name: len(part.rules) for name, part in parts.items()}, {"Risc": 9, "Prioritate": 4})
+        self.assertIs(system.split_outputs(), parts)
+        self.assertIs(parts["Risc"].variables["Buget_Lunar"], system.variables["Buget_Lunar"])
+        system.add_rule(FuzzyRule([("Cost_Actual", "mare")], ("Prioritate", "urgent")))
+        self.assertEqual(len(system.split_outputs()["Prioritate"].rules), 5)
+        single = build_system("sugeno")
+        self.assertEqual(single.split_outputs(), {None: single})
+
+    def test_single_output(self):
+        inputs = samples(50)
+        system = build_system("sugeno")
+        np.testing.assert_array_equal(system.evaluate_batch_outputs(inputs)[None], system.evaluate_batch(inputs))
+        point = rows(inputs)[0]
+        self.assertEqual(system.evaluate_outputs(point), {None: system.evaluate(point)})
+
+
+class TestPipeline(unittest.TestCase):
+
+    def hierarchy(self):
+        """Risk and priority from the inputs, then an action level from both"""
+        level = FuzzySystem()
+        risk = FuzzyVariable("Risc", (0, 100))
+        risk.add_term("mic", TriangularMF(0, 0, 60))
+        risk.add_term("mare", TriangularMF(40, 100, 100))
+        level.add_variable(risk)
+        level.add_variable(priority_variable())
+        level.add_rule(FuzzyRule([("Risc", "mic"), ("Prioritate", "amanat")], 0))
+        level.add_rule(FuzzyRule([("Risc", "mare")], 10))
+        level.add_rule(FuzzyRule([("Prioritate", "urgent")], LinearOutput({"Risc": 0.05}, 5)))
+        pipeline = FuzzyPipeline()
+        pipeline.add(level, "Actiune")  # added first, runs last
+        pipeline.add(multi_output_system("mamdani"))
+        return pipeline, level
+
+    def test_chained_outputs(self):
+        pipeline, level = self.hierarchy()
+        self.assertEqual(pipeline.outputs, ["Risc", "Prioritate", "Actiune"])
+        self.assertEqual(pipeline.inputs, ["Buget_Lunar", "Cost_Actual"])
+        inputs = samples(300)
+        outputs = pipeline.evaluate_batch(inputs)
+        upstream = multi_output_system("mamdani").evaluate_batch_outputs(inputs)
+        np.testing.assert_allclose(outputs["Actiune"], level.evaluate_batch(upstream))
+        for k, row in enumerate(rows(inputs)[:40]):
+            values = pipeline.evaluate(row)
+            for name in pipeline.outputs:
+                self.assertAlmostEqual(values[name], outputs[name][k])
+
+    def test_columns(self):
+        pipeline, _ = self.hierarchy()
+        inputs = samples(20)
+        data = np.column_stack([inputs["Cost_Actual"], inputs["Buget_Lunar"]])
+        outputs = pipeline.evaluate_batch(data, columns=["Cost_Actual", "Buget_Lunar"])
+        np.testing.assert_array_equal(outputs["Actiune"], pipeline.evaluate_batch(inputs)["Actiune"])
+
+    def test_shared_fuzzification(self):
+        systems = [build_system("sugeno"), build_system("mamdani"), build_system("sugeno", "gaussian")]
+        for system in systems[:2]:  # equal functions, separate objects
+            for var in ["Buget_Lunar", "Cost_Actual"]:
+                terms = system.variables[var].terms
+                for term, mf in terms.items():
+                    terms[term] = CountingMF(mf.a, mf.b, mf.c)
+        pipeline = FuzzyPipeline()
+        for k, system in enumerate(systems):
+            pipeline.add(system, f"y{k}")
+        inputs = samples(100)
+        CountingMF.calls = 0
+        outputs = pipeline.evaluate_batch(inputs)
+        self.assertEqual(CountingMF.calls, 6)  # not 12: the two systems share every term
+        CountingMF.calls = 0
+        pipeline.evaluate(rows(inputs)[0])
+        self.assertEqual(CountingMF.calls, 6)
+        for k, system in enumerate(systems):
+            np.testing.assert_allclose(outputs[f"y{k}"], system.evaluate_batch(inputs))
+
+    def test_rebuilds_after_change(self):
+        system = build_system("sugeno")
+        pipeline = FuzzyPipeline()
+        pipeline.add(system, "y")
+        inputs = samples(50)
+        pipeline.evaluate_batch(inputs)
+        system.rules[4] = FuzzyRule(system.rules[4].conditions, 80)
+        np.testing.assert_allclose(pipeline.evaluate_batch(inputs)["y"], system.evaluate_batch(inputs))
+
+    def test_errors(self):
+        pipeline = FuzzyPipeline()
+        pipeline.add(build_system("sugeno"))
+        with self.assertRaises(ValueError):
+            pipeline.outputs
+        pipeline = FuzzyPipeline()
+        pipeline.add(multi_output_system("mamdani"), "y")
+        with self.assertRaises(ValueError):
+            pipeline.outputs
+        pipeline = FuzzyPipeline()
+        pipeline.add(build_system("sugeno"), "y")
+        pipeline.add(build_system("mamdani"), "y")
+        with self.assertRaises(ValueError):
+            pipeline.outputs
+
+        # Each stage reads the other's output
+        first, second = build_system("sugeno"), build_system("sugeno")
+        for system, source in [(first, "B"), (second, "A")]:
+            var = FuzzyVariable(source, (0, 100))
+            var.add_term("mare", TriangularMF(50, 100, 100))
+            system.add_variable(var)
+            system.add_rule(FuzzyRule([(source, "mare")], 100))
+        pipeline = FuzzyPipeline()
+        pipeline.add(first, "A")
+        pipeline.add(second, "B")
+        with self.assertRaises(ValueError):
+            pipeline.outputs
+        pipeline = FuzzyPipeline()
+        pipeline.add(build_system("sugeno"), "y")
+        with self.assertRaises(KeyError):
+            pipeline.evaluate_batch({"Buget_Lunar": [100.0]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from itertools import product
+
+import numpy as np
+
+from nebulo.membership import TriangularMF
+from nebulo.rulebase import RuleBase
+from nebulo.rules import FuzzyRule
+from nebulo.system import FuzzySystem
+from nebulo.variables import FuzzyVariable
+from tests.test_batch import build_system
+
+
+def as_pairs(rules):
+    return [(r.conditions, r.output) for r in rules]
+
+
+class TestRuleBase(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = [FuzzyRule([("x", "a"), ("y", "b")], 1),
+                      FuzzyRule([("x", "c")], ("out", "high")),
+                      FuzzyRule([("y", "a"), ("x", "a"), ("z", "d")], "low")]
+
+    def test_list_behaviour(self):
+        base = RuleBase(self.rules)
+        self.assertEqual(len(base), 3)
+        self.assertEqual(as_pairs(base), as_pairs(self.rules))
+        self.assertEqual(as_pairs([base[-1]]), as_pairs(self.rules[-1:]))
+        self.assertEqual(as_pairs(base[1:]), as_pairs(self.rules[1:]))
+        self.assertEqual(base.slot_names[:2], [("x", "a"), ("y", "b")])
+        with self.assertRaises(IndexError):
+            base[3]
+
+    def test_edits_match_a_list(self):
+        base, plain = RuleBase(self.rules), list(self.rules)
+        edits = [
+            lambda rules: rules.insert(1, FuzzyRule([("z", "d"), ("x", "a")], 7)),
+            lambda rules: rules.__setitem__(0, FuzzyRule([("y", "b")], 2.5)),
+            lambda rules: rules.__delitem__(2),
+            lambda rules: rules.__setitem__(slice(0, 2), [FuzzyRule([("x", "c")], 4)]),
+            lambda rules: rules.append(FuzzyRule([("x", "a"), ("y", "a"), ("z", "d")], "mid")),
+            lambda rules: rules.__delitem__(slice(None, None, 2)),
+            lambda rules: rules.insert(-1, FuzzyRule([("y", "b")], 3)),
+            lambda rules: rules.insert(-10, FuzzyRule([("x", "c")], "mid")),
+            lambda rules: rules.insert(10, FuzzyRule([("z", "d")], 5)),
+        ]
+        for edit in edits:
+            edit(base)
+            edit(plain)
+            self.assertEqual(as_pairs(base), as_pairs(plain))
+        base.clear()
+        self.assertEqual(len(base), 0)
+
+    def test_slotted_objects(self):
+        for obj in (TriangularMF(0, 1, 2), FuzzyRule([], 0), build_system("sugeno").variables["Risc"]):
+            self.assertFalse(hasattr(obj, "__dict__"))
+
+
+class TestSystemRules(unittest.TestCase):
+
+    def setUp(self):
+        grid = np.linspace(0, 5000, 21)
+        x1, x2 = np.meshgrid(grid, grid)
+        self.inputs = {"Buget_Lunar": x1.ravel(), "Cost_Actual": x2.ravel()}
+
+    def test_add_rules_matches_add_rule(self):
+        names = [["scazut", "mediu", "ridicat"], ["mic", "moderat", "mare"]]
+        for mode in ("sugeno", "mamdani"):
+            expected = build_system(mode)
+            for terms in ("names", "positions"):
+                with self.subTest(mode=mode, terms=terms):
+                    system = build_system(mode)
+                    rules = list(system.rules)
+                    system.rules = []
+                    if terms == "names":
+                        matrix = [[t for _, t in r.conditions] for r in rules]
+                    else:
+                        matrix = [[names[j].index(t) for j, (_, t) in enumerate(r.conditions)] for r in rules]
+                    system.add_rules(["Buget_Lunar", "Cost_Actual"], matrix, [r.output for r in rules])
+                    self.assertEqual(as_pairs(system.rules), as_pairs(expected.rules))
+                    np.testing.assert_array_equal(system.evaluate_batch(self.inputs),
+                                                  expected.evaluate_batch(self.inputs))
+
+    def test_add_rules_skips_variables(self):
+        system = build_system("sugeno")
+        system.add_rules(["Buget_Lunar", "Cost_Actual"], [[-1, 2], [0, -1]], [100, 0])
+        self.assertEqual(as_pairs(system.rules[-2:]),
+                         [([("Cost_Actual", "mare")], 100.0), ([("Buget_Lunar", "scazut")], 0.0)])
+        row = {"Buget_Lunar": 4000, "Cost_Actual": 4200}
+        self.assertAlmostEqual(system.evaluate(row), system.evaluate_batch({k: [v] for k, v in row.items()})[0])
+
+    def test_replacing_a_rule_recompiles(self):
+        system = build_system("sugeno")
+        before = system.evaluate_batch(self.inputs)
+        system.rules[4] = FuzzyRule([("Buget_Lunar", "mediu"), ("Cost_Actual", "moderat")], 0)
+        after = system.evaluate_batch(self.inputs)
+        self.assertFalse(np.array_equal(before, after))
+        np.testing.assert_allclose(after, [system.evaluate({"Buget_Lunar": x, "Cost_Actual": y})
+                                           for x, y in zip(*(self.inputs[n].tolist() for n in self.inputs))])
+
+    def test_large_generated_grid(self):
+        system = FuzzySystem()
+        var_names = ["x0", "x1", "x2"]
+        for name in var_names:
+            var = FuzzyVariable(name)
+            for t in range(20):
+                var.add_term(f"t{t}", TriangularMF((t - 1) * 5, t * 5, (t + 1) * 5))
+            system.add_variable(var)
+        terms = np.array(list(product(range(20), repeat=3)))
+        system.add_rules(var_names, terms, terms.sum(axis=1) % 7)
+        self.assertEqual(len(system.rules), 8000)
+        self.assertEqual(len(system.rules.slot_names), 60)
+        row = {"x0": 12.5, "x1": 40.1, "x2": 77.7}
+        self.assertAlmostEqual(system.evaluate(row), system.evaluate_batch({k: [v] for k, v in row.items()})[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+
+import numpy as np
+
+from nebulo.membership import TrapezoidalMF
+from nebulo.rules import FuzzyRule, LinearOutput
+from nebulo.sensitivity import monte_carlo, one_at_a_time, sobol_indices
+from nebulo.system import FuzzySystem
+from nebulo.utils import compute_surface
+from nebulo.variables import FuzzyVariable
+from tests.test_batch import build_system
+
+
+def linear_system(coefficients):
+    """One always-firing rule, so the output is exactly sum(c * x) over [0, 1] inputs"""
+    system = FuzzySystem()
+    for name in coefficients:
+        var = FuzzyVariable(name, (0, 1))
+        var.add_term("all", TrapezoidalMF(-1, 0, 1, 2))
+        system.add_variable(var)
+    system.add_rule(FuzzyRule([(name, "all") for name in coefficients], LinearOutput(coefficients)))
+    return system
+
+
+class TestSurface(unittest.TestCase):
+
+    def test_matches_nested_evaluate(self):
+        for mode in ["sugeno", "mamdani"]:
+            with self.subTest(mode=mode):
+                system = build_system(mode)
+                X, Y, Z = compute_surface(system, "Buget_Lunar", "Cost_Actual", resolution=(12, 9))
+                x_range, y_range = np.linspace(0, 5000, 12), np.linspace(0, 5000, 9)
+                expected = [[system.evaluate({"Buget_Lunar": x, "Cost_Actual": y}) for x in x_range] for y in y_range]
+                self.assertEqual(Z.shape, (9, 12))
+                np.testing.assert_array_equal(X[0], x_range)
+                np.testing.assert_array_equal(Y[:, 0], y_range)
+                np.testing.assert_allclose(Z, expected, atol=1e-9)
+
+    def test_fixed_inputs(self):
+        system = linear_system({"a": 1, "b": 2, "c": 4})
+        X, Y, Z = compute_surface(system, "a", "c", 5, fixed={"b": 0.5}, y_range=(0, 1.5))
+        np.testing.assert_allclose(Z, X + 1 + 4 * Y)
+        with self.assertRaises(KeyError):
+            compute_surface(system, "a", "c", 5)
+
+
+class TestSensitivity(unittest.TestCase):
+
+    def test_sobol_linear(self):
+        # Var(a + 2b) = 1/12 + 4/12 for independent uniform inputs: S_a = 0.2, S_b = 0.8
+        system = linear_system({"a": 1, "b": 2})
+        result = sobol_indices(system, n_samples=100_000, seed=0)
+        for var, expected in [("a", 0.2), ("b", 0.8)]:
+            self.assertAlmostEqual(result.first_order[var], expected, delta=0.03)
+            self.assertAlmostEqual(result.total[var], expected, delta=0.03)
+            self.assertLess(result.total_error[var], 0.02)
+        self.assertAlmostEqual(result.variance, 5 / 12, delta=0.01)
+        self.assertEqual(result.ranking(), ["b", "a"])
+        self.assertEqual(result.n_evaluations, 400_000)
+        self.assertEqual(len(result.history), 10)
+        self.assertEqual(result.history[-1][0], 100_000)
+
+    def test_sobol_interaction_and_fixed(self):
+        # a * b has no first-order effect of a where b is centred on 0, only interaction
+        system = linear_system({"a": 1})
+        system.variables["a"]._universe = (-1, 1)
+        system.rules = [FuzzyRule([("a", "all")], lambda x: x["a"] * x["b"])]
+        result = sobol_indices(system, {"a": (-1, 1), "b": (-1, 1), "c": 3.0}, n_samples=20_000, seed=1)
+        self.assertEqual(result.names, ["a", "b"])
+        self.assertAlmostEqual(result.first_order["a"], 0.0, delta=0.05)
+        self.assertAlmostEqual(result.total["a"], 1.0, delta=0.05)
+
+    def test_monte_carlo(self):
+        system = linear_system({"a": 1, "b": 2})
+        result = monte_carlo(system, {"b": lambda rng, n: rng.normal(0.5, 0.1, n)}, n_samples=50_000, seed=0)
+        self.assertAlmostEqual(result.mean, 1.5, delta=0.01)
+        self.assertAlmostEqual(result.std, np.sqrt(1 / 12 + 0.04), delta=0.01)
+        self.assertAlmostEqual(result.quantile(0.5), 1.5, delta=0.02)
+        self.assertEqual(len(result.outputs), 50_000)
+        self.assertIsNone(result.converged)
+        means = [mean for _, mean, _ in result.history]
+        self.assertEqual(means[-1], result.mean)
+
+        early = monte_carlo(system, n_samples=10 ** 6, chunk_size=10_000, seed=0, tolerance=0.005, keep_outputs=False)
+        self.assertTrue(early.converged)
+        self.assertLess(early.n_samples, 10 ** 6)
+        self.assertLessEqual(early.standard_error, 0.005)
+        with self.assertRaises(ValueError):
+            early.quantile(0.5)
+        with self.assertRaises(ValueError):
+            monte_carlo(system, {"a": lambda rng, n: rng.uniform(size=n + 1)}, n_samples=10)
+
+    def test_large_mean_small_spread(self):
+        system = linear_system({"a": 1, "b": 2})
+        system.rules = [FuzzyRule(system.rules[0].conditions, LinearOutput({"a": 1e-3, "b": 2e-3}, 1e8))]
+        result = monte_carlo(system, n_samples=50_000, seed=0)
+        self.assertAlmostEqual(result.std, np.std(result.outputs), delta=1e-3 * result.std)
+        sobol = sobol_indices(system, n_samples=50_000, seed=0)
+        self.assertAlmostEqual(sobol.variance, 5e-6 / 12, delta=5e-8)
+        self.assertAlmostEqual(sobol.total["b"], 0.8, delta=0.03)
+
+    def test_no_samples(self):
+        system = linear_system({"a": 1})
+        for function in (monte_carlo, sobol_indices):
+            with self.subTest(function=function.__name__), self.assertRaises(ValueError):
+                function(system, n_samples=0)
+
+    def test_one_at_a_time(self):
+        system = linear_system({"a": 1, "b": -3})
+        result = one_at_a_time(system, {"a": 0.5, "b": 0.25}, n_points=11)
+        self.assertAlmostEqual(result.base_output, 0.5 - 0.75)
+        self.assertAlmostEqual(result.slopes["a"], 1.0)
+        self.assertAlmostEqual(result.slopes["b"], -3.0)
+        self.assertAlmostEqual(result.ranges["b"], 3.0)
+        np.testing.assert_allclose(result.outputs["a"], result.values["a"] - 0.75)
+        self.assertEqual(result.ranking(), ["b", "a"])
+
+    def test_fuzzy_example(self):
+        system = build_system("sugeno")
+        result = sobol_indices(system, n_samples=20_000, seed=0)
+        self.assertEqual(set(result.names), {"Buget_Lunar", "Cost_Actual"})
+        for var in result.names:
+            self.assertGreater(result.total[var], result.first_order[var] - 0.05)
+            self.assertGreater(result.total[var], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from nebulo.rules import FuzzyRule, LinearOutput
+from nebulo.server import Client, FuzzyServer, MicroBatcher
+from tests.test_batch import build_system
+
+
+def failing_consequent(inputs):
+    raise RuntimeError("consequent failed")
+
+
+def risk_from_extra(inputs):
+    return inputs["Extra"] / 2
+
+
+def sample_inputs(n, seed=4):
+    rng = np.random.default_rng(seed)
+    return [{"Buget_Lunar": x, "Cost_Actual": y} for x, y in rng.uniform(0, 5000, (n, 2)).tolist()]
+
+
+class TestMicroBatcher(unittest.IsolatedAsyncioTestCase):
+
+    async def test_coalesces_concurrent_requests(self):
+        system = build_system("mamdani")
+        batcher = MicroBatcher(system, max_batch_size=16, max_wait=0.01)
+        inputs = sample_inputs(40)
+        outputs = await asyncio.gather(*(batcher.evaluate(row) for row in inputs))
+        for row, output in zip(inputs, outputs):
+            self.assertAlmostEqual(output, system.evaluate(row), places=9)
+        self.assertEqual(batcher.requests, 40)
+        self.assertEqual(batcher.batches, 3)
+
+    async def test_swap_keeps_queued_requests(self):
+        batcher = MicroBatcher(build_system("sugeno"), max_wait=0.01)
+        pending = [batcher.evaluate(row) for row in sample_inputs(5)]
+        replacement = build_system("mamdani")
+        batcher.swap(replacement)
+        outputs = await asyncio.gather(*pending)
+        for row, output in zip(sample_inputs(5), outputs):
+            self.assertAlmostEqual(output, replacement.evaluate(row), places=9)
+
+    async def test_linear_output_reading_other_inputs(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Cost_Actual", "mare")], LinearOutput({"Marja": 10}, 5)))
+        batcher = MicroBatcher(system, max_batch_size=16, max_wait=0.01)
+        inputs = [dict(row, Marja=i / 10) for i, row in enumerate(sample_inputs(20))]
+        expected = system.evaluate_batch({name: [row[name] for row in inputs] for name in inputs[0]})
+        outputs = await asyncio.gather(*(batcher.evaluate(row) for row in inputs))
+        np.testing.assert_allclose(outputs, expected, rtol=1e-12)
+        self.assertAlmostEqual(await batcher.evaluate(inputs[3]), expected[3], places=9)
+
+    async def test_callable_reading_other_inputs(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Cost_Actual", "mare")], risk_from_extra))
+        batcher = MicroBatcher(system, max_batch_size=16, max_wait=0.01)
+        inputs = [dict(row, Extra=float(i)) for i, row in enumerate(sample_inputs(10))]
+        expected = system.evaluate_batch({name: [row[name] for row in inputs] for name in inputs[0]})
+        plain = sample_inputs(4, seed=5)
+        outputs = await asyncio.gather(*(batcher.evaluate(row) for row in inputs + plain), return_exceptions=True)
+        np.testing.assert_allclose(outputs[:10], expected, rtol=1e-12)
+        # Requests without the input are batched apart, and only they fail
+        for output in outputs[10:]:
+            self.assertIsInstance(output, KeyError)
+        self.assertAlmostEqual(await batcher.evaluate(inputs[3]), expected[3], places=9)
+
+    async def test_bad_request_fails_alone(self):
+        batcher = MicroBatcher(build_system("sugeno"), max_wait=0.01)
+        good = batcher.evaluate({"Buget_Lunar": 1200, "Cost_Actual": 1000})
+        missing = batcher.evaluate({"Buget_Lunar": 1200})
+        self.assertAlmostEqual(await good, build_system("sugeno").evaluate({"Buget_Lunar": 1200, "Cost_Actual": 1000}))
+        with self.assertRaises(KeyError):
+            await missing
+
+
+class TestFuzzyServer(unittest.IsolatedAsyncioTestCase):
+
+    async def run_clients(self, connect, inputs, connections=8):
+        clients = [await Client.connect(**connect) for _ in range(connections)]
+        try:
+            async def worker(client, rows):
+                return [await client.evaluate(row) for row in rows]
+            parts = await asyncio.gather(*(worker(c, inputs[i::connections]) for i, c in enumerate(clients)))
+        finally:
+            for client in clients:
+                await client.close()
+        outputs = [None] * len(inputs)
+        for i, part in enumerate(parts):
+            outputs[i::connections] = part
+        return outputs
+
+    async def test_tcp_requests_are_batched(self):
+        system = build_system("sugeno")
+        async with await FuzzyServer(system, max_wait=0.005).start(port=0) as server:
+            host, port = server.address[:2]
+            inputs = sample_inputs(64)
+            outputs = await self.run_clients({"host": host, "port": port}, inputs)
+            client = await Client.connect(host, port)
+            status, health = await client.request("GET", "/health")
+            status_missing, error = await client.request("POST", "/evaluate", {"Buget_Lunar": 1})
+            await client.close()
+        np.testing.assert_allclose(outputs, [system.evaluate(row) for row in inputs], rtol=1e-12)
+        self.assertEqual(status, 200)
+        self.assertEqual(health["requests"], 64)
+        self.assertLess(health["batches"], 64)
+        self.assertEqual(status_missing, 400)
+        self.assertIn("Cost_Actual", error["error"])
+
+    async def test_evaluation_errors_keep_the_connection(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], failing_consequent))
+        async with await FuzzyServer(system, max_wait=0.001).start(port=0) as server:
+            client = await Client.connect(*server.address[:2])
+            status, error = await client.request("POST", "/evaluate", {"Buget_Lunar": 3000, "Cost_Actual": 100})
+            status_health, _ = await client.request("GET", "/health")
+            await client.close()
+        self.assertEqual(status, 500)
+        self.assertIn("consequent failed", error["error"])
+        self.assertEqual(status_health, 200)
+
+    @unittest.skipUnless(hasattr(asyncio, "start_unix_server"), "needs Unix sockets")
+    async def test_unix_socket(self):
+        system = build_system("sugeno")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "nebulo.sock")
+            async with await FuzzyServer(system).start(path=path):
+                inputs = sample_inputs(10)
+                outputs = await self.run_clients({"path": path}, inputs, connections=2)
+        np.testing.assert_allclose(outputs, [system.evaluate(row) for row in inputs], rtol=1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
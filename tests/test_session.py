@@ -0,0 +1,123 @@
+import unittest
+from itertools import combinations
+
+import numpy as np
+
+from nebulo.membership import TriangularMF
+from nebulo.rules import FuzzyRule
+from nebulo.system import FuzzySystem
+from nebulo.variables import FuzzyVariable
+from tests.test_batch import build_system
+
+TERMS = {"jos": (-50, 0, 50), "mediu": (0, 50, 100), "sus": (50, 100, 150)}
+
+
+def sparse_system(mode, n_vars=5):
+    """Rules over pairs of variables, so one input only affects some of them"""
+    system = FuzzySystem(mode=mode)
+    names = [f"x{i}" for i in range(n_vars)]
+    for name in names:
+        var = FuzzyVariable(name, (0, 100))
+        for term, params in TERMS.items():
+            var.add_term(term, TriangularMF(*params))
+        system.add_variable(var)
+    out = FuzzyVariable("y", (0, 100))
+    for term, params in TERMS.items():
+        out.add_term(term, TriangularMF(*params))
+    system.add_output(out)
+    labels = list(TERMS)
+    k = 0
+    for a, b in combinations(names[:3], 2):
+        for ta in labels:
+            for tb in labels:
+                output = ("y", labels[k % 3]) if mode == "mamdani" else (k * 7) % 100
+                system.add_rule(FuzzyRule([(a, ta), (b, tb)], output))
+                k += 1
+    for name in names[3:]:
+        for term in labels:
+            system.add_rule(FuzzyRule([(name, term)], ("y", term) if mode == "mamdani" else len(term) * 10))
+    return system
+
+
+def random_walk(system, session, steps, seed=0, per_step=1):
+    rng = np.random.default_rng(seed)
+    names = list(system.variables)
+    current = dict(session.inputs)
+    for _ in range(steps):
+        change = {name: float(rng.uniform(0, 100)) for name in rng.choice(names, per_step, replace=False)}
+        current.update(change)
+        yield session.update(change), system.evaluate(current), session._deltas
+
+
+class TestEvaluationSession(unittest.TestCase):
+
+    def start(self, system):
+        return system.session({name: 50.0 for name in system.variables})
+
+    def test_matches_evaluate(self):
+        for mode in ("sugeno", "mamdani"):
+            for per_step in (1, 2):
+                with self.subTest(mode=mode, per_step=per_step):
+                    system = sparse_system(mode)
+                    session = self.start(system)
+                    self.assertEqual(session.output, system.evaluate(session.inputs))
+                    pairs = list(random_walk(system, session, 500, per_step=per_step))
+                    got, expected, deltas = np.array(pairs).T
+                    if mode == "mamdani":
+                        np.testing.assert_array_equal(got, expected)
+                    else:
+                        np.testing.assert_allclose(got, expected, rtol=1e-12, atol=1e-12)
+                    self.assertGreater(deltas.max(), 0)  # some steps were incremental
+
+    def test_keyword_updates_and_unchanged_inputs(self):
+        system = build_system("mamdani")
+        session = system.session()
+        self.assertEqual(session.update(Buget_Lunar=1500, Cost_Actual=700),
+                         system.evaluate({"Buget_Lunar": 1500, "Cost_Actual": 700}))
+        self.assertEqual(session.update(Cost_Actual=700), session.output)
+        self.assertEqual(session.update({"Cost_Actual": 2500}),
+                         system.evaluate({"Buget_Lunar": 1500, "Cost_Actual": 2500}))
+
+    def test_missing_and_unknown_inputs(self):
+        system = sparse_system("sugeno")
+        session = system.session()
+        with self.assertRaises(KeyError):
+            session.update(x0=10.0)
+        with self.assertRaises(KeyError):
+            session.update(nu_exista=1.0)
+        expected = system.evaluate({name: 10.0 for name in system.variables})
+        self.assertEqual(session.update({name: 10.0 for name in system.variables}), expected)
+
+    def test_nothing_fires_gives_exact_zero(self):
+        system = sparse_system("sugeno", n_vars=3)
+        system.variables["x0"].add_term("departe", TriangularMF(1000, 1100, 1200))
+        system.rules = [rule for rule in system.rules if ("x0", "jos") in rule.conditions]
+        session = system.session({"x0": 10.0, "x1": 10.0, "x2": 10.0})
+        self.assertGreater(session.output, 0)
+        for value in (20.0, 30.0, 60.0):
+            session.update(x0=value)
+        self.assertEqual(session.output, 0)
+        self.assertEqual(session._sums, [0.0, 0.0])
+
+    def test_system_changes_and_callables(self):
+        system = sparse_system("sugeno")
+        session = self.start(system)
+        other = self.start(system)
+        self.assertIs(session._plan, other._plan)
+        plan = session._plan
+        system.add_rule(FuzzyRule([("x3", "jos")], lambda inputs: inputs["x4"] + 1))
+        for got, expected, _ in random_walk(system, session, 200, seed=1):
+            self.assertAlmostEqual(got, expected, places=9)
+        self.assertIsNot(session._plan, plan)
+        other.update(x0=20.0)
+        self.assertIs(other._plan, session._plan)
+
+    def test_refresh(self):
+        system = sparse_system("sugeno")
+        session = system.session({name: 50.0 for name in system.variables}, refresh=3)
+        deltas = [step[2] for step in random_walk(system, session, 50)]
+        self.assertEqual(max(deltas), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from nebulo.membership import (
+    GaussianMF, GeneralizedBellMF, MembershipFunction, PiShapedMF, PiecewiseLinearMF,
+    SigmoidMF, SShapedMF, TrapezoidalMF, TriangularMF, ZShapedMF,
+)
+from nebulo.rules import FuzzyRule
+from nebulo.system import FuzzySystem
+from nebulo.variables import FuzzyVariable
+from tests.test_batch import build_system
+
+
+def every_kind_system():
+    x = FuzzyVariable("x", universe=(0, 10))
+    x.add_term("tri", TriangularMF(0, 2, 4))
+    x.add_term("trap", TrapezoidalMF(1, 3, 5, 7))
+    x.add_term("gauss", GaussianMF(5, 1.5))
+    x.add_term("bell", GeneralizedBellMF(2, 3, 6))
+    x.add_term("sig", SigmoidMF(2, 7))
+    y = FuzzyVariable("y")
+    y.add_term("s", SShapedMF(0, 6))
+    y.add_term("z", ZShapedMF(4, 10))
+    y.add_term("pi", PiShapedMF(1, 4, 6, 9))
+    y.add_term("pwl", PiecewiseLinearMF([(0, 0), (3, 1), (5, 0.4), (10, 0)]))
+    system = FuzzySystem(mode="sugeno")
+    system.add_variable(x)
+    system.add_variable(y)
+    for i, a in enumerate(x.terms):
+        for j, b in enumerate(y.terms):
+            conditions = [("x", a)] if (i + j) % 4 == 0 else [("x", a), ("y", b)]
+            system.add_rule(FuzzyRule(conditions, 7 * i - 3 * j))
+    return system
+
+
+class TestSaveLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "model.nebulo")
+        rng = np.random.default_rng(6)
+        self.inputs = {"Buget_Lunar": rng.uniform(0, 5000, 500), "Cost_Actual": rng.uniform(0, 5000, 500),
+                       "x": rng.uniform(0, 10, 500), "y": rng.uniform(0, 10, 500)}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assertRoundTrip(self, system, mmap):
+        system.save(self.path)
+        loaded = FuzzySystem.load(self.path, mmap=mmap)
+        inputs = {name: self.inputs[name] for name in system.variables if name in self.inputs}
+        np.testing.assert_array_equal(loaded.evaluate_batch(inputs), system.evaluate_batch(inputs))
+        row = {name: values[0] for name, values in inputs.items()}
+        self.assertAlmostEqual(loaded.evaluate(row), system.evaluate(row), places=12)
+        self.assertEqual([(r.conditions, r.output) for r in loaded.rules],
+                         [(r.conditions, r.output) for r in system.rules])
+        return loaded
+
+    def test_round_trip(self):
+        systems = {"sugeno": build_system("sugeno"), "mamdani": build_system("mamdani"),
+                   "every kind": every_kind_system()}
+        for name, system in systems.items():
+            for mmap in (True, False):
+                with self.subTest(system=name, mmap=mmap):
+                    self.assertRoundTrip(system, mmap)
+
+    def test_mapped_rules_are_read_only_views(self):
+        loaded = self.assertRoundTrip(build_system("mamdani"), mmap=True)
+        compiled = loaded.compile()
+        self.assertFalse(compiled.antecedents.flags.writeable)
+        self.assertFalse(compiled.consequents.flags.writeable)
+
+    def test_loaded_system_stays_editable(self):
+        system = build_system("sugeno")
+        system.save(self.path)
+        loaded = FuzzySystem.load(self.path)
+        for s in (system, loaded):
+            s.add_rule(FuzzyRule([("Cost_Actual", "mare")], 100))
+        inputs = {"Buget_Lunar": self.inputs["Buget_Lunar"], "Cost_Actual": self.inputs["Cost_Actual"]}
+        np.testing.assert_array_equal(loaded.evaluate_batch(inputs), system.evaluate_batch(inputs))
+        self.assertEqual(len(loaded.rules), 10)
+
+    def test_unsupported_systems(self):
+        callable_rule = build_system("sugeno")
+        callable_rule.add_rule(FuzzyRule([("Cost_Actual", "mare")], lambda inputs: 1.0))
+
+        class CustomMF(MembershipFunction):
+            def evaluate(self, x):
+                return 1.0
+        custom = build_system("sugeno")
+        custom.variables["Cost_Actual"].add_term("custom", CustomMF())
+        for system in (callable_rule, custom):
+            with self.assertRaises(ValueError):
+                system.save(self.path)
+
+    def test_rejects_other_files(self):
+        build_system("sugeno").save(self.path)
+        with open(self.path, "r+b") as handle:
+            handle.seek(8)
+            handle.write(struct.pack("<I", 99))
+        with self.assertRaises(ValueError):
+            FuzzySystem.load(self.path)
+        with open(self.path, "wb") as handle:
+            handle.write(b"not a model")
+        with self.assertRaises(ValueError):
+            FuzzySystem.load(self.path)
+
+if __name__ == '__main__':
+    unittest.main()
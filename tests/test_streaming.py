@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from tests.test_batch import build_system
+
+NAMES = ["Buget_Lunar", "Cost_Actual"]
+
+
+class TestEvaluateStream(unittest.TestCase):
+
+    def setUp(self):
+        self.system = build_system("sugeno")
+        self.data = np.random.default_rng(5).uniform(0, 5000, (1000, 2))
+        self.expected = self.system.evaluate_batch(self.data, columns=NAMES)
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def collect(self, source, **options):
+        chunks = list(self.system.evaluate_stream(source, chunk_size=128, **options))
+        self.assertTrue(all(len(c) <= 128 for c in chunks))
+        return np.concatenate(chunks)
+
+    def test_array_source(self):
+        np.testing.assert_array_equal(self.collect(self.data, columns=NAMES), self.expected)
+
+    def test_mapping_source(self):
+        source = {name: self.data[:, i] for i, name in enumerate(NAMES)}
+        np.testing.assert_array_equal(self.collect(source), self.expected)
+
+    def test_record_iterators(self):
+        records = ({"Buget_Lunar": x, "Cost_Actual": y} for x, y in self.data.tolist())
+        np.testing.assert_array_equal(self.collect(records), self.expected)
+        rows = iter(self.data.tolist())
+        np.testing.assert_array_equal(self.collect(rows, columns=NAMES), self.expected)
+
+    def test_csv_source(self):
+        path = os.path.join(self.tmp.name, "inputs.csv")
+        with open(path, "w") as handle:
+            handle.write("id,Cost_Actual,Buget_Lunar\n")
+            for i, (x, y) in enumerate(self.data.tolist()):
+                handle.write(f"{i},{y!r},{x!r}\n")
+        np.testing.assert_array_equal(self.collect(path, columns=NAMES), self.expected)
+
+    def test_empty_csv(self):
+        path = os.path.join(self.tmp.name, "empty.csv")
+        with open(path, "w") as handle:
+            handle.write("")
+        with self.assertRaisesRegex(ValueError, "empty.csv"):
+            list(self.system.evaluate_stream(path))
+
+    def test_no_rows(self):
+        path = os.path.join(self.tmp.name, "header.csv")
+        with open(path, "w") as handle:
+            handle.write("Buget_Lunar,Cost_Actual\n")
+        for source in (path, iter([]), np.empty((0, 2))):
+            with self.subTest(source=type(source).__name__):
+                self.assertEqual(list(self.system.evaluate_stream(source, columns=NAMES)), [])
+
+    def test_npy_to_memmap_output(self):
+        source = os.path.join(self.tmp.name, "inputs.npy")
+        target = os.path.join(self.tmp.name, "outputs.npy")
+        np.save(source, self.data)
+        for _ in self.system.evaluate_stream(source, chunk_size=300, columns=NAMES, out=target):
+            pass
+        np.testing.assert_array_equal(np.load(target), self.expected)
+
+    def test_out_too_small(self):
+        with self.assertRaises(ValueError):
+            list(self.system.evaluate_stream(self.data, columns=NAMES, out=np.empty(10)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+import numpy as np
+
+from nebulo.membership import TriangularMF
+from nebulo.variables import FuzzyVariable
+from nebulo.rules import FuzzyRule, LinearOutput
+from nebulo.system import FuzzySystem
+from nebulo.surrogate import LookupTable
+
+from tests.test_batch import build_system
+
+
+def smooth_system():
+    # Shoulder terms cover the whole universe, so the output has no jumps
+    system = FuzzySystem(mode="sugeno")
+    for name in ("x", "y"):
+        var = FuzzyVariable(name, (0, 10))
+        var.add_term("low", TriangularMF(-10, 0, 10))
+        var.add_term("high", TriangularMF(0, 10, 20))
+        system.add_variable(var)
+    for i, (a, b) in enumerate([("low", "low"), ("low", "high"), ("high", "low"), ("high", "high")]):
+        system.add_rule(FuzzyRule([("x", a), ("y", b)], [0, 30, 60, 100][i]))
+    return system
+
+
+class TestLookupTable(unittest.TestCase):
+
+    def test_exact_on_grid_nodes(self):
+        system = build_system("sugeno")
+        lut = system.to_lut(resolution=9)
+        for x in lut.axes[0][::3]:
+            for y in lut.axes[1][::3]:
+                inputs = {"Buget_Lunar": x, "Cost_Actual": y}
+                self.assertAlmostEqual(lut.evaluate(inputs), system.evaluate(inputs), places=9)
+
+    def test_scalar_matches_batch(self):
+        lut = build_system("mamdani").to_lut(resolution=15)
+        rng = np.random.default_rng(4)
+        inputs = {"Buget_Lunar": rng.uniform(-100, 5100, 200), "Cost_Actual": rng.uniform(0, 5000, 200)}
+        expected = [lut.evaluate({"Buget_Lunar": x, "Cost_Actual": y})
+                    for x, y in zip(inputs["Buget_Lunar"], inputs["Cost_Actual"])]
+        np.testing.assert_allclose(lut.evaluate_batch(inputs), expected, atol=1e-12)
+
+    def test_tolerance_bounds_error(self):
+        system = smooth_system()
+        coarse = system.to_lut(resolution=3)
+        fine = system.to_lut(resolution=3, tolerance=0.1)
+        self.assertLess(fine.max_error, coarse.max_error)
+        self.assertLess(fine.max_error, 0.2)
+        self.assertGreater(len(fine), len(coarse))
+
+    def test_max_points(self):
+        with self.assertRaises(ValueError):
+            build_system("sugeno").to_lut(resolution=2000, max_points=10_000)
+
+    def test_rejects_callable_consequents(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Buget_Lunar", "mediu")], lambda inputs: inputs["Buget_Lunar"] / 50))
+        with self.assertRaises(ValueError):
+            system.to_lut(resolution=5)
+
+    def test_linear_output_inputs_become_axes(self):
+        system = build_system("sugeno")
+        system.add_rule(FuzzyRule([("Cost_Actual", "mare")], LinearOutput({"Marja": 10}, 5)))
+        with self.assertRaises(ValueError):
+            system.to_lut(resolution=5)
+        lut = system.to_lut(resolution=5, universes={"Marja": (0, 5)})
+        self.assertEqual(len(lut.axes), 3)
+        grid = np.meshgrid(*lut.axes, indexing="ij")
+        inputs = {name: axis.ravel() for name, axis in zip(["Buget_Lunar", "Cost_Actual", "Marja"], grid)}
+        np.testing.assert_allclose(lut.evaluate_batch(inputs), system.evaluate_batch(inputs), atol=1e-9)
+
+    def test_shape_validation(self):
+        with self.assertRaises(ValueError):
+            LookupTable({"x": [0, 1, 2]}, np.zeros(2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -34,9 +34,14 @@ class TestFuzzySystem(unittest.TestCase):
         self.assertAlmostEqual(output, 100, places=1)
 
     def test_mamdani_evaluation(self):
+        level = FuzzyVariable("alert_level")
+        level.add_term("normal", TriangularMF(0, 0, 50))
+        level.add_term("alert", TriangularMF(50, 100, 100))
+
         mamdani_system = FuzzySystem(mode="mamdani")
         mamdani_system.add_variable(self.consumption)
         mamdani_system.add_variable(self.trend)
+        mamdani_system.add_output(level)
 
         rule_m1 = FuzzyRule([("weekly_consumption", "high"), ("trend", "increasing")], "alert")
         rule_m2 = FuzzyRule([("weekly_consumption", "low"), ("trend", "decreasing")], "normal")
@@ -45,7 +50,8 @@ class TestFuzzySystem(unittest.TestCase):
 
         inputs = {"weekly_consumption": 600, "trend": 150}
         output = mamdani_system.evaluate(inputs)
-        self.assertIn("alert", output)
+        # Only the "alert" rule fires (at 0.5): centroid of "alert" clipped at 0.5
+        self.assertAlmostEqual(output, 725 / 9, places=9)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file